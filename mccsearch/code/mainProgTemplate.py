@@ -72,6 +72,10 @@ def main():
     #if the TRMMdirName wasnt entered for whatever reason, you can still get the TRMM data this way
     # CEGraph = mccSearch.findCloudElements(mergImgs,timeList)
     # allCETRMMList=mccSearch.findPrecipRate(TRMMdirName,timeList)
+    #for long periods, the frames can be read, linked, pruned and classified one at a time instead
+    # MCCList,MCSList = mccSearch.streamMCCSearch(mccSearch.iterMergData(CEoriDirName), TRMMdirName)
+    #or the files can be split in chunks that are searched for CEs in parallel, then findCloudClusters and findMCC used as below
+    # CEGraph = mccSearch.findCloudElementsParallel(CEoriDirName, TRMMdirName=TRMMdirName)
     # ----------------------------------------------------------------------------------------------
     print ("-"*80)
     print "number of nodes in CEGraph is: ", CEGraph.number_of_nodes()
@@ -94,6 +98,7 @@ def main():
     #some calculations/metrics that work that work
     # print "creating the MCC userfile ", mccSearch.createTextFile(MCCList,1)
     # print "creating the MCS userfile ", mccSearch.createTextFile(MCSList,2)
+    # summary = mccSearch.writeFeatureSummary(MCCList,1)
     # MCCTimes, tdelta = mccSearch.temporalAndAreaInfoMetric(MCCList)
     # print "number of MCCs is: ", mccSearch.numberOfFeatures(MCCList)
     # print "longest duration is: ", mccSearch.longestDuration(MCCTimes), "hrs"
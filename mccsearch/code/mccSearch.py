@@ -19,9 +19,12 @@
 # Following RCMES dataformat in format (t,lat,lon), value
 '''
 
+from collections import OrderedDict
 from datetime import timedelta, datetime
 import glob
 import itertools
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
 from netCDF4 import Dataset, date2num
 import numpy as np
 import numpy.ma as ma
@@ -29,6 +32,7 @@ import os
 import pickle
 import re
 from scipy import ndimage
+import shutil
 import string
 import subprocess
 import sys
@@ -80,14 +84,41 @@ MINIMUM_DURATION = 6 #min number of frames the MCC must exist for (assuming hrly
 MAXIMUM_DURATION = 24#max number of framce the MCC can last for 
 #------------------- End user defined Variables -------------------
 edgeWeight = [1,2,3] #weights for the graph edges
+#file in MAINDIRECTORY storing the boxes of all the CEs found
+CE_STORE_FILENAME = 'cloudElements.nc'
+CE_STORE_EPOCH = datetime(1970, 1, 1)
+CE_STORE_TIME_UNITS = 'hours since 1970-01-01 00:00:00'
+#the fixed numeric columns of each CE, with its boxes from firstPixel in the pixels of the table. See createCloudElementTable
+CE_TABLE_DTYPE = np.dtype([('uniqueID', 'S32'), ('frameNum', 'i4'), ('time', 'f8'), ('area', 'f8'), 
+	('centerLat', 'f8'), ('centerLon', 'f8'), ('eccentricity', 'f8'), ('Tmin', 'f8'), ('Tmax', 'f8'), 
+	('hasTRMM', '?'), ('precipTotal', 'f8'), ('TRMMArea', 'f8'), ('TRMMmax', 'f8'), ('TRMMmin', 'f8'), 
+	('firstPixel', 'i8'), ('numOfPixels', 'i4'), ('CriteriaBArea', 'f8'), 
+	('nodeBehaviorIdentifier', 'S1'), ('nodeMCSIdentifier', 'S1')])
+CE_PIXEL_DTYPE = np.dtype([('latIndex', 'i2'), ('lonIndex', 'i2'), ('brightnesstemp', 'i2')])
+
+#file in MAINDIRECTORY storing the cumulative precipitation of the CEs. See createAccumulationIndex
+ACCU_INDEX_FILENAME = 'precipAccumulationIndex.nc'
+
+TRMM_TRES = 3 #temporal resolution of the TRMM data in hrs
+TRMM_CACHE_SIZE = 8
+#TRMM fields regridded to the MERG grid, by (TRMMdirName, time) in least recently used order
+TRMM_CACHE = OrderedDict()
 #graph object fo the CEs meeting the criteria
 CLOUD_ELEMENT_GRAPH = nx.DiGraph()
+#the CEs of CLOUD_ELEMENT_GRAPH, each node has the CEindex of its row
+CE_TABLE = {'records': np.zeros(0, dtype=CE_TABLE_DTYPE), 'numOfCEs': 0,
+	'pixels': np.zeros(0, dtype=CE_PIXEL_DTYPE), 'numOfPixels': 0}
 #graph meeting the CC criteria
 PRUNED_GRAPH = nx.DiGraph()
+# these strings are specific to the MERG data
+MERG_VARNAME = 'ch4'
+MERG_TIME_VARNAME = 'time'
+MERG_LAT_VARNAME = 'latitude'
+MERG_LON_VARNAME = 'longitude'
 #------------------------ End GLOBAL VARS -------------------------
 #************************ Begin Functions *************************
 #******************************************************************
-def readMergData(dirname, filelist = None):
+def readMergData(dirname, filelist = None, numThreads = 1):
 	'''
 	Purpose::
 		Read MERG data into RCMES format
@@ -95,6 +126,7 @@ def readMergData(dirname, filelist = None):
 	Input::
 		dirname: a string representing the directory to the MERG files in NETCDF format
 		filelist (optional): a list of strings representing the filenames betweent the start and end dates provided
+		numThreads (optional): an integer representing the number of files to read at the same time
 	
 	Output::
 		A 3D masked array (t,lat,lon) with only the variables which meet the minimum temperature 
@@ -104,90 +136,177 @@ def readMergData(dirname, filelist = None):
 		The MERG data has been converted to NETCDF using LATS4D
 		The data has the same lat/lon format
 
-	TODO:: figure out how to use netCDF4 to do the clipping tmp = netCDF4.Dataset(filelist[0])
+	'''
+
+	filelist, latSlice, lonSlice = openMergData(dirname, filelist)
+
+	#the cube that will contain all the masked frames, sized from the header of each file and filled in place file by file
+	framesPerFile = map(countMergFrames, filelist)
+	firstFrames = np.cumsum([0] + framesPerFile)
+	nframes = firstFrames[-1]
+	mergImgs = np.zeros((nframes, LAT.shape[0], LAT.shape[1]), dtype='int16')
+	#timelist of python time strings
+	timelist = [None]*nframes
+	goodFrames = np.zeros(nframes, dtype=bool)
+
+	for fileNum, (tempMaskedValue, time2store) in enumerate(mapMergFiles(filelist, latSlice, lonSlice, numThreads)):
+		if tempMaskedValue is None:
+			continue
+
+		start, end = firstFrames[fileNum], firstFrames[fileNum+1]
+		if tempMaskedValue.shape[0] != end - start:
+			print "bad file! ", filelist[fileNum], " has ", tempMaskedValue.shape[0], " times instead of ", end - start
+			continue
+
+		mergImgs[start:end,:,:] = tempMaskedValue
+		timelist[start:end] = time2store
+		goodFrames[start:end] = True
+
+	#only drop the frames of bad files if there were any, to avoid a copy of the cube
+	if not goodFrames.all():
+		mergImgs = mergImgs[goodFrames]
+		timelist = [thisTime for thisTime, good in zip(timelist, goodFrames) if good]
+
+	return ma.asarray(mergImgs), timelist
+#******************************************************************
+def iterMergData(dirname, filelist = None, numThreads = 1):
+	'''
+	Purpose::
+		Read MERG data frame by frame, so that only the frames of the files being read are in memory.
+		The frames can be passed to findCloudElements instead of the output of readMergData
+	
+	Input::
+		dirname: a string representing the directory to the MERG files in NETCDF format
+		filelist (optional): a list of strings representing the filenames betweent the start and end dates provided
+		numThreads (optional): an integer representing the number of files to read ahead at the same time
+	
+	Output::
+		A generator of (python datetime, 2D array (lat,lon)) of the variables which meet the minimum 
+		temperature criteria for each frame
+
+	Assumptions::
+		The MERG data has been converted to NETCDF using LATS4D
+		The data has the same lat/lon format
 
 	'''
 
+	filelist, latSlice, lonSlice = openMergData(dirname, filelist)
+
+	for tempMaskedValue, time2store in mapMergFiles(filelist, latSlice, lonSlice, numThreads):
+		if tempMaskedValue is None:
+			continue
+		for frameTime, mergFrame in itertools.izip(time2store, tempMaskedValue):
+			yield frameTime, mergFrame
+#******************************************************************
+def openMergData(dirname, filelist = None):
+	'''
+	Purpose::
+		Finds the MERG files to read and the part of the grid within the user lat,lon limits
+	
+	Input::
+		dirname: a string representing the directory to the MERG files in NETCDF format
+		filelist (optional): a list of strings representing the filenames betweent the start and end dates provided
+	
+	Output::
+		filelist: a sorted list of strings representing the filenames
+		latSlice, lonSlice: slices of the lat and lon indices within LATMIN:LATMAX and LONMIN:LONMAX
+
+	Assumptions::
+		The data has the same lat/lon format
+		NB: also sets LAT and LON for the clipped grid
+	'''
+
 	global LAT
 	global LON
 
-	# these strings are specific to the MERG data
-	mergVarName = 'ch4'
-	mergTimeVarName = 'time'
-	mergLatVarName = 'latitude'
-	mergLonVarName = 'longitude'
-	
 	filelistInstructions = dirname + '/*'
 	if filelist == None:
 		filelist = glob.glob(filelistInstructions)
 
-	
-	#sat_img is the array that will contain all the masked frames
-	mergImgs = []
-	#timelist of python time strings
-	timelist = [] 
-	time2store = None
-	tempMaskedValueNp =[]
-	
-
 	filelist.sort()
-	nfiles = len(filelist)
 
 	# Crash nicely if there are no netcdf files
-	if nfiles == 0:
+	if len(filelist) == 0:
 		print 'Error: no files in this directory! Exiting elegantly'
 		sys.exit()
-	else:
-		# Open the first file in the list to read in lats, lons and generate the  grid for comparison
-		#tmp = Nio.open_file(filelist[0], format='nc')
-		tmp = Dataset(filelist[0], format='NETCDF4')
-
-		#clip the lat/lon grid according to user input
-		#http://www.pyngl.ucar.edu/NioExtendedSelection.shtml
-		latsraw = tmp.variables[mergLatVarName][mergLatVarName+"|"+LATMIN+":"+LATMAX].astype('f2')
-		lonsraw = tmp.variables[mergLonVarName][mergLonVarName+"|"+LONMIN+":"+LONMAX].astype('f2')
-		lonsraw[lonsraw > 180] = lonsraw[lonsraw > 180] - 360.  # convert to -180,180 if necessary
-		
-		LON, LAT = np.meshgrid(lonsraw, latsraw)
-		#clean up
-		latsraw =[]
-		lonsraw = []
-		nygrd = len(LAT[:, 0]); nxgrd = len(LON[0, :])
-		tmp.close
-	
-	for files in filelist:
-		try:
-			#thisFile = Nio.open_file(files, format='nc') 
-			thisFile = Dataset(files, format='NETCDF4')
-			#clip the dataset according to user lat,lon coordinates
-			#mask the data and fill with zeros for later 
-			tempRaw = thisFile.variables[mergVarName][mergLatVarName+"|"+LATMIN+":"+LATMAX \
-									   +" " +mergLonVarName+"|"+LONMIN+":"+LONMAX ].astype('int16')
-
-			tempMask = ma.masked_array(tempRaw, mask=(tempRaw > T_BB_MAX), fill_value=0) 
-			
-			#get the actual values that the mask returned
-			tempMaskedValue = ma.zeros((tempRaw.shape)).astype('int16')
-			for index, value in maenumerate(tempMask): 
-				time_index, lat_index, lon_index = index			
-				tempMaskedValue[time_index,lat_index, lon_index]=value	
-				
-			timesRaw = thisFile.variables[mergTimeVarName]
-			#convert this time to a python datastring
-			time2store, _ = process.getModelTimes(files, mergTimeVarName)
-			#extend instead of append because getModelTimes returns a list already and we don't 
-			#want a list of list
-			timelist.extend(time2store)
-			mergImgs.extend(tempMaskedValue) 
-			thisFile.close
-			thisFile = None
-			
-		except:
-			print "bad file! ", file
 
-	mergImgs = ma.array(mergImgs)
+	# Open the first file in the list to read in lats, lons and generate the  grid for comparison
+	tmp = Dataset(filelist[0], format='NETCDF4')
+	latsraw = tmp.variables[MERG_LAT_VARNAME][:]
+	lonsraw = tmp.variables[MERG_LON_VARNAME][:]
+	tmp.close()
+	lonsraw[lonsraw > 180] = lonsraw[lonsraw > 180] - 360.  # convert to -180,180 if necessary
 
-	return mergImgs, timelist
+	#clip the lat/lon grid according to user input
+	latIndices = np.where((latsraw >= float(LATMIN)) & (latsraw <= float(LATMAX)))[0]
+	lonIndices = np.where((lonsraw >= float(LONMIN)) & (lonsraw <= float(LONMAX)))[0]
+	latSlice = slice(latIndices[0], latIndices[-1]+1)
+	lonSlice = slice(lonIndices[0], lonIndices[-1]+1)
+
+	LON, LAT = np.meshgrid(lonsraw[lonSlice].astype('f2'), latsraw[latSlice].astype('f2'))
+
+	return filelist, latSlice, lonSlice
+#******************************************************************
+def readMergFile(fileName, latSlice, lonSlice):
+	'''
+	Purpose::
+		Read one MERG file clipped to the user lat,lon limits
+	
+	Input::
+		fileName: a string representing the MERG file in NETCDF format
+		latSlice, lonSlice: slices of the lat and lon indices to read
+	
+	Output::
+		tempMaskedValue: a 3D int16 array (t,lat,lon) of the temperatures meeting T_BB_MAX, 0 elsewhere
+		time2store: a list of python datetimes of the frames
+		Both are None if the file can't be read
+	'''
+
+	try:
+		thisFile = Dataset(fileName, format='NETCDF4')
+		#clip the dataset according to user lat,lon coordinates
+		tempRaw = ma.filled(thisFile.variables[MERG_VARNAME][:,latSlice,lonSlice], T_BB_MAX+1).astype('int16')
+		thisFile.close()
+
+		#mask the data and fill with zeros for later
+		tempRaw[tempRaw > T_BB_MAX] = 0
+
+		#convert this time to a python datastring
+		time2store, _ = process.getModelTimes(fileName, MERG_TIME_VARNAME)
+
+	except:
+		print "bad file! ", fileName
+		return None, None
+
+	return tempRaw, time2store
+#******************************************************************
+def mapMergFiles(filelist, latSlice, lonSlice, numThreads = 1):
+	'''
+	Purpose::
+		Read MERG files in order, with up to numThreads files being read at the same time
+	
+	Input::
+		filelist: a list of strings representing the MERG files in NETCDF format
+		latSlice, lonSlice: slices of the lat and lon indices to read
+		numThreads (optional): an integer representing the number of files to read at the same time
+	
+	Output::
+		A generator of the output of readMergFile for each file in filelist
+	'''
+
+	readFile = lambda fileName: readMergFile(fileName, latSlice, lonSlice)
+
+	if numThreads <= 1:
+		for fileName in filelist:
+			yield readFile(fileName)
+		return
+
+	pool = ThreadPool(numThreads)
+	try:
+		for result in pool.imap(readFile, filelist):
+			yield result
+	finally:
+		pool.terminate()
 #******************************************************************
 def findCloudElements(mergImgs,timelist,TRMMdirName=None):
 	'''
@@ -198,23 +317,24 @@ def findCloudElements(mergImgs,timelist,TRMMdirName=None):
 	Input::	
 		mergImgs: masked numpy array in (time,lat,lon),T_bb representing the satellite data. This is masked based on the
 		maximum acceptable temperature, T_BB_MAX
-		timelist: a list of python datatimes
+			or a generator of (python datetime, 2D array (lat,lon)) from iterMergData
+		timelist: a list of python datatimes, or None if mergImgs is a generator from iterMergData
 		TRMMdirName (optional): string representing the path where to find the TRMM datafiles
 		
 	Output::
-		CLOUD_ELEMENT_GRAPH: a Networkx directed graph where each node contains the information in cloudElementDict
+		CLOUD_ELEMENT_GRAPH: a Networkx directed graph where each node has the CEindex of its row in CE_TABLE
 		The nodes are determined according to the area of contiguous squares. The nodes are linked through weighted edges.
+		NB: also adds the CEs to CE_TABLE. thisDict gives the information of a node as cloudElementDict, 
+		without the boxes of the CE that are given by cloudElementLatLons and the cloud element store
 
 		cloudElementDict = {'uniqueID': unique tag for this CE, 
 							'cloudElementTime': time of the CE,
-							'cloudElementLatLon': (lat,lon,value) of MERG data of CE, 
 							'cloudElementCenter':list of floating-point [lat,lon] representing the CE's center 
 							'cloudElementArea':floating-point representing the area of the CE, 
 							'cloudElementEccentricity': floating-point representing the shape of the CE, 
 							'cloudElementTmax':integer representing the maximum Tb in CE, 
 							'cloudElementTmin': integer representing the minimum Tb in CE, 
 							'cloudElementPrecipTotal':floating-point representing the sum of all rainfall in CE if TRMMdirName entered,
-							'cloudElementLatLonTRMM':(lat,lon,value) of TRMM data in CE if TRMMdirName entered, 
 							'TRMMArea': floating-point representing the CE if TRMMdirName entered,
 							'CETRMMmax':floating-point representing the max rate in the CE if TRMMdirName entered, 
 							'CETRMMmin':floating-point representing the min rate in the CE if TRMMdirName entered}
@@ -224,26 +344,266 @@ def findCloudElements(mergImgs,timelist,TRMMdirName=None):
 		therefore, 2400/16 = 150 contiguous squares
 	'''
 
-	frame = ma.empty((1,mergImgs.shape[1],mergImgs.shape[2]))
+	#openfile for storing the boxes of all the CEs meeting the criteria
+	ceStore = createCloudElementStore()
+
+	#openfile for storing ALL cloudElement information 
+	cloudElementsFile = open((MAINDIRECTORY+'/textFiles/cloudElements.txt'),'wb')
+	#openfile for storing cloudElement information meeting user criteria i.e. MCCs in this case
+	cloudElementsUserFile = open((MAINDIRECTORY+'/textFiles/cloudElementsUserFile.txt'),'w')
+	
+	#the frames are either all in the mergImgs array or given one at a time by iterMergData
+	if timelist is None:
+		mergFrames = mergImgs
+	else:
+		mergFrames = itertools.izip(timelist, mergImgs)
+
+	for frame, frameCEs in generateCloudElements(mergFrames, TRMMdirName, ceStore, cloudElementsFile, cloudElementsUserFile):
+		pass
+						
+	ceStore.close()
+	cloudElementsFile.close
+	cloudElementsUserFile.close
+	#if using ARCGIS data store code, uncomment this file close line
+	#cloudElementsTextFile.close
+
+	cleanUpCloudElementGraph()
+
+	return CLOUD_ELEMENT_GRAPH	
+#******************************************************************
+def cleanUpCloudElementGraph():
+	'''
+	Purpose::
+		Removes the CEs that are not linked to any other CE from CLOUD_ELEMENT_GRAPH and draws it
+
+	Input::
+		None
+
+	Output::
+		None
+	'''
+
+	#clean up graph - remove parent and childless nodes
+	outAndInDeg = CLOUD_ELEMENT_GRAPH.degree_iter()
+	toRemove = [node[0] for node in outAndInDeg if node[1]<1]
+	CLOUD_ELEMENT_GRAPH.remove_nodes_from(toRemove)
+	
+	print "number of nodes are: ", CLOUD_ELEMENT_GRAPH.number_of_nodes()
+	print "number of edges are: ", CLOUD_ELEMENT_GRAPH.number_of_edges()
+	print ("*"*80)
+
+	#hierachial graph output
+	graphTitle = "Cloud Elements observed over somewhere from 0000Z to 0000Z" 
+	drawGraph(CLOUD_ELEMENT_GRAPH, graphTitle, edgeWeight)
+
+	return
+#******************************************************************
+def findCloudElementsParallel(dirname, filelist=None, TRMMdirName=None, numProcesses=None, filesPerChunk=24):
+	'''
+	Purpose::
+		Does the same as readMergData and findCloudElements, but with the time range split into chunks 
+		of consecutive MERG files that are searched for CEs at the same time in a pool of processes.
+		The CEs in each chunk are linked by the worker, then the chunks are stitched by linking the 
+		last frame of each chunk to the first frame of the next, so the graph is the same as a serial run
+
+	Input::
+		dirname: a string representing the directory to the MERG files in NETCDF format
+		filelist (optional): a list of strings representing the filenames betweent the start and end dates provided
+		TRMMdirName (optional): string representing the path where to find the TRMM datafiles
+		numProcesses (optional): an integer representing the number of processes, the number of cpus by default
+		filesPerChunk (optional): an integer representing the number of MERG files in each chunk
+
+	Output::
+		CLOUD_ELEMENT_GRAPH: a Networkx directed graph as from findCloudElements
+
+	Assumptions::
+		The MERG files that can be opened can also be read, so that the frames are numbered as in a serial run
+		The workers only use the module settings and the arguments they are given
+	'''
+
+	filelist, latSlice, lonSlice = openMergData(dirname, filelist)
+
+	pool = Pool(numProcesses)
+	try:
+		#number the frames of each chunk as in a serial run
+		framesPerFile = pool.map(countMergFrames, filelist)
+
+		#drop the files that can't be read, as readMergData does
+		goodFiles = []
+		for fileName, numOfFrames in zip(filelist, framesPerFile):
+			if numOfFrames == 0:
+				print "bad file! ", fileName
+			else:
+				goodFiles.append(fileName)
+		framesPerFile = [numOfFrames for numOfFrames in framesPerFile if numOfFrames != 0]
+		filelist = goodFiles
+
+		chunks = []
+		firstFrameNum = 1
+		for chunkNum, firstFile in enumerate(xrange(0, len(filelist), filesPerChunk)):
+			chunkFiles = filelist[firstFile:firstFile+filesPerChunk]
+			chunks.append((chunkNum, chunkFiles, latSlice, lonSlice, TRMMdirName, firstFrameNum, MAINDIRECTORY, LAT, LON))
+			firstFrameNum += sum(framesPerFile[firstFile:firstFile+filesPerChunk])
+
+		chunkResults = pool.map(findChunkCloudElements, chunks)
+	finally:
+		pool.close()
+		pool.join()
+
+	#stitch the chunks, in order
+	prevResult = None
+	for chunkResult in chunkResults:
+		offset = mergeCloudElementTables(CE_TABLE, chunkResult['ceTable'])
+		CLOUD_ELEMENT_GRAPH.add_nodes_from((node, {'CEindex': data['CEindex']+offset}) for node, data in chunkResult['nodes'])
+		CLOUD_ELEMENT_GRAPH.add_edges_from(chunkResult['edges'])
+		if chunkResult['firstFrame'] is None:
+			continue
+		if prevResult is not None:
+			prevFrame, prevFrameCEs = prevResult['lastFrame']
+			currFrame, currFrameCEs = chunkResult['firstFrame']
+			linkCloudElements(CLOUD_ELEMENT_GRAPH, prevFrame, prevFrameCEs, currFrame, currFrameCEs)
+		prevResult = chunkResult
+
+	#gather the files of the chunks into the files of the run
+	ceStore = createCloudElementStore()
+	mergeCloudElementStores(ceStore, [chunkResult['ceStoreFile'] for chunkResult in chunkResults])
+	ceStore.close()
+
+	for fileKey, fileName in [('cloudElementsFile', 'cloudElements.txt'), ('cloudElementsUserFile', 'cloudElementsUserFile.txt')]:
+		with open(MAINDIRECTORY+'/textFiles/'+fileName, 'wb') as textFile:
+			for chunkResult in chunkResults:
+				with open(chunkResult[fileKey], 'rb') as chunkFile:
+					shutil.copyfileobj(chunkFile, textFile)
+
+	for chunkResult in chunkResults:
+		for fileKey in ['ceStoreFile', 'cloudElementsFile', 'cloudElementsUserFile']:
+			os.remove(chunkResult[fileKey])
+
+	cleanUpCloudElementGraph()
+
+	return CLOUD_ELEMENT_GRAPH
+#******************************************************************
+def countMergFrames(fileName):
+	'''
+	Purpose::
+		Finds the number of frames in a MERG file without reading the data
+
+	Input::
+		fileName: a string representing the MERG file in NETCDF format
+
+	Output::
+		an integer representing the number of frames, 0 if the file can't be opened
+	'''
+
+	try:
+		thisFile = Dataset(fileName, format='NETCDF4')
+		numOfFrames = len(thisFile.variables[MERG_TIME_VARNAME])
+		thisFile.close()
+	except:
+		return 0
+
+	return numOfFrames
+#******************************************************************
+def findChunkCloudElements(chunk):
+	'''
+	Purpose::
+		Finds and links the CEs in a chunk of MERG files, in a worker process of findCloudElementsParallel.
+		Everything is kept in a graph and files of the chunk, and nothing is shared with the other chunks
+
+	Input::
+		chunk: a tuple of (chunkNum, chunkFiles, latSlice, lonSlice, TRMMdirName, firstFrameNum, mainDirectory, lat, lon) with
+			chunkNum: an integer representing the position of the chunk in the time range
+			chunkFiles: a list of strings representing the MERG files in the chunk
+			latSlice, lonSlice: slices of the lat and lon indices to read, from openMergData
+			TRMMdirName: string representing the path where to find the TRMM datafiles or None
+			firstFrameNum: an integer representing the number of the first frame of the chunk in the whole period
+			mainDirectory, lat, lon: the MAINDIRECTORY, LAT and LON of the run
+
+	Output::
+		chunkResult: a dictionary with
+			{'nodes', 'edges': lists of the nodes and edges of the graph of the chunk with their data,
+			 'ceTable': the table of CEs of the chunk that the nodes index,
+			 'firstFrame', 'lastFrame': (labelled frame, dictionary of label to CE uniqueID) of the first and 
+				 last frames of the chunk, or None if the chunk has no frames,
+			 'ceStoreFile', 'cloudElementsFile', 'cloudElementsUserFile': strings representing the files of the chunk}
+	'''
+
+	global MAINDIRECTORY
+	global LAT
+	global LON
+
+	chunkNum, chunkFiles, latSlice, lonSlice, TRMMdirName, firstFrameNum, MAINDIRECTORY, LAT, LON = chunk
+
+	chunkGraph = nx.DiGraph()
+	ceTable = createCloudElementTable()
+	ceStoreName = os.path.splitext(CE_STORE_FILENAME)[0]+'_chunk%d.nc' %chunkNum
+	chunkResult = {'firstFrame': None, 'lastFrame': None,
+		'ceStoreFile': MAINDIRECTORY+'/'+ceStoreName,
+		'cloudElementsFile': MAINDIRECTORY+'/textFiles/cloudElements_chunk%d.txt' %chunkNum,
+		'cloudElementsUserFile': MAINDIRECTORY+'/textFiles/cloudElementsUserFile_chunk%d.txt' %chunkNum}
+
+	ceStore = createCloudElementStore(ceStoreName)
+	cloudElementsFile = open(chunkResult['cloudElementsFile'], 'wb')
+	cloudElementsUserFile = open(chunkResult['cloudElementsUserFile'], 'w')
+
+	#the frames of the files that can be read, as from iterMergData
+	mergFrames = ((frameTime, mergFrame) 
+		for tempMaskedValue, time2store in mapMergFiles(chunkFiles, latSlice, lonSlice) if tempMaskedValue is not None 
+		for frameTime, mergFrame in itertools.izip(time2store, tempMaskedValue))
+	for frame, frameCEs in generateCloudElements(mergFrames, TRMMdirName, ceStore, cloudElementsFile, cloudElementsUserFile, chunkGraph, firstFrameNum, ceTable):
+		if chunkResult['firstFrame'] is None:
+			chunkResult['firstFrame'] = (frame, frameCEs)
+		chunkResult['lastFrame'] = (frame, frameCEs)
+
+	ceStore.close()
+	cloudElementsFile.close()
+	cloudElementsUserFile.close()
+
+	chunkResult['nodes'] = chunkGraph.nodes(data=True)
+	chunkResult['edges'] = chunkGraph.edges(data=True)
+	chunkResult['ceTable'] = ceTable
+
+	return chunkResult
+#******************************************************************
+def generateCloudElements(mergFrames, TRMMdirName, ceStore, cloudElementsFile, cloudElementsUserFile, CEGraph=None, firstFrameNum=1, ceTable=None):
+	'''
+	Purpose::
+		Adds the CEs of each frame to CLOUD_ELEMENT_GRAPH and links them to the CEs of the previous frame,
+		one frame at a time. Only the labels of the previous frame are kept between frames
+
+	Input::
+		mergFrames: an iterable of (python datetime, 2D array (lat,lon)) of the T_bb meeting T_BB_MAX for each frame
+		TRMMdirName: string representing the path where to find the TRMM datafiles or None
+		ceStore: a netCDF4 Dataset returned by createCloudElementStore
+		cloudElementsFile: the open textfile for all the cloudElement information
+		cloudElementsUserFile: the open textfile for the cloudElement information meeting user criteria
+		CEGraph (optional): the Networkx directed graph to add the CEs to, CLOUD_ELEMENT_GRAPH by default
+		firstFrameNum (optional): an integer representing the number of the first frame in the whole period
+		ceTable (optional): the table of CEs from createCloudElementTable that the nodes of CEGraph index, CE_TABLE by default
+
+	Output::
+		A generator of (labelled frame, dictionary of label to the uniqueID of each CE in the frame)
+		for each frame, given after the frame is linked
+
+	'''
+
 	CEcounter = 0
 	frameCEcounter = 0
-	frameNum = 0
+	frameNum = firstFrameNum - 1
 	cloudElementEpsilon = 0.0
 	cloudElementDict = {} 
 	cloudElementCenter = []		#list with two elements [lat,lon] for the center of a CE
-	prevFrameCEs = []			#list for CEs in previous frame
-	currFrameCEs = []			#list for CEs in current frame
+	prevFrameCEs = {}			#uniqueIDs of the CEs in previous frame by label
+	currFrameCEs = {}			#uniqueIDs of the CEs in current frame by label
+	prevFrame = None			#labelled previous frame
 	cloudElementLat = []		#list for a particular CE's lat values
 	cloudElementLon = []		#list for a particular CE's lon values
-	cloudElementLatLons = []	#list for a particular CE's (lat,lon) values
 	
 	prevLatValue = 0.0
 	prevLonValue = 0.0
 	TIR_min = 0.0
 	TIR_max = 0.0
-	temporalRes = 3 # TRMM data is 3 hourly
 	precipTotal = 0.0
-	CETRMMList =[]
 	precip =[]
 	TRMMCloudElementLatLons =[]
 
@@ -253,348 +613,325 @@ def findCloudElements(mergImgs,timelist,TRMMdirName=None):
 	maxCELonLimit = 0.0
 	
 	nygrd = len(LAT[:, 0]); nxgrd = len(LON[0, :])
+
+	if CEGraph is None:
+		CEGraph = CLOUD_ELEMENT_GRAPH
+	if ceTable is None:
+		ceTable = CE_TABLE
 	
-	#openfile for storing ALL cloudElement information 
-	cloudElementsFile = open((MAINDIRECTORY+'/textFiles/cloudElements.txt'),'wb')
-	#openfile for storing cloudElement information meeting user criteria i.e. MCCs in this case
-	cloudElementsUserFile = open((MAINDIRECTORY+'/textFiles/cloudElementsUserFile.txt'),'w')
-	
-	#NB in the TRMM files the info is hours since the time thus 00Z file has in 01, 02 and 03 times
-	for t in xrange(mergImgs.shape[0]):
+	for frameTime, mergFrame in mergFrames:
 		#-------------------------------------------------
 		# #textfile name for saving the data for arcgis
-		# thisFileName = MAINDIRECTORY+'/' + (str(timelist[t])).replace(" ", "_") + '.txt'
+		# thisFileName = MAINDIRECTORY+'/' + (str(frameTime)).replace(" ", "_") + '.txt'
 		# cloudElementsTextFile = open(thisFileName,'w')
 		#-------------------------------------------------
 
 		#determine contiguous locations with temeperature below the warmest temp i.e. cloudElements in each frame
-	   	frame, CEcounter = ndimage.measurements.label(mergImgs[t,:,:], structure=STRUCTURING_ELEMENT)
-	   	frameCEcounter=0
+		#and the properties of all of them at once
+		frame, frameCEs = findFrameCloudElements(mergFrame)
+		frameCEcounter=0
 		frameNum += 1
 
+		#if other dataset (TRMM) assumed to be a precipitation dataset was entered, 
+		#get it on the MERG grid once for all the CEs in the frame
+		if TRMMdirName and frameCEs:
+			regriddedTRMM = getRegriddedTRMM(TRMMdirName, frameTime)
+			framePrecip = findFrameCEPrecip(regriddedTRMM, frame, len(frameCEs))
+
 		#for each of the areas identified, check to determine if it a valid CE via an area and T requirement
-	   	for count in xrange(CEcounter):
-	   		#[0] is time dimension. Determine the actual values from the data
-	   		#loc is a masked array
-	   		try:
-	   			loc = ndimage.find_objects(frame==(count+1))[0]
-	   		except Exception, e:
-	   			print "Error is ", e
-	   			continue
-
-
-	   		cloudElement = mergImgs[t,:,:][loc]
-	   		labels, lcounter = ndimage.label(cloudElement)
-	   		
-	   		#determine the true lats and lons for this particular CE
-   			cloudElementLat = LAT[loc[0],0]
-   			cloudElementLon = LON[0,loc[1]] 
-   			
-	   		#determine number of boxes in this cloudelement
-	   		numOfBoxes = np.count_nonzero(cloudElement)
-	   		cloudElementArea = numOfBoxes*XRES*YRES
-
-	   		#If the area is greater than the area required, or if the area is smaller than the suggested area, check if it meets a convective fraction requirement
-	   		#consider as CE
-
-	   		if cloudElementArea >= AREA_MIN or (cloudElementArea < AREA_MIN and ((ndimage.minimum(cloudElement, labels=labels))/float((ndimage.maximum(cloudElement, labels=labels)))) < CONVECTIVE_FRACTION ):
-
-	   			#get some time information and labeling info
-	   			frameTime = str(timelist[t])
-	   			frameCEcounter +=1
-	   			CEuniqueID = 'F'+str(frameNum)+'CE'+str(frameCEcounter) 
-
-	   			#-------------------------------------------------
+		for thisCE in frameCEs:
+			#the (lat,lon,value) of each box in this CE is found by indexing the grid directly
+			cloudElementLat = LAT[thisCE['rows'],0]
+			cloudElementLon = LON[0,thisCE['cols']]
+			cloudElementValues = thisCE['values']
+
+			numOfBoxes = thisCE['numOfBoxes']
+			cloudElementArea = thisCE['cloudElementArea']
+
+			#the CE restricted to its bounding box, with the boxes of any other CE set to zero
+			loc = thisCE['slice']
+			cloudElement = np.where(frame[loc] == thisCE['label'], ma.filled(mergFrame[loc],0), 0)
+
+			#latCenter and lonCenter are given as indices in the frame so convert them to the overall domain truth
+			latCenter = LAT[int(round(thisCE['center'][0])),0]
+			lonCenter = LON[0,int(round(thisCE['center'][1]))]
+
+			#If the area is greater than the area required, or if the area is smaller than the suggested area, check if it meets a convective fraction requirement
+			#consider as CE
+
+			if cloudElementArea >= AREA_MIN or (cloudElementArea < AREA_MIN and thisCE['convectiveFraction'] < CONVECTIVE_FRACTION ):
+
+				#get some time information and labeling info
+				frameCEcounter +=1
+				CEuniqueID = 'F'+str(frameNum)+'CE'+str(frameCEcounter) 
+
+				#-------------------------------------------------
 				#textfile name for accesing CE data using MATLAB code
-				# thisFileName = MAINDIRECTORY+'/' + (str(timelist[t])).replace(" ", "_") + CEuniqueID +'.txt'
+				# thisFileName = MAINDIRECTORY+'/' + (str(frameTime)).replace(" ", "_") + CEuniqueID +'.txt'
 				# cloudElementsTextFile = open(thisFileName,'w')
 				#-------------------------------------------------
 
-				# ------ NETCDF File stuff for brightness temp stuff ------------------------------------
-				thisFileName = MAINDIRECTORY +'/MERGnetcdfCEs/cloudElements'+ (str(timelist[t])).replace(" ", "_") + CEuniqueID +'.nc'
-				currNetCDFCEData = Dataset(thisFileName, 'w', format='NETCDF4')
-				currNetCDFCEData.description = 'Cloud Element '+CEuniqueID + ' temperature data'
-				currNetCDFCEData.calendar = 'standard'
-				currNetCDFCEData.conventions = 'COARDS'
-				# dimensions
-				currNetCDFCEData.createDimension('time', None)
-				currNetCDFCEData.createDimension('lat', len(LAT[:,0]))
-				currNetCDFCEData.createDimension('lon', len(LON[0,:]))
-				# variables
-				tempDims = ('time','lat', 'lon',)
-				times = currNetCDFCEData.createVariable('time', 'f8', ('time',))
-				times.units = 'hours since '+ str(timelist[t])[:-6]
-				latitudes = currNetCDFCEData.createVariable('latitude', 'f8', ('lat',))
-				longitudes = currNetCDFCEData.createVariable('longitude', 'f8', ('lon',))
-				brightnesstemp = currNetCDFCEData.createVariable('brightnesstemp', 'i16',tempDims )
-				brightnesstemp.units = 'Kelvin'
-				# NETCDF data
-				dates=[timelist[t]+timedelta(hours=0)]
-				times[:] =  date2num(dates,units=times.units)
-				longitudes[:] = LON[0,:]
-				longitudes.units = "degrees_east" 
-				longitudes.long_name = "Longitude" 
-
-				latitudes[:] =  LAT[:,0]
-				latitudes.units = "degrees_north"
-				latitudes.long_name ="Latitude"
-				
-				#generate array of zeros for brightness temperature
-				brightnesstemp1 = ma.zeros((1,len(latitudes), len(longitudes))).astype('int16')
-				#-----------End most of NETCDF file stuff ------------------------------------
-
-				#if other dataset (TRMM) assumed to be a precipitation dataset was entered
 				if TRMMdirName:
-					#------------------TRMM stuff -------------------------------------------------
-					fileDate = ((str(timelist[t])).replace(" ", "")[:-8]).replace("-","")
-					fileHr1 = (str(timelist[t])).replace(" ", "")[-8:-6]
-					
-					if int(fileHr1) % temporalRes == 0:
-						fileHr = fileHr1
-					else:
-						fileHr = (int(fileHr1)/temporalRes) * temporalRes
-					if fileHr < 10:
-						fileHr = '0'+str(fileHr)
-					else:
-						str(fileHr)
-
-					#open TRMM file for the resolution info and to create the appropriate sized grid
-					TRMMfileName = TRMMdirName+'/3B42.'+ fileDate + "."+str(fileHr)+".7A.nc"
-					
-					TRMMData = Dataset(TRMMfileName,'r', format='NETCDF4')
-					precipRate = TRMMData.variables['pcp'][:,:,:]
-					latsrawTRMMData = TRMMData.variables['latitude'][:]
-					lonsrawTRMMData = TRMMData.variables['longitude'][:]
-					lonsrawTRMMData[lonsrawTRMMData > 180] = lonsrawTRMMData[lonsrawTRMMData>180] - 360.
-					LONTRMM, LATTRMM = np.meshgrid(lonsrawTRMMData, latsrawTRMMData)
-
-					nygrdTRMM = len(LATTRMM[:,0]); nxgrdTRMM = len(LONTRMM[0,:])
-					precipRateMasked = ma.masked_array(precipRate, mask=(precipRate < 0.0))
-					#---------regrid the TRMM data to the MERG dataset ----------------------------------
-					#regrid using the do_regrid stuff from the Apache OCW 
-					regriddedTRMM = ma.zeros((0, nygrd, nxgrd))
-					regriddedTRMM = process.do_regrid(precipRateMasked[0,:,:], LATTRMM,  LONTRMM, LAT, LON, order=1, mdi= -999999999)
-					#----------------------------------------------------------------------------------
-		
-					# #get the lat/lon info from cloudElement
-					#get the lat/lon info from the file
-					latCEStart = LAT[0][0]
-					latCEEnd = LAT[-1][0]
-					lonCEStart = LON[0][0]
-					lonCEEnd = LON[0][-1]
-					
-					#get the lat/lon info for TRMM data (different resolution)
-					latStartT = find_nearest(latsrawTRMMData, latCEStart)
-					latEndT = find_nearest(latsrawTRMMData, latCEEnd)
-					lonStartT = find_nearest(lonsrawTRMMData, lonCEStart)
-					lonEndT = find_nearest(lonsrawTRMMData, lonCEEnd)
-					latStartIndex = np.where(latsrawTRMMData == latStartT)
-					latEndIndex = np.where(latsrawTRMMData == latEndT)
-					lonStartIndex = np.where(lonsrawTRMMData == lonStartT)
-					lonEndIndex = np.where(lonsrawTRMMData == lonEndT)
-
-					#get the relevant TRMM info 
-					CEprecipRate = precipRate[:,(latStartIndex[0][0]-1):latEndIndex[0][0],(lonStartIndex[0][0]-1):lonEndIndex[0][0]]
-					TRMMData.close()
-					
-					# ------ NETCDF File info for writing TRMM CE rainfall ------------------------------------
-					thisFileName = MAINDIRECTORY+'/TRMMnetcdfCEs/TRMM' + (str(timelist[t])).replace(" ", "_") + CEuniqueID +'.nc'
-					currNetCDFTRMMData = Dataset(thisFileName, 'w', format='NETCDF4')
-					currNetCDFTRMMData.description = 'Cloud Element '+CEuniqueID + ' precipitation data'
-					currNetCDFTRMMData.calendar = 'standard'
-					currNetCDFTRMMData.conventions = 'COARDS'
-					# dimensions
-					currNetCDFTRMMData.createDimension('time', None)
-					currNetCDFTRMMData.createDimension('lat', len(LAT[:,0]))
-					currNetCDFTRMMData.createDimension('lon', len(LON[0,:]))
-					
-					# variables
-					TRMMprecip = ('time','lat', 'lon',)
-					times = currNetCDFTRMMData.createVariable('time', 'f8', ('time',))
-					times.units = 'hours since '+ str(timelist[t])[:-6]
-					latitude = currNetCDFTRMMData.createVariable('latitude', 'f8', ('lat',))
-					longitude = currNetCDFTRMMData.createVariable('longitude', 'f8', ('lon',))
-					rainFallacc = currNetCDFTRMMData.createVariable('precipitation_Accumulation', 'f8',TRMMprecip )
-					rainFallacc.units = 'mm'
-
-					longitude[:] = LON[0,:]
-					longitude.units = "degrees_east" 
-					longitude.long_name = "Longitude" 
-
-					latitude[:] =  LAT[:,0]
-					latitude.units = "degrees_north"
-					latitude.long_name ="Latitude"
-
-					finalCETRMMvalues = ma.zeros((brightnesstemp.shape))
-					#-----------End most of NETCDF file stuff ------------------------------------
-
-	   			#populate cloudElementLatLons by unpacking the original values from loc to get the actual value for lat and lon
-				#TODO: KDW - too dirty... play with itertools.izip or zip and the enumerate with this
-				# 			as cloudElement is masked
-				for index,value in np.ndenumerate(cloudElement):
-					if value != 0 : 
-						lat_index,lon_index = index
-						lat_lon_tuple = (cloudElementLat[lat_index], cloudElementLon[lon_index],value)
-
-						#generate the comma separated file for GIS
-						cloudElementLatLons.append(lat_lon_tuple)
-
-						#temp data for CE NETCDF file
-						brightnesstemp1[0,int(np.where(LAT[:,0]==cloudElementLat[lat_index])[0]),int(np.where(LON[0,:]==cloudElementLon[lon_index])[0])] = value
-						
-						if TRMMdirName:
-							finalCETRMMvalues[0,int(np.where(LAT[:,0]==cloudElementLat[lat_index])[0]),int(np.where(LON[0,:]==cloudElementLon[lon_index])[0])] = regriddedTRMM[int(np.where(LAT[:,0]==cloudElementLat[lat_index])[0]),int(np.where(LON[0,:]==cloudElementLon[lon_index])[0])]
-							CETRMMList.append((cloudElementLat[lat_index], cloudElementLon[lon_index], finalCETRMMvalues[0,cloudElementLat[lat_index], cloudElementLon[lon_index]]))
-
+					CETRMMValues = regriddedTRMM[thisCE['rows'],thisCE['cols']]
+				else:
+					CETRMMValues = None
 
-				brightnesstemp[:] = brightnesstemp1[:]
-				currNetCDFCEData.close()
+				#add the boxes of this CE to the cloud element store
+				appendCloudElement(ceStore, CEuniqueID, frameTime, thisCE['rows'], thisCE['cols'], cloudElementValues, CETRMMValues)
 
 				if TRMMdirName:
 
-					#calculate the total precip associated with the feature
-					for index, value in np.ndenumerate(finalCETRMMvalues):
-						precipTotal += value 
-						precip.append(value)
-			
-					rainFallacc[:] = finalCETRMMvalues[:]
-					currNetCDFTRMMData.close()
-					TRMMnumOfBoxes = np.count_nonzero(finalCETRMMvalues)
-					TRMMArea = TRMMnumOfBoxes*XRES*YRES
-					try:
-						maxCEprecipRate = np.max(finalCETRMMvalues[np.nonzero(finalCETRMMvalues)])
-						minCEprecipRate = np.min(finalCETRMMvalues[np.nonzero(finalCETRMMvalues)])
-					except:
-						pass
-
-				#sort cloudElementLatLons by lats
-				cloudElementLatLons.sort(key=lambda tup: tup[0])	
+					#the precip associated with the feature was calculated for all the CEs in the frame
+					precipTotal = framePrecip['precipTotal'][thisCE['label']-1]
+					TRMMArea = framePrecip['TRMMArea'][thisCE['label']-1]
+					maxCEprecipRate = framePrecip['CETRMMmax'][thisCE['label']-1]
+					minCEprecipRate = framePrecip['CETRMMmin'][thisCE['label']-1]
 
 				#determine if the cloud element the shape 
 				cloudElementEpsilon = eccentricity (cloudElement)
-				cloudElementsUserFile.write("\n\nTime is: %s" %(str(timelist[t])))
+				cloudElementsUserFile.write("\n\nTime is: %s" %(str(frameTime)))
 				cloudElementsUserFile.write("\nCEuniqueID is: %s" %CEuniqueID)
-				latCenter, lonCenter = ndimage.measurements.center_of_mass(cloudElement, labels=labels)
-				
-				#latCenter and lonCenter are given according to the particular array defining this CE
-				#so you need to convert this value to the overall domain truth
-				latCenter = cloudElementLat[round(latCenter)]
-				lonCenter = cloudElementLon[round(lonCenter)]
 				cloudElementsUserFile.write("\nCenter (lat,lon) is: %.2f\t%.2f" %(latCenter, lonCenter))
-				cloudElementCenter.append(latCenter)
-				cloudElementCenter.append(lonCenter)
+				cloudElementCenter = [latCenter, lonCenter]
 				cloudElementsUserFile.write("\nNumber of boxes are: %d" %numOfBoxes)
 				cloudElementsUserFile.write("\nArea is: %.4f km^2" %(cloudElementArea))
-				cloudElementsUserFile.write("\nAverage brightness temperature is: %.4f K" %ndimage.mean(cloudElement, labels=labels))
-				cloudElementsUserFile.write("\nMin brightness temperature is: %.4f K" %ndimage.minimum(cloudElement, labels=labels))
-				cloudElementsUserFile.write("\nMax brightness temperature is: %.4f K" %ndimage.maximum(cloudElement, labels=labels))
-				cloudElementsUserFile.write("\nBrightness temperature variance is: %.4f K" %ndimage.variance(cloudElement, labels=labels))
-				cloudElementsUserFile.write("\nConvective fraction is: %.4f " %(((ndimage.minimum(cloudElement, labels=labels))/float((ndimage.maximum(cloudElement, labels=labels))))*100.0))
+				cloudElementsUserFile.write("\nAverage brightness temperature is: %.4f K" %thisCE['TIR_mean'])
+				cloudElementsUserFile.write("\nMin brightness temperature is: %.4f K" %thisCE['TIR_min'])
+				cloudElementsUserFile.write("\nMax brightness temperature is: %.4f K" %thisCE['TIR_max'])
+				cloudElementsUserFile.write("\nBrightness temperature variance is: %.4f K" %thisCE['TIR_variance'])
+				cloudElementsUserFile.write("\nConvective fraction is: %.4f " %(thisCE['convectiveFraction']*100.0))
 				cloudElementsUserFile.write("\nEccentricity is: %.4f " %(cloudElementEpsilon))
-				#populate the dictionary
+				#the record of the CE, its boxes are kept in the table and its TRMM boxes in the cloud element store
+				cloudElementRecord = {'uniqueID': CEuniqueID, 'frameNum': frameNum, 'time': date2num(frameTime, units=CE_STORE_TIME_UNITS), 
+					'area': cloudElementArea, 'centerLat': latCenter, 'centerLon': lonCenter, 'eccentricity': cloudElementEpsilon, 
+					'Tmin': thisCE['TIR_min'], 'Tmax': thisCE['TIR_max']}
 				if TRMMdirName:
-					cloudElementDict = {'uniqueID': CEuniqueID, 'cloudElementTime': timelist[t],'cloudElementLatLon': cloudElementLatLons, 'cloudElementCenter':cloudElementCenter, 'cloudElementArea':cloudElementArea, 'cloudElementEccentricity':cloudElementEpsilon, 'cloudElementTmax':TIR_max, 'cloudElementTmin': TIR_min, 'cloudElementPrecipTotal':precipTotal,'cloudElementLatLonTRMM':CETRMMList, 'TRMMArea': TRMMArea,'CETRMMmax':maxCEprecipRate, 'CETRMMmin':minCEprecipRate}
-				else:
-					cloudElementDict = {'uniqueID': CEuniqueID, 'cloudElementTime': timelist[t],'cloudElementLatLon': cloudElementLatLons, 'cloudElementCenter':cloudElementCenter, 'cloudElementArea':cloudElementArea, 'cloudElementEccentricity':cloudElementEpsilon, 'cloudElementTmax':TIR_max, 'cloudElementTmin': TIR_min,}
+					cloudElementRecord.update({'hasTRMM': True, 'precipTotal': precipTotal, 'TRMMArea': TRMMArea, 
+						'TRMMmax': maxCEprecipRate, 'TRMMmin': minCEprecipRate})
+				CEindex = appendCloudElementRecord(ceTable, cloudElementRecord, thisCE['rows'], thisCE['cols'], cloudElementValues)
 				
-				#current frame list of CEs
-				currFrameCEs.append(cloudElementDict)
+				#current frame CEs by their label in the frame
+				currFrameCEs[thisCE['label']] = CEuniqueID
 				
 				#draw the graph node
-				CLOUD_ELEMENT_GRAPH.add_node(CEuniqueID, cloudElementDict)
+				CEGraph.add_node(CEuniqueID, CEindex=CEindex)
 				
-				if frameNum != 1:
-					for cloudElementDict in prevFrameCEs:
-						thisCElen = len(cloudElementLatLons)
-						percentageOverlap, areaOverlap = cloudElementOverlap(cloudElementLatLons, cloudElementDict['cloudElementLatLon'])
-						
-						#change weights to integers because the built in shortest path chokes on floating pts according to Networkx doc
-						#according to Goyens et al, two CEs are considered related if there is atleast 95% overlap between them for consecutive imgs a max of 2 hrs apart
-						if percentageOverlap >= 0.95: 
-							CLOUD_ELEMENT_GRAPH.add_edge(cloudElementDict['uniqueID'], CEuniqueID, weight=edgeWeight[0])
-							
-						elif percentageOverlap >= 0.90 and percentageOverlap < 0.95 :
-							CLOUD_ELEMENT_GRAPH.add_edge(cloudElementDict['uniqueID'], CEuniqueID, weight=edgeWeight[1])
-
-						elif areaOverlap >= MIN_OVERLAP:
-							CLOUD_ELEMENT_GRAPH.add_edge(cloudElementDict['uniqueID'], CEuniqueID, weight=edgeWeight[2])
-
-				else:
-					#TODO: remove this else as we only wish for the CE details
+				if frameNum == 1:
+					#TODO: remove this block as we only wish for the CE details
 					#ensure only the non-zero elements are considered
 					#store intel in allCE file
-					labels, _ = ndimage.label(cloudElement)
 					cloudElementsFile.write("\n-----------------------------------------------")
-					cloudElementsFile.write("\n\nTime is: %s" %(str(timelist[t])))
-					# cloudElementLat = LAT[loc[0],0]
-					# cloudElementLon = LON[0,loc[1]] 
-					
-					#populate cloudElementLatLons by unpacking the original values from loc
-					#TODO: KDW - too dirty... play with itertools.izip or zip and the enumerate with this
-					# 			as cloudElement is masked
-					for index,value in np.ndenumerate(cloudElement):
-						if value != 0 : 
-							lat_index,lon_index = index
-							lat_lon_tuple = (cloudElementLat[lat_index], cloudElementLon[lon_index])
-							cloudElementLatLons.append(lat_lon_tuple)
-	
-					cloudElementsFile.write("\nLocation of rejected CE (lat,lon) points are: %s" %cloudElementLatLons)
-					#latCenter and lonCenter are given according to the particular array defining this CE
-		   			#so you need to convert this value to the overall domain truth
-					latCenter, lonCenter = ndimage.measurements.center_of_mass(cloudElement, labels=labels)
-					latCenter = cloudElementLat[round(latCenter)]
-					lonCenter = cloudElementLon[round(lonCenter)]
+					cloudElementsFile.write("\n\nTime is: %s" %(str(frameTime)))
+					cloudElementsFile.write("\nLocation of rejected CE (lat,lon) points are: %s" %zip(cloudElementLat.tolist(), cloudElementLon.tolist()))
 					cloudElementsFile.write("\nCenter (lat,lon) is: %.2f\t%.2f" %(latCenter, lonCenter))
 					cloudElementsFile.write("\nNumber of boxes are: %d" %numOfBoxes)
 					cloudElementsFile.write("\nArea is: %.4f km^2" %(cloudElementArea))
-					cloudElementsFile.write("\nAverage brightness temperature is: %.4f K" %ndimage.mean(cloudElement, labels=labels))
-					cloudElementsFile.write("\nMin brightness temperature is: %.4f K" %ndimage.minimum(cloudElement, labels=labels))
-					cloudElementsFile.write("\nMax brightness temperature is: %.4f K" %ndimage.maximum(cloudElement, labels=labels))
-					cloudElementsFile.write("\nBrightness temperature variance is: %.4f K" %ndimage.variance(cloudElement, labels=labels))
-					cloudElementsFile.write("\nConvective fraction is: %.4f " %(((ndimage.minimum(cloudElement, labels=labels))/float((ndimage.maximum(cloudElement, labels=labels))))*100.0))
+					cloudElementsFile.write("\nAverage brightness temperature is: %.4f K" %thisCE['TIR_mean'])
+					cloudElementsFile.write("\nMin brightness temperature is: %.4f K" %thisCE['TIR_min'])
+					cloudElementsFile.write("\nMax brightness temperature is: %.4f K" %thisCE['TIR_max'])
+					cloudElementsFile.write("\nBrightness temperature variance is: %.4f K" %thisCE['TIR_variance'])
+					cloudElementsFile.write("\nConvective fraction is: %.4f " %(thisCE['convectiveFraction']*100.0))
 					cloudElementsFile.write("\nEccentricity is: %.4f " %(cloudElementEpsilon))
 					cloudElementsFile.write("\n-----------------------------------------------")
 					
 			#reset list for the next CE
-			nodeExist = False
 			cloudElementCenter=[]
 			cloudElement = []
-			cloudElementLat=[]
-			cloudElementLon =[]
-			cloudElementLatLons =[]
-			brightnesstemp1 =[]
-			brightnesstemp =[]
-			finalCETRMMvalues =[]
-			CEprecipRate =[]
-			CETRMMList =[]
 			precipTotal = 0.0
-			precip=[]
-			TRMMCloudElementLatLons=[]
 			
+		#link the CEs in this frame to those in the previous frame
+		if prevFrame is not None:
+			linkCloudElements(CEGraph, prevFrame, prevFrameCEs, frame, currFrameCEs)
+
 		#reset for the next time
-		prevFrameCEs =[]
+		prevFrame = frame
 		prevFrameCEs = currFrameCEs
-		currFrameCEs =[]
-						
-	cloudElementsFile.close
-	cloudElementsUserFile.close
-	#if using ARCGIS data store code, uncomment this file close line
-	#cloudElementsTextFile.close
+		currFrameCEs = {}
 
-	#clean up graph - remove parent and childless nodes
-	outAndInDeg = CLOUD_ELEMENT_GRAPH.degree_iter()
-	toRemove = [node[0] for node in outAndInDeg if node[1]<1]
-	CLOUD_ELEMENT_GRAPH.remove_nodes_from(toRemove)
-	
-	print "number of nodes are: ", CLOUD_ELEMENT_GRAPH.number_of_nodes()
-	print "number of edges are: ", CLOUD_ELEMENT_GRAPH.number_of_edges()
-	print ("*"*80)
+		#the CEs of this frame are done
+		yield prevFrame, prevFrameCEs
+#******************************************************************
+def linkCloudElements(CEGraph, prevFrame, prevFrameCEs, currFrame, currFrameCEs):
+	'''
+	Purpose::
+		Adds the weighted edges between the CEs of two consecutive frames to a graph, 
+		using the overlap of all pairs of labels at once
 
-	#hierachial graph output
-	graphTitle = "Cloud Elements observed over somewhere from 0000Z to 0000Z" 
-	drawGraph(CLOUD_ELEMENT_GRAPH, graphTitle, edgeWeight)
+	Input::
+		CEGraph: the Networkx directed graph with the CEs of both frames
+		prevFrame, currFrame: 2D arrays (lat,lon) of the labels of the CEs in the previous and current frames
+		prevFrameCEs, currFrameCEs: dictionaries of label to the uniqueID of each CE in the previous and current frames
 
-	return CLOUD_ELEMENT_GRAPH	
+	Output::
+		None
+	'''
+
+	prevLabels, currLabels, percentageOverlaps, areaOverlaps = cloudElementFrameOverlap(prevFrame, currFrame)
+	for prevLabel, currLabel, percentageOverlap, areaOverlap in itertools.izip(prevLabels, currLabels, percentageOverlaps, areaOverlaps):
+		if prevLabel not in prevFrameCEs or currLabel not in currFrameCEs:
+			continue
+
+		prevCEuniqueID = prevFrameCEs[prevLabel]
+		CEuniqueID = currFrameCEs[currLabel]
+
+		#change weights to integers because the built in shortest path chokes on floating pts according to Networkx doc
+		#according to Goyens et al, two CEs are considered related if there is atleast 95% overlap between them for consecutive imgs a max of 2 hrs apart
+		if percentageOverlap >= 0.95: 
+			CEGraph.add_edge(prevCEuniqueID, CEuniqueID, weight=edgeWeight[0])
+			
+		elif percentageOverlap >= 0.90 and percentageOverlap < 0.95 :
+			CEGraph.add_edge(prevCEuniqueID, CEuniqueID, weight=edgeWeight[1])
+
+		elif areaOverlap >= MIN_OVERLAP:
+			CEGraph.add_edge(prevCEuniqueID, CEuniqueID, weight=edgeWeight[2])
+
+	return
+#******************************************************************
+def findFrameCloudElements(mergFrame):
+	'''
+	Purpose::
+		Determines the contiguous areas (cloudElements) in one MERG frame and their properties.
+		The frame is labelled once and the properties of all areas are found at once using the 
+		labelled reductions in ndimage instead of iterating over each area
+
+	Input::
+		mergFrame: a 2D masked array (lat,lon) of the brightness temperatures meeting T_BB_MAX, 
+			with zeros elsewhere
+
+	Output::
+		frame: a 2D array (lat,lon) of the label of the area each box belongs to, 0 for no area
+		frameCEs: a list of dictionaries, one per label in label order, with
+			{'label': integer label of the area in frame,
+			 'slice': tuple of slices for the bounding box of the area in frame,
+			 'rows', 'cols': 1D arrays of the lat and lon indices of each box in the area,
+			 'values': 1D array of the brightness temperature of each box in the area,
+			 'numOfBoxes': integer number of boxes in the area,
+			 'cloudElementArea': floating-point area of the area in km^2,
+			 'TIR_min', 'TIR_max', 'TIR_mean', 'TIR_variance': floating-point brightness temperature stats,
+			 'convectiveFraction': floating-point TIR_min/TIR_max,
+			 'center': (lat,lon) floating-point indices of the Tb weighted center of the area}
+
+	Assumptions::
+		The boxes in an area are in increasing lat then lon index order
+	'''
+
+	frame, CEcounter = ndimage.measurements.label(mergFrame, structure=STRUCTURING_ELEMENT)
+	if CEcounter == 0:
+		return frame, []
+
+	values = ma.filled(mergFrame, 0)
+	index = np.arange(1, CEcounter + 1)
+
+	#bounding boxes of all the areas from a single pass over the frame
+	slices = ndimage.find_objects(frame)
+
+	#stats of all the areas
+	numOfBoxes = np.bincount(frame.ravel(), minlength=CEcounter + 1)
+	TIRmin = ndimage.minimum(values, labels=frame, index=index)
+	TIRmax = ndimage.maximum(values, labels=frame, index=index)
+	TIRmean = ndimage.mean(values, labels=frame, index=index)
+	TIRvariance = ndimage.variance(values, labels=frame, index=index)
+	centers = ndimage.center_of_mass(values, labels=frame, index=index)
+
+	#group the flat indices of the boxes by label with a stable sort, leaving out the background
+	order = np.argsort(frame.ravel(), kind='mergesort')[numOfBoxes[0]:]
+	rows, cols = np.unravel_index(order, frame.shape)
+	boxValues = values.ravel()[order]
+	splits = np.cumsum(numOfBoxes[1:-1])
+
+	frameCEs = []
+	for label, loc, CErows, CEcols, CEvalues, minT, maxT, meanT, varT, center in itertools.izip(index, slices, 
+			np.split(rows, splits), np.split(cols, splits), np.split(boxValues, splits), 
+			TIRmin, TIRmax, TIRmean, TIRvariance, centers):
+		frameCEs.append({'label': label, 'slice': loc, 'rows': CErows, 'cols': CEcols, 'values': CEvalues, 
+			'numOfBoxes': numOfBoxes[label], 'cloudElementArea': numOfBoxes[label]*XRES*YRES, 
+			'TIR_min': minT, 'TIR_max': maxT, 'TIR_mean': meanT, 'TIR_variance': varT, 
+			'convectiveFraction': minT/float(maxT), 'center': center})
+
+	return frame, frameCEs
+#******************************************************************
+def getRegriddedTRMM(TRMMdirName, CEtime):
+	'''
+	Purpose::
+		Gets the TRMM precipitation for a time on the MERG grid. Each 3 hourly TRMM file is read 
+		and regridded once and then kept in a cache of at most TRMM_CACHE_SIZE fields, 
+		dropping the least recently used field first
+
+	Input::
+		TRMMdirName: a string representing the directory for the original TRMM netCDF files
+		CEtime: a python datetime of the MERG frame
+
+	Output::
+		regriddedTRMM: a 2D array (lat,lon) of the TRMM precipitation on the MERG grid, 0 where there is no data
+
+	Assumptions::
+		readMergData has been run i.e. LAT and LON are set
+	'''
+
+	#NB in the TRMM files the info is hours since the time thus 00Z file has in 01, 02 and 03 times
+	TRMMtime = CEtime.replace(hour=(CEtime.hour/TRMM_TRES)*TRMM_TRES, minute=0, second=0, microsecond=0)
+	cacheKey = (TRMMdirName, TRMMtime)
+
+	if cacheKey in TRMM_CACHE:
+		regriddedTRMM = TRMM_CACHE.pop(cacheKey)
+		TRMM_CACHE[cacheKey] = regriddedTRMM
+		return regriddedTRMM
+
+	#open TRMM file for the resolution info and to create the appropriate sized grid
+	TRMMfileName = TRMMdirName+'/3B42.'+ TRMMtime.strftime('%Y%m%d.%H') +".7A.nc"
+	TRMMData = Dataset(TRMMfileName,'r', format='NETCDF4')
+	precipRate = TRMMData.variables['pcp'][:,:,:]
+	latsrawTRMMData = TRMMData.variables['latitude'][:]
+	lonsrawTRMMData = TRMMData.variables['longitude'][:]
+	TRMMData.close()
+
+	lonsrawTRMMData[lonsrawTRMMData > 180] = lonsrawTRMMData[lonsrawTRMMData>180] - 360.
+	LONTRMM, LATTRMM = np.meshgrid(lonsrawTRMMData, latsrawTRMMData)
+	precipRateMasked = ma.masked_array(precipRate, mask=(precipRate < 0.0))
+
+	#---------regrid the TRMM data to the MERG dataset ----------------------------------
+	#regrid using the do_regrid stuff from the Apache OCW 
+	regriddedTRMM = process.do_regrid(precipRateMasked[0,:,:], LATTRMM,  LONTRMM, LAT, LON, order=1, mdi= -999999999)
+	regriddedTRMM = ma.filled(regriddedTRMM, 0.0)
+	#----------------------------------------------------------------------------------
+
+	TRMM_CACHE[cacheKey] = regriddedTRMM
+	while len(TRMM_CACHE) > TRMM_CACHE_SIZE:
+		TRMM_CACHE.popitem(last=False)
+
+	return regriddedTRMM
+#******************************************************************
+def findFrameCEPrecip(regriddedTRMM, frame, CEcounter):
+	'''
+	Purpose::
+		Determines the precipitation statistics of all the CEs in a frame at once by masking the 
+		TRMM data with the label of each CE
+
+	Input::
+		regriddedTRMM: a 2D array (lat,lon) of the TRMM precipitation on the MERG grid
+		frame: a 2D array (lat,lon) of the CE labels in the frame, 0 for no CE
+		CEcounter: an integer representing the number of labels in the frame
+
+	Output::
+		framePrecip: a dictionary of 1D arrays indexed by label - 1 with 
+			{'precipTotal': floating-point sum of all rainfall in the CE, 
+			 'TRMMArea': floating-point area of the CE with rainfall, 
+			 'CETRMMmax': floating-point max rate in the CE, 
+			 'CETRMMmin': floating-point min non-zero rate in the CE, 0 if there is no rainfall}
+	'''
+
+	index = np.arange(1, CEcounter + 1)
+	raining = regriddedTRMM > 0.0
+
+	TRMMnumOfBoxes = ndimage.sum(raining, labels=frame, index=index)
+	CETRMMmin = ndimage.minimum(np.where(raining, regriddedTRMM, np.inf), labels=frame, index=index)
+
+	framePrecip = {'precipTotal': ndimage.sum(regriddedTRMM, labels=frame, index=index),
+		'TRMMArea': TRMMnumOfBoxes*XRES*YRES,
+		'CETRMMmax': np.where(TRMMnumOfBoxes > 0, ndimage.maximum(regriddedTRMM, labels=frame, index=index), 0.0),
+		'CETRMMmin': np.where(TRMMnumOfBoxes > 0, CETRMMmin, 0.0)}
+
+	return framePrecip
 #******************************************************************
 def findPrecipRate(TRMMdirName, timelist):
 	''' 
@@ -606,8 +943,7 @@ def findPrecipRate(TRMMdirName, timelist):
 		timelist: a list of python datatimes
 
 	Output:: a list of dictionary of the TRMM data 
-		NB: also creates netCDF with TRMM data for each CE (for post processing) index
-			in MAINDIRECTORY/TRMMnetcdfCEs
+		NB: also adds the TRMM data for each CE (for post processing) to the cloud element store and CE_TABLE
    
 	Assumptions:: Assumes that findCloudElements was run without the TRMMdirName value 
  
@@ -615,162 +951,47 @@ def findPrecipRate(TRMMdirName, timelist):
 	allCEnodesTRMMdata =[]
 	TRMMdataDict={}
 	precipTotal = 0.0
+	CEprecip = {}
 
-	os.chdir((MAINDIRECTORY+'/MERGnetcdfCEs/'))
-	imgFilename = ''
-	temporalRes = 3 #3 hours for TRMM
+	ceStore = readCloudElementStore()
 	
-	#sort files
-	files = filter(os.path.isfile, glob.glob("*.nc"))
-	files.sort(key=lambda x: os.path.getmtime(x))
-	
-	for afile in files:
-		fullFname = os.path.splitext(afile)[0]
-		noFrameExtension = (fullFname.replace("_","")).split('F')[0]
-		CEuniqueID = 'F' +(fullFname.replace("_","")).split('F')[1]
-		fileDateTimeChar = (noFrameExtension.replace(":","")).split('s')[1]
-		fileDateTime = fileDateTimeChar.replace("-","")
-		fileDate = fileDateTime[:-6]
-		fileHr1=fileDateTime[-6:-4]
-
-		cloudElementData = Dataset(afile,'r', format='NETCDF4')
-		brightnesstemp1 = cloudElementData.variables['brightnesstemp'][:,:,:] 
-		latsrawCloudElements = cloudElementData.variables['latitude'][:]
-		lonsrawCloudElements = cloudElementData.variables['longitude'][:]
-		
-		brightnesstemp = np.squeeze(brightnesstemp1, axis=0)
-		
-		if int(fileHr1) % temporalRes == 0:
-			fileHr = fileHr1
-		else:
-			fileHr = (int(fileHr1)/temporalRes) * temporalRes
-		
-		if fileHr < 10:
-			fileHr = '0'+str(fileHr)
-		else:
-			str(fileHr)
-
-		TRMMfileName = TRMMdirName+"/3B42."+ str(fileDate) + "."+str(fileHr)+".7A.nc"
-		TRMMData = Dataset(TRMMfileName,'r', format='NETCDF4')
-		precipRate = TRMMData.variables['pcp'][:,:,:]
-		latsrawTRMMData = TRMMData.variables['latitude'][:]
-		lonsrawTRMMData = TRMMData.variables['longitude'][:]
-		lonsrawTRMMData[lonsrawTRMMData > 180] = lonsrawTRMMData[lonsrawTRMMData>180] - 360.
-		LONTRMM, LATTRMM = np.meshgrid(lonsrawTRMMData, latsrawTRMMData)
-
-		#nygrdTRMM = len(LATTRMM[:,0]); nxgrd = len(LONTRMM[0,:])
-		nygrd = len(LAT[:, 0]); nxgrd = len(LON[0, :])
-
-		precipRateMasked = ma.masked_array(precipRate, mask=(precipRate < 0.0))
-		#---------regrid the TRMM data to the MERG dataset ----------------------------------
-		#regrid using the do_regrid stuff from the Apache OCW 
-		regriddedTRMM = ma.zeros((0, nygrd, nxgrd))
-		regriddedTRMM = process.do_regrid(precipRateMasked[0,:,:], LATTRMM,  LONTRMM, LAT, LON, order=1, mdi= -999999999)
-		#----------------------------------------------------------------------------------
-
-		# #get the lat/lon info from
-		latCEStart = LAT[0][0]
-		latCEEnd = LAT[-1][0]
-		lonCEStart = LON[0][0]
-		lonCEEnd = LON[0][-1]
-
-		#get the lat/lon info for TRMM data (different resolution)
-		latStartT = find_nearest(latsrawTRMMData, latCEStart)
-		latEndT = find_nearest(latsrawTRMMData, latCEEnd)
-		lonStartT = find_nearest(lonsrawTRMMData, lonCEStart)
-		lonEndT = find_nearest(lonsrawTRMMData, lonCEEnd)
-		latStartIndex = np.where(latsrawTRMMData == latStartT)
-		latEndIndex = np.where(latsrawTRMMData == latEndT)
-		lonStartIndex = np.where(lonsrawTRMMData == lonStartT)
-		lonEndIndex = np.where(lonsrawTRMMData == lonEndT)
-
-		#get the relevant TRMM info 
-		CEprecipRate = precipRate[:,(latStartIndex[0][0]-1):latEndIndex[0][0],(lonStartIndex[0][0]-1):lonEndIndex[0][0]]
-		TRMMData.close()
-			
-		
-		# ------ NETCDF File stuff ------------------------------------
-		thisFileName = MAINDIRECTORY+'/TRMMnetcdfCEs/'+ fileDateTime + CEuniqueID +'.nc'
-		currNetCDFTRMMData = Dataset(thisFileName, 'w', format='NETCDF4')
-		currNetCDFTRMMData.description = 'Cloud Element '+CEuniqueID + ' rainfall data'
-		currNetCDFTRMMData.calendar = 'standard'
-		currNetCDFTRMMData.conventions = 'COARDS'
-		# dimensions
-		currNetCDFTRMMData.createDimension('time', None)
-		currNetCDFTRMMData.createDimension('lat', len(LAT[:,0]))
-		currNetCDFTRMMData.createDimension('lon', len(LON[0,:]))
-		# variables
-		TRMMprecip = ('time','lat', 'lon',)
-		times = currNetCDFTRMMData.createVariable('time', 'f8', ('time',))
-		times.units = 'hours since '+ fileDateTime[:-6] 
-		latitude = currNetCDFTRMMData.createVariable('latitude', 'f8', ('lat',))
-		longitude = currNetCDFTRMMData.createVariable('longitude', 'f8', ('lon',))
-		rainFallacc = currNetCDFTRMMData.createVariable('precipitation_Accumulation', 'f8',TRMMprecip )
-		rainFallacc.units = 'mm'
-
-		longitude[:] = LON[0,:]
-		longitude.units = "degrees_east" 
-		longitude.long_name = "Longitude" 
-
-		latitude[:] =  LAT[:,0]
-		latitude.units = "degrees_north"
-		latitude.long_name ="Latitude"
-
-		finalCETRMMvalues = ma.zeros((brightnesstemp1.shape))
-		#-----------End most of NETCDF file stuff ------------------------------------	
-		for index,value in np.ndenumerate(brightnesstemp):
-			lat_index, lon_index = index
-			currTimeValue = 0
-			if value > 0:
-
-				finalCETRMMvalues[0,lat_index,lon_index] = regriddedTRMM[int(np.where(LAT[:,0]==LAT[lat_index,0])[0]), int(np.where(LON[0,:]==LON[0,lon_index])[0])]
-				
+	for CEuniqueID in ceStore['uniqueIDs']:
+		CEtime = ceStore['times'][CEuniqueID]
+		rows, cols, _ = cloudElementBoxes(ceStore, CEuniqueID)
 
-		rainFallacc[:] = finalCETRMMvalues
-		currNetCDFTRMMData.close()
+		regriddedTRMM = getRegriddedTRMM(TRMMdirName, CEtime)
 
-		for index, value in np.ndenumerate(finalCETRMMvalues):
-			precipTotal += value 
+		#the TRMM values in the boxes of the CE
+		CETRMMValues = regriddedTRMM[rows, cols]
+		CEprecip[CEuniqueID] = CETRMMValues
 
-		TRMMnumOfBoxes = np.count_nonzero(finalCETRMMvalues)
-		TRMMArea = TRMMnumOfBoxes*XRES*YRES	
+		precipTotal = CETRMMValues.sum()
 
-		try:
-			minCEprecipRate = np.min(finalCETRMMvalues[np.nonzero(finalCETRMMvalues)])
-		except:
-			minCEprecipRate = 0.0
+		TRMMnumOfBoxes = np.count_nonzero(CETRMMValues)
+		TRMMArea = TRMMnumOfBoxes*XRES*YRES    
 
-		try:
-			maxCEprecipRate = np.max(finalCETRMMvalues[np.nonzero(finalCETRMMvalues)])
-		except:
+		if TRMMnumOfBoxes > 0:
+			minCEprecipRate = np.min(CETRMMValues[np.nonzero(CETRMMValues)])
+			maxCEprecipRate = np.max(CETRMMValues[np.nonzero(CETRMMValues)])
+		else:
+			minCEprecipRate = 0.0
 			maxCEprecipRate = 0.0
 
-		#add info to CLOUDELEMENTSGRAPH
-		#TODO try block
-		for eachdict in CLOUD_ELEMENT_GRAPH.nodes(CEuniqueID):
-			if eachdict[1]['uniqueID'] == CEuniqueID:
-				if not 'cloudElementPrecipTotal' in eachdict[1].keys():
-					eachdict[1]['cloudElementPrecipTotal'] = precipTotal
-				if not 'cloudElementLatLonTRMM' in eachdict[1].keys():
-					eachdict[1]['cloudElementLatLonTRMM'] = finalCETRMMvalues
-				if not 'TRMMArea' in eachdict[1].keys():
-					eachdict[1]['TRMMArea'] = TRMMArea
-				if not 'CETRMMmin' in eachdict[1].keys():
-					eachdict[1]['CETRMMmin'] = minCEprecipRate
-				if not 'CETRMMmax' in eachdict[1].keys():
-					eachdict[1]['CETRMMmax'] = maxCEprecipRate
+		#add info to CE_TABLE for the nodes of CLOUDELEMENTSGRAPH
+		if CLOUD_ELEMENT_GRAPH.has_node(CEuniqueID):
+			CEindex = cloudElementIndex(CEuniqueID)
+			if not CE_TABLE['records']['hasTRMM'][CEindex]:
+				for key, value in [('hasTRMM', True), ('precipTotal', precipTotal), ('TRMMArea', TRMMArea), 
+					('TRMMmin', minCEprecipRate), ('TRMMmax', maxCEprecipRate)]:
+					CE_TABLE['records'][key][CEindex] = value
 
 		#clean up
 		precipTotal = 0.0
-		latsrawTRMMData =[]
-		lonsrawTRMMData = []
-		latsrawCloudElements=[]
-		lonsrawCloudElements=[]
-		finalCETRMMvalues =[]
-		CEprecipRate =[]
-		brightnesstemp =[]
 		TRMMdataDict ={}
 
+	#store the TRMM data of all the CEs at once
+	writeCloudElementPrecip(CEprecip)
+
 	return allCEnodesTRMMdata
 #******************************************************************	
 def findCloudClusters(CEGraph):
@@ -788,38 +1009,9 @@ def findCloudClusters(CEGraph):
 
 	'''
 
-	seenNode = []
-	allMCSLists =[]
-	pathDictList =[]
-	pathList=[]
-
 	cloudClustersFile = open((MAINDIRECTORY+'/textFiles/cloudClusters.txt'),'wb')
 	
-	for eachNode in CEGraph:
-		#check if the node has been seen before
-		if eachNode not in dict(enumerate(zip(*seenNode))):
-			#look for all trees associated with node as the root
-			thisPathDistanceAndLength = nx.single_source_dijkstra(CEGraph, eachNode)
-			#determine the actual shortestPath and minimum depth/length
-			maxDepthAndMinPath = findMaxDepthAndMinPath(thisPathDistanceAndLength)
-			if maxDepthAndMinPath:
-				maxPathLength = maxDepthAndMinPath[0] 
-				shortestPath = maxDepthAndMinPath[1]
-				
-				#add nodes and paths to PRUNED_GRAPH
-				for i in xrange(len(shortestPath)):
-					if PRUNED_GRAPH.has_node(shortestPath[i]) is False:
-						PRUNED_GRAPH.add_node(shortestPath[i])
-						
-					#add edge if necessary
-					if i < (len(shortestPath)-1) and PRUNED_GRAPH.has_edge(shortestPath[i], shortestPath[i+1]) is False:
-						prunedGraphEdgeweight = CEGraph.get_edge_data(shortestPath[i], shortestPath[i+1])['weight']
-						PRUNED_GRAPH.add_edge(shortestPath[i], shortestPath[i+1], weight=prunedGraphEdgeweight)
-
-				#note information in a file for consideration later i.e. checking to see if it works
-				cloudClustersFile.write("\nSubtree pathlength is %d and path is %s" %(maxPathLength, shortestPath))
-				#update seenNode info
-				seenNode.append(shortestPath)	
+	pruneCloudClusters(CEGraph, cloudClustersFile)
 
 	print "pruned graph"
 	print "number of nodes are: ", PRUNED_GRAPH.number_of_nodes()
@@ -832,6 +1024,74 @@ def findCloudClusters(CEGraph):
 	
 	return PRUNED_GRAPH  
 #******************************************************************
+def pruneCloudClusters(CEGraph, cloudClustersFile):
+	'''
+	Purpose:: 
+		Adds the cloud clusters in a graph of CEs to PRUNED_GRAPH i.e. the paths 
+		meeting the minimum depth
+
+	Input:: 
+		CEGraph: a Networkx directed graph of the CEs with weighted edges
+		according the area overlap between nodes (CEs) of consectuive frames
+		cloudClustersFile: the open textfile for the cloud cluster information
+	
+	Output:: 
+		None
+
+	Assumptions::
+		CEGraph is a directed acyclic graph as the edges go from a frame to the next one
+
+	'''
+
+	seenNodes = set()
+
+	for component in nx.weakly_connected_components(CEGraph):
+		if len(component) < MIN_MCS_DURATION:
+			continue
+
+		orderedNodes = nx.topological_sort(CEGraph.subgraph(component))
+
+		#longest path (in nodes) starting at each node, the least path distance for ties. 
+		#Found from the last frame to the first so each node uses the paths of its successors
+		longestPath = {}
+		for eachNode in reversed(orderedNodes):
+			pathLength, pathDistance, nextNode = 1, 0, None
+			for successor, edgeData in CEGraph[eachNode].iteritems():
+				successorLength, successorDistance, _ = longestPath[successor]
+				if (successorLength + 1, -(successorDistance + edgeData['weight'])) > (pathLength, -pathDistance):
+					pathLength, pathDistance, nextNode = successorLength + 1, successorDistance + edgeData['weight'], successor
+			longestPath[eachNode] = (pathLength, pathDistance, nextNode)
+
+		for eachNode in orderedNodes:
+			#check if the node has been seen before
+			if eachNode in seenNodes:
+				continue
+
+			#if the duration is shorter then the min MCS length, then don't store!
+			maxPathLength, minPathDistance, _ = longestPath[eachNode]
+			if maxPathLength < MIN_MCS_DURATION:
+				continue
+
+			#add nodes and paths to PRUNED_GRAPH, up to the first node already added as the 
+			#rest of the path from there is in PRUNED_GRAPH already
+			shortestPath = [eachNode]
+			seenNodes.add(eachNode)
+			PRUNED_GRAPH.add_node(eachNode)
+			nextNode = longestPath[eachNode][2]
+			while nextNode is not None:
+				prunedGraphEdgeweight = CEGraph.get_edge_data(shortestPath[-1], nextNode)['weight']
+				PRUNED_GRAPH.add_edge(shortestPath[-1], nextNode, weight=prunedGraphEdgeweight)
+				shortestPath.append(nextNode)
+				if nextNode in seenNodes:
+					break
+				seenNodes.add(nextNode)
+				nextNode = longestPath[nextNode][2]
+
+			#note information in a file for consideration later i.e. checking to see if it works
+			cloudClustersFile.write("\nSubtree pathlength is %d and path is %s" %(minPathDistance, shortestPath))
+
+	return
+#******************************************************************
 def findMCC (prunedGraph):
 	'''
 	Purpose:: 
@@ -977,27 +1237,175 @@ def findMCC (prunedGraph):
 					for eachNode in eachList[(eachList.index(eachMCCList[-1])+1):]:
 						addNodeMCSIdentifier(eachNode, 'D')
 
-					#update definiteMCS list
-					for eachNode in orderedPath[(orderedPath.index(eachMCCList[-1])+1):]:
-						addNodeMCSIdentifier(eachNode, 'D')
+					#update definiteMCS list
+					for eachNode in orderedPath[(orderedPath.index(eachMCCList[-1])+1):]:
+						addNodeMCSIdentifier(eachNode, 'D')
+
+					#run maximum extent and eccentricity criteria
+					maxExtentNode, definiteMCCFlag = maxExtentAndEccentricity(eachList)
+					#print "maxExtentNode, definiteMCCFlag ", maxExtentNode, definiteMCCFlag
+					if definiteMCCFlag == True:
+						definiteMCC.append(eachList)
+
+
+			definiteMCS.append(orderedPath)
+			
+			#reset for next subGraph	
+			aSubGraph.clear()
+			orderedPath=[]
+			MCCList =[]
+			MCSList =[]
+			definiteMCSFlag = False
+		
+	return definiteMCC, definiteMCS
+#******************************************************************
+def streamMCCSearch(mergFrames, TRMMdirName=None):
+	'''
+	Purpose::
+		Runs findCloudElements, findCloudClusters and findMCC one frame at a time, so that 
+		a long period can be searched without holding all its frames and CEs in memory.
+		A feature (connected CEs) can only grow while it has a CE in the latest frame, 
+		so as soon as it has none it is complete and is pruned and classified.
+
+	Input::
+		mergFrames: an iterable of (python datetime, 2D array (lat,lon)) of the T_bb meeting T_BB_MAX 
+			for each frame e.g. from iterMergData
+		TRMMdirName (optional): string representing the path where to find the TRMM datafiles
+
+	Output::
+		MCCList: a list of list of nodes representing the MCCs found, as from findMCC
+		MCSList: a list of list of nodes representing the MCSs found, as from findMCC
+
+	Assumptions::
+		Only the nodes of the features found to be MCSs are kept in CLOUD_ELEMENT_GRAPH, for the metrics
+	'''
+
+	MCCList = []
+	MCSList = []
+
+	#openfile for storing the boxes of all the CEs meeting the criteria
+	ceStore = createCloudElementStore()
+
+	#openfile for storing ALL cloudElement information 
+	cloudElementsFile = open((MAINDIRECTORY+'/textFiles/cloudElements.txt'),'wb')
+	#openfile for storing cloudElement information meeting user criteria i.e. MCCs in this case
+	cloudElementsUserFile = open((MAINDIRECTORY+'/textFiles/cloudElementsUserFile.txt'),'w')
+	cloudClustersFile = open((MAINDIRECTORY+'/textFiles/cloudClusters.txt'),'wb')
+
+	prevFrameCEs = []
+	for frame, frameCEs in generateCloudElements(mergFrames, TRMMdirName, ceStore, cloudElementsFile, cloudElementsUserFile):
+		for featureNodes in findCompletedFeatures(prevFrameCEs, frameCEs.values()):
+			featureMCCList, featureMCSList = flushFeature(featureNodes, cloudClustersFile)
+			MCCList.extend(featureMCCList)
+			MCSList.extend(featureMCSList)
+		prevFrameCEs = frameCEs.values()
+
+	#all the features left are complete at the end of the period
+	for featureNodes in findCompletedFeatures(prevFrameCEs, []):
+		featureMCCList, featureMCSList = flushFeature(featureNodes, cloudClustersFile)
+		MCCList.extend(featureMCCList)
+		MCSList.extend(featureMCSList)
+
+	ceStore.close()
+	cloudElementsFile.close()
+	cloudElementsUserFile.close()
+	cloudClustersFile.close()
+
+	print "number of nodes kept are: ", CLOUD_ELEMENT_GRAPH.number_of_nodes()
+	print "number of MCCs are: ", len(MCCList)
+	print "number of MCSs are: ", len(MCSList)
+	print ("*"*80)
+
+	return MCCList, MCSList
+#******************************************************************
+def findCompletedFeatures(prevFrameCEs, frameCEs):
+	'''
+	Purpose::
+		Finds the features in CLOUD_ELEMENT_GRAPH that were still growing in the previous frame
+		but have no CE in the latest frame
+
+	Input::
+		prevFrameCEs: a list of strings representing the uniqueIDs of the CEs in the previous frame
+		frameCEs: a list of strings representing the uniqueIDs of the CEs in the latest frame
+
+	Output::
+		completedFeatures: a list of sets of strings representing the uniqueIDs of the CEs of each completed feature
+
+	Assumptions::
+		The features without a CE in the previous frame were completed (and flushed) before, so only 
+		the features of the CEs in the previous frame are searched
+	'''
+
+	latestCEs = set(frameCEs)
+	checkedNodes = set()
+	completedFeatures = []
+
+	for node in prevFrameCEs:
+		if node in checkedNodes or not CLOUD_ELEMENT_GRAPH.has_node(node):
+			continue
+		featureNodes = featureComponent(node)
+		checkedNodes.update(featureNodes)
+		if latestCEs.isdisjoint(featureNodes):
+			completedFeatures.append(featureNodes)
+
+	return completedFeatures
+#******************************************************************
+def featureComponent(node):
+	'''
+	Purpose::
+		Finds the CEs of CLOUD_ELEMENT_GRAPH connected to a CE, following edges in both directions
+
+	Input::
+		node: a string representing the uniqueID of a CE
+
+	Output::
+		featureNodes: a set of strings representing the uniqueIDs of the CEs of the feature
+	'''
+
+	featureNodes = set([node])
+	stack = [node]
+	while stack:
+		thisNode = stack.pop()
+		for neighbour in itertools.chain(CLOUD_ELEMENT_GRAPH.predecessors(thisNode), CLOUD_ELEMENT_GRAPH.successors(thisNode)):
+			if neighbour not in featureNodes:
+				featureNodes.add(neighbour)
+				stack.append(neighbour)
+
+	return featureNodes
+#******************************************************************
+def flushFeature(featureNodes, cloudClustersFile):
+	'''
+	Purpose::
+		Prunes and classifies one completed feature, then removes its CEs from CLOUD_ELEMENT_GRAPH 
+		unless they are part of a MCS, and drops the removed CEs from CE_TABLE
+
+	Input::
+		featureNodes: a set of strings representing the uniqueIDs of the CEs of the feature
+		cloudClustersFile: the open textfile for the cloud cluster information
+
+	Output::
+		MCCList: a list of list of nodes representing the MCCs in the feature, as from findMCC
+		MCSList: a list of list of nodes representing the MCSs in the feature, as from findMCC
+	'''
+
+	MCCList = []
+	MCSList = []
+
+	#a CE without parent or child is not a feature (as the clean up in findCloudElements)
+	if len(featureNodes) > 1:
+		PRUNED_GRAPH.clear()
+		pruneCloudClusters(CLOUD_ELEMENT_GRAPH.subgraph(featureNodes), cloudClustersFile)
+		MCCList, MCSList = findMCC(PRUNED_GRAPH)
+		PRUNED_GRAPH.clear()
 
-					#run maximum extent and eccentricity criteria
-					maxExtentNode, definiteMCCFlag = maxExtentAndEccentricity(eachList)
-					#print "maxExtentNode, definiteMCCFlag ", maxExtentNode, definiteMCCFlag
-					if definiteMCCFlag == True:
-						definiteMCC.append(eachList)
+	MCSNodes = set(itertools.chain.from_iterable(MCSList))
+	CLOUD_ELEMENT_GRAPH.remove_nodes_from([node for node in featureNodes if node not in MCSNodes])
 
+	#drop the rows of the removed CEs once they are most of the table, so the cost is amortized
+	if 2*CLOUD_ELEMENT_GRAPH.number_of_nodes() < CE_TABLE['numOfCEs']:
+		compactCloudElementTable(CE_TABLE, CLOUD_ELEMENT_GRAPH)
 
-			definiteMCS.append(orderedPath)
-			
-			#reset for next subGraph	
-			aSubGraph.clear()
-			orderedPath=[]
-			MCCList =[]
-			MCSList =[]
-			definiteMCSFlag = False
-		
-	return definiteMCC, definiteMCS
+	return MCCList, MCSList
 #******************************************************************
 def traverseTree(subGraph,node, stack, checkedNodes=None):
 	'''
@@ -1098,12 +1506,12 @@ def checkedNodesMCC (prunedGraph, nodeList):
 			MATURITYFLAG = False
 
 			#check if criteriaA is met
-			cloudElementAreaA, criteriaA = checkCriteria(thisdict['cloudElementLatLon'], OUTER_CLOUD_SHIELD_TEMPERATURE)
+			cloudElementAreaA, criteriaA = checkCriteria(cloudElementLatLons(node), OUTER_CLOUD_SHIELD_TEMPERATURE)
 			#TODO: calcuate the eccentricity at this point and read over????or create a new field in the dict
 			
 			if cloudElementAreaA >= OUTER_CLOUD_SHIELD_AREA:
 				#check if criteriaB is met
-				cloudElementAreaB,criteriaB = checkCriteria(thisdict['cloudElementLatLon'], INNER_CLOUD_SHIELD_TEMPERATURE)
+				cloudElementAreaB,criteriaB = checkCriteria(cloudElementLatLons(node), INNER_CLOUD_SHIELD_TEMPERATURE)
 				
 				#if Criteria A and B have been met, then the MCC is initiated, i.e. store node as potentialMCC
 		   		if cloudElementAreaB >= INNER_CLOUD_SHIELD_AREA:
@@ -1471,12 +1879,33 @@ def thisDict (thisNode):
 		thisNode: a string representing the CE to get the information for
 
 	Output :: 
-		eachdict[1]: a dictionary representing the info associated with thisNode from the graph
+		eachdict: a dictionary representing the info associated with thisNode, made from its row in CE_TABLE.
+			The boxes of the CE are not in it, see cloudElementLatLons
 
 	'''
-	for eachdict in CLOUD_ELEMENT_GRAPH.nodes(thisNode):
-		if eachdict[1]['uniqueID'] == thisNode:
-			return eachdict[1]
+	if not CLOUD_ELEMENT_GRAPH.has_node(thisNode):
+		return None
+
+	record = CE_TABLE['records'][cloudElementIndex(thisNode)]
+	eachdict = {'uniqueID': record['uniqueID'], 
+		'cloudElementTime': CE_STORE_EPOCH + timedelta(hours=float(record['time'])), 
+		'cloudElementCenter': [float(record['centerLat']), float(record['centerLon'])], 
+		'cloudElementArea': float(record['area']), 
+		'cloudElementEccentricity': float(record['eccentricity']), 
+		'cloudElementTmax': float(record['Tmax']), 
+		'cloudElementTmin': float(record['Tmin'])}
+	if record['hasTRMM']:
+		eachdict.update({'cloudElementPrecipTotal': float(record['precipTotal']), 
+			'TRMMArea': float(record['TRMMArea']), 
+			'CETRMMmax': float(record['TRMMmax']), 
+			'CETRMMmin': float(record['TRMMmin'])})
+	if not np.isnan(record['CriteriaBArea']):
+		eachdict['CriteriaBArea'] = float(record['CriteriaBArea'])
+	for key in ['nodeBehaviorIdentifier', 'nodeMCSIdentifier']:
+		if record[key]:
+			eachdict[key] = record[key]
+
+	return eachdict
 #******************************************************************
 def checkCriteria (thisCloudElementLatLon, aTemperature):
 	'''
@@ -1649,14 +2078,12 @@ def addInfothisDict (thisNode, cloudElementArea,criteriaB):
 		thisNode: a string representing the unique ID of a node
 		cloudElementArea: a floating-point number representing the area of the cloud element
 		criteriaB: a masked array of floating-point numbers representing the lat,lons meeting the criteria  
+			NB: this is not kept, to keep CE_TABLE to fixed numeric columns
 
 	Output:: None 
 
 	'''
-	for eachdict in CLOUD_ELEMENT_GRAPH.nodes(thisNode):
-		if eachdict[1]['uniqueID'] == thisNode:
-			eachdict[1]['CriteriaBArea'] = cloudElementArea
-			eachdict[1]['CriteriaBLatLon'] = criteriaB
+	CE_TABLE['records']['CriteriaBArea'][cloudElementIndex(thisNode)] = cloudElementArea
 	return
 #******************************************************************
 def addNodeBehaviorIdentifier (thisNode, nodeBehaviorIdentifier):
@@ -1670,10 +2097,9 @@ def addNodeBehaviorIdentifier (thisNode, nodeBehaviorIdentifier):
 	Output :: None
 
 	'''
-	for eachdict in CLOUD_ELEMENT_GRAPH.nodes(thisNode):
-		if eachdict[1]['uniqueID'] == thisNode:
-			if not 'nodeBehaviorIdentifier' in eachdict[1].keys():
-				eachdict[1]['nodeBehaviorIdentifier'] = nodeBehaviorIdentifier
+	CEindex = cloudElementIndex(thisNode)
+	if not CE_TABLE['records']['nodeBehaviorIdentifier'][CEindex]:
+		CE_TABLE['records']['nodeBehaviorIdentifier'][CEindex] = nodeBehaviorIdentifier
 	return
 #******************************************************************
 def addNodeMCSIdentifier (thisNode, nodeMCSIdentifier):
@@ -1688,10 +2114,9 @@ def addNodeMCSIdentifier (thisNode, nodeMCSIdentifier):
 	Output :: None
 
 	'''
-	for eachdict in CLOUD_ELEMENT_GRAPH.nodes(thisNode):
-		if eachdict[1]['uniqueID'] == thisNode:
-			if not 'nodeMCSIdentifier' in eachdict[1].keys():
-				eachdict[1]['nodeMCSIdentifier'] = nodeMCSIdentifier
+	CEindex = cloudElementIndex(thisNode)
+	if not CE_TABLE['records']['nodeMCSIdentifier'][CEindex]:
+		CE_TABLE['records']['nodeMCSIdentifier'][CEindex] = nodeMCSIdentifier
 	return
 #******************************************************************
 def updateNodeMCSIdentifier (thisNode, nodeMCSIdentifier):
@@ -1706,9 +2131,7 @@ def updateNodeMCSIdentifier (thisNode, nodeMCSIdentifier):
 	Output :: None
 
 	'''
-	for eachdict in CLOUD_ELEMENT_GRAPH.nodes(thisNode):
-		if eachdict[1]['uniqueID'] == thisNode:
-			eachdict[1]['nodeMCSIdentifier'] = nodeBehaviorIdentifier
+	CE_TABLE['records']['nodeMCSIdentifier'][cloudElementIndex(thisNode)] = nodeMCSIdentifier
 
 	return
 #******************************************************************
@@ -1779,6 +2202,45 @@ def cloudElementOverlap (currentCELatLons, previousCELatLons):
 	
 	return percentageOverlap, areaOverlap
 #******************************************************************
+def cloudElementFrameOverlap (prevFrame, currFrame):
+	'''
+	Purpose::
+		Determines the overlap between every CE in one frame and every CE in the next frame at once, 
+		using a joint histogram of the (previous label, current label) of the boxes in both frames
+
+	Input::
+		prevFrame: a 2D array (lat,lon) of the CE labels in the previous frame, 0 for no CE
+		currFrame: a 2D array (lat,lon) of the CE labels in the current frame, 0 for no CE
+
+	Output::
+		prevLabels: a 1D array of the previous frame labels of each overlapping pair
+		currLabels: a 1D array of the current frame labels of each overlapping pair
+		percentageOverlap: a 1D array of floating-points representing the fraction of the smaller CE in each pair that overlaps
+		areaOverlap: a 1D array of floating-points representing the area overlapping in each pair
+
+	Assumptions::
+		Both frames are on the same grid. Pairs that do not overlap are not returned
+	'''
+
+	prevFrame = np.asarray(prevFrame, dtype=np.int64)
+	currFrame = np.asarray(currFrame, dtype=np.int64)
+
+	prevSizes = np.bincount(prevFrame.ravel())
+	currSizes = np.bincount(currFrame.ravel())
+
+	#joint histogram over the boxes that belong to a CE in both frames
+	overlapping = (prevFrame > 0) & (currFrame > 0)
+	pairs = prevFrame[overlapping] * len(currSizes) + currFrame[overlapping]
+	pairs, counts = np.unique(pairs, return_counts=True)
+
+	prevLabels = pairs // len(currSizes)
+	currLabels = pairs % len(currSizes)
+
+	areaOverlap = counts*XRES*YRES
+	percentageOverlap = np.maximum(counts/currSizes[currLabels].astype(float), counts/prevSizes[prevLabels].astype(float))
+
+	return prevLabels, currLabels, percentageOverlap, areaOverlap
+#******************************************************************
 def findCESpeed(node, MCSList):
 	'''
 	Purpose:: 
@@ -1825,70 +2287,530 @@ def findCESpeed(node, MCSList):
 			
 			CEspeed.append(theSpeed)
 
-			# print "~~~ ", thisDict(aNode)['uniqueID']
-			# print "*** ", nodeLatLon, thisDict(node)['cloudElementCenter']
-			# print "*** ", aNodeLatLon, thisDict(aNode)['cloudElementCenter']
-			
-	if not CEspeed:
-		return 0.0
-	else:
-		return min(CEspeed)	
+			# print "~~~ ", thisDict(aNode)['uniqueID']
+			# print "*** ", nodeLatLon, thisDict(node)['cloudElementCenter']
+			# print "*** ", aNodeLatLon, thisDict(aNode)['cloudElementCenter']
+			
+	if not CEspeed:
+		return 0.0
+	else:
+		return min(CEspeed)	
+#******************************************************************
+#
+#			UTILITY SCRIPTS FOR MCCSEARCH.PY
+#
+#******************************************************************
+def maenumerate(mArray):
+	'''
+	Purpose::
+		Utility script for returning the actual values from the masked array
+		Taken from: http://stackoverflow.com/questions/8620798/numpy-ndenumerate-for-masked-arrays
+	
+	Input::
+		mArray: the masked array returned from the ma.array() command
+		
+		
+	Output::
+		maskedValues: 3D (t,lat,lon), value of only masked values
+	
+	'''
+
+	mask = ~mArray.mask.ravel()
+	#beware yield fast, but generates a type called "generate" that does not allow for array methods
+	for index, maskedValue in itertools.izip(np.ndenumerate(mArray), mask):
+		if maskedValue: 
+			yield index	
+#******************************************************************
+def createMainDirectory(mainDirStr):
+	'''
+	Purpose:: 
+		To create the main directory for storing information and
+		the subdirectories for storing information
+	Input:: 
+		mainDir: a directory for where all information generated from
+			the program are to be stored
+	Output:: None
+
+	'''
+	global MAINDIRECTORY
+
+	MAINDIRECTORY = mainDirStr
+	#if directory doesnt exist, creat it
+	if not os.path.exists(MAINDIRECTORY):
+		os.makedirs(MAINDIRECTORY)
+
+	os.chdir((MAINDIRECTORY))
+	#create the subdirectories
+	try:	
+		os.makedirs('images')
+		os.makedirs('textFiles')
+		os.makedirs('MERGnetcdfCEs')
+		os.makedirs('TRMMnetcdfCEs')
+	except:
+		print "Directory exists already!!!"
+		#TODO: some nice way of prompting if it is ok to continue...or just leave
+
+	return 
+#******************************************************************
+def createCloudElementTable():
+	'''
+	Purpose::
+		Creates an empty table of CEs, with the fixed numeric columns of each CE in a structured 
+		array and the boxes of all the CEs in one shared array
+
+	Input::
+		None
+
+	Output::
+		ceTable: a dictionary with
+			{'records': structured array of CE_TABLE_DTYPE, one row per CE in the order they were found,
+			 'numOfCEs': integer number of rows of records in use,
+			 'pixels': structured array of CE_PIXEL_DTYPE, the boxes of each CE from its record's firstPixel,
+			 'numOfPixels': integer number of rows of pixels in use}
+	'''
+
+	return {'records': np.zeros(0, dtype=CE_TABLE_DTYPE), 'numOfCEs': 0,
+		'pixels': np.zeros(0, dtype=CE_PIXEL_DTYPE), 'numOfPixels': 0}
+#******************************************************************
+def growCloudElementTable(ceTable, numOfCEs, numOfPixels):
+	'''
+	Purpose::
+		Makes room in a table of CEs, doubling the arrays when they are full so that appending is cheap
+
+	Input::
+		ceTable: a dictionary returned by createCloudElementTable
+		numOfCEs, numOfPixels: integers representing the number of rows of records and pixels needed
+
+	Output::
+		None
+	'''
+
+	for key, size in [('records', numOfCEs), ('pixels', numOfPixels)]:
+		if size > len(ceTable[key]):
+			grown = np.zeros(max(size, 2*len(ceTable[key]), 1024), dtype=ceTable[key].dtype)
+			grown[:len(ceTable[key])] = ceTable[key]
+			ceTable[key] = grown
+
+	return
+#******************************************************************
+def appendCloudElementRecord(ceTable, record, rows, cols, brightnessTemps):
+	'''
+	Purpose::
+		Adds a CE to a table of CEs
+
+	Input::
+		ceTable: a dictionary returned by createCloudElementTable
+		record: a dictionary of the values of the columns of CE_TABLE_DTYPE for the CE, 
+			the columns not given are left unset
+		rows, cols: 1D arrays of the lat and lon indices of each box in the CE
+		brightnessTemps: a 1D array of the brightness temperature of each box in the CE
+
+	Output::
+		CEindex: an integer representing the row of the CE in the table
+	'''
+
+	CEindex = ceTable['numOfCEs']
+	firstPixel = ceTable['numOfPixels']
+	lastPixel = firstPixel + len(rows)
+	growCloudElementTable(ceTable, CEindex+1, lastPixel)
+
+	records = ceTable['records']
+	records['CriteriaBArea'][CEindex] = np.nan
+	for key, value in record.iteritems():
+		records[key][CEindex] = value
+	records['firstPixel'][CEindex] = firstPixel
+	records['numOfPixels'][CEindex] = len(rows)
+
+	pixels = ceTable['pixels']
+	pixels['latIndex'][firstPixel:lastPixel] = rows
+	pixels['lonIndex'][firstPixel:lastPixel] = cols
+	pixels['brightnesstemp'][firstPixel:lastPixel] = brightnessTemps
+
+	ceTable['numOfCEs'] = CEindex + 1
+	ceTable['numOfPixels'] = lastPixel
+
+	return CEindex
+#******************************************************************
+def mergeCloudElementTables(ceTable, otherTable):
+	'''
+	Purpose::
+		Appends all the CEs of another table of CEs to a table of CEs
+
+	Input::
+		ceTable: a dictionary returned by createCloudElementTable
+		otherTable: a dictionary returned by createCloudElementTable with the CEs to append
+
+	Output::
+		offset: an integer representing the row in ceTable of the first CE of otherTable
+	'''
+
+	offset = ceTable['numOfCEs']
+	pixelOffset = ceTable['numOfPixels']
+	numOfCEs = offset + otherTable['numOfCEs']
+	numOfPixels = pixelOffset + otherTable['numOfPixels']
+	growCloudElementTable(ceTable, numOfCEs, numOfPixels)
+
+	ceTable['records'][offset:numOfCEs] = otherTable['records'][:otherTable['numOfCEs']]
+	ceTable['records']['firstPixel'][offset:numOfCEs] += pixelOffset
+	ceTable['pixels'][pixelOffset:numOfPixels] = otherTable['pixels'][:otherTable['numOfPixels']]
+
+	ceTable['numOfCEs'] = numOfCEs
+	ceTable['numOfPixels'] = numOfPixels
+
+	return offset
+#******************************************************************
+def compactCloudElementTable(ceTable, CEGraph):
+	'''
+	Purpose::
+		Drops the CEs that are no longer nodes of a graph from a table of CEs, 
+		and re-points the CEindex of each node to its new row
+
+	Input::
+		ceTable: a dictionary returned by createCloudElementTable
+		CEGraph: a Networkx directed graph where each node has the CEindex of its row in ceTable
+
+	Output::
+		None
+
+	Assumptions::
+		The rows kept stay in the order they were found, as do their pixels
+	'''
+
+	nodes = CEGraph.nodes()
+	oldIndices = np.array([CEGraph.node[node]['CEindex'] for node in nodes], dtype='i8')
+	order = np.argsort(oldIndices)
+	oldIndices = oldIndices[order]
+
+	records = ceTable['records'][oldIndices]
+	numOfPixels = records['numOfPixels'].astype('i8')
+	newFirstPixels = np.cumsum(numOfPixels) - numOfPixels
+	pixelIndices = np.repeat(records['firstPixel'] - newFirstPixels, numOfPixels) + np.arange(numOfPixels.sum())
+
+	ceTable['pixels'] = ceTable['pixels'][pixelIndices]
+	records['firstPixel'] = newFirstPixels
+	ceTable['records'] = records
+	ceTable['numOfCEs'] = len(records)
+	ceTable['numOfPixels'] = len(pixelIndices)
+
+	for CEindex, nodeNum in enumerate(order):
+		CEGraph.node[nodes[nodeNum]]['CEindex'] = CEindex
+
+	return
+#******************************************************************
+def cloudElementIndex(thisNode):
+	'''
+	Purpose::
+		Finds the row of a node of CLOUD_ELEMENT_GRAPH in CE_TABLE
+
+	Input::
+		thisNode: a string representing the unique ID of a node
+
+	Output::
+		CEindex: an integer representing the row of the CE in CE_TABLE
+	'''
+
+	return CLOUD_ELEMENT_GRAPH.node[thisNode]['CEindex']
+#******************************************************************
+def cloudElementLatLons(thisNode):
+	'''
+	Purpose::
+		Gets the boxes of a CE as a list, as was stored in the node dictionary
+
+	Input::
+		thisNode: a string representing the unique ID of a node
+
+	Output::
+		cloudElementLatLons: a list of (lat,lon,value) of MERG data of CE, sorted by lat
+	'''
+
+	record = CE_TABLE['records'][cloudElementIndex(thisNode)]
+	pixels = CE_TABLE['pixels'][record['firstPixel']:record['firstPixel']+record['numOfPixels']]
+
+	cloudElementLatLons = zip(LAT[pixels['latIndex'],0].tolist(), LON[0,pixels['lonIndex']].tolist(), pixels['brightnesstemp'].tolist())
+	cloudElementLatLons.sort(key=lambda tup: tup[0])
+
+	return cloudElementLatLons
+#******************************************************************
+def createCloudElementStore(fileName=CE_STORE_FILENAME):
+	'''
+	Purpose::
+		Creates the file that stores the boxes of all the CEs found in this run. 
+		The CEs are appended to the file as they are found and indexed by their uniqueID
+
+	Input::
+		fileName (optional): a string representing the name of the file in MAINDIRECTORY
+
+	Output::
+		ceStore: a netCDF4 Dataset opened for appending CEs with appendCloudElement
+
+	Assumptions::
+		createMainDirectory and readMergData have been run i.e. MAINDIRECTORY, LAT and LON are set
+	'''
+
+	ceStore = Dataset(MAINDIRECTORY+'/'+fileName, 'w', format='NETCDF4')
+	ceStore.description = 'Cloud Elements temperature and precipitation data'
+	ceStore.calendar = 'standard'
+	ceStore.conventions = 'COARDS'
+	# dimensions
+	ceStore.createDimension('lat', len(LAT[:,0]))
+	ceStore.createDimension('lon', len(LON[0,:]))
+	ceStore.createDimension('cloudElement', None)
+	ceStore.createDimension('box', None)
+	# variables
+	latitudes = ceStore.createVariable('latitude', 'f8', ('lat',))
+	longitudes = ceStore.createVariable('longitude', 'f8', ('lon',))
+	ceStore.createVariable('uniqueID', str, ('cloudElement',))
+	times = ceStore.createVariable('time', 'f8', ('cloudElement',))
+	times.units = CE_STORE_TIME_UNITS
+	ceStore.createVariable('firstBox', 'i8', ('cloudElement',))
+	ceStore.createVariable('numOfBoxes', 'i4', ('cloudElement',))
+	ceStore.createVariable('latIndex', 'i4', ('box',))
+	ceStore.createVariable('lonIndex', 'i4', ('box',))
+	brightnesstemp = ceStore.createVariable('brightnesstemp', 'i2', ('box',))
+	brightnesstemp.units = 'Kelvin'
+	rainFallacc = ceStore.createVariable('precipitation_Accumulation', 'f8', ('box',), fill_value=0.0)
+	rainFallacc.units = 'mm'
+
+	longitudes[:] = LON[0,:]
+	longitudes.units = "degrees_east" 
+	longitudes.long_name = "Longitude" 
+
+	latitudes[:] =  LAT[:,0]
+	latitudes.units = "degrees_north"
+	latitudes.long_name ="Latitude"
+
+	return ceStore
+#******************************************************************
+def appendCloudElement(ceStore, CEuniqueID, CEtime, rows, cols, brightnessTemps, precip=None):
+	'''
+	Purpose::
+		Adds the boxes of a CE to the cloud element store
+
+	Input::
+		ceStore: a netCDF4 Dataset returned by createCloudElementStore
+		CEuniqueID: a string representing the uniqueID of the CE
+		CEtime: a python datetime of the CE
+		rows, cols: 1D arrays of the lat and lon indices of each box in the CE
+		brightnessTemps: a 1D array of the brightness temperature of each box in the CE
+		precip (optional): a 1D array of the TRMM precipitation of each box in the CE
+
+	Output::
+		None
+	'''
+
+	CEindex = len(ceStore.dimensions['cloudElement'])
+	firstBox = len(ceStore.dimensions['box'])
+	lastBox = firstBox + len(rows)
+
+	ceStore.variables['uniqueID'][CEindex] = CEuniqueID
+	ceStore.variables['time'][CEindex] = date2num(CEtime, units=CE_STORE_TIME_UNITS)
+	ceStore.variables['firstBox'][CEindex] = firstBox
+	ceStore.variables['numOfBoxes'][CEindex] = len(rows)
+
+	ceStore.variables['latIndex'][firstBox:lastBox] = rows
+	ceStore.variables['lonIndex'][firstBox:lastBox] = cols
+	ceStore.variables['brightnesstemp'][firstBox:lastBox] = brightnessTemps
+	if precip is not None:
+		ceStore.variables['precipitation_Accumulation'][firstBox:lastBox] = precip
+
+	return
+#******************************************************************
+def mergeCloudElementStores(ceStore, ceStoreFiles):
+	'''
+	Purpose::
+		Appends all the CEs of other cloud element stores to a cloud element store, in order
+
+	Input::
+		ceStore: a netCDF4 Dataset returned by createCloudElementStore
+		ceStoreFiles: a list of strings representing the files of the cloud element stores to append
+
+	Output::
+		None
+
+	Assumptions::
+		All the stores are on the same grid
+	'''
+
+	for ceStoreFile in ceStoreFiles:
+		ceStoreData = Dataset(ceStoreFile, 'r', format='NETCDF4')
+		numOfCEs = len(ceStoreData.dimensions['cloudElement'])
+		if numOfCEs == 0:
+			ceStoreData.close()
+			continue
+
+		CEindex = len(ceStore.dimensions['cloudElement'])
+		firstBox = len(ceStore.dimensions['box'])
+		lastBox = firstBox + len(ceStoreData.dimensions['box'])
+
+		ceStore.variables['uniqueID'][CEindex:CEindex+numOfCEs] = ceStoreData.variables['uniqueID'][:]
+		ceStore.variables['time'][CEindex:CEindex+numOfCEs] = ceStoreData.variables['time'][:]
+		ceStore.variables['firstBox'][CEindex:CEindex+numOfCEs] = ceStoreData.variables['firstBox'][:] + firstBox
+		ceStore.variables['numOfBoxes'][CEindex:CEindex+numOfCEs] = ceStoreData.variables['numOfBoxes'][:]
+
+		for varName in ['latIndex', 'lonIndex', 'brightnesstemp', 'precipitation_Accumulation']:
+			ceStore.variables[varName][firstBox:lastBox] = ceStoreData.variables[varName][:]
+		ceStoreData.close()
+
+	return
+#******************************************************************
+def readCloudElementStore():
+	'''
+	Purpose::
+		Reads the whole cloud element store into memory
+
+	Input::
+		None
+
+	Output::
+		ceStore: a dictionary with
+			{'uniqueIDs': list of the CE uniqueIDs in the order they were found,
+			 'index': dictionary of CE uniqueID to the (firstBox, numOfBoxes) of its boxes,
+			 'times': dictionary of CE uniqueID to its python datetime,
+			 'latIndex', 'lonIndex', 'brightnesstemp', 'precipitation_Accumulation': 1D arrays of all the boxes,
+			 'latitude', 'longitude': 1D arrays of the grid}
+
+	Assumptions::
+		findCloudElements has been run for MAINDIRECTORY
+	'''
+
+	ceStoreData = Dataset(MAINDIRECTORY+'/'+CE_STORE_FILENAME, 'r', format='NETCDF4')
+	uniqueIDs = list(ceStoreData.variables['uniqueID'][:])
+	times = [CE_STORE_EPOCH + timedelta(hours=float(hours)) for hours in ceStoreData.variables['time'][:]]
+	firstBoxes = ceStoreData.variables['firstBox'][:]
+	numOfBoxes = ceStoreData.variables['numOfBoxes'][:]
+
+	ceStore = {'uniqueIDs': uniqueIDs,
+		'index': dict(zip(uniqueIDs, zip(firstBoxes, numOfBoxes))),
+		'times': dict(zip(uniqueIDs, times))}
+	for varName in ['latIndex', 'lonIndex', 'brightnesstemp', 'precipitation_Accumulation', 'latitude', 'longitude']:
+		ceStore[varName] = ma.filled(ceStoreData.variables[varName][:], 0)
+	ceStoreData.close()
+
+	return ceStore
+#******************************************************************
+def cloudElementBoxes(ceStore, CEuniqueID, varName='brightnesstemp'):
+	'''
+	Purpose::
+		Gets the boxes of a CE from the cloud element store
+
+	Input::
+		ceStore: a dictionary returned by readCloudElementStore
+		CEuniqueID: a string representing the uniqueID of the CE
+		varName (optional): a string representing the variable to get i.e. brightnesstemp or precipitation_Accumulation
+
+	Output::
+		rows, cols: 1D arrays of the lat and lon indices of each box in the CE
+		values: a 1D array of the variable at each box in the CE
+	'''
+
+	firstBox, numOfBoxes = ceStore['index'][CEuniqueID]
+	boxes = slice(firstBox, firstBox + numOfBoxes)
+
+	return ceStore['latIndex'][boxes], ceStore['lonIndex'][boxes], ceStore[varName][boxes]
 #******************************************************************
-#
-#			UTILITY SCRIPTS FOR MCCSEARCH.PY
-#
+def cloudElementGrid(ceStore, CEuniqueID, varName='brightnesstemp'):
+	'''
+	Purpose::
+		Gets a CE from the cloud element store on the full lat,lon grid
+
+	Input::
+		ceStore: a dictionary returned by readCloudElementStore
+		CEuniqueID: a string representing the uniqueID of the CE
+		varName (optional): a string representing the variable to get i.e. brightnesstemp or precipitation_Accumulation
+
+	Output::
+		grid: a 2D array (lat,lon) of the variable in the boxes of the CE and zeros elsewhere
+	'''
+
+	rows, cols, values = cloudElementBoxes(ceStore, CEuniqueID, varName)
+	grid = np.zeros((len(ceStore['latitude']), len(ceStore['longitude'])), dtype=values.dtype)
+	grid[rows, cols] = values
+
+	return grid
 #******************************************************************
-def maenumerate(mArray):
+def writeCloudElementPrecip(CEprecip):
 	'''
 	Purpose::
-		Utility script for returning the actual values from the masked array
-		Taken from: http://stackoverflow.com/questions/8620798/numpy-ndenumerate-for-masked-arrays
-	
+		Stores the TRMM precipitation of CEs already in the cloud element store
+
 	Input::
-		mArray: the masked array returned from the ma.array() command
-		
-		
+		CEprecip: a dictionary of CE uniqueID to a 1D array of the precipitation of each box in the CE 
+
 	Output::
-		maskedValues: 3D (t,lat,lon), value of only masked values
-	
+		None
 	'''
 
-	mask = ~mArray.mask.ravel()
-	#beware yield fast, but generates a type called "generate" that does not allow for array methods
-	for index, maskedValue in itertools.izip(np.ndenumerate(mArray), mask):
-		if maskedValue: 
-			yield index	
+	ceStoreData = Dataset(MAINDIRECTORY+'/'+CE_STORE_FILENAME, 'a', format='NETCDF4')
+	uniqueIDs = list(ceStoreData.variables['uniqueID'][:])
+	firstBoxes = ceStoreData.variables['firstBox'][:]
+	precip = ma.filled(ceStoreData.variables['precipitation_Accumulation'][:], 0.0)
+
+	for CEindex, CEuniqueID in enumerate(uniqueIDs):
+		if CEuniqueID in CEprecip:
+			precip[firstBoxes[CEindex]:firstBoxes[CEindex] + len(CEprecip[CEuniqueID])] = CEprecip[CEuniqueID]
+
+	ceStoreData.variables['precipitation_Accumulation'][:] = precip
+	ceStoreData.close()
+
+	return
 #******************************************************************
-def createMainDirectory(mainDirStr):
+def exportCloudElements(dirName, dataset):
 	'''
-	Purpose:: 
-		To create the main directory for storing information and
-		the subdirectories for storing information
-	Input:: 
-		mainDir: a directory for where all information generated from
-			the program are to be stored
-	Output:: None
+	Purpose::
+		Writes each CE in the cloud element store to its own netCDF file on the full lat,lon grid
+		for the GrADS post processing
+
+	Input::
+		dirName: a string representing the directory to write the files to
+		dataset: an integer representing the data to write, 1 - MERG brightness temperature, 2 - TRMM precipitation
 
+	Output::
+		None
 	'''
-	global MAINDIRECTORY
 
-	MAINDIRECTORY = mainDirStr
-	#if directory doesnt exist, creat it
-	if not os.path.exists(MAINDIRECTORY):
-		os.makedirs(MAINDIRECTORY)
+	ceStore = readCloudElementStore()
 
-	os.chdir((MAINDIRECTORY))
-	#create the subdirectories
-	try:	
-		os.makedirs('images')
-		os.makedirs('textFiles')
-		os.makedirs('MERGnetcdfCEs')
-		os.makedirs('TRMMnetcdfCEs')
-	except:
-		print "Directory exists already!!!"
-		#TODO: some nice way of prompting if it is ok to continue...or just leave
+	if dataset == 1:
+		filePrefix = 'cloudElements'
+		varName = 'brightnesstemp'
+		varType = 'i2'
+		varUnits = 'Kelvin'
+	else:
+		filePrefix = 'TRMM'
+		varName = 'precipitation_Accumulation'
+		varType = 'f8'
+		varUnits = 'mm'
+
+	for CEuniqueID in ceStore['uniqueIDs']:
+		CEtime = ceStore['times'][CEuniqueID]
+		thisFileName = dirName+'/'+filePrefix+str(CEtime).replace(" ", "_")+CEuniqueID+'.nc'
+		currNetCDFCEData = Dataset(thisFileName, 'w', format='NETCDF4')
+		currNetCDFCEData.description = 'Cloud Element '+CEuniqueID + ' ' + varName + ' data'
+		currNetCDFCEData.calendar = 'standard'
+		currNetCDFCEData.conventions = 'COARDS'
+		# dimensions
+		currNetCDFCEData.createDimension('time', None)
+		currNetCDFCEData.createDimension('lat', len(ceStore['latitude']))
+		currNetCDFCEData.createDimension('lon', len(ceStore['longitude']))
+		# variables
+		times = currNetCDFCEData.createVariable('time', 'f8', ('time',))
+		times.units = 'hours since '+ str(CEtime)[:-6]
+		latitudes = currNetCDFCEData.createVariable('latitude', 'f8', ('lat',))
+		longitudes = currNetCDFCEData.createVariable('longitude', 'f8', ('lon',))
+		CEdata = currNetCDFCEData.createVariable(varName, varType, ('time','lat', 'lon',))
+		CEdata.units = varUnits
+		# NETCDF data
+		times[:] = date2num([CEtime], units=times.units)
+		longitudes[:] = ceStore['longitude']
+		longitudes.units = "degrees_east" 
+		longitudes.long_name = "Longitude" 
+		latitudes[:] = ceStore['latitude']
+		latitudes.units = "degrees_north"
+		latitudes.long_name ="Latitude"
+		CEdata[0,:,:] = cloudElementGrid(ceStore, CEuniqueID, varName)
+		currNetCDFCEData.close()
 
-	return 
+	return
 #******************************************************************
 def checkForFiles(startTime, endTime, thisDir, fileType):
 	'''
@@ -2175,6 +3097,7 @@ def postProcessingNetCDF(dataset, dirName = None):
 	Input::
 		dataset: integer representing post-processed MERG (1) or TRMM data (2) or original MERG(3)
 		string: Directory to the location of the raw (MERG) files, preferably zipped
+		NB: for (1) and (2) the CEs in the cloud element store are first written to this directory
 		
 	Output::
 	   images in location as specfied in the code
@@ -2225,6 +3148,10 @@ def postProcessingNetCDF(dataset, dirName = None):
 		sologsFile = coreDir+"/../GrADSscripts/infrared.gs"
 		lineNum = 54			
 
+	#write the CEs in the cloud element store to files GrADS can open
+	if dataset == 1 or dataset == 2:
+		exportCloudElements(dirName, dataset)
+
 	#sort files
 	os.chdir((dirName+'/'))
 	try:
@@ -2458,11 +3385,178 @@ def tempMaskedImages(imgFilename):
 #******************************************************************
 # 
 #			 METRICS FUNCTIONS FOR MERG.PY
-# TODO: rewrite these metrics so that they use the data from the 
-#	file instead of the graph as this reduce mem resources needed
-#	
+# The metrics use the records of the nodes in CE_TABLE, gathered
+#	once for all the features by featureTable
 #
 #******************************************************************
+def featureTable(finalMCCList):
+	'''
+	Purpose:: 
+		To gather the records of all the nodes of the features once, for the metrics
+
+	Input:: 
+		finalMCCList: a list of list of strings representing the list of nodes representing a MCC
+
+	Output:: 
+		features: a dictionary with
+			{'numOfFeatures': integer number of features,
+			 'featureNum': 1D array of the index in finalMCCList of the feature of each node,
+			 'records': structured array of CE_TABLE_DTYPE of the record of each node, in the order of finalMCCList}
+	'''
+
+	numOfNodes = [len(eachMCC) for eachMCC in finalMCCList]
+	CEindices = np.array([cloudElementIndex(eachNode) for eachMCC in finalMCCList for eachNode in eachMCC], dtype='i8')
+
+	return {'numOfFeatures': len(finalMCCList),
+		'featureNum': np.repeat(np.arange(len(finalMCCList)), numOfNodes),
+		'records': CE_TABLE['records'][CEindices]}
+#******************************************************************
+def summarizeFeatures(finalMCCList):
+	'''
+	Purpose:: 
+		To compute all the metrics of the features at once, with grouped reductions over the records 
+		of their nodes from featureTable
+
+	Input:: 
+		finalMCCList: a list of list of strings representing the list of nodes representing a MCC
+	
+	Output:: 
+		summary: a dictionary with, for each feature in the order of finalMCCList
+			{'MCCtimes': list of the sorted unique python datetimes of the feature,
+			 'starttime', 'endtime': python datetimes of the first and last times,
+			 'tdelta': python timedelta between the first two times, TRES hrs if there is one time,
+			 'duration': python timedelta of endtime - starttime + tdelta,
+			 'MCSArea': list of the area of each node,
+			 'averageArea', 'maxArea': floating-point numbers representing the average and max area of the nodes,
+			 'precipTotal': floating-point number representing the total precipitation of the nodes,
+			 'hourlyPrecip': list of (hr, precipitation of the consecutive nodes in that hr) and ('0', precipTotal),
+			 'precipMaxMin': list of (uniqueID, min rate, max rate) of each node}
+		in a list under 'features', and for all the features
+			{'numberOfFeatures': integer number of features,
+			 'longestDuration', 'shortestDuration', 'averageDuration': python timedeltas,
+			 'averageFeatureSize': floating-point number representing the average of averageArea,
+			 'commonFeatureSize': (hist, bin_edges) of the histogram of averageArea}
+
+	Assumptions:: 
+		the final time hour --> the event lasted throughout that hr, therefore tdelta is added to endtime
+		the precipitation is 0 for the nodes of CEs without TRMM data
+	'''
+
+	features = featureTable(finalMCCList)
+	numOfFeatures = features['numOfFeatures']
+	featureNum = features['featureNum']
+	records = features['records']
+
+	summary = {'numberOfFeatures': numOfFeatures, 'features': []}
+	if numOfFeatures == 0:
+		return summary
+
+	#areas and precipitation of each feature
+	numOfNodes = np.bincount(featureNum, minlength=numOfFeatures)
+	averageAreas = np.bincount(featureNum, weights=records['area'], minlength=numOfFeatures)/numOfNodes
+	maxAreas = np.full(numOfFeatures, -np.inf)
+	np.maximum.at(maxAreas, featureNum, records['area'])
+	precipTotals = np.bincount(featureNum, weights=records['precipTotal'], minlength=numOfFeatures)
+
+	#the unique times of each feature, sorted
+	order = np.lexsort((records['time'], featureNum))
+	sortedFeatures = featureNum[order]
+	sortedTimes = records['time'][order]
+	isNewTime = np.ones(len(order), dtype=bool)
+	isNewTime[1:] = (np.diff(sortedFeatures) != 0) | (np.diff(sortedTimes) != 0)
+	uniqueFeatures = sortedFeatures[isNewTime]
+	uniqueTimes = sortedTimes[isNewTime]
+	firstTime = np.searchsorted(uniqueFeatures, np.arange(numOfFeatures))
+	lastTime = np.searchsorted(uniqueFeatures, np.arange(numOfFeatures), side='right') - 1
+	tdeltas = np.where(lastTime > firstTime, uniqueTimes[np.minimum(firstTime+1, lastTime)] - uniqueTimes[firstTime], TRES)
+	durations = uniqueTimes[lastTime] - uniqueTimes[firstTime] + tdeltas
+
+	#the precipitation of the runs of consecutive nodes of a feature in the same hr
+	hours = np.floor(records['time']).astype('i8') % 24
+	isNewRun = np.ones(len(records), dtype=bool)
+	isNewRun[1:] = (np.diff(featureNum) != 0) | (np.diff(hours) != 0)
+	runStarts = np.flatnonzero(isNewRun)
+	runPrecip = np.add.reduceat(records['precipTotal'], runStarts)
+	runFeatures = featureNum[runStarts]
+	runHours = hours[runStarts]
+
+	toDatetime = lambda hrs: CE_STORE_EPOCH + timedelta(hours=float(hrs))
+	nodeSplits = np.cumsum(numOfNodes)[:-1]
+	featureAreas = np.split(records['area'], nodeSplits)
+	featureRecords = np.split(records, nodeSplits)
+	runSplits = np.searchsorted(runFeatures, np.arange(1, numOfFeatures))
+
+	for thisFeature, (areas, nodeRecords, hrs, precip) in enumerate(itertools.izip(featureAreas, featureRecords, 
+		np.split(runHours, runSplits), np.split(runPrecip, runSplits))):
+		summary['features'].append({'MCCtimes': [toDatetime(aTime) for aTime in uniqueTimes[firstTime[thisFeature]:lastTime[thisFeature]+1]],
+			'starttime': toDatetime(uniqueTimes[firstTime[thisFeature]]),
+			'endtime': toDatetime(uniqueTimes[lastTime[thisFeature]]),
+			'tdelta': timedelta(hours=float(tdeltas[thisFeature])),
+			'duration': timedelta(hours=float(durations[thisFeature])),
+			'MCSArea': areas.tolist(),
+			'averageArea': averageAreas[thisFeature],
+			'maxArea': maxAreas[thisFeature],
+			'precipTotal': precipTotals[thisFeature],
+			'hourlyPrecip': zip(hrs.tolist(), precip.tolist()) + [('0', precipTotals[thisFeature])],
+			'precipMaxMin': zip(nodeRecords['uniqueID'].tolist(), nodeRecords['TRMMmin'].tolist(), nodeRecords['TRMMmax'].tolist())})
+
+	summary['longestDuration'] = timedelta(hours=float(durations.max()))
+	summary['shortestDuration'] = timedelta(hours=float(durations.min()))
+	summary['averageDuration'] = timedelta(hours=float(durations.mean()))
+	summary['averageFeatureSize'] = averageAreas.mean()
+	summary['commonFeatureSize'] = np.histogram(averageAreas)
+
+	return summary
+#******************************************************************
+def writeFeatureSummary(finalMCCList, identifier):
+	'''
+	Purpose:: 
+		To write all the metrics of the features to one text file
+
+	Input:: 
+		finalMCCList: a list of list of strings representing the list of nodes representing a MCC
+		identifier: an integer representing the type of list that has been entered...this is for creating file purposes
+			1 - MCCList; 2- MCSList
+
+	Output:: 
+		summary: the dictionary from summarizeFeatures
+		NB: also writes MCCMetrics.txt or MCSMetrics.txt in MAINDIRECTORY/textFiles
+	'''
+
+	summary = summarizeFeatures(finalMCCList)
+
+	if identifier == 1:
+		featureName = 'MCC'
+	else:
+		featureName = 'MCS'
+
+	summaryFile = open((MAINDIRECTORY+'/textFiles/'+featureName+'Metrics.txt'),'wb')
+	summaryFile.write("Number of %ss is: %d" %(featureName, summary['numberOfFeatures']))
+	if summary['numberOfFeatures'] > 0:
+		summaryFile.write("\nLongest duration is: %s " %(str(summary['longestDuration'])))
+		summaryFile.write("\nShortest duration is: %s " %(str(summary['shortestDuration'])))
+		summaryFile.write("\nAverage duration is: %s " %(str(summary['averageDuration'])))
+		summaryFile.write("\nAverage size is: %.4f km^2 " %(summary['averageFeatureSize']))
+		hist, binEdges = summary['commonFeatureSize']
+		summaryFile.write("\nCommon size (count in each average area bin in km^2) is: %s " 
+			%(', '.join('%.4f-%.4f: %d' %(binEdges[i], binEdges[i+1], hist[i]) for i in xrange(len(hist)))))
+
+	for featureNum, feature in enumerate(summary['features']):
+		summaryFile.write("\n\n%s %d" %(featureName, featureNum+1))
+		summaryFile.write("\nStarttime is: %s " %(str(feature['starttime'])))
+		summaryFile.write("\nEndtime is: %s " %(str(feature['endtime'])))
+		summaryFile.write("\nLife duration is %s " %(str(feature['duration'])))
+		summaryFile.write("\nNumber of CEs is: %d " %(len(feature['MCSArea'])))
+		summaryFile.write("\nAverage area is: %.4f km^2 " %(feature['averageArea']))
+		summaryFile.write("\nMax area is: %.4f km^2 " %(feature['maxArea']))
+		summaryFile.write("\nTotal precipitation is %.4f mm/lifetime" %(feature['precipTotal']))
+		summaryFile.write("\nPrecipitation in each hr is: %s " 
+			%(', '.join('%s: %.4f' %(hr, precip) for hr, precip in feature['hourlyPrecip'][:-1])))
+
+	summaryFile.close()
+
+	return summary
+#******************************************************************
 def numberOfFeatures(finalMCCList):
 	'''
 	Purpose:: 
@@ -2488,38 +3582,18 @@ def temporalAndAreaInfoMetric(finalMCCList):
 	Output:: 
 		allMCCtimes: a list of dictionaries {MCCtimes, starttime, endtime, duration, area} representing a list of dictionaries
 			of MCC temporal details for each MCC in the period considered
+		tdelta: a python timedelta between the first two times of the last MCC
 
 	Assumptions:: 
 		the final time hour --> the event lasted throughout that hr, therefore +1 to endtime
 	'''
-	#TODO: in real data edit this to use datetime
-	#starttime =0
-	#endtime =0
-	#duration = 0
-	MCCtimes =[]
-	allMCCtimes=[]
-	MCSArea =[]
-	
-	if finalMCCList:
-		for eachMCC in finalMCCList:
-			#get the info from the node
-			for eachNode in eachMCC:
-				MCCtimes.append(thisDict(eachNode)['cloudElementTime'])
-				MCSArea.append(thisDict(eachNode)['cloudElementArea'])
-			
-			#sort and remove duplicates 
-			MCCtimes=list(set(MCCtimes))
-			MCCtimes.sort()
-			tdelta = MCCtimes[1] - MCCtimes[0]
-			starttime = MCCtimes[0]
-			endtime = MCCtimes[-1]
-			duration = (endtime - starttime) + tdelta
-			print "starttime ", starttime, "endtime ", endtime, "tdelta ", tdelta, "duration ", duration, "MCSAreas ", MCSArea
-			allMCCtimes.append({'MCCtimes':MCCtimes, 'starttime':starttime, 'endtime':endtime, 'duration':duration, 'MCSArea': MCSArea})
-			MCCtimes=[]
-			MCSArea=[]
+	summary = summarizeFeatures(finalMCCList)
+
+	allMCCtimes = [dict((key, feature[key]) for key in ['MCCtimes', 'starttime', 'endtime', 'duration', 'MCSArea']) 
+		for feature in summary['features']]
+	if allMCCtimes:
+		tdelta = summary['features'][-1]['tdelta']
 	else:
-		allMCCtimes =[]
 		tdelta = 0 
 
 	return allMCCtimes, tdelta
@@ -2630,20 +3704,8 @@ def averageFeatureSize(finalMCCList):
 	Assumptions:: 
 
 	'''
-	thisMCC = 0.0
-	thisMCCAvg = 0.0
-
-	#for each node in the list, get the are information from the dictionary
-	#in the graph and calculate the area
-	for eachPath in finalMCCList:
-		for eachNode in eachPath:
-			thisMCC += thisDict(eachNode)['cloudElementArea']
-
-		thisMCCAvg += (thisMCC/len(eachPath))
-		thisMCC = 0.0
-
 	#calcuate final average
-	return thisMCCAvg/(len(finalMCCList))
+	return summarizeFeatures(finalMCCList)['averageFeatureSize']
 #******************************************************************
 def commonFeatureSize(finalMCCList): 
 	'''
@@ -2659,20 +3721,7 @@ def commonFeatureSize(finalMCCList):
 	Assumptions:: 
 
 	'''
-	thisMCC = 0.0
-	thisMCCAvg = []
-
-	#for each node in the list, get the area information from the dictionary
-	#in the graph and calculate the area
-	for eachPath in finalMCCList:
-		for eachNode in eachPath:
-			thisMCC += eachNode['cloudElementArea']
-
-		thisMCCAvg.append(thisMCC/len(eachPath))
-		thisMCC = 0.0
-
-	#calcuate 
-	hist, bin_edges = np.histogram(thisMCCAvg)
+	hist, bin_edges = summarizeFeatures(finalMCCList)['commonFeatureSize']
 	return hist,bin_edges
 #******************************************************************
 def precipTotals(finalMCCList):
@@ -2687,93 +3736,27 @@ def precipTotals(finalMCCList):
 		precipTotal: a floating-point number representing the total amount of precipitation associated 
 			with the feature
 	'''
-	precipTotal = 0.0
-	CEprecip =0.0
-	MCSPrecip=[]
-	allMCSPrecip =[]
-	count = 0
-
-	if finalMCCList:
-		#print "len finalMCCList is: ", len(finalMCCList)
-		for eachMCC in finalMCCList:
-			#get the info from the node
-			for node in eachMCC:
-				eachNode=thisDict(node)
-				count += 1
-				if count == 1:
-					prevHr = int(str(eachNode['cloudElementTime']).replace(" ", "")[-8:-6])
-				
-				currHr =int(str(eachNode['cloudElementTime']).replace(" ", "")[-8:-6])
-				if prevHr == currHr:
-					CEprecip += eachNode['cloudElementPrecipTotal'] 
-				else:
-					MCSPrecip.append((prevHr,CEprecip))
-					CEprecip = eachNode['cloudElementPrecipTotal'] 
-				#last value in for loop
-				if count == len(eachMCC):
-					MCSPrecip.append((currHr, CEprecip))
-
-				precipTotal += eachNode['cloudElementPrecipTotal'] 
-				prevHr = currHr
-
-			MCSPrecip.append(('0',precipTotal))
-			
-			allMCSPrecip.append(MCSPrecip)
-			precipTotal =0.0
-			CEprecip = 0.0
-			MCSPrecip = []
-			count = 0
-
-		print "allMCSPrecip ", allMCSPrecip
+	allMCSPrecip = [feature['hourlyPrecip'] for feature in summarizeFeatures(finalMCCList)['features']]
 
 	return allMCSPrecip
 #******************************************************************
 def precipMaxMin(finalMCCList):
 	'''
-	TODO: this doesnt work the np.min/max function seems to be not working with the nonzero option..possibly a problem upstream with cloudElementLatLonTRMM
 	Purpose:: 
 		Precipitation maximum and min rates associated with each CE in MCS
 	Input:: 
 		finalMCCList: a list of dictionaries representing a list of nodes representing a MCC
 
 	Output::
-		MCSPrecip: a list indicating max and min rate for each CE identified
+		MCSPrecip: a list indicating (uniqueID, min rate, max rate) for each CE identified, 
+			or a list of these lists for each MCC if finalMCCList is a list of MCCs
 
 	'''
-	maxCEprecip = 0.0
-	minCEprecip =0.0
-	MCSPrecip=[]
-	allMCSPrecip =[]
+	if finalMCCList and type(finalMCCList[0]) is str: 
+		#the nodes of one MCC
+		return summarizeFeatures([finalMCCList])['features'][0]['precipMaxMin']
 
-
-	if finalMCCList:
-		if type(finalMCCList[0]) is str: # len(finalMCCList) == 1:
-			for node in finalMCCList:
-				eachNode = thisDict(node)
-				CETRMM = eachNode['cloudElementLatLonTRMM']
-
-				print "all ", np.min(CETRMM[np.nonzero(CETRMM)])
-				print "minCEprecip ", np.min(eachNode['cloudElementLatLonTRMM']) #[np.nonzero(eachNode['cloudElementLatLonTRMM'])])
-
-				print "maxCEprecip ", np.max(eachNode['cloudElementLatLonTRMM'][np.nonzero(eachNode['cloudElementLatLonTRMM'])])
-				sys.exit()
-				maxCEprecip = np.max(eachNode['cloudElementLatLonTRMM'][np.nonzero(eachNode['cloudElementLatLonTRMM'])])
-				minCEprecip = np.min(eachNode['cloudElementLatLonTRMM'][np.nonzero(eachNode['cloudElementLatLonTRMM'])])
-				MCSPrecip.append((eachNode['uniqueID'],minCEprecip, maxCEprecip))
-			
-		else:
-			for eachMCC in finalMCCList:
-				#get the info from the node
-				for node in eachMCC: 
-					eachNode=thisDict(node)
-					#find min and max precip
-					maxCEprecip =  np.max(eachNode['cloudElementLatLonTRMM'][np.nonzero(eachNode['cloudElementLatLonTRMM'])])
-					minCEprecip =  np.min(eachNode['cloudElementLatLonTRMM'][np.nonzero(eachNode['cloudElementLatLonTRMM'])])
-					MCSPrecip.append((eachNode['uniqueID'],minCEprecip, maxCEprecip))
-				allMCSPrecip.append(MCSPrecip)
-				MCSPrecip =[]
-	 
-	return MCSPrecip
+	return [feature['precipMaxMin'] for feature in summarizeFeatures(finalMCCList)['features']]
 #******************************************************************
 #
 #							PLOTS
@@ -2967,7 +3950,7 @@ def displayPrecip(finalMCCList):
 def plotPrecipHistograms(finalMCCList):
 	'''
 	Purpose:: 
-		To create plots (histograms) of the each TRMMnetcdfCEs files
+		To create plots (histograms) of the TRMM data of each CE in the cloud element store
 
 	Input:: 
 		finalMCCList: a list of dictionaries representing a list of nodes representing a MCC
@@ -2987,6 +3970,7 @@ def plotPrecipHistograms(finalMCCList):
 
 	#TODO: use try except block instead
 	if finalMCCList:
+		ceStore = readCloudElementStore()
 
 		for eachMCC in finalMCCList:
 			firstTime = True
@@ -3029,20 +4013,15 @@ def plotPrecipHistograms(finalMCCList):
 						plt.savefig(imgFilename, transparent=True)
 						precip =[]
 						
-					# ------ NETCDF File get info ------------------------------------
-					thisFileName = MAINDIRECTORY+'/TRMMnetcdfCEs/TRMM' + str(thisTime).replace(" ", "_") + eachNode['uniqueID'] +'.nc'
-					TRMMData = Dataset(thisFileName,'r', format='NETCDF4')
-					precipRate = TRMMData.variables['precipitation_Accumulation'][:,:,:]
-					CEprecipRate = precipRate[0,:,:]
-					TRMMData.close()
+					# ------ cloud element store get info ------------------------------------
+					CEprecipRate = cloudElementGrid(ceStore, eachNode['uniqueID'], 'precipitation_Accumulation')
 					if firstTime==True:
 						totalPrecip=np.zeros((CEprecipRate.shape))
 					
-					totalPrecip = np.add(totalPrecip, precipRate)
-					# ------ End NETCDF File ------------------------------------
-					for index, value in np.ndenumerate(CEprecipRate): 
-						if value != 0.0:
-							precip.append(value)
+					totalPrecip = np.add(totalPrecip, CEprecipRate)
+					# ------ End cloud element store ------------------------------------
+					_, _, CEprecipValues = cloudElementBoxes(ceStore, eachNode['uniqueID'], 'precipitation_Accumulation')
+					precip.extend(CEprecipValues[CEprecipValues != 0.0].tolist())
 
 					lastTime = str(thisTime)
 					firstTime = False
@@ -3107,132 +4086,32 @@ def plotAccTRMM (finalMCCList):
 	Purpose:: 
 		(1) generate a file with the accumulated precipiation for the MCS
 		(2) generate the appropriate image
-		TODO: NB: as the domain changes, will need to change XDEF and YDEF by hand to accomodate the new domain
-		TODO: look into getting the info from the NETCDF file
 
 	Input:: 
 		finalMCCList: a list of dictionaries representing a list of nodes representing a MCC
   
 	Output:: 
-		a netcdf file containing the accumulated precip 
-		a gif (generated in Grads)
+		a netcdf file containing the accumulated precip for each MCS
+		a gif for each MCS
 	'''
-	os.chdir((MAINDIRECTORY+'/TRMMnetcdfCEs'))
-	fname =''
-	imgFilename = ''
-	firstPartName = ''
-	firstTime = True
-	replaceExpXDef = ''
-	
-	#Just incase the X11 server is giving problems
-	subprocess.call('export DISPLAY=:0.0', shell=True)
+	ceStore = readCloudElementStore()
 
-	#generate the file name using MCCTimes
-	#if the file name exists, add it to the accTRMM file
 	for path in finalMCCList:
-		for eachNode in path:
-			thisNode = thisDict(eachNode)
-			fname = 'TRMM'+ str(thisNode['cloudElementTime']).replace(" ", "_") + thisNode['uniqueID'] +'.nc'
-			
-			if os.path.isfile(fname):	
-				#open NetCDF file add info to the accu 
-				#print "opening TRMM file ", fname
-				TRMMCEData = Dataset(fname,'r',format='NETCDF4')
-				precipRate = TRMMCEData.variables['precipitation_Accumulation'][:]
-				lats = TRMMCEData.variables['latitude'][:]
-				lons = TRMMCEData.variables['longitude'][:]
-				LONTRMM, LATTRMM = np.meshgrid(lons,lats)
-				nygrdTRMM = len(LATTRMM[:,0]) 
-				nxgrdTRMM = len(LONTRMM[0,:])
-				precipRate = ma.masked_array(precipRate, mask=(precipRate < 0.0))
-				TRMMCEData.close()
-
-				if firstTime == True:
-					firstPartName = str(thisNode['cloudElementTime']).replace(" ", "_")+'-'
-					accuPrecipRate = ma.zeros((precipRate.shape))
-					firstTime = False
-
-				accuPrecipRate += precipRate
-
-		imgFilename = MAINDIRECTORY+'/images/MCSaccu'+firstPartName+str(thisNode['cloudElementTime']).replace(" ", "_")+'.gif'
-		#create new netCDF file
-		accuTRMMFile = MAINDIRECTORY+'/TRMMnetcdfCEs/accu'+firstPartName+str(thisNode['cloudElementTime']).replace(" ", "_")+'.nc'
-		#write the file
-		accuTRMMData = Dataset(accuTRMMFile, 'w', format='NETCDF4')
-		accuTRMMData.description =  'Accumulated precipitation data'
-		accuTRMMData.calendar = 'standard'
-		accuTRMMData.conventions = 'COARDS'
-		# dimensions
-		accuTRMMData.createDimension('time', None)
-		accuTRMMData.createDimension('lat', nygrdTRMM)
-		accuTRMMData.createDimension('lon', nxgrdTRMM)
-		
-		# variables
-		TRMMprecip = ('time','lat', 'lon',)
-		times = accuTRMMData.createVariable('time', 'f8', ('time',))
-		times.units = 'hours since '+ str(thisNode['cloudElementTime']).replace(" ", "_")[:-6]
-		latitude = accuTRMMData.createVariable('latitude', 'f8', ('lat',))
-		longitude = accuTRMMData.createVariable('longitude', 'f8', ('lon',))
-		rainFallacc = accuTRMMData.createVariable('precipitation_Accumulation', 'f8',TRMMprecip)
-		rainFallacc.units = 'mm'
-
-		longitude[:] = LONTRMM[0,:]
-		longitude.units = "degrees_east" 
-		longitude.long_name = "Longitude" 
-
-		latitude[:] =  LATTRMM[:,0]
-		latitude.units = "degrees_north"
-		latitude.long_name ="Latitude"
-
-		rainFallacc[:] = accuPrecipRate[:]
+		#the nodes of the MCS with TRMM data, in time order
+		pathNodes = sorted((thisDict(eachNode) for eachNode in path if eachNode in ceStore['index']), key=lambda thisNode: thisNode['cloudElementTime'])
+		if not pathNodes:
+			continue
 
-		accuTRMMData.close()
+		#add the boxes of all the CEs to the accu at once
+		accuPrecipRate = accumulateCloudElementPrecip(ceStore, [thisNode['uniqueID'] for thisNode in pathNodes])
 
-		#generate the image with GrADS
-		#print "ny,nx ", nygrdTRMM, nxgrdTRMM, min(lats), max(lats)
-		#the ctl file
-		subprocess.call('rm acc.ctl', shell=True)
-		subprocess.call('touch acc.ctl', shell=True)
-		replaceExpDset = 'echo DSET ' + accuTRMMFile +' >> acc.ctl'
-		subprocess.call(replaceExpDset, shell=True)  
-		subprocess.call('echo "OPTIONS yrev little_endian template" >> acc.ctl', shell=True)
-		subprocess.call('echo "DTYPE netcdf" >> acc.ctl', shell=True)
-		subprocess.call('echo "UNDEF  0" >> acc.ctl', shell=True)
-		subprocess.call('echo "TITLE  TRMM MCS accumulated precipitation" >> acc.ctl', shell=True)
-		replaceExpXDef = 'echo XDEF '+ str(nxgrdTRMM) + ' LINEAR ' + str(min(lons)) +' '+ str((max(lons)-min(lons))/nxgrdTRMM) +' >> acc.ctl'
-		subprocess.call(replaceExpXDef, shell=True)
-		#subprocess.call('echo "XDEF 413 LINEAR  -9.984375 0.036378335 " >> acc.ctl', shell=True)
-		#subprocess.call('echo "YDEF 412 LINEAR 5.03515625 0.036378335 " >> acc.ctl', shell=True)
-		replaceExpYDef = 'echo YDEF '+str(nygrdTRMM)+' LINEAR '+str(min(lats))+ ' '+str((max(lats)-min(lats))/nygrdTRMM)+' >>acc.ctl'
-		subprocess.call(replaceExpYDef, shell=True)
-		subprocess.call('echo "ZDEF   01 LEVELS 1" >> acc.ctl', shell=True)
-		subprocess.call('echo "TDEF 99999 linear 31aug2009 1hr" >> acc.ctl', shell=True)
-		#subprocess.call(replaceExpTdef, shell=True)
-		subprocess.call('echo "VARS 1" >> acc.ctl', shell=True)
-		subprocess.call('echo "precipitation_Accumulation=>precipAcc	 1  t,y,x	precipAccu" >> acc.ctl', shell=True)
-		subprocess.call('echo "ENDVARS" >> acc.ctl', shell=True)
-
-		#generate GrADS script
-		subprocess.call('rm accuTRMM1.gs', shell=True)
-		subprocess.call('touch accuTRMM1.gs', shell=True)
-		subprocess.call('echo "''\'reinit''\'" >> accuTRMM1.gs', shell=True)
-		subprocess.call('echo "''\'open acc.ctl ''\'" >> accuTRMM1.gs', shell=True)
-		subprocess.call('echo "''\'set grads off''\'" >> accuTRMM1.gs', shell=True)
-		subprocess.call('echo "''\'set mpdset hires''\'" >> accuTRMM1.gs', shell=True)
-		subprocess.call('echo "''\'set gxout shaded''\'" >> accuTRMM1.gs', shell=True)
-		subprocess.call('echo "''\'set datawarn off''\'" >> accuTRMM1.gs', shell=True)
-		subprocess.call('echo "''\'d precipacc''\'" >> accuTRMM1.gs', shell=True)
-		subprocess.call('echo "''\'draw title TRMM Accumulated Precipitation [mm]''\'" >> accuTRMM1.gs', shell=True)
-		subprocess.call('echo "''\'run cbarn''\'" >> accuTRMM1.gs', shell=True)
-		subprocess.call('echo "''\'printim '+imgFilename +' x1000 y800 white''\'" >> accuTRMM1.gs', shell=True)
-		subprocess.call('echo "''\'quit''\'" >> accuTRMM1.gs', shell=True)
-		gradscmd = 'grads -blc ' + '\'run accuTRMM1.gs''\''
-		subprocess.call(gradscmd, shell=True)
-		sys.exit()
+		firstPartName = str(pathNodes[0]['cloudElementTime']).replace(" ", "_")+'-'
+		lastPartName = str(pathNodes[-1]['cloudElementTime']).replace(" ", "_")
+		imgFilename = MAINDIRECTORY+'/images/MCSaccu'+firstPartName+lastPartName+'.gif'
+		accuTRMMFile = MAINDIRECTORY+'/TRMMnetcdfCEs/accu'+firstPartName+lastPartName+'.nc'
 
-		#clean up
-		subprocess.call('rm accuTRMM1.gs', shell=True)
-		subprocess.call('rm acc.ctl', shell=True)
+		writeAccumulatedPrecip(accuTRMMFile, accuPrecipRate, ceStore['latitude'], ceStore['longitude'], lastPartName[:-6])
+		drawAccumulatedPrecip(accuPrecipRate, ceStore['latitude'], ceStore['longitude'], imgFilename)
 	
 	return	
 #******************************************************************
@@ -3247,124 +4126,219 @@ def plotAccuInTimeRange(starttime, endtime):
 
 	Output:: 
 		a netcdf file containing the accumulated precip for specified times
-		a gif (generated in Grads)
+		a gif 
+	'''
+
+	sTime = datetime.strptime(starttime.replace("_"," "),'%Y-%m-%d %H:%M:%S')
+	eTime = datetime.strptime(endtime.replace("_"," "),'%Y-%m-%d %H:%M:%S')
+
+	accuPrecipRate, lats, lons = accumulatedPrecipInTimeRange(sTime, eTime)
+
+	accuTRMMFile = MAINDIRECTORY+'/TRMMnetcdfCEs/accu'+starttime+'-'+endtime+'.nc'
+	print "accuTRMMFile ", accuTRMMFile
+	writeAccumulatedPrecip(accuTRMMFile, accuPrecipRate, lats, lons, starttime[:-6])
+
+	imgFilename = MAINDIRECTORY+'/images/accu'+starttime+'-'+endtime+'.gif'
+	drawAccumulatedPrecip(accuPrecipRate, lats, lons, imgFilename)
 
-	TODO: pass of pick up from the NETCDF file the  lat, lon and resolution for generating the ctl file
+	return	
+#******************************************************************
+def accumulateCloudElementPrecip(ceStore, CEuniqueIDs):
 	'''
+	Purpose::
+		Sums the precipitation of some CEs on the grid, from their boxes in the cloud element store
 
-	os.chdir((MAINDIRECTORY+'/TRMMnetcdfCEs/'))
-	#Just incase the X11 server is giving problems
-	subprocess.call('export DISPLAY=:0.0', shell=True)
+	Input::
+		ceStore: a dictionary returned by readCloudElementStore
+		CEuniqueIDs: a list of strings representing the uniqueIDs of the CEs
 
-	imgFilename = ''
-	firstPartName = ''
-	firstTime = True
+	Output::
+		accuPrecipRate: a 2D array (lat,lon) of the accumulated precipitation
+	'''
 
-	fileList = []
-	sTime = datetime.strptime(starttime.replace("_"," "),'%Y-%m-%d %H:%M:%S')
-	eTime = datetime.strptime(endtime.replace("_"," "),'%Y-%m-%d %H:%M:%S')
-	thisTime = sTime
-
-	while thisTime <= eTime:
-		fileList = filter(os.path.isfile, glob.glob(('TRMM'+ str(thisTime).replace(" ", "_") + '*' +'.nc')))
-		for fname in fileList:
-			TRMMCEData = Dataset(fname,'r',format='NETCDF4')
-			precipRate = TRMMCEData.variables['precipitation_Accumulation'][:]
-			lats = TRMMCEData.variables['latitude'][:]
-			lons = TRMMCEData.variables['longitude'][:]
-			LONTRMM, LATTRMM = np.meshgrid(lons,lats)
-			nygrdTRMM = len(LATTRMM[:,0]) 
-			nxgrdTRMM = len(LONTRMM[0,:])
-			precipRate = ma.masked_array(precipRate, mask=(precipRate < 0.0))
-			TRMMCEData.close()
+	nygrd = len(ceStore['latitude'])
+	nxgrd = len(ceStore['longitude'])
 
-			if firstTime == True:
-				accuPrecipRate = ma.zeros((precipRate.shape))
-				firstTime = False
+	boxes = [np.arange(firstBox, firstBox+numOfBoxes) for firstBox, numOfBoxes in (ceStore['index'][CEuniqueID] for CEuniqueID in CEuniqueIDs)]
+	boxes = np.concatenate(boxes) if boxes else np.zeros(0, dtype='i8')
 
-			accuPrecipRate += precipRate
+	flatIndices = ceStore['latIndex'][boxes].astype('i8')*nxgrd + ceStore['lonIndex'][boxes]
+	accuPrecipRate = np.bincount(flatIndices, weights=ceStore['precipitation_Accumulation'][boxes], minlength=nygrd*nxgrd)
 
-		#increment the time
-		thisTime +=timedelta(hours=TRES)
+	return accuPrecipRate.reshape(nygrd, nxgrd)
+#******************************************************************
+def createAccumulationIndex():
+	'''
+	Purpose::
+		Creates the accumulation index of the precipitation of all the CEs in the cloud element store: 
+		the cumulative precipitation on the grid up to each time that has CEs. The accumulated precipitation
+		between any two times is then the difference of two slices of the index
+
+	Input::
+		None
+
+	Output::
+		None
+		NB: writes ACCU_INDEX_FILENAME in MAINDIRECTORY
+
+	Assumptions::
+		findCloudElements has been run with the TRMM data, or findPrecipRate after it
+	'''
+
+	ceStore = readCloudElementStore()
+	nygrd = len(ceStore['latitude'])
+	nxgrd = len(ceStore['longitude'])
+
+	#the times that have CEs and the time of each box, with the boxes sorted by time
+	CEtimes = np.array([date2num(ceStore['times'][CEuniqueID], units=CE_STORE_TIME_UNITS) for CEuniqueID in ceStore['uniqueIDs']])
+	firstBoxes = np.array([ceStore['index'][CEuniqueID][0] for CEuniqueID in ceStore['uniqueIDs']], dtype='i8')
+	numOfBoxes = np.array([ceStore['index'][CEuniqueID][1] for CEuniqueID in ceStore['uniqueIDs']], dtype='i8')
+	indexTimes, CEtimeIndices = np.unique(CEtimes, return_inverse=True)
+
+	boxTimeIndices = np.repeat(CEtimeIndices, numOfBoxes)
+	boxes = np.arange(numOfBoxes.sum()) + np.repeat(firstBoxes - (np.cumsum(numOfBoxes) - numOfBoxes), numOfBoxes)
+	order = np.argsort(boxTimeIndices, kind='mergesort')
+	boxes = boxes[order]
+	flatIndices = ceStore['latIndex'][boxes].astype('i8')*nxgrd + ceStore['lonIndex'][boxes]
+	precip = ceStore['precipitation_Accumulation'][boxes]
+	timeSplits = np.searchsorted(boxTimeIndices[order], np.arange(1, len(indexTimes)))
+
+	accuIndex = Dataset(MAINDIRECTORY+'/'+ACCU_INDEX_FILENAME, 'w', format='NETCDF4')
+	accuIndex.description = 'Cumulative precipitation of the Cloud Elements up to each time'
+	accuIndex.calendar = 'standard'
+	accuIndex.conventions = 'COARDS'
+	accuIndex.createDimension('time', len(indexTimes))
+	accuIndex.createDimension('accumulation', len(indexTimes)+1)
+	accuIndex.createDimension('lat', nygrd)
+	accuIndex.createDimension('lon', nxgrd)
+	times = accuIndex.createVariable('time', 'f8', ('time',))
+	times.units = CE_STORE_TIME_UNITS
+	times[:] = indexTimes
+	accuIndex.createVariable('latitude', 'f8', ('lat',))[:] = ceStore['latitude']
+	accuIndex.createVariable('longitude', 'f8', ('lon',))[:] = ceStore['longitude']
+	#slice k is the accumulation of the CEs at times[:k]
+	cumulativePrecip = accuIndex.createVariable('precipitation_Accumulation', 'f8', ('accumulation', 'lat', 'lon'), chunksizes=(1, nygrd, nxgrd))
+	cumulativePrecip.units = 'mm'
+
+	accuPrecipRate = np.zeros(nygrd*nxgrd)
+	cumulativePrecip[0] = accuPrecipRate.reshape(nygrd, nxgrd)
+	for timeIndex, (timeFlatIndices, timePrecip) in enumerate(itertools.izip(np.split(flatIndices, timeSplits), np.split(precip, timeSplits))):
+		accuPrecipRate += np.bincount(timeFlatIndices, weights=timePrecip, minlength=nygrd*nxgrd)
+		cumulativePrecip[timeIndex+1] = accuPrecipRate.reshape(nygrd, nxgrd)
+
+	accuIndex.close()
+
+	return
+#******************************************************************
+def accumulatedPrecipInTimeRange(starttime, endtime):
+	'''
+	Purpose::
+		Finds the accumulated precipitation of all the CEs within a time range, from two slices of 
+		the accumulation index. The index is created first if it is older than the cloud element store
+
+	Input::
+		starttime, endtime: python datetimes of the first and last times to accumulate, inclusive
+
+	Output::
+		accuPrecipRate: a 2D array (lat,lon) of the accumulated precipitation
+		lats, lons: 1D arrays of the grid
+	'''
+
+	accuIndexFile = MAINDIRECTORY+'/'+ACCU_INDEX_FILENAME
+	if not os.path.exists(accuIndexFile) or os.path.getmtime(accuIndexFile) < os.path.getmtime(MAINDIRECTORY+'/'+CE_STORE_FILENAME):
+		createAccumulationIndex()
+
+	accuIndex = Dataset(accuIndexFile, 'r', format='NETCDF4')
+	indexTimes = accuIndex.variables['time'][:]
+	lats = accuIndex.variables['latitude'][:]
+	lons = accuIndex.variables['longitude'][:]
+
+	first = np.searchsorted(indexTimes, date2num(starttime, units=CE_STORE_TIME_UNITS), side='left')
+	last = np.searchsorted(indexTimes, date2num(endtime, units=CE_STORE_TIME_UNITS), side='right')
+	cumulativePrecip = accuIndex.variables['precipitation_Accumulation']
+	accuPrecipRate = cumulativePrecip[last] - cumulativePrecip[first]
+	accuIndex.close()
+
+	return accuPrecipRate, lats, lons
+#******************************************************************
+def writeAccumulatedPrecip(accuTRMMFile, accuPrecipRate, lats, lons, startHour):
+	'''
+	Purpose::
+		Writes accumulated precipitation to a netCDF file
+
+	Input::
+		accuTRMMFile: a string representing the file to write
+		accuPrecipRate: a 2D array (lat,lon) of the accumulated precipitation
+		lats, lons: 1D arrays of the grid
+		startHour: a string representing the time in the units of the time variable, format yyyy-mm-dd_hh
+
+	Output::
+		None
+	'''
 
-	#create new netCDF file
-	accuTRMMFile = MAINDIRECTORY+'/TRMMnetcdfCEs/accu'+starttime+'-'+endtime+'.nc'
-	print "accuTRMMFile ", accuTRMMFile
-	#write the file
 	accuTRMMData = Dataset(accuTRMMFile, 'w', format='NETCDF4')
 	accuTRMMData.description =  'Accumulated precipitation data'
 	accuTRMMData.calendar = 'standard'
 	accuTRMMData.conventions = 'COARDS'
 	# dimensions
 	accuTRMMData.createDimension('time', None)
-	accuTRMMData.createDimension('lat', nygrdTRMM)
-	accuTRMMData.createDimension('lon', nxgrdTRMM)
+	accuTRMMData.createDimension('lat', len(lats))
+	accuTRMMData.createDimension('lon', len(lons))
 	
 	# variables
 	TRMMprecip = ('time','lat', 'lon',)
 	times = accuTRMMData.createVariable('time', 'f8', ('time',))
-	times.units = 'hours since '+ starttime[:-6]
+	times.units = 'hours since '+ startHour
 	latitude = accuTRMMData.createVariable('latitude', 'f8', ('lat',))
 	longitude = accuTRMMData.createVariable('longitude', 'f8', ('lon',))
 	rainFallacc = accuTRMMData.createVariable('precipitation_Accumulation', 'f8',TRMMprecip)
 	rainFallacc.units = 'mm'
 
-	longitude[:] = LONTRMM[0,:]
+	longitude[:] = lons
 	longitude.units = "degrees_east" 
 	longitude.long_name = "Longitude" 
 
-	latitude[:] =  LATTRMM[:,0]
+	latitude[:] =  lats
 	latitude.units = "degrees_north"
 	latitude.long_name ="Latitude"
 
-	rainFallacc[:] = accuPrecipRate[:]
+	rainFallacc[:] = accuPrecipRate[np.newaxis,:,:]
 
 	accuTRMMData.close()
 
-	#generate the image with GrADS
-	#the ctl file
-	subprocess.call('rm acc.ctl', shell=True)
-	subprocess.call('touch acc.ctl', shell=True)
-	replaceExpDset = 'echo DSET ' + accuTRMMFile +' >> acc.ctl'
-	subprocess.call(replaceExpDset, shell=True)  
-	subprocess.call('echo "OPTIONS yrev little_endian template" >> acc.ctl', shell=True)
-	subprocess.call('echo "DTYPE netcdf" >> acc.ctl', shell=True)
-	subprocess.call('echo "UNDEF  0" >> acc.ctl', shell=True)
-	subprocess.call('echo "TITLE  TRMM MCS accumulated precipitation" >> acc.ctl', shell=True)
-	replaceExpXDef = 'echo XDEF '+ str(nxgrdTRMM) + ' LINEAR ' + str(min(lons)) +' '+ str((max(lons)-min(lons))/nxgrdTRMM) +' >> acc.ctl'
-	subprocess.call(replaceExpXDef, shell=True)
-	replaceExpYDef = 'echo YDEF '+str(nygrdTRMM)+' LINEAR '+str(min(lats))+ ' '+str((max(lats)-min(lats))/nygrdTRMM)+' >>acc.ctl'
-	subprocess.call(replaceExpYDef, shell=True)
-	#subprocess.call('echo "XDEF 384 LINEAR  -8.96875 0.036378335 " >> acc.ctl', shell=True)
-	#subprocess.call('echo "YDEF 384 LINEAR 5.03515625 0.036378335 " >> acc.ctl', shell=True)
-	subprocess.call('echo "ZDEF   01 LEVELS 1" >> acc.ctl', shell=True)
-	subprocess.call('echo "TDEF 99999 linear 31aug2009 1hr" >> acc.ctl', shell=True)
-	subprocess.call('echo "VARS 1" >> acc.ctl', shell=True)
-	subprocess.call('echo "precipitation_Accumulation=>precipAcc	 1  t,y,x	precipAccu" >> acc.ctl', shell=True)
-	subprocess.call('echo "ENDVARS" >> acc.ctl', shell=True)
-	#generate GrADS script
-	imgFilename = MAINDIRECTORY+'/images/accu'+starttime+'-'+endtime+'.gif'
-	subprocess.call('rm accuTRMM1.gs', shell=True)
-	subprocess.call('touch accuTRMM1.gs', shell=True)
-	subprocess.call('echo "''\'reinit''\'" >> accuTRMM1.gs', shell=True)
-	subprocess.call('echo "''\'open acc.ctl ''\'" >> accuTRMM1.gs', shell=True)
-	subprocess.call('echo "''\'set grads off''\'" >> accuTRMM1.gs', shell=True)
-	subprocess.call('echo "''\'set mpdset hires''\'" >> accuTRMM1.gs', shell=True)
-	subprocess.call('echo "''\'set gxout shaded''\'" >> accuTRMM1.gs', shell=True)
-	subprocess.call('echo "''\'set datawarn off''\'" >> accuTRMM1.gs', shell=True)
-	subprocess.call('echo "''\'d precipacc''\'" >> accuTRMM1.gs', shell=True)
-	subprocess.call('echo "''\'draw title TRMM Accumulated Precipitation [mm]''\'" >> accuTRMM1.gs', shell=True)
-	subprocess.call('echo "''\'run cbarn''\'" >> accuTRMM1.gs', shell=True)
-	subprocess.call('echo "''\'printim '+imgFilename +' x1000 y800 white''\'" >> accuTRMM1.gs', shell=True)
-	subprocess.call('echo "''\'quit''\'" >> accuTRMM1.gs', shell=True)
-	gradscmd = 'grads -blc ' + '\'run accuTRMM1.gs''\''
-	subprocess.call(gradscmd, shell=True)
+	return
+#******************************************************************
+def drawAccumulatedPrecip(accuPrecipRate, lats, lons, imgFilename):
+	'''
+	Purpose::
+		Draws a map of accumulated precipitation
 
-	#clean up
-	subprocess.call('rm accuTRMM1.gs', shell=True)
-	subprocess.call('rm acc.ctl', shell=True)
+	Input::
+		accuPrecipRate: a 2D array (lat,lon) of the accumulated precipitation
+		lats, lons: 1D arrays of the grid
+		imgFilename: a string representing the image file to save
 
-	return	
+	Output::
+		None
+	'''
+
+	plt.close('all')
+	fig, ax = plt.subplots(1, facecolor='white', figsize=(10,8))
+
+	#no precipitation is undefined, as in the data
+	accuPrecipRate = ma.masked_less_equal(accuPrecipRate, 0.0)
+	precipMap = ax.pcolormesh(lons, lats, accuPrecipRate, cmap=cm.jet)
+	fig.colorbar(precipMap, ax=ax)
+	ax.set_xlim(min(lons), max(lons))
+	ax.set_ylim(min(lats), max(lats))
+	ax.set_xlabel('Longitude', fontsize=12)
+	ax.set_ylabel('Latitude', fontsize=12)
+	ax.set_title('TRMM Accumulated Precipitation [mm]')
+
+	plt.savefig(imgFilename, facecolor=fig.get_facecolor(), transparent=True)
+	plt.close(fig)
+
+	return
 #******************************************************************
 def createTextFile(finalMCCList, identifier):
 	'''
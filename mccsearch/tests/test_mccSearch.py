@@ -0,0 +1,520 @@
+#
+#  Licensed to the Apache Software Foundation (ASF) under one or more
+#  contributor license agreements.  See the NOTICE file distributed with
+#  this work for additional information regarding copyright ownership.
+#  The ASF licenses this file to You under the Apache License, Version 2.0
+#  (the "License"); you may not use this file except in compliance with
+#  the License.  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from StringIO import StringIO
+
+import networkx as nx
+import numpy as np
+from netCDF4 import Dataset, date2num
+
+# mccSearch uses the rcmes storage and utils modules, whose circular
+# import only resolves when classes is imported first
+import classes
+import mccSearch
+
+
+class MCCSearchTestCase(unittest.TestCase):
+
+    gridSize = 60
+    lats = 5.0 + 0.036 * np.arange(gridSize)
+    lons = 0.036 * np.arange(gridSize)
+
+    def setUp(self):
+        self.mainDirectory = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.mainDirectory, 'textFiles'))
+        self.cwd = os.getcwd()
+        os.chdir(self.mainDirectory)
+        mccSearch.MAINDIRECTORY = self.mainDirectory
+
+        mccSearch.LON, mccSearch.LAT = np.meshgrid(self.lons, self.lats)
+
+        mccSearch.CLOUD_ELEMENT_GRAPH.clear()
+        mccSearch.CE_TABLE.update(mccSearch.createCloudElementTable())
+        # the graphs are drawn with graphviz, which isn't needed here
+        self.drawGraph = mccSearch.drawGraph
+        mccSearch.drawGraph = lambda *args: None
+
+    def tearDown(self):
+        mccSearch.drawGraph = self.drawGraph
+        os.chdir(self.cwd)
+        shutil.rmtree(self.mainDirectory)
+
+
+class TestStreamMCCSearch(MCCSearchTestCase):
+
+    def frames(self, numOfFeatureFrames, numOfEmptyFrames, shortFeatures=False):
+        startTime = datetime(2009, 9, 1)
+        for frameNum in range(numOfFeatureFrames + numOfEmptyFrames):
+            frame = np.zeros((self.gridSize, self.gridSize))
+            if frameNum < numOfFeatureFrames:
+                frame[10 + frameNum:40 + frameNum, 10:40] = 210.
+            elif shortFeatures and frameNum % 3:
+                # two frame features, too short to be MCSs
+                frame[5:25, 5:25] = 210.
+            yield startTime + timedelta(hours=frameNum), frame
+
+    def testFeatureReportedOnce(self):
+        MCCList, MCSList = mccSearch.streamMCCSearch(self.frames(4, 6))
+
+        self.assertEqual(MCSList, [['F1CE1', 'F2CE1', 'F3CE1', 'F4CE1']])
+        self.assertEqual(mccSearch.CLOUD_ELEMENT_GRAPH.number_of_nodes(), 4)
+
+    def testFlushedCloudElementsDropped(self):
+        MCCList, MCSList = mccSearch.streamMCCSearch(
+            self.frames(4, 26, shortFeatures=True))
+
+        self.assertEqual(MCSList, [['F1CE1', 'F2CE1', 'F3CE1', 'F4CE1']])
+        self.assertEqual(mccSearch.CE_TABLE['numOfCEs'], 4)
+        self.assertEqual(mccSearch.CE_TABLE['numOfPixels'], 4 * 900)
+        for node in MCSList[0]:
+            CEindex = mccSearch.cloudElementIndex(node)
+            self.assertEqual(
+                mccSearch.CE_TABLE['records']['uniqueID'][CEindex], node)
+            self.assertEqual(len(mccSearch.cloudElementLatLons(node)), 900)
+
+
+class TestFindFrameCloudElements(unittest.TestCase):
+
+    def testCloudElementStats(self):
+        mergFrame = np.zeros((8, 8))
+        mergFrame[1:3, 1:4] = [[220., 230., 240.], [210., 220., 230.]]
+        mergFrame[5, 5:7] = 200.
+        # only diagonally adjacent to the first area, so not part of it
+        mergFrame[3, 4] = 240.
+
+        frame, frameCEs = mccSearch.findFrameCloudElements(mergFrame)
+
+        self.assertEqual([CE['label'] for CE in frameCEs], [1, 2, 3])
+        self.assertEqual([CE['numOfBoxes'] for CE in frameCEs], [6, 1, 2])
+        first = frameCEs[0]
+        np.testing.assert_array_equal(first['rows'], [1, 1, 1, 2, 2, 2])
+        np.testing.assert_array_equal(first['cols'], [1, 2, 3, 1, 2, 3])
+        np.testing.assert_array_equal(first['values'], mergFrame[1:3, 1:4].ravel())
+        self.assertEqual(first['slice'], (slice(1, 3), slice(1, 4)))
+        self.assertEqual(first['cloudElementArea'], 6 * mccSearch.XRES * mccSearch.YRES)
+        self.assertEqual(first['TIR_min'], 210.)
+        self.assertEqual(first['TIR_max'], 240.)
+        self.assertAlmostEqual(first['TIR_mean'], 225.)
+        self.assertAlmostEqual(first['TIR_variance'], np.var(mergFrame[1:3, 1:4]))
+        self.assertAlmostEqual(first['convectiveFraction'], 210. / 240.)
+        np.testing.assert_array_equal(frameCEs[2]['cols'], [5, 6])
+        self.assertEqual(frameCEs[2]['center'], (5., 5.5))
+        for CE in frameCEs:
+            np.testing.assert_array_equal(frame[CE['rows'], CE['cols']], CE['label'])
+        self.assertEqual((frame > 0).sum(), 9)
+
+    def testNoCloudElements(self):
+        frame, frameCEs = mccSearch.findFrameCloudElements(np.zeros((8, 8)))
+
+        self.assertEqual(frameCEs, [])
+        self.assertFalse(frame.any())
+
+
+class TestCloudElementFrameOverlap(unittest.TestCase):
+
+    def testOverlappingPairs(self):
+        prevFrame = np.zeros((8, 8), dtype=int)
+        prevFrame[0:2, 0:2] = 1
+        prevFrame[4:6, 4:8] = 2
+        currFrame = np.zeros((8, 8), dtype=int)
+        currFrame[1:3, 0:2] = 1
+        currFrame[4:6, 6] = 2
+        # doesn't overlap anything in the previous frame
+        currFrame[7, 0:3] = 3
+
+        prevLabels, currLabels, percentageOverlap, areaOverlap = \
+            mccSearch.cloudElementFrameOverlap(prevFrame, currFrame)
+
+        np.testing.assert_array_equal(prevLabels, [1, 2])
+        np.testing.assert_array_equal(currLabels, [1, 2])
+        # relative to the smaller CE of each pair
+        np.testing.assert_array_almost_equal(percentageOverlap, [0.5, 1.0])
+        np.testing.assert_array_almost_equal(
+            areaOverlap, np.array([2, 2]) * mccSearch.XRES * mccSearch.YRES)
+
+    def testSplitCloudElement(self):
+        prevFrame = np.zeros((4, 8), dtype=int)
+        prevFrame[1:3, 0:8] = 1
+        currFrame = np.zeros((4, 8), dtype=int)
+        currFrame[1:3, 0:3] = 1
+        currFrame[1:3, 5:8] = 2
+
+        prevLabels, currLabels, percentageOverlap, areaOverlap = \
+            mccSearch.cloudElementFrameOverlap(prevFrame, currFrame)
+
+        np.testing.assert_array_equal(prevLabels, [1, 1])
+        np.testing.assert_array_equal(currLabels, [1, 2])
+        np.testing.assert_array_almost_equal(percentageOverlap, [1.0, 1.0])
+
+    def testNoOverlap(self):
+        prevFrame = np.zeros((4, 4), dtype=int)
+        prevFrame[0, 0] = 1
+
+        prevLabels, currLabels, percentageOverlap, areaOverlap = \
+            mccSearch.cloudElementFrameOverlap(prevFrame, np.zeros((4, 4), dtype=int))
+
+        self.assertEqual(len(prevLabels), 0)
+        self.assertEqual(len(areaOverlap), 0)
+
+
+class TestCloudElementStore(MCCSearchTestCase):
+
+    def testRoundTrip(self):
+        ceStore = mccSearch.createCloudElementStore()
+        mccSearch.appendCloudElement(ceStore, 'F1CE1', datetime(2009, 9, 1, 0),
+            [1, 1, 2], [3, 4, 3], [210, 220, 230])
+        mccSearch.appendCloudElement(ceStore, 'F2CE1', datetime(2009, 9, 1, 1),
+            [5, 6], [7, 7], [200, 205], precip=[1.5, 2.5])
+        ceStore.close()
+
+        ceStore = mccSearch.readCloudElementStore()
+
+        self.assertEqual(ceStore['uniqueIDs'], ['F1CE1', 'F2CE1'])
+        self.assertEqual(ceStore['times']['F2CE1'], datetime(2009, 9, 1, 1))
+        rows, cols, values = mccSearch.cloudElementBoxes(ceStore, 'F1CE1')
+        np.testing.assert_array_equal(rows, [1, 1, 2])
+        np.testing.assert_array_equal(cols, [3, 4, 3])
+        np.testing.assert_array_equal(values, [210, 220, 230])
+        # no precipitation was stored for the first CE
+        _, _, precip = mccSearch.cloudElementBoxes(ceStore, 'F1CE1', 'precipitation_Accumulation')
+        np.testing.assert_array_equal(precip, [0., 0., 0.])
+        _, _, precip = mccSearch.cloudElementBoxes(ceStore, 'F2CE1', 'precipitation_Accumulation')
+        np.testing.assert_array_equal(precip, [1.5, 2.5])
+
+        grid = mccSearch.cloudElementGrid(ceStore, 'F2CE1')
+        self.assertEqual(grid.shape, (self.gridSize, self.gridSize))
+        self.assertEqual(grid[5, 7], 200)
+        self.assertEqual(grid[6, 7], 205)
+        self.assertEqual(grid.sum(), 405)
+
+    def testMergeStores(self):
+        for fileName, CEuniqueID, hour in [('chunk1.nc', 'F1CE1', 0), ('chunk2.nc', 'F2CE1', 1)]:
+            chunkStore = mccSearch.createCloudElementStore(fileName)
+            mccSearch.appendCloudElement(chunkStore, CEuniqueID, datetime(2009, 9, 1, hour),
+                [hour, hour], [0, 1], [210 + hour, 220 + hour])
+            chunkStore.close()
+        # a chunk without any CEs
+        mccSearch.createCloudElementStore('chunk3.nc').close()
+
+        ceStore = mccSearch.createCloudElementStore()
+        mccSearch.mergeCloudElementStores(ceStore, [os.path.join(self.mainDirectory, fileName)
+            for fileName in ['chunk1.nc', 'chunk3.nc', 'chunk2.nc']])
+        ceStore.close()
+
+        ceStore = mccSearch.readCloudElementStore()
+        self.assertEqual(ceStore['uniqueIDs'], ['F1CE1', 'F2CE1'])
+        rows, cols, values = mccSearch.cloudElementBoxes(ceStore, 'F2CE1')
+        np.testing.assert_array_equal(rows, [1, 1])
+        np.testing.assert_array_equal(cols, [0, 1])
+        np.testing.assert_array_equal(values, [211, 221])
+
+
+class TestFindFrameCEPrecip(unittest.TestCase):
+
+    def testPrecipStats(self):
+        frame = np.zeros((6, 6), dtype=int)
+        frame[0:2, 0:2] = 1
+        frame[4:6, 4:6] = 2
+        frame[3, 0] = 3
+        regriddedTRMM = np.zeros((6, 6))
+        regriddedTRMM[0, 0:2] = [1.0, 3.0]
+        regriddedTRMM[1, 0] = 0.5
+        regriddedTRMM[4:6, 4:6] = 2.0
+        # rain outside of any CE
+        regriddedTRMM[3, 3] = 9.0
+
+        framePrecip = mccSearch.findFrameCEPrecip(regriddedTRMM, frame, 3)
+
+        np.testing.assert_array_almost_equal(framePrecip['precipTotal'], [4.5, 8.0, 0.0])
+        np.testing.assert_array_almost_equal(framePrecip['TRMMArea'],
+            np.array([3, 4, 0]) * mccSearch.XRES * mccSearch.YRES)
+        np.testing.assert_array_almost_equal(framePrecip['CETRMMmax'], [3.0, 2.0, 0.0])
+        # the min is of the boxes with rainfall, 0 without any
+        np.testing.assert_array_almost_equal(framePrecip['CETRMMmin'], [0.5, 2.0, 0.0])
+
+
+class TestGetRegriddedTRMM(MCCSearchTestCase):
+
+    def setUp(self):
+        MCCSearchTestCase.setUp(self)
+        self.TRMMDirectory = os.path.join(self.mainDirectory, 'trmm')
+        os.makedirs(self.TRMMDirectory)
+        self.cacheSize = mccSearch.TRMM_CACHE_SIZE
+        mccSearch.TRMM_CACHE.clear()
+
+    def tearDown(self):
+        mccSearch.TRMM_CACHE_SIZE = self.cacheSize
+        mccSearch.TRMM_CACHE.clear()
+        MCCSearchTestCase.tearDown(self)
+
+    def writeTRMMFile(self, TRMMtime, rate):
+        fileName = os.path.join(self.TRMMDirectory, '3B42.%s.7A.nc' % TRMMtime.strftime('%Y%m%d.%H'))
+        TRMMFile = Dataset(fileName, 'w', format='NETCDF4')
+        TRMMFile.createDimension('time', 1)
+        TRMMFile.createDimension('latitude', self.gridSize)
+        TRMMFile.createDimension('longitude', self.gridSize)
+        TRMMFile.createVariable('latitude', 'f4', ('latitude',))[:] = self.lats
+        TRMMFile.createVariable('longitude', 'f4', ('longitude',))[:] = self.lons
+        pcp = np.full((1, self.gridSize, self.gridSize), rate)
+        # missing data
+        pcp[0, :5, :] = -1.
+        TRMMFile.createVariable('pcp', 'f4', ('time', 'latitude', 'longitude'))[:] = pcp
+        TRMMFile.close()
+        return fileName
+
+    def testRegriddedOncePerFile(self):
+        fileName = self.writeTRMMFile(datetime(2009, 9, 1, 0), 2.0)
+
+        regriddedTRMM = mccSearch.getRegriddedTRMM(self.TRMMDirectory, datetime(2009, 9, 1, 1))
+
+        self.assertEqual(regriddedTRMM.shape, (self.gridSize, self.gridSize))
+        # away from the edges of the TRMM grid
+        np.testing.assert_array_almost_equal(regriddedTRMM[10:-1, 1:-1], 2.0)
+        np.testing.assert_array_equal(regriddedTRMM[:4, :], 0.0)
+
+        # the other frames of the 3 hourly file come from the cache
+        os.remove(fileName)
+        self.assertIs(mccSearch.getRegriddedTRMM(self.TRMMDirectory, datetime(2009, 9, 1, 2)), regriddedTRMM)
+        self.assertEqual(len(mccSearch.TRMM_CACHE), 1)
+
+    def testLeastRecentlyUsedDropped(self):
+        mccSearch.TRMM_CACHE_SIZE = 2
+        for hour in [0, 3, 6]:
+            self.writeTRMMFile(datetime(2009, 9, 1, hour), float(hour))
+
+        mccSearch.getRegriddedTRMM(self.TRMMDirectory, datetime(2009, 9, 1, 0))
+        mccSearch.getRegriddedTRMM(self.TRMMDirectory, datetime(2009, 9, 1, 3))
+        mccSearch.getRegriddedTRMM(self.TRMMDirectory, datetime(2009, 9, 1, 1))
+        mccSearch.getRegriddedTRMM(self.TRMMDirectory, datetime(2009, 9, 1, 6))
+
+        self.assertEqual([TRMMtime for _, TRMMtime in mccSearch.TRMM_CACHE],
+            [datetime(2009, 9, 1, 0), datetime(2009, 9, 1, 6)])
+
+
+class TestPruneCloudClusters(unittest.TestCase):
+
+    def setUp(self):
+        mccSearch.PRUNED_GRAPH.clear()
+        self.cloudClustersFile = StringIO()
+
+    def tearDown(self):
+        mccSearch.PRUNED_GRAPH.clear()
+
+    def testLongestPathKept(self):
+        CEGraph = nx.DiGraph()
+        CEGraph.add_weighted_edges_from([('F1CE1', 'F2CE1', 1), ('F2CE1', 'F3CE1', 1),
+            ('F3CE1', 'F4CE1', 2), ('F2CE1', 'F3CE2', 1)])
+        # too short to be a cloud cluster
+        CEGraph.add_weighted_edges_from([('F1CE2', 'F2CE2', 1)])
+
+        mccSearch.pruneCloudClusters(CEGraph, self.cloudClustersFile)
+
+        self.assertEqual(sorted(mccSearch.PRUNED_GRAPH.edges(data=True)), [
+            ('F1CE1', 'F2CE1', {'weight': 1}), ('F2CE1', 'F3CE1', {'weight': 1}),
+            ('F3CE1', 'F4CE1', {'weight': 2})])
+        self.assertIn("['F1CE1', 'F2CE1', 'F3CE1', 'F4CE1']", self.cloudClustersFile.getvalue())
+
+    def testLeastDistanceForTies(self):
+        CEGraph = nx.DiGraph()
+        CEGraph.add_weighted_edges_from([('F1CE1', 'F2CE1', 3), ('F2CE1', 'F3CE1', 3),
+            ('F1CE1', 'F2CE2', 1), ('F2CE2', 'F3CE1', 2)])
+
+        mccSearch.pruneCloudClusters(CEGraph, self.cloudClustersFile)
+
+        self.assertEqual(sorted(mccSearch.PRUNED_GRAPH.edges()),
+            [('F1CE1', 'F2CE2'), ('F2CE2', 'F3CE1')])
+        self.assertIn("Subtree pathlength is 3 ", self.cloudClustersFile.getvalue())
+
+    def testPathsJoinPrunedGraph(self):
+        CEGraph = nx.DiGraph()
+        CEGraph.add_weighted_edges_from([('F1CE1', 'F2CE1', 1), ('F2CE1', 'F3CE1', 1),
+            ('F3CE1', 'F4CE1', 1), ('F2CE2', 'F3CE2', 1), ('F3CE2', 'F4CE1', 1)])
+
+        mccSearch.pruneCloudClusters(CEGraph, self.cloudClustersFile)
+
+        # the second path stops at the node already in PRUNED_GRAPH
+        self.assertEqual(sorted(mccSearch.PRUNED_GRAPH.edges()), [('F1CE1', 'F2CE1'),
+            ('F2CE1', 'F3CE1'), ('F2CE2', 'F3CE2'), ('F3CE1', 'F4CE1'), ('F3CE2', 'F4CE1')])
+
+
+class TestSummarizeFeatures(MCCSearchTestCase):
+
+    def addNode(self, uniqueID, CEtime, area, precipTotal):
+        record = {'uniqueID': uniqueID, 'area': area, 'precipTotal': precipTotal,
+            'time': date2num(CEtime, units=mccSearch.CE_STORE_TIME_UNITS),
+            'TRMMmin': precipTotal / 2., 'TRMMmax': precipTotal}
+        CEindex = mccSearch.appendCloudElementRecord(mccSearch.CE_TABLE, record, [0], [0], [210])
+        mccSearch.CLOUD_ELEMENT_GRAPH.add_node(uniqueID, CEindex=CEindex)
+
+    def testFeatureMetrics(self):
+        startTime = datetime(2009, 9, 1)
+        for hour in range(3):
+            self.addNode('F%dCE1' % (hour + 1), startTime + timedelta(hours=hour),
+                100. * (hour + 1), float(hour + 1))
+        # two CEs at the same time
+        self.addNode('F1CE2', startTime, 50., 0.5)
+        self.addNode('F1CE3', startTime, 150., 0.)
+
+        summary = mccSearch.summarizeFeatures([['F1CE1', 'F2CE1', 'F3CE1'], ['F1CE2', 'F1CE3']])
+
+        self.assertEqual(summary['numberOfFeatures'], 2)
+        first, second = summary['features']
+        self.assertEqual(first['MCCtimes'], [startTime + timedelta(hours=hour) for hour in range(3)])
+        self.assertEqual(first['starttime'], startTime)
+        self.assertEqual(first['endtime'], startTime + timedelta(hours=2))
+        self.assertEqual(first['tdelta'], timedelta(hours=1))
+        self.assertEqual(first['duration'], timedelta(hours=3))
+        self.assertEqual(first['MCSArea'], [100., 200., 300.])
+        self.assertAlmostEqual(first['averageArea'], 200.)
+        self.assertEqual(first['maxArea'], 300.)
+        self.assertAlmostEqual(first['precipTotal'], 6.)
+        self.assertEqual(first['hourlyPrecip'], [(0, 1.), (1, 2.), (2, 3.), ('0', 6.)])
+        self.assertEqual(first['precipMaxMin'][0], ('F1CE1', 0.5, 1.))
+
+        # one time, so the duration is the temporal resolution
+        self.assertEqual(second['MCCtimes'], [startTime])
+        self.assertEqual(second['tdelta'], timedelta(hours=mccSearch.TRES))
+        self.assertEqual(second['duration'], timedelta(hours=mccSearch.TRES))
+        self.assertAlmostEqual(second['averageArea'], 100.)
+        self.assertEqual(second['maxArea'], 150.)
+        self.assertEqual(second['hourlyPrecip'], [(0, 0.5), ('0', 0.5)])
+
+        self.assertEqual(summary['longestDuration'], timedelta(hours=3))
+        self.assertEqual(summary['shortestDuration'], timedelta(hours=1))
+        self.assertEqual(summary['averageDuration'], timedelta(hours=2))
+        self.assertAlmostEqual(summary['averageFeatureSize'], 150.)
+
+    def testNoFeatures(self):
+        summary = mccSearch.summarizeFeatures([])
+
+        self.assertEqual(summary, {'numberOfFeatures': 0, 'features': []})
+
+
+class TestAccumulatedPrecip(MCCSearchTestCase):
+
+    cloudElements = [('F1CE1', 0, [1.0, 2.0]), ('F2CE1', 1, [3.0, 4.0]),
+        ('F2CE2', 1, [5.0, 6.0]), ('F4CE1', 3, [7.0, 8.0])]
+
+    def writeStore(self, scale=1.0):
+        ceStore = mccSearch.createCloudElementStore()
+        for CEuniqueID, hour, precip in self.cloudElements:
+            # all the CEs share the box at (2, 3)
+            mccSearch.appendCloudElement(ceStore, CEuniqueID, datetime(2009, 9, 1, hour),
+                [2, 3 + hour], [3, 3], [210, 210], precip=np.array(precip) * scale)
+        ceStore.close()
+
+    def testTimeRanges(self):
+        self.writeStore()
+        ceStore = mccSearch.readCloudElementStore()
+
+        for starttime, endtime, CEuniqueIDs in [
+                (datetime(2009, 9, 1, 0), datetime(2009, 9, 1, 3), ['F1CE1', 'F2CE1', 'F2CE2', 'F4CE1']),
+                (datetime(2009, 9, 1, 1), datetime(2009, 9, 1, 1), ['F2CE1', 'F2CE2']),
+                (datetime(2009, 9, 1, 1), datetime(2009, 9, 1, 2), ['F2CE1', 'F2CE2']),
+                (datetime(2009, 9, 1, 4), datetime(2009, 9, 1, 5), [])]:
+            accuPrecipRate, lats, lons = mccSearch.accumulatedPrecipInTimeRange(starttime, endtime)
+            np.testing.assert_array_almost_equal(accuPrecipRate,
+                mccSearch.accumulateCloudElementPrecip(ceStore, CEuniqueIDs))
+
+        accuPrecipRate, lats, lons = mccSearch.accumulatedPrecipInTimeRange(
+            datetime(2009, 9, 1, 0), datetime(2009, 9, 1, 1))
+        self.assertAlmostEqual(accuPrecipRate[2, 3], 1.0 + 3.0 + 5.0)
+        np.testing.assert_array_almost_equal(lats, self.lats)
+        np.testing.assert_array_almost_equal(lons, self.lons)
+
+    def testIndexRebuiltForNewerStore(self):
+        self.writeStore()
+        mccSearch.accumulatedPrecipInTimeRange(datetime(2009, 9, 1, 0), datetime(2009, 9, 1, 3))
+        accuIndexFile = os.path.join(self.mainDirectory, mccSearch.ACCU_INDEX_FILENAME)
+        indexTime = os.path.getmtime(accuIndexFile)
+
+        self.writeStore(scale=2.0)
+        os.utime(os.path.join(self.mainDirectory, mccSearch.CE_STORE_FILENAME), (indexTime + 10, indexTime + 10))
+        accuPrecipRate, _, _ = mccSearch.accumulatedPrecipInTimeRange(
+            datetime(2009, 9, 1, 0), datetime(2009, 9, 1, 0))
+
+        self.assertAlmostEqual(accuPrecipRate[2, 3], 2.0)
+
+
+class MergFilesTestCase(MCCSearchTestCase):
+
+    def setUp(self):
+        MCCSearchTestCase.setUp(self)
+        self.mergDirectory = os.path.join(self.mainDirectory, 'merg')
+        os.makedirs(self.mergDirectory)
+
+    def writeMergFile(self, hour, numOfTimes):
+        fileName = os.path.join(self.mergDirectory, 'merg_2009090100_%02d.nc' % hour)
+        mergFile = Dataset(fileName, 'w', format='NETCDF4')
+        mergFile.createDimension('time', numOfTimes)
+        mergFile.createDimension('latitude', self.gridSize)
+        mergFile.createDimension('longitude', self.gridSize)
+        times = mergFile.createVariable('time', 'f8', ('time',))
+        times.units = 'hours since 2009-09-01 00:00:00'
+        hours = hour + np.arange(numOfTimes)
+        times[:] = hours
+        mergFile.createVariable('latitude', 'f4', ('latitude',))[:] = self.lats
+        mergFile.createVariable('longitude', 'f4', ('longitude',))[:] = self.lons
+        values = np.full((numOfTimes, self.gridSize, self.gridSize), 280.)
+        # a block with a different temperature in each frame
+        values[:, 10:40, 10:40] = 200. + hours[:, np.newaxis, np.newaxis]
+        mergFile.createVariable('ch4', 'f4', ('time', 'latitude', 'longitude'))[:] = values
+        mergFile.close()
+
+
+class TestReadMergData(MergFilesTestCase):
+
+    def testFilesWithDifferentNumbersOfTimes(self):
+        self.writeMergFile(0, 1)
+        self.writeMergFile(1, 2)
+        self.writeMergFile(3, 1)
+
+        mergImgs, timelist = mccSearch.readMergData(self.mergDirectory)
+
+        self.assertEqual(mergImgs.shape, (4, self.gridSize, self.gridSize))
+        self.assertEqual(timelist, [datetime(2009, 9, 1, hour) for hour in range(4)])
+        np.testing.assert_array_equal(mergImgs[:, 20, 20], [200, 201, 202, 203])
+        np.testing.assert_array_equal(mergImgs[:, 0, 0], [0, 0, 0, 0])
+
+        # the same frames as when streaming
+        mergFrames = list(mccSearch.iterMergData(self.mergDirectory))
+        self.assertEqual([frameTime for frameTime, _ in mergFrames], timelist)
+        for frameNum, (_, mergFrame) in enumerate(mergFrames):
+            np.testing.assert_array_equal(mergFrame, mergImgs[frameNum])
+
+
+class TestFindCloudElementsParallel(MergFilesTestCase):
+
+    def testBadFilesDropped(self):
+        self.writeMergFile(0, 1)
+        self.writeMergFile(1, 2)
+        with open(os.path.join(self.mergDirectory, 'merg_2009090100_03.nc'), 'w') as badFile:
+            badFile.write('not a netCDF file')
+        self.writeMergFile(4, 1)
+
+        CEGraph = mccSearch.findCloudElementsParallel(self.mergDirectory, numProcesses=1, filesPerChunk=1)
+
+        # the file that can't be read is dropped, as by readMergData
+        self.assertEqual(sorted(CEGraph.nodes()), ['F1CE1', 'F2CE1', 'F3CE1', 'F4CE1'])
+        self.assertEqual(sorted(CEGraph.edges()), [('F1CE1', 'F2CE1'), ('F2CE1', 'F3CE1'), ('F3CE1', 'F4CE1')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,7 +17,12 @@
 
 import curses
 import sys
+import argparse
 import os
+import threading
+import time
+import ConfigParser
+from multiprocessing.pool import ThreadPool
 import numpy as np
 
 from netCDF4 import Dataset
@@ -32,6 +37,13 @@ from ocw.dataset import Bounds
 from ocw.data_source.local import load_file
 
 
+OUTPUT_PLOT = "plot"
+# Time in milliseconds between updates of the evaluation progress screen.
+PROGRESS_REFRESH_MS = 200
+# Time in seconds to wait for a cancelled evaluation to stop before giving up on it.
+CANCEL_WAIT_S = 10
+
+
 def ready_screen(page, note=""):
      ''' Generates page borders, header, footer and notification center.
 
@@ -88,6 +100,7 @@ def load_model_screen(header):
                screen.addstr(6, 2, "Enter model variable name {0}: ".format(all_netcdf_variables))
                variable_name = screen.getstr()
                model_dataset = load_file(model_path, variable_name)
+               model_dataset.name = os.path.splitext(os.path.basename(model_path))[0]
                model_datasets.append(model_dataset)
                models_info.append({ 'directory': model_path,
                                  'variable_name': variable_name
@@ -227,36 +240,53 @@ def select_obs_screen(header):   #TODO: if the observation is already selected,
           screen.addstr(5, 2, "Enter Parameter ID: ")
           parameter_id = screen.getstr()
 
-          for obs in all_obs_info:
-               if obs['dataset_id'] == dataset_id and obs['parameter_id'] == parameter_id:
-                    observations_info.append({
-                                        'database':obs['database'],
-                                        'dataset_id':dataset_id,
-                                        'parameter_id':parameter_id,
-                                        'start_date':obs['start_date'],
-                                        'end_date':obs['end_date'],
-                                        'bounding_box':obs['bounding_box'],
-                                        'timestep':obs['timestep'],
-                                        'min_lat':float(eval(obs['bounding_box'].encode())[2][0]) if obs['bounding_box'] else None,
-                                        'max_lat':float(eval(obs['bounding_box'].encode())[0][0]) if obs['bounding_box'] else None,
-                                        'min_lon':float(eval(obs['bounding_box'].encode())[2][1]) if obs['bounding_box'] else None,
-                                        'max_lon':float(eval(obs['bounding_box'].encode())[0][1]) if obs['bounding_box'] else None,
-                                        'timestep':obs['timestep'],
-                                        'timestep':obs['timestep'],
-                                        'timestep':obs['timestep'],
-                                        'lat_res':float(obs['lat_res'].encode()),
-                                        'lon_res':float(obs['lon_res'].encode())
-                                        })
-                    note = "Observation sucessfully selected."
-                    break
-               else:
-                    note = "WARNING: Observation cannot be selected. There is no observation with given info."
+          obs_info = find_observation_info(all_obs_info, dataset_id, parameter_id)
+          if obs_info is not None:
+               observations_info.append(obs_info)
+               note = "Observation sucessfully selected."
+          else:
+               note = "WARNING: Observation cannot be selected. There is no observation with given info."
      except:
           note = "WARNING: Observation cannot be selected, dataset or parameter id is wrong."
 
      return  note
 
 
+def find_observation_info(all_obs_info, dataset_id, parameter_id):
+     '''Find an observation in the RCMED parameters metadata.
+
+     :param all_obs_info: metadata of all RCMED parameters
+     :type all_obs_info: list of dictionaries
+     :param dataset_id: Dataset ID of the observation
+     :type dataset_id: string
+     :param parameter_id: Parameter ID of the observation
+     :type parameter_id: string
+
+     :returns: information of the observation or None if it cannot be found
+     :rtype: dictionary
+     '''
+
+     for obs in all_obs_info:
+          if obs['dataset_id'] == dataset_id and obs['parameter_id'] == parameter_id:
+               return {
+                         'database':obs['database'],
+                         'dataset_id':dataset_id,
+                         'parameter_id':parameter_id,
+                         'start_date':obs['start_date'],
+                         'end_date':obs['end_date'],
+                         'bounding_box':obs['bounding_box'],
+                         'timestep':obs['timestep'],
+                         'min_lat':float(eval(obs['bounding_box'].encode())[2][0]) if obs['bounding_box'] else None,
+                         'max_lat':float(eval(obs['bounding_box'].encode())[0][0]) if obs['bounding_box'] else None,
+                         'min_lon':float(eval(obs['bounding_box'].encode())[2][1]) if obs['bounding_box'] else None,
+                         'max_lon':float(eval(obs['bounding_box'].encode())[0][1]) if obs['bounding_box'] else None,
+                         'lat_res':float(obs['lat_res'].encode()),
+                         'lon_res':float(obs['lon_res'].encode())
+                         }
+
+     return None
+
+
 def unselect_obs_screen(header):
      '''Generates screen to be able to unselect observations.
      Observations can be unselected by entering index allocated to them.
@@ -334,12 +364,229 @@ def manage_obs_screen(header, note=""):
 #     Run Evaluation Screen
 ##############################################################
 
+class EvaluationCancelled(Exception):
+     '''Raised inside the evaluation worker when the user cancels the run.'''
+
+
+class EvaluationWorker(threading.Thread):
+     '''Runs the evaluation in the background so the screen stays responsive.
+
+     Every model is evaluated against every distinct observation. Each
+     observation is retrieved from RCMED once, all datasets are regridded
+     onto one shared grid in parallel and one Evaluation is run per model
+     with all the observations as targets, so the bias is model - obs.
+
+     Each stage reports its progress in percent in `progress`. The number of
+     downloaded bytes is reported in `bytes_read` and `bytes_total`. Results
+     of completed stages are kept in `results` so they remain available if
+     the run is cancelled or fails part way through.
+     '''
+
+     STAGES = [('retrieve', "Retrieving data"),
+               ('temporal', "Temporally regridding"),
+               ('spatial', "Spatially regridding"),
+               ('metrics', "Setting up metrics"),
+               ('evaluate', "Running evaluation"),
+               ('plot', "Generating plots")]
+
+     def __init__(self, model_datasets, observations_info, bounds,
+                  temp_grid_setting, spatial_grid_setting, working_directory,
+                  plot_title, processes=None):
+          '''Default EvaluationWorker constructor.
+
+          :param model_datasets: list of model dataset objects
+          :type model_datasets: list
+          :param observations_info: list of dictionaries that contain information for each observation
+          :type observations_info: list
+          :param bounds: evaluation boundaries
+          :type bounds: ocw.dataset.Bounds
+          :param temp_grid_setting: temporal grid option such as hourly, daily, monthly and annually
+          :type temp_grid_setting: string
+          :param spatial_grid_setting: spatial resolution of the new grid
+          :type spatial_grid_setting: float
+          :param working_directory: path to a directory for storring outputs
+          :type working_directory: string
+          :param plot_title: Title for plot
+          :type plot_title: string
+          :param processes: number of threads used for spatial regridding, defaults to the number of CPUs
+          :type processes: integer
+          '''
+
+          threading.Thread.__init__(self)
+          self.daemon = True
+          self.model_datasets = model_datasets
+          self.observations_info = observations_info
+          self.bounds = bounds
+          self.temp_grid_setting = temp_grid_setting
+          self.spatial_grid_setting = spatial_grid_setting
+          self.working_directory = working_directory
+          self.plot_title = plot_title
+          self.processes = processes
+
+          self.progress = dict((stage, 0) for stage, _ in self.STAGES)
+          self.bytes_read = 0
+          self.bytes_total = None
+          self.results = {'plots': [], 'evaluations': []}
+          self.error = None
+          self.cancelled = False
+          self._cancel_event = threading.Event()
+
+     def cancel(self):
+          '''Ask the worker to stop at the next checkpoint.'''
+
+          self._cancel_event.set()
+
+     def stop(self, timeout=None):
+          '''Cancel the worker and wait for it to stop.
+
+          :param timeout: seconds to wait for the worker, forever by default
+          :type timeout: float
+
+          :returns: results of the stages that completed before it stopped
+          :rtype: dictionary
+          '''
+
+          self.cancel()
+          if self.is_alive():
+               self.join(timeout)
+          return self.results
+
+     def _check_cancelled(self):
+          if self._cancel_event.is_set():
+               raise EvaluationCancelled()
+
+     def _set_progress(self, stage, done, total=1):
+          self._check_cancelled()
+          self.progress[stage] = int(100. * done / total)
+
+     def run(self):
+          try:
+               self._run_stages()
+          except EvaluationCancelled:
+               self.cancelled = True
+          except Exception as error:
+               self.error = error
+
+     def _run_stages(self):
+          obs_datasets = self._retrieve_observations()
+
+          if self.temp_grid_setting.lower() == 'hourly':
+               days = 0.5
+          elif self.temp_grid_setting.lower() == 'daily':
+               days = 1
+          elif self.temp_grid_setting.lower() == 'monthly':
+               days = 31
+          else:
+               days = 365
+          datasets = obs_datasets + [dsp.subset(self.bounds, model) for model in self.model_datasets]
+          for i, dataset in enumerate(datasets):
+               datasets[i] = dsp.temporal_rebin(dataset, timedelta(days))
+               self._set_progress('temporal', i + 1, len(datasets))
+
+          datasets = self._spatial_regrid(datasets)
+          obs_datasets = datasets[:len(obs_datasets)]
+          model_datasets = datasets[len(obs_datasets):]
+          self.results['obs_datasets'] = obs_datasets
+          self.results['model_datasets'] = model_datasets
+
+          evaluations = []
+          for model_dataset in model_datasets:
+               evaluations.append(evaluation.Evaluation(model_dataset, obs_datasets, [metrics.Bias()]))
+          self._set_progress('metrics', 1)
+
+          for i, bias_evaluation in enumerate(evaluations):
+               bias_evaluation.run()
+               self.results['evaluations'].append(bias_evaluation)
+               self._set_progress('evaluate', i + 1, len(evaluations))
+
+          self._plot(evaluations)
+
+     def _retrieve_observations(self):
+          '''Retrieve every distinct observation from RCMED once.'''
+
+          min_lat, max_lat = self.bounds.lat_min, self.bounds.lat_max
+          min_lon, max_lon = self.bounds.lon_min, self.bounds.lon_max
+          retrieved = {}
+          obs_datasets = []
+          for i, obs_info in enumerate(self.observations_info):
+               key = (obs_info['dataset_id'], obs_info['parameter_id'])
+               if key in retrieved:
+                    self._set_progress('retrieve', i + 1, len(self.observations_info))
+                    continue
+
+               def download_progress(bytes_read, bytes_total):
+                    self.bytes_read = bytes_read
+                    self.bytes_total = bytes_total
+                    fraction = float(bytes_read) / bytes_total if bytes_total else 0
+                    self._set_progress('retrieve', i + fraction, len(self.observations_info))
+
+               obs_dataset = rcmed.parameter_dataset(
+                                   int(obs_info['dataset_id']),
+                                   int(obs_info['parameter_id']),
+                                   min_lat,
+                                   max_lat,
+                                   min_lon,
+                                   max_lon,
+                                   self.bounds.start,
+                                   self.bounds.end,
+                                   progress_callback=download_progress)
+               obs_dataset.name = obs_info.get('name', obs_info['database'])
+               retrieved[key] = obs_dataset
+               obs_datasets.append(obs_dataset)
+               self._set_progress('retrieve', i + 1, len(self.observations_info))
+
+          return obs_datasets
+
+     def _spatial_regrid(self, datasets):
+          '''Regrid all datasets onto the shared grid in parallel.'''
+
+          new_lats = np.arange(self.bounds.lat_min, self.bounds.lat_max, self.spatial_grid_setting)
+          new_lons = np.arange(self.bounds.lon_min, self.bounds.lon_max, self.spatial_grid_setting)
+          self.results['lats'] = new_lats
+          self.results['lons'] = new_lons
+
+          pool = ThreadPool(self.processes)
+          try:
+               regridded = []
+               for dataset in pool.imap(lambda ds: dsp.spatial_regrid(ds, new_lats, new_lons), datasets):
+                    regridded.append(dataset)
+                    self._set_progress('spatial', len(regridded), len(datasets))
+          finally:
+               pool.terminate()
+
+          return regridded
+
+     def _plot(self, evaluations):
+          gridshape = (1, 1)
+          sub_titles = [""]   #No subtitle set for now
+
+          if not os.path.exists(self.working_directory):
+               os.makedirs(self.working_directory)
+
+          plots = [(bias_evaluation, target_index)
+                   for bias_evaluation in evaluations
+                   for target_index in range(len(bias_evaluation.target_datasets))]
+          for i, (bias_evaluation, target_index) in enumerate(plots):
+               results = bias_evaluation.results[target_index][0]
+               prefix = "{0}_{1}_".format(bias_evaluation.target_datasets[target_index].name,
+                                          bias_evaluation.ref_dataset.name)
+               for j in range(len(results)):
+                    fname = self.working_directory + prefix + OUTPUT_PLOT + str(j)
+                    plotter.draw_contour_map(results[j], self.results['lats'], self.results['lons'], fname,
+                                    gridshape=gridshape, ptitle=self.plot_title,
+                                    subtitles=sub_titles)
+                    self.results['plots'].append(fname)
+                    self._set_progress('plot', i + float(j + 1) / len(results), len(plots))
+
+
 def run_screen(model_datasets, models_info, observations_info,
                overlap_start_time, overlap_end_time, overlap_min_lat,
                overlap_max_lat, overlap_min_lon, overlap_max_lon,
                temp_grid_setting, spatial_grid_setting, working_directory, plot_title):
      '''Generates screen to show running evaluation process.
 
+     All loaded models are evaluated against all selected observations.
+
      :param model_datasets: list of model dataset objects
      :type model_datasets: list
      :param models_info: list of dictionaries that contain information for each model
@@ -366,108 +613,288 @@ def run_screen(model_datasets, models_info, observations_info,
      :type working_directory: string
      :param plot_title: Title for plot
      :type plot_title: string
+
+     :returns: Notification and the results of the evaluation
+     :rtype: tuple of a string and a dictionary
      '''
 
-     option = None
-     if option != "0":
-          ready_screen("manage_obs_screen")
-          y = screen.getmaxyx()[0]
-          screen.addstr(2, 2, "Evaluation started....")
-          screen.refresh()
+     new_bounds = Bounds(overlap_min_lat, overlap_max_lat, overlap_min_lon, overlap_max_lon, overlap_start_time, overlap_end_time)
+     worker = EvaluationWorker(model_datasets, observations_info, new_bounds,
+                               temp_grid_setting, spatial_grid_setting,
+                               working_directory, plot_title)
+     return progress_screen(worker)
 
-          OUTPUT_PLOT = "plot"
 
-          dataset_id = int(observations_info[0]['dataset_id'])       #just accepts one dataset at this time
-          parameter_id = int(observations_info[0]['parameter_id'])  #just accepts one dataset at this time
+def progress_screen(worker):
+     '''Generates screen to show the progress of an evaluation worker.
 
-          new_bounds = Bounds(overlap_min_lat, overlap_max_lat, overlap_min_lon, overlap_max_lon, overlap_start_time, overlap_end_time)
-          model_dataset = dsp.subset(new_bounds, model_datasets[0])   #just accepts one model at this time
+     The worker is started and the progress of each stage is shown until it
+     finishes. Pressing 'c' cancels the run and waits up to CANCEL_WAIT_S
+     seconds for the worker to stop, keeping the results of the stages that
+     have already completed. A worker stuck in a stage is left to finish in
+     the background.
 
-          #Getting bound info of subseted model file to retrive obs data with same bound as subseted model
-          new_model_spatial_bounds = model_dataset.spatial_boundaries()
-          new_model_temp_bounds = model_dataset.time_range()
-          new_min_lat = new_model_spatial_bounds[0]
-          new_max_lat = new_model_spatial_bounds[1]
-          new_min_lon = new_model_spatial_bounds[2]
-          new_max_lon = new_model_spatial_bounds[3]
-          new_start_time = new_model_temp_bounds[0]
-          new_end_time = new_model_temp_bounds[1]
+     :param worker: evaluation worker that hasn't been started yet
+     :type worker: EvaluationWorker
 
-          screen.addstr(4, 4, "Retrieving data...")
-          screen.refresh()
+     :returns: Notification and the results of the worker
+     :rtype: tuple of a string and a dictionary
+     '''
 
-          #Retrieve obs data
-          obs_dataset = rcmed.parameter_dataset(
-                                        dataset_id,
-                                        parameter_id,
-                                        new_min_lat,
-                                        new_max_lat,
-                                        new_min_lon,
-                                        new_max_lon,
-                                        new_start_time,
-                                        new_end_time)
-          screen.addstr(4, 4, "--> Data retrieved.")
-          screen.refresh()
+     ready_screen("run_screen")
+     y = screen.getmaxyx()[0]
+     screen.addstr(2, 2, "Evaluation started.... (press 'c' to cancel)")
+     screen.refresh()
+     worker.start()
 
-          screen.addstr(5, 4, "Temporally regridding...")
-          screen.refresh()
-          if temp_grid_setting.lower() == 'hourly':
-               days = 0.5
-          elif temp_grid_setting.lower() == 'daily':
-               days = 1
-          elif temp_grid_setting.lower() == 'monthly':
-               days = 31
-          else:
-               days = 365
-          model_dataset = dsp.temporal_rebin(model_dataset, timedelta(days))
-          obs_dataset = dsp.temporal_rebin(obs_dataset, timedelta(days))
-          screen.addstr(5, 4, "--> Temporally regridded.")
-          screen.refresh()
+     # Poll the keyboard instead of blocking on it so the progress keeps updating.
+     screen.timeout(PROGRESS_REFRESH_MS)
+     curses.noecho()
+     deadline = None
+     try:
+          while worker.is_alive() and (deadline is None or time.time() < deadline):
+               draw_progress(worker)
+               if screen.getch() in (ord('c'), ord('C')) and deadline is None:
+                    screen.addstr(2, 2, "Cancelling, waiting for the current stage to stop....")
+                    screen.clrtoeol()
+                    screen.refresh()
+                    worker.cancel()
+                    deadline = time.time() + CANCEL_WAIT_S
+     finally:
+          screen.timeout(-1)
+          curses.echo()
+     draw_progress(worker)
+
+     note = worker_status(worker)
+     screen.addstr(y-2, 1, note)
+     screen.addstr(y-5, 1, "Press 'enter' to Exit: ")
+     screen.getstr()
 
-          new_lats = np.arange(new_min_lat, new_max_lat, spatial_grid_setting)
-          new_lons = np.arange(new_min_lon, new_max_lon, spatial_grid_setting)
+     return note, worker.results
 
-          screen.addstr(6, 4, "Spatially regridding...")
-          screen.refresh()
-          spatial_gridded_model = dsp.spatial_regrid(model_dataset, new_lats, new_lons)
-          spatial_gridded_obs = dsp.spatial_regrid(obs_dataset, new_lats, new_lons)
-          screen.addstr(6, 4, "--> Spatially regridded.")
-          screen.refresh()
 
-          screen.addstr(7, 4, "Setting up metrics...")
-          screen.refresh()
-          bias = metrics.Bias()
-          bias_evaluation = evaluation.Evaluation(spatial_gridded_model, [spatial_gridded_obs], [bias])
-          screen.addstr(7, 4, "--> Metrics setting done.")
-          screen.refresh()
+def progress_lines(worker):
+     '''Format the progress of each evaluation stage.
 
-          screen.addstr(8, 4, "Running evaluation.....")
-          screen.refresh()
-          bias_evaluation.run()
-          results = bias_evaluation.results[0][0]
-          screen.addstr(8, 4, "--> Evaluation Finished.")
-          screen.refresh()
+     :param worker: running or finished evaluation worker
+     :type worker: EvaluationWorker
 
-          screen.addstr(9, 4, "Generating plots....")
-          screen.refresh()
-          lats = new_lats
-          lons = new_lons
+     :returns: one line of text per stage
+     :rtype: list of strings
+     '''
 
-          gridshape = (1, 1)
-          sub_titles = [""]   #No subtitle set for now
+     lines = []
+     for stage, label in worker.STAGES:
+          percent = worker.progress[stage]
+          line = "{0:<25} [{1:<20}] {2:>3}%".format(label, "#" * (percent / 5), percent)
+          if stage == 'retrieve' and worker.bytes_read:
+               if worker.bytes_total:
+                    line += "  {0}/{1} KB".format(worker.bytes_read / 1024, worker.bytes_total / 1024)
+               else:
+                    line += "  {0} KB".format(worker.bytes_read / 1024)
+          lines.append(line)
 
-          if not os.path.exists(working_directory):
-               os.makedirs(working_directory)
+     return lines
+
+
+def draw_progress(worker):
+     '''Draw the progress of each evaluation stage.
+
+     :param worker: running or finished evaluation worker
+     :type worker: EvaluationWorker
+     '''
+
+     for i, line in enumerate(progress_lines(worker)):
+          screen.addstr(4 + i, 4, line)
+          screen.clrtoeol()
+     screen.refresh()
 
-          for i in range(len(results)):
-               fname = working_directory + OUTPUT_PLOT + str(i)
-               plotter.draw_contour_map(results[i], lats, lons, fname,
-                               gridshape=gridshape, ptitle=plot_title,
-                               subtitles=sub_titles)
-          screen.addstr(9, 4, "--> Plots generated.")
-          screen.refresh()
-          screen.addstr(y-2, 1, "Press 'enter' to Exit: ")
-          option = screen.getstr()
+
+def worker_status(worker):
+     '''Describe how an evaluation worker ended.
+
+     :param worker: evaluation worker that has finished or was cancelled
+     :type worker: EvaluationWorker
+
+     :returns: Notification
+     :rtype: string
+     '''
+
+     if worker.is_alive() or worker.cancelled:
+          return "Evaluation cancelled. {0} plot(s) kept in {1}".format(len(worker.results['plots']), worker.working_directory)
+     elif worker.error is not None:
+          return "WARNING: Evaluation failed: {0}".format(worker.error)
+     else:
+          return "Evaluation finished. {0} plot(s) saved in {1}".format(len(worker.results['plots']), worker.working_directory)
+
+
+##############################################################
+#     Config File
+##############################################################
+
+def load_config_file(config_path):
+     '''Create an evaluation worker from a config file.
+
+     The config file lists every model and observation of a batch run and
+     the evaluation settings. All settings but workDir and temporalGrid are
+     optional; boundaries default to the overlap of all datasets and the
+     spatial grid defaults to the resolution of the first observation.
+
+     .. sourcecode:: ini
+
+          [SETTINGS]
+          workDir = /tmp/ocw/plots/
+          ; hourly, daily, monthly or annually
+          temporalGrid = monthly
+          spatialGrid = 0.5
+          startTime = 1990-01-01
+          endTime = 2000-12-31
+          latMin = -40
+          latMax = 40
+          lonMin = -20
+          lonMax = 60
+          plotTitle = Bias
+          processes = 4
+
+          [MODEL knmi]
+          path = /data/AFRICA_KNMI-RACMO2.2b_CTL_ERAINT_MM_50km_1989-2008_tasmax.nc
+          variable = tasmax
+
+          [OBSERVATION cru]
+          datasetId = 10
+          parameterId = 37
+
+     :param config_path: path to the config file
+     :type config_path: string
+
+     :returns: evaluation worker that hasn't been started yet
+     :rtype: EvaluationWorker
+
+     :raises ValueError: If the config file is invalid or the datasets don't overlap.
+     '''
+
+     config = ConfigParser.SafeConfigParser()
+     if not config.read(config_path):
+          raise ValueError("Config file {0} cannot be read.".format(config_path))
+
+     try:
+          loaded_models = []
+          selected_observations = []
+          all_obs_info = None
+          for section in config.sections():
+               if section.startswith('MODEL '):
+                    model_dataset = load_file(config.get(section, 'path'), config.get(section, 'variable'))
+                    model_dataset.name = section[len('MODEL '):].strip()
+                    loaded_models.append(model_dataset)
+               elif section.startswith('OBSERVATION '):
+                    if all_obs_info is None:
+                         all_obs_info = rcmed.get_parameters_metadata()
+                    obs_info = find_observation_info(all_obs_info,
+                                                     config.get(section, 'datasetId'),
+                                                     config.get(section, 'parameterId'))
+                    if obs_info is None:
+                         raise ValueError("There is no observation with given info in [{0}].".format(section))
+                    obs_info['name'] = section[len('OBSERVATION '):].strip()
+                    selected_observations.append(obs_info)
+
+          if not loaded_models or not selected_observations:
+               raise ValueError("At least one model and one observation are required.")
+
+          def get_setting(option, convert, default):
+               if config.has_option('SETTINGS', option):
+                    return convert(config.get('SETTINGS', option))
+               return default
+
+          def parse_time(value):
+               return datetime.strptime(value, '%Y-%m-%d')
+
+          overlap_start_time = max([model.time_range()[0] for model in loaded_models] +
+                                   [parse_time(obs['start_date']) for obs in selected_observations])
+          overlap_end_time = min([model.time_range()[1] for model in loaded_models] +
+                                 [parse_time(obs['end_date']) for obs in selected_observations])
+          datasets_bound = ([model.spatial_boundaries() for model in loaded_models] +
+                            [[obs['min_lat'], obs['max_lat'], obs['min_lon'], obs['max_lon']] for obs in selected_observations])
+
+          bounds = Bounds(get_setting('latMin', float, max(each[0] for each in datasets_bound)),
+                          get_setting('latMax', float, min(each[1] for each in datasets_bound)),
+                          get_setting('lonMin', float, max(each[2] for each in datasets_bound)),
+                          get_setting('lonMax', float, min(each[3] for each in datasets_bound)),
+                          get_setting('startTime', parse_time, overlap_start_time),
+                          get_setting('endTime', parse_time, overlap_end_time))
+          if bounds.end <= bounds.start or bounds.lat_max <= bounds.lat_min or bounds.lon_max <= bounds.lon_min:
+               raise ValueError("One or more dataset does not overlap with others.")
+
+          working_directory = config.get('SETTINGS', 'workDir')
+          if working_directory[-1] != '/':
+               working_directory = working_directory + "/"
+
+          return EvaluationWorker(loaded_models,
+                                  selected_observations,
+                                  bounds,
+                                  config.get('SETTINGS', 'temporalGrid'),
+                                  get_setting('spatialGrid', float, selected_observations[0]['lat_res']),
+                                  working_directory,
+                                  get_setting('plotTitle', str, ''),
+                                  processes=get_setting('processes', int, None))
+     except ConfigParser.Error as error:
+          raise ValueError("Config file {0} is invalid: {1}".format(config_path, error))
+
+
+def config_file_screen(header):
+     '''Generates screen to run an evaluation from a config file.
+
+     :param header: Header of page
+     :type header: string
+
+     :returns: Notification and the results of the evaluation, None if it
+          couldn't be started
+     :rtype: tuple of a string and a dictionary
+     '''
+
+     ready_screen("config_file_screen")
+     screen.addstr(1, 1, header)
+     screen.addstr(4, 2, "Enter config file path: ")
+     config_path = screen.getstr()
+     screen.addstr(6, 2, "Loading datasets....")
+     screen.refresh()
+     try:
+          worker = load_config_file(config_path)
+     except Exception as error:
+          return "WARNING: {0}".format(error), None
+
+     return progress_screen(worker)
+
+
+def run_config_file(config_path):
+     '''Run an evaluation from a config file without the curses interface.
+
+     Progress is printed to stdout. Interrupting (Ctrl-C) cancels the run and
+     waits up to CANCEL_WAIT_S seconds for it to stop, keeping the results of
+     the stages that have already completed.
+
+     :param config_path: path to the config file
+     :type config_path: string
+
+     :returns: exit status, 0 if the evaluation finished
+     :rtype: integer
+     '''
+
+     worker = load_config_file(config_path)
+     worker.start()
+     last_lines = None
+     try:
+          while worker.is_alive():
+               worker.join(PROGRESS_REFRESH_MS / 1000.)
+               lines = progress_lines(worker)
+               if lines != last_lines:
+                    print "\n".join(lines) + "\n"
+                    last_lines = lines
+     except KeyboardInterrupt:
+          print "Cancelling, waiting for the current stage to stop...."
+          worker.stop(CANCEL_WAIT_S)
+
+     print worker_status(worker)
+     return 0 if not (worker.is_alive() or worker.cancelled or worker.error) else 1
 
 
 ##############################################################
@@ -589,6 +1016,20 @@ def get_spatial_overlap(models_bound, observations_bound):
      return overlap_min_lat, overlap_max_lat, overlap_min_lon, overlap_max_lon
 
 
+def get_coarsest_temporal_resolution(resolutions):
+     '''Get the coarsest of some temporal resolutions.
+
+     :param resolutions: temporal resolutions such as hourly, daily and monthly
+     :type resolutions: list of strings
+
+     :returns: the coarsest temporal resolution, unknown ones count as annual
+     :rtype: string
+     '''
+
+     order = ['minutely', 'hourly', 'daily', 'monthly']
+     return max(resolutions, key=lambda res: order.index(res.lower()) if res.lower() in order else len(order))
+
+
 def settings_screen(header):
      '''Generates screen for settings before running evaluation.
 
@@ -603,12 +1044,23 @@ def settings_screen(header):
      models_bound = get_model_spatial_bound()
      observations_bound = get_obs_spatial_bound()
      overlap_min_lat, overlap_max_lat, overlap_min_lon, overlap_max_lon = get_spatial_overlap(models_bound, observations_bound)
-     model_temp_res = model_datasets[0].temporal_resolution()       #just accepts one model at this time
-     obs_temp_res = observations_info[0]['timestep']        #just accepts one obs at this time
-     model_lat_res = model_datasets[0].spatial_resolution()[0] #just accepts one model at this time
-     model_lon_res = model_datasets[0].spatial_resolution()[1]  #just accepts one model at this time
-     obs_lat_res = observations_info[0]['lat_res']     #just accepts one obs at this time
-     obs_lon_res = observations_info[0]['lon_res']    #just accepts one obs at this time
+     #All datasets are regridded to one grid, so gridding to the models or
+     # observations uses the coarsest resolution among them.
+     models_temp_res = [model.temporal_resolution() for model in model_datasets]
+     models_spatial_res = [model.spatial_resolution() for model in model_datasets]
+     model_temp_res = get_coarsest_temporal_resolution(models_temp_res)
+     obs_temp_res = get_coarsest_temporal_resolution([obs['timestep'] for obs in observations_info])
+     model_lat_res = max(lat_res for lat_res, lon_res in models_spatial_res)
+     model_lon_res = max(lon_res for lat_res, lon_res in models_spatial_res)
+     obs_lat_res = max(obs['lat_res'] for obs in observations_info)
+     obs_lon_res = max(obs['lon_res'] for obs in observations_info)
+     datasets_res = (["Model {0}: [temporal={1} lat={2} lon={3}]".format(model.name, temp_res, lat_res, lon_res)
+                      for model, temp_res, (lat_res, lon_res) in zip(model_datasets, models_temp_res, models_spatial_res)] +
+                     ["Observation {0}-{1} ({2}): [temporal={3} lat={4} lon={5}]".format(obs['dataset_id'], obs['parameter_id'],
+                                                                                      obs['database'], obs['timestep'], obs['lat_res'], obs['lon_res'])
+                      for obs in observations_info])
+     #Rows below the list of datasets move down by its length
+     extra = len(datasets_res)
 
      temp_grid_option = "Observation"
      temp_grid_setting = obs_temp_res
@@ -636,29 +1088,31 @@ def settings_screen(header):
           screen.addstr(7, 4, "Spatial Boundaries:     [min-lat={0}  max-lat={1} min-lon={2} max-lon={3}]".format(overlap_min_lat, overlap_max_lat, overlap_min_lon, overlap_max_lon))
           screen.addstr(8, 4, "Temporal Resolution:    [Model={0} - Observation={1}]".format(model_temp_res, obs_temp_res))
           screen.addstr(9, 4, "Spatial Resolution:     [Model: lat={0} lon={1} - Observation: lat={2} lon={3}]".format(model_lat_res, model_lon_res, obs_lat_res, obs_lon_res))
-          screen.addstr(10, 4, "Temporal Grid Option:   [{0}]".format(temp_grid_option))
-          screen.addstr(11, 4, "Spatial Grid Option:    [{0}]".format(spatial_grid_option))
-          screen.addstr(12, 4, "Working Directory:      {0}".format(working_directory))
-          screen.addstr(13, 4, "Metrics:                {0}".format(metrics))
-
-          screen.addstr(15, 5, "1 - Change Temporal Boundaries")
-          screen.addstr(16, 5, "2 - Change Spatial Boundaries")
-          screen.addstr(17, 5, "3 - Change Temporal Gridding")
-          screen.addstr(18, 5, "4 - Change Spatial Gridding")
-          screen.addstr(19, 5, "5 - Add Subregion file (txt file) [Coming Soon....]")
-          screen.addstr(20, 5, "6 - Modify Metric (add/remove) [Coming Soon....]")
-          screen.addstr(21, 5, "7 - Change Working Directory")
-          screen.addstr(22, 5, "8 - Change Plot Title [Coming Soon....]")
-          screen.addstr(23, 5, "0 - Return to Main Menu")
-          screen.addstr(26, 5, "r - Run Evaluation")
-          screen.addstr(28, 2, "Select an option: ")
+          for i, dataset_res in enumerate(datasets_res):
+               screen.addstr(10 + i, 6, dataset_res)
+          screen.addstr(10 + extra, 4, "Temporal Grid Option:   [{0}]".format(temp_grid_option))
+          screen.addstr(11 + extra, 4, "Spatial Grid Option:    [{0}]".format(spatial_grid_option))
+          screen.addstr(12 + extra, 4, "Working Directory:      {0}".format(working_directory))
+          screen.addstr(13 + extra, 4, "Metrics:                {0}".format(metrics))
+
+          screen.addstr(15 + extra, 5, "1 - Change Temporal Boundaries")
+          screen.addstr(16 + extra, 5, "2 - Change Spatial Boundaries")
+          screen.addstr(17 + extra, 5, "3 - Change Temporal Gridding")
+          screen.addstr(18 + extra, 5, "4 - Change Spatial Gridding")
+          screen.addstr(19 + extra, 5, "5 - Add Subregion file (txt file) [Coming Soon....]")
+          screen.addstr(20 + extra, 5, "6 - Modify Metric (add/remove) [Coming Soon....]")
+          screen.addstr(21 + extra, 5, "7 - Change Working Directory")
+          screen.addstr(22 + extra, 5, "8 - Change Plot Title [Coming Soon....]")
+          screen.addstr(23 + extra, 5, "0 - Return to Main Menu")
+          screen.addstr(26 + extra, 5, "r - Run Evaluation")
+          screen.addstr(28 + extra, 2, "Select an option: ")
 
           screen.refresh()
           option = screen.getstr()
           ### TODO: It breaks when you want to pick start time after end time and same issue with lat, lon.
 
           if option == '1':
-               screen.addstr(33, 4, "Enter Start Time [min time: {0}] (Format YYYY-MM-DD):".format(fix_min_time))
+               screen.addstr(33 + extra, 4, "Enter Start Time [min time: {0}] (Format YYYY-MM-DD):".format(fix_min_time))
                new_start_time = screen.getstr()
                try:
                     new_start_time = datetime.strptime(new_start_time, '%Y-%m-%d')
@@ -669,7 +1123,7 @@ def settings_screen(header):
                          note = "Start time has changed successfully."
                except:
                     note = "Start time has not changed."
-               screen.addstr(34, 4, "Enter End Time [max time:{0}] (Format YYYY-MM-DD):".format(fix_max_time))
+               screen.addstr(34 + extra, 4, "Enter End Time [max time:{0}] (Format YYYY-MM-DD):".format(fix_max_time))
                new_max_time = screen.getstr()
                try:
                     new_max_time = datetime.strptime(new_max_time, '%Y-%m-%d')
@@ -682,7 +1136,7 @@ def settings_screen(header):
                     note = note + " End time has not changed."
 
           if option == '2':
-               screen.addstr(33, 4, "Enter Minimum Latitude [{0}]:".format(fix_min_lat))
+               screen.addstr(33 + extra, 4, "Enter Minimum Latitude [{0}]:".format(fix_min_lat))
                new_min_lat = screen.getstr()
                try:
                     new_min_lat = float(new_min_lat)
@@ -693,7 +1147,7 @@ def settings_screen(header):
                          note = "Minimum latitude has changed successfully."
                except:
                     note = "Minimum latitude has not changed."
-               screen.addstr(34, 4, "Enter Maximum Latitude [{0}]:".format(fix_max_lat))
+               screen.addstr(34 + extra, 4, "Enter Maximum Latitude [{0}]:".format(fix_max_lat))
                new_max_lat = screen.getstr()
                try:
                     new_max_lat = float(new_max_lat)
@@ -704,7 +1158,7 @@ def settings_screen(header):
                          note = note + "Maximum latitude has changed successfully."
                except:
                     note = note + " Maximum latitude has not changed."
-               screen.addstr(35, 4, "Enter Minimum Longitude [{0}]:".format(fix_min_lon))
+               screen.addstr(35 + extra, 4, "Enter Minimum Longitude [{0}]:".format(fix_min_lon))
                new_min_lon = screen.getstr()
                try:
                     new_min_lon = float(new_min_lon)
@@ -715,7 +1169,7 @@ def settings_screen(header):
                          note = note + "Minimum longitude has changed successfully."
                except:
                     note = note + " Minimum longitude has not changed."
-               screen.addstr(36, 4, "Enter Maximum Longitude [{0}]:".format(fix_max_lon))
+               screen.addstr(36 + extra, 4, "Enter Maximum Longitude [{0}]:".format(fix_max_lon))
                new_max_lon = screen.getstr()
                try:
                     new_max_lon = float(new_max_lon)
@@ -728,7 +1182,7 @@ def settings_screen(header):
                     note = note + " Maximum longitude has not changed."
 
           if option == '3':
-               screen.addstr(33, 4, "Enter Temporal Gridding Option [Model or Observation]:")
+               screen.addstr(33 + extra, 4, "Enter Temporal Gridding Option [Model or Observation]:")
                new_temp_grid_option = screen.getstr()
                if new_temp_grid_option.lower() == 'model':
                     temp_grid_option = 'Model'
@@ -742,7 +1196,7 @@ def settings_screen(header):
                     note = "Temporal gridding option has not be changed."
 
           if option == '4':
-               screen.addstr(33, 4, "Enter Spatial Gridding Option [Model, Observation or User]:")
+               screen.addstr(33 + extra, 4, "Enter Spatial Gridding Option [Model, Observation or User]:")
                new_spatial_grid_option = screen.getstr()
                if new_spatial_grid_option.lower() == 'model':
                     spatial_grid_option = 'Model'
@@ -753,7 +1207,7 @@ def settings_screen(header):
                     spatial_grid_setting = obs_lat_res
                     note = "Spatial gridding option has changed successfully to {0}".format(spatial_grid_option)
                elif new_spatial_grid_option.lower() == 'user':
-                    screen.addstr(34, 4, "Please enter spatial resolution: ")
+                    screen.addstr(34 + extra, 4, "Please enter spatial resolution: ")
                     user_res = screen.getstr()
                     try:
                          user_res = float(user_res)
@@ -767,23 +1221,24 @@ def settings_screen(header):
 
           '''
           if option == '5':
-               screen.addstr(33, 4, "Please enter one Subregion path:")
+               screen.addstr(33 + extra, 4, "Please enter one Subregion path:")
                subregion_path = screen.getstr()
           '''
           if option == '7':
-               screen.addstr(33, 4, "Please enter working directory path:")
+               screen.addstr(33 + extra, 4, "Please enter working directory path:")
                working_directory = screen.getstr()
                if working_directory[-1] != '/':
                     working_directory = working_directory + "/"
 
           if option == '8':
-               screen.addstr(33, 4, "Please enter plot title:")
+               screen.addstr(33 + extra, 4, "Please enter plot title:")
                plot_title = screen.getstr()
 
           if option.lower() == 'r':
-               run_screen(model_datasets, models_info, observations_info, overlap_start_time, overlap_end_time, \
+               note, results = run_screen(model_datasets, models_info, observations_info, overlap_start_time, overlap_end_time, \
                           overlap_min_lat, overlap_max_lat, overlap_min_lon, overlap_max_lon, \
                           temp_grid_setting, spatial_grid_setting, working_directory, plot_title)
+               evaluation_results.append(results)
 
 
 ##############################################################
@@ -811,7 +1266,7 @@ def main_menu(model_datasets, models_info, observation_datasets, observations_in
           screen.addstr(1, 1, "Main Menu:")
           screen.addstr(4, 4, "1 - Manage Model ({0})".format(model_status))
           screen.addstr(6, 4, "2 - Manage Observation ({0})".format(obs_status))
-          screen.addstr(8, 4, "3 - Run(Config File) [coming soon....]")
+          screen.addstr(8, 4, "3 - Run(Config File)")
           screen.addstr(10, 4, "4 - Run(Settings)")
           screen.addstr(12, 4, "0 - EXIT")
           screen.addstr(18, 2, "Select an option: ")
@@ -826,7 +1281,9 @@ def main_menu(model_datasets, models_info, observation_datasets, observations_in
                manage_obs_screen(header)
           if option == '3':
                header = "Main Menu > Run(Config File)"
-               #TODO: function to read config file and run evaluation
+               note, results = config_file_screen(header)
+               if results is not None:
+                    evaluation_results.append(results)
           if option == '4':
                if model_status =='NC' or obs_status == 'NC':
                     main_menu(model_datasets, models_info, observation_datasets, observations_info, note="WARNING: Please complete step 1 and 2 before 4.")
@@ -838,6 +1295,12 @@ def main_menu(model_datasets, models_info, observation_datasets, observations_in
 
 
 if __name__ == '__main__':
+     parser = argparse.ArgumentParser(description="Open Climate Workbench Evaluation System")
+     parser.add_argument('-c', '--config', help="run the evaluation described in this config file without the interactive interface")
+     args = parser.parse_args()
+     if args.config:
+          sys.exit(run_config_file(args.config))
+
      TITLE = "Open Climate Workbench Evaluation System"
      ORGANIZATION = "Apache Software Foundation"
      screen = curses.initscr()
@@ -845,4 +1308,5 @@ if __name__ == '__main__':
      models_info = []              #list of dictionaries that contain information for each model
      observation_datasets = []     #list of observation dataset objects
      observations_info = []        #list of dictionaries that contain information for each observation
+     evaluation_results = []       #list of dictionaries that contain the results of each evaluation run, e.g. the regridded datasets
      main_menu(model_datasets, models_info, observation_datasets, observations_info)
@@ -0,0 +1,213 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+'''Unit tests for the ocw_cli.py module'''
+
+import threading
+import time
+import unittest
+import numpy as np
+import datetime as dt
+from ocw.dataset import Dataset, Bounds
+
+import ocw_cli
+
+
+class LocalEvaluationWorker(ocw_cli.EvaluationWorker):
+    '''Evaluation worker with local observations and without plots.'''
+
+    def __init__(self, obs_datasets, *args, **kwargs):
+        ocw_cli.EvaluationWorker.__init__(self, *args, **kwargs)
+        self.obs_datasets = obs_datasets
+
+    def _retrieve_observations(self):
+        return self.obs_datasets
+
+    def _plot(self, evaluations):
+        pass
+
+
+class SlowEvaluationWorker(LocalEvaluationWorker):
+    '''Evaluation worker that is slow to reach the checkpoint after the
+    spatial regridding.'''
+
+    def __init__(self, *args, **kwargs):
+        LocalEvaluationWorker.__init__(self, *args, **kwargs)
+        self.regridded = threading.Event()
+
+    def _spatial_regrid(self, datasets):
+        regridded = LocalEvaluationWorker._spatial_regrid(self, datasets)
+        self.regridded.set()
+        time.sleep(0.2)
+        return regridded
+
+
+class StalledEvaluationWorker(LocalEvaluationWorker):
+    '''Evaluation worker stuck in a download that never checks for cancel.'''
+
+    def __init__(self, *args, **kwargs):
+        LocalEvaluationWorker.__init__(self, *args, **kwargs)
+        self.retrieving = threading.Event()
+        self.release = threading.Event()
+
+    def _retrieve_observations(self):
+        self.retrieving.set()
+        self.release.wait(10)
+        return LocalEvaluationWorker._retrieve_observations(self)
+
+
+class RecordingScreen(object):
+    '''Curses screen that records the text written and answers 0.'''
+
+    def __init__(self):
+        self.lines = {}
+
+    def addstr(self, y, x, text):
+        self.lines[y] = self.lines.get(y, '') + text
+
+    def getmaxyx(self):
+        return 60, 200
+
+    def getstr(self):
+        return '0'
+
+    def clear(self):
+        self.lines = {}
+
+    def border(self, *args):
+        pass
+
+    def refresh(self):
+        pass
+
+
+class TestSettingsScreen(unittest.TestCase):
+    def setUp(self):
+        lats = np.array([10., 12., 14., 16., 18.])
+        lons = np.array([100., 102., 104., 106., 108.])
+        monthly_times = np.array([dt.datetime(2000, x, 1) for x in range(1, 13)])
+        daily_times = np.array([dt.datetime(2000, 1, 1) + dt.timedelta(x) for x in range(366)])
+        model_datasets = [Dataset(lats, lons, monthly_times, np.ones([12, 5, 5]), 'prec', name='model1'),
+                          Dataset(lats, lons, daily_times, np.ones([366, 5, 5]), 'prec', name='model2')]
+        observations_info = [{'dataset_id': dataset_id, 'parameter_id': parameter_id, 'database': database,
+                              'start_date': '2000-01-01', 'end_date': '2000-12-31', 'timestep': timestep,
+                              'min_lat': 0., 'max_lat': 20., 'min_lon': 90., 'max_lon': 110.,
+                              'lat_res': res, 'lon_res': res}
+                             for dataset_id, parameter_id, database, timestep, res in
+                             [('3', '36', 'TRMM', 'daily', 0.25), ('6', '32', 'CRU', 'monthly', 0.5)]]
+        self.screen = RecordingScreen()
+        self.globals = dict((name, getattr(ocw_cli, name, None)) for name in
+                            ['TITLE', 'ORGANIZATION', 'screen', 'model_datasets', 'models_info',
+                             'observation_datasets', 'observations_info'])
+        ocw_cli.TITLE = ocw_cli.ORGANIZATION = ''
+        ocw_cli.screen = self.screen
+        ocw_cli.model_datasets = model_datasets
+        ocw_cli.models_info = [{}, {}]
+        ocw_cli.observation_datasets = []
+        ocw_cli.observations_info = observations_info
+
+    def tearDown(self):
+        for name, value in self.globals.items():
+            setattr(ocw_cli, name, value)
+
+    def test_lists_all_datasets(self):
+        ocw_cli.settings_screen('Settings')
+
+        text = '\n'.join(self.screen.lines.values())
+        self.assertIn('Model model1: [temporal=monthly lat=2.0 lon=2.0]', text)
+        self.assertIn('Model model2: [temporal=daily lat=2.0 lon=2.0]', text)
+        self.assertIn('Observation 3-36 (TRMM): [temporal=daily lat=0.25 lon=0.25]', text)
+        self.assertIn('Observation 6-32 (CRU): [temporal=monthly lat=0.5 lon=0.5]', text)
+        # gridding to the models or observations uses the coarsest of them
+        self.assertIn('Temporal Resolution:    [Model=monthly - Observation=monthly]', text)
+        self.assertIn('Spatial Resolution:     [Model: lat=2.0 lon=2.0 - Observation: lat=0.5 lon=0.5]', text)
+
+    def test_coarsest_temporal_resolution(self):
+        self.assertEqual(ocw_cli.get_coarsest_temporal_resolution(['daily', 'Monthly', 'hourly']), 'Monthly')
+        self.assertEqual(ocw_cli.get_coarsest_temporal_resolution(['monthly', 'annual']), 'annual')
+
+
+class TestEvaluationWorker(unittest.TestCase):
+    def setUp(self):
+        lats = np.array([10, 12, 14, 16, 18])
+        lons = np.array([100, 102, 104, 106, 108])
+        times = np.array([dt.datetime(2000, x, 1) for x in range(1, 13)])
+        values = np.ones([12, 5, 5])
+        self.obs_dataset = Dataset(lats, lons, times, values, 'prec', name='obs')
+        self.model_datasets = [Dataset(lats, lons, times, values * 3, 'prec', name='model1'),
+                               Dataset(lats, lons, times, values * 5, 'prec', name='model2')]
+        self.bounds = Bounds(10, 18, 100, 108,
+                             dt.datetime(2000, 1, 1), dt.datetime(2000, 12, 1))
+
+    def test_bias_is_model_minus_obs(self):
+        worker = LocalEvaluationWorker([self.obs_dataset], self.model_datasets, [],
+                                       self.bounds, 'monthly', 2, '/tmp/', '')
+        worker.run()
+
+        self.assertIsNone(worker.error)
+        evaluations = worker.results['evaluations']
+        self.assertEqual(len(evaluations), 2)
+        for bias_evaluation, expected_bias in zip(evaluations, [2, 4]):
+            self.assertEqual(len(bias_evaluation.target_datasets), 1)
+            bias = bias_evaluation.results[0][0]
+            np.testing.assert_array_almost_equal(bias, np.full(bias.shape, expected_bias))
+
+    def test_stop_waits_for_worker(self):
+        worker = SlowEvaluationWorker([self.obs_dataset], self.model_datasets, [],
+                                      self.bounds, 'monthly', 2, '/tmp/', '')
+        worker.start()
+        self.assertTrue(worker.regridded.wait(10))
+        results = worker.stop()
+
+        self.assertFalse(worker.is_alive())
+        self.assertTrue(worker.cancelled)
+        self.assertEqual(len(results['model_datasets']), 2)
+        self.assertEqual(results['evaluations'], [])
+
+    def test_stop_timeout(self):
+        worker = StalledEvaluationWorker([self.obs_dataset], self.model_datasets, [],
+                                         self.bounds, 'monthly', 2, '/tmp/', '')
+        worker.start()
+        self.assertTrue(worker.retrieving.wait(10))
+        results = worker.stop(0.1)
+
+        self.assertTrue(worker.is_alive())
+        self.assertIs(results, worker.results)
+        self.assertTrue(ocw_cli.worker_status(worker).startswith("Evaluation cancelled"))
+
+        worker.release.set()
+        worker.join(10)
+        self.assertTrue(worker.cancelled)
+
+    def test_retrieve_duplicate_observation(self):
+        observations_info = [{'dataset_id': 1, 'parameter_id': 2, 'database': 'obs'},
+                             {'dataset_id': 1, 'parameter_id': 2, 'database': 'obs'}]
+        worker = ocw_cli.EvaluationWorker(self.model_datasets, observations_info,
+                                          self.bounds, 'monthly', 2, '/tmp/', '')
+        parameter_dataset = ocw_cli.rcmed.parameter_dataset
+        ocw_cli.rcmed.parameter_dataset = lambda *args, **kwargs: self.obs_dataset
+        try:
+            obs_datasets = worker._retrieve_observations()
+        finally:
+            ocw_cli.rcmed.parameter_dataset = parameter_dataset
+
+        self.assertEqual(obs_datasets, [self.obs_dataset])
+        self.assertEqual(worker.progress['retrieve'], 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,7 +23,7 @@ import sys
 import os
 import json
 
-from bottle import Bottle, request, response
+from bottle import Bottle, HTTPError, request, response, static_file
 
 from config import WORK_DIR
 
@@ -36,9 +36,13 @@ import ocw.metrics as metrics
 import ocw.plotter as plotter
 
 import numpy as np
+import numpy.ma as ma
 
 processing_app = Bottle()
 
+# Tile renderers for evaluation results, keyed by (eval_dir, result_name)
+_tile_renderers = {}
+
 class EnableCors(object):
     name = 'enable_cors'
     api = 2
@@ -247,6 +251,41 @@ def run_evaluation():
 
     return json.dumps({'eval_work_dir': eval_time_stamp})
 
+@processing_app.route('/tiles/<eval_dir>/<result_name>/<index:int>/<zoom:int>/<x:int>/<y:int>.png')
+def get_result_tile(eval_dir, result_name, index, zoom, x, y):
+    ''' Return a map tile of an evaluation result.
+
+    Tiles follow the z/x/y spherical mercator scheme used by Leaflet so that
+    large results can be viewed interactively without downloading the full
+    resolution plot. Tiles are rendered on first request and cached in the
+    evaluation's work directory.
+
+    :param eval_dir: The time stamped work directory of the evaluation.
+    :type eval_dir: string
+    :param result_name: The plot name of the result, without extension.
+    :type result_name: string
+    :param index: The index of the temporal bin of the result to draw.
+    :type index: Integer >= 0
+    :param zoom: The tile zoom level.
+    :type zoom: Integer >= 0
+    :param x: The tile column.
+    :type x: Integer >= 0
+    :param y: The tile row.
+    :type y: Integer >= 0
+
+    :returns: The requested PNG tile.
+    '''
+    renderer = _get_tile_renderer(eval_dir, result_name)
+    if renderer is None or not 0 <= index < renderer.dataset.shape[0]:
+        return HTTPError(404, 'Result not found')
+
+    try:
+        path = renderer.tile_path(zoom, x, y, index=index)
+    except ValueError:
+        return HTTPError(404, 'Tile not found')
+
+    return static_file(os.path.relpath(path, WORK_DIR), root=WORK_DIR)
+
 def _process_dataset_object(dataset_object, eval_bounds):
     ''' Convert an dataset object representation into an OCW Dataset
 
@@ -530,6 +569,7 @@ def _generate_evaluation_plots(evaluation, lat_bins, lon_bins, eval_time_stamp):
 										 fname=file_name,
 										 ptitle=plot_title,
                                          gridshape=grid_shape)
+                _save_tile_source(results, lat_bins, lon_bins, file_name)
 
     if evaluation.unary_results != []:
         for metric_index, metric in enumerate(evaluation.unary_metrics):
@@ -550,6 +590,54 @@ def _generate_evaluation_plots(evaluation, lat_bins, lon_bins, eval_time_stamp):
 										   ptitle=plot_title,
                                            gridshape=grid_shape)
 
+def _save_tile_source(results, lat_bins, lon_bins, file_name):
+    ''' Save a result array so that it can be served as map tiles.
+
+    :param results: The metric result values.
+    :type results: Numpy Array
+    :param lat_bins: The latitude bin values used in the evaluation.
+    :type lat_bins: List
+    :param lon_bins: The longitude bin values used in the evaluation.
+    :type lon_bins: List
+    :param file_name: The plot path of the result, without extension.
+    :type file_name: string
+    '''
+    results = ma.asarray(results)
+    np.savez(file_name + '.npz',
+             values=results.filled(0),
+             mask=ma.getmaskarray(results),
+             lats=lat_bins,
+             lons=lon_bins)
+
+def _get_tile_renderer(eval_dir, result_name):
+    ''' Get the (cached) tile renderer for an evaluation result.
+
+    :param eval_dir: The time stamped work directory of the evaluation.
+    :type eval_dir: string
+    :param result_name: The plot name of the result, without extension.
+    :type result_name: string
+
+    :returns: An ocw.plotter.MapTileRenderer or None if the result doesn't exist.
+    '''
+    if '..' in eval_dir or '..' in result_name:
+        return None
+
+    key = (eval_dir, result_name)
+    if key not in _tile_renderers:
+        source = os.path.join(WORK_DIR, eval_dir, result_name + '.npz')
+        if not os.path.exists(source):
+            return None
+
+        data = np.load(source)
+        values = ma.array(data['values'], mask=data['mask'])
+        cache_dir = os.path.join(WORK_DIR, eval_dir, result_name + '_tiles')
+        _tile_renderers[key] = plotter.MapTileRenderer(values,
+                                                       data['lats'],
+                                                       data['lons'],
+                                                       cache_dir)
+
+    return _tile_renderers[key]
+
 def _calculate_grid_shape(reference_dataset, max_cols=6):
     ''' Calculate the plot grid shape given a reference dataset. 
 
@@ -16,6 +16,7 @@
 # under the License.
 
 import re
+import glob
 import netCDF4
 from ocw.dataset import Dataset
 import numpy
@@ -25,6 +26,7 @@ import calendar
 import string
 
 import ocw.utils as utils
+import ocw.instrumentation as instrumentation
 
 LAT_NAMES = ['x', 'rlat', 'rlats', 'lat', 'lats', 'latitude', 'latitudes']
 LON_NAMES = ['y', 'rlon', 'rlons', 'lon', 'lons', 'longitude', 'longitudes']
@@ -193,6 +195,7 @@ def _get_value_name(possible_value_name):
     return value_variable_name
 
 
+@instrumentation.instrument()
 def load_file(file_path, variable_name):
     '''Load netCDF file, get the all variables name and get the data.
 
@@ -266,3 +269,209 @@ def load_file(file_path, variable_name):
             values = values [:,:,:,0]
 
     return Dataset(lats, lons, times, values, variable_name)
+
+@instrumentation.instrument()
+def load_multiple_files(file_path, variable_name, subregion=None):
+    '''Load a netCDF variable that is split in time across several files.
+
+    The headers of all files are read first to check that they share the
+    same grid and to order them by time. The files are then treated as a
+    single time axis on which each file starts at a known offset, so only
+    the files and the slabs of values that fall inside subregion are read.
+    Those values are read into memory when this is called, as for
+    load_file.
+
+    Only rectilinear grids with 1D latitudes and longitudes are supported.
+
+    :param file_path: A glob pattern matching the files or a list of paths.
+    :type file_path: String or List of Strings
+    :param variable_name: The value variable name, the same in every file.
+    :type variable_name: String
+    :param subregion: (optional) The Bounds of the data to load. Defaults
+        to all of the data.
+    :type subregion: ocw.dataset.Bounds
+
+    :returns: An OCW Dataset object containing the requested parameter data.
+    :rtype: ocw.dataset.Dataset object
+
+    :raises: ValueError
+    '''
+    if isinstance(file_path, basestring):
+        file_paths = glob.glob(file_path)
+    else:
+        file_paths = list(file_path)
+
+    if not file_paths:
+        err = "No files were found to load."
+        raise ValueError(err)
+
+    time_axis = _MultipleFileTimeAxis(file_paths, variable_name)
+    lats, lons = time_axis.lats, time_axis.lons
+
+    lat_slice = lon_slice = time_slice = slice(None)
+    if subregion is not None:
+        normalized_lons = numpy.where(lons > 180, lons - 360, lons)
+        lat_slice = _get_index_slice(
+            (lats >= subregion.lat_min) & (lats <= subregion.lat_max))
+        lon_slice = _get_index_slice(
+            (normalized_lons >= subregion.lon_min) &
+            (normalized_lons <= subregion.lon_max))
+        time_slice = _get_index_slice(
+            (time_axis.times >= subregion.start) &
+            (time_axis.times <= subregion.end))
+
+    values = time_axis.read(time_slice, lat_slice, lon_slice)
+    return Dataset(lats[lat_slice], lons[lon_slice],
+                   time_axis.times[time_slice], values, variable_name)
+
+
+def _get_index_slice(selected):
+    '''Get the slice that covers the selected values of a 1D array.
+
+    :param selected: Boolean array that is True at the selected values.
+    :type selected: Numpy Array
+
+    :returns: A slice from the first to the last selected value.
+    :rtype: slice
+
+    :raises ValueError: If no values are selected.
+    '''
+    indices = numpy.nonzero(selected)[0]
+    if len(indices) == 0:
+        err = "The subregion doesn't overlap the data in the files."
+        raise ValueError(err)
+
+    return slice(indices[0], indices[-1] + 1)
+
+
+class _MultipleFileTimeAxis(object):
+    '''A single time axis made of the time axes of several netCDF files.'''
+
+    def __init__(self, file_paths, variable_name):
+        '''Default _MultipleFileTimeAxis constructor
+
+        Reads the header of each file, checks that all files share the
+        grid of the first one and orders them by their first time.
+
+        :param file_paths: The paths of the netCDF files.
+        :type file_paths: List of Strings
+        :param variable_name: The value variable name.
+        :type variable_name: String
+
+        :raises: ValueError
+        '''
+        self.variable_name = variable_name
+        headers = sorted((self._read_header(path) for path in file_paths),
+                         key=lambda header: header['times'][0])
+
+        self.lats = headers[0]['lats']
+        self.lons = headers[0]['lons']
+        for header in headers[1:]:
+            if not (numpy.array_equal(header['lats'], self.lats) and
+                    numpy.array_equal(header['lons'], self.lons)):
+                err = "The grid of {0} doesn't match the grid of {1}.".format(
+                    header['path'], headers[0]['path'])
+                raise ValueError(err)
+
+        self.times = numpy.concatenate([header['times'] for header in headers])
+        if (numpy.diff(self.times) <= timedelta(0)).any():
+            err = "The times of the files overlap or aren't increasing."
+            raise ValueError(err)
+
+        self.headers = headers
+        # The position of the first time of each file on the combined axis
+        self.offsets = numpy.cumsum([0] + [len(header['times'])
+                                           for header in headers])
+
+    def _read_header(self, path):
+        '''Read the grid, times and variable layout of a file.
+
+        :param path: The path of the netCDF file.
+        :type path: String
+
+        :returns: The header of the file.
+        :rtype: Dictionary
+
+        :raises: ValueError
+        '''
+        try:
+            netcdf = netCDF4.Dataset(path, mode='r')
+        except:
+            err = "The given file cannot be loaded (Only netCDF file can be supported)."
+            raise ValueError(err)
+
+        try:
+            lat_name = _get_netcdf_variable_name(LAT_NAMES, netcdf, self.variable_name)
+            lon_name = _get_netcdf_variable_name(LON_NAMES, netcdf, self.variable_name)
+            time_name = _get_netcdf_variable_name(TIME_NAMES, netcdf, self.variable_name)
+            times = numpy.array(utils.decode_time_values(netcdf, time_name))
+            if len(times) == 0:
+                err = "{0} has no time values.".format(path)
+                raise ValueError(err)
+
+            # A Dataset needs 1D lats and lons on their own dimensions, so
+            # curvilinear grids with 2D lats and lons can't be loaded.
+            lat_dimensions = netcdf.variables[lat_name].dimensions
+            lon_dimensions = netcdf.variables[lon_name].dimensions
+            if (len(lat_dimensions) != 1 or len(lon_dimensions) != 1 or
+                    lat_dimensions == lon_dimensions):
+                err = ("{0} has latitudes or longitudes that aren't 1D. "
+                       "Only rectilinear grids are supported.").format(path)
+                raise ValueError(err)
+
+            return {
+                'path': path,
+                'lats': netcdf.variables[lat_name][:],
+                'lons': netcdf.variables[lon_name][:],
+                'times': times,
+                'dimensions': netcdf.variables[self.variable_name].dimensions,
+                'lat_dimension': lat_dimensions[0],
+                'lon_dimension': lon_dimensions[0],
+                'time_dimension': netcdf.variables[time_name].dimensions[0]
+            }
+        finally:
+            netcdf.close()
+
+    def read(self, time_slice, lat_slice, lon_slice):
+        '''Read the values inside a time, lat and lon range.
+
+        Only the files with times inside time_slice are opened. Extra
+        dimensions such as a single level are reduced to their first index.
+
+        :param time_slice: The range of indices on the combined time axis.
+        :type time_slice: slice
+        :param lat_slice: The range of latitude indices.
+        :type lat_slice: slice
+        :param lon_slice: The range of longitude indices.
+        :type lon_slice: slice
+
+        :returns: The values with shape (times, lats, lons).
+        :rtype: Numpy Masked Array
+        '''
+        time_start, time_end, _ = time_slice.indices(len(self.times))
+        num_lats = len(range(*lat_slice.indices(len(self.lats))))
+        num_lons = len(range(*lon_slice.indices(len(self.lons))))
+        values = ma.zeros((time_end - time_start, num_lats, num_lons))
+
+        for index, header in enumerate(self.headers):
+            file_start, file_end = self.offsets[index], self.offsets[index + 1]
+            start, end = max(time_start, file_start), min(time_end, file_end)
+            if start >= end:
+                continue
+
+            slices = {
+                header['time_dimension']: slice(start - file_start, end - file_start),
+                header['lat_dimension']: lat_slice,
+                header['lon_dimension']: lon_slice
+            }
+            slab = tuple(slices.get(dimension, 0)
+                         for dimension in header['dimensions'])
+
+            netcdf = netCDF4.Dataset(header['path'], mode='r')
+            try:
+                values[start - time_start:end - time_start] = \
+                    netcdf.variables[self.variable_name][slab]
+            finally:
+                netcdf.close()
+
+        return values
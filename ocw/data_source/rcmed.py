@@ -28,9 +28,14 @@ import numpy.ma as ma
 from datetime import datetime
 import calendar
 from ocw.dataset import Dataset
+import ocw.instrumentation as instrumentation
 
 
 URL = 'http://rcmes.jpl.nasa.gov/query-api/query.php?'
+# Number of bytes read at a time when reporting download progress.
+CHUNK_SIZE = 64 * 1024
+# Seconds to wait for the server to connect or send more data before giving up.
+TIMEOUT = 60
 
 
 def get_parameters_metadata():
@@ -42,7 +47,7 @@ def get_parameters_metadata():
 
     param_info_list = []
     url = URL + "&param_info=yes"
-    string = urllib2.urlopen(url)
+    string = urllib2.urlopen(url, timeout=TIMEOUT)
     data_string = string.read()
     json_format_data = json.loads(data_string)
     fields_name = json_format_data['fields_name']
@@ -149,18 +154,62 @@ def _make_unique(lats, lons, times):
     return (unique_lats, unique_lons, unique_times)
 
 
-def _get_data(url):
+def _read_response(response, progress_callback):
+    '''Read a url response in chunks, reporting the progress.
+
+    :param response: The opened url.
+    :type response: File like object
+    :param progress_callback: Function called as progress_callback(bytes_read,
+        total_bytes) after each chunk is read. total_bytes is None if the
+        server doesn't report the size of the response. The download can be
+        aborted by raising an exception from the callback.
+    :type progress_callback: Function
+
+    :returns: The content of the response
+    :rtype: String
+    '''
+    total_bytes = None
+    if hasattr(response, 'info'):
+        content_length = response.info().getheader('Content-Length')
+        if content_length:
+            total_bytes = int(content_length)
+
+    chunks = []
+    bytes_read = 0
+    progress_callback(bytes_read, total_bytes)
+    while True:
+        chunk = response.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        bytes_read += len(chunk)
+        progress_callback(bytes_read, total_bytes)
+
+    return ''.join(chunks)
+
+
+@instrumentation.instrument()
+def _get_data(url, progress_callback=None, timeout=TIMEOUT):
     '''Reterive data from database.
 
     :param url: url to query from database
     :type url: String
+    :param progress_callback: Optional function called as
+        progress_callback(bytes_read, total_bytes) while the data is downloaded.
+    :type progress_callback: Function
+    :param timeout: Optional seconds to wait for the server to connect or
+        send the next chunk, so a stalled download fails instead of hanging.
+    :type timeout: Float
 
     :returns: Latitudes, longitudes, times and values data
     :rtype: (Numpy array, Numpy array, Numpy array, Numpy array)
     '''
 
-    string = urllib2.urlopen(url)
-    data_string = string.read()    
+    string = urllib2.urlopen(url, timeout=timeout)
+    if progress_callback is None:
+        data_string = string.read()
+    else:
+        data_string = _read_response(string, progress_callback)
     index_of_data = re.search('data: \r\n', data_string)
     data = data_string[index_of_data.end():len(data_string)]
     data = data.split('\r\n') 
@@ -312,7 +361,8 @@ def _get_parameter_info(parameters_metadata, parameter_id):
     return (database, time_step, realm, instrument, start_date, end_date, unit)
 
 
-def parameter_dataset(dataset_id, parameter_id, min_lat, max_lat, min_lon, max_lon, start_time, end_time):
+@instrumentation.instrument()
+def parameter_dataset(dataset_id, parameter_id, min_lat, max_lat, min_lon, max_lon, start_time, end_time, progress_callback=None, timeout=TIMEOUT):
     '''Get data from one database(parameter).
 
     :param dataset_id: Dataset id.
@@ -331,6 +381,14 @@ def parameter_dataset(dataset_id, parameter_id, min_lat, max_lat, min_lon, max_l
     :type start_time: Datetime
     :param end_time: End time 
     :type end_time: Datetime
+    :param progress_callback: Optional function called as
+        progress_callback(bytes_read, total_bytes) while the data is
+        downloaded. total_bytes is None if the size of the download is
+        unknown. Raising an exception from the callback aborts the download.
+    :type progress_callback: Function
+    :param timeout: Optional seconds to wait for the server to connect or
+        send the next chunk of the data.
+    :type timeout: Float
 
     :returns: An OCW Dataset object contained the requested data from RCMED.
     :rtype: ocw.dataset.Dataset object
@@ -339,7 +397,7 @@ def parameter_dataset(dataset_id, parameter_id, min_lat, max_lat, min_lon, max_l
     parameters_metadata = get_parameters_metadata()
     parameter_name, time_step, _, _, _, _, _= _get_parameter_info(parameters_metadata, parameter_id)
     url = _generate_query_url(dataset_id, parameter_id, min_lat, max_lat, min_lon, max_lon, start_time, end_time, time_step)
-    lats, lons, times, values = _get_data(url)
+    lats, lons, times, values = _get_data(url, progress_callback, timeout)
 
     unique_lats_lons_times = _make_unique(lats, lons, times)
     unique_times = _calculate_time(unique_lats_lons_times[2], time_step)
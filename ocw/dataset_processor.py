@@ -16,19 +16,24 @@
 #
 
 from ocw import dataset as ds
+from ocw import utils
+import ocw.instrumentation as instrumentation
 
 import datetime
 import numpy as np
 import numpy.ma as ma
 import scipy.interpolate
 import scipy.ndimage
+import scipy.sparse
 from scipy.ndimage import map_coordinates
 import netCDF4
+from matplotlib.path import Path
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+@instrumentation.instrument()
 def temporal_rebin(target_dataset, temporal_resolution):
     """ Rebin a Dataset to a new temporal resolution
     
@@ -65,6 +70,7 @@ def temporal_rebin(target_dataset, temporal_resolution):
     
     return new_dataset
 
+@instrumentation.instrument()
 def spatial_regrid(target_dataset, new_latitudes, new_longitudes):
     """ Regrid a Dataset using the new latitudes and longitudes
 
@@ -141,6 +147,7 @@ def ensemble(datasets):
     
     return ensemble_dataset
 
+@instrumentation.instrument()
 def subset(subregion, target_dataset):
     '''Subset given dataset(s) with subregion information
 
@@ -181,6 +188,7 @@ def subset(subregion, target_dataset):
         target_dataset.name
     )
 
+@instrumentation.instrument()
 def safe_subset(subregion, target_dataset):
     '''Safely subset given dataset with subregion information
 
@@ -220,6 +228,68 @@ def safe_subset(subregion, target_dataset):
 
     return subset(subregion, target_dataset)
 
+def region_weights(subregions, lats, lons):
+    '''Build the area weights for averaging over many subregions at once
+
+    Each row of the returned matrix holds the area weights of the grid
+    points inside one subregion, so the weights can be built once and
+    reused for every Dataset on the same grid.
+
+    :param subregions: The subregions to average over. Each subregion is
+        either a Bounds, a boolean mask with the shape of the lat/lon grid
+        in which True marks the grid points outside the subregion, or a
+        sequence of (lat, lon) polygon vertices.
+    :type subregions: List
+    :param lats: 1D or 2D array of grid latitudes.
+    :type lats: Numpy Array
+    :param lons: 1D or 2D array of grid longitudes.
+    :type lons: Numpy Array
+
+    :returns: A (number of subregions, number of grid points) matrix of
+        area weights.
+    :rtype: scipy.sparse.csr_matrix
+
+    :raises ValueError: If a subregion isn't given in a supported form.
+    '''
+    lats, lons = _get_grid_lats_lons(lats, lons)
+
+    # The area of a regular lat/lon grid box is proportional to the cosine
+    # of its latitude.
+    grid_weights = np.cos(np.radians(lats)).ravel()
+
+    cells = [np.flatnonzero(_get_subregion_grid_points(subregion, lats, lons))
+             for subregion in subregions]
+    indices = np.concatenate([np.zeros(0, dtype=np.int64)] + cells)
+    indptr = np.cumsum([0] + [len(region_cells) for region_cells in cells])
+
+    return scipy.sparse.csr_matrix((grid_weights[indices], indices, indptr),
+                                   shape=(len(cells), lats.size))
+
+@instrumentation.instrument()
+def region_means(target_dataset, subregions):
+    '''Calculate area weighted mean time series for many subregions at once
+
+    Missing values are left out of the mean of their time step and the
+    remaining weights renormalized.
+
+    :param target_dataset: The Dataset to average.
+    :type target_dataset: ocw.dataset.Dataset object
+    :param subregions: Weights from :func:`region_weights` or a list of
+        subregions to build them from.
+    :type subregions: scipy.sparse.csr_matrix or List
+
+    :returns: The mean of each subregion at each time step. A value is
+        masked when its subregion has no data at that time step.
+    :rtype: Numpy Masked Array of shape (number of subregions, times)
+    '''
+    weights = subregions
+    if not scipy.sparse.issparse(weights):
+        weights = region_weights(subregions,
+                                 target_dataset.lats,
+                                 target_dataset.lons)
+
+    return _region_means(target_dataset.values, weights)
+
 def normalize_dataset_datetimes(dataset, timestep):
     ''' Normalize Dataset datetime values.
 
@@ -297,6 +367,7 @@ def _rcmes_normalize_datetimes(datetimes, timestep):
 
     Force daily to an hour time value of 00:00:00.
     Force monthly data to the first of the month at midnight.
+    Other timesteps, e.g. hourly, are left as they are.
 
     :param datetimes: The datetimes to normalize.
     :type datetimes: List of `datetime` values.
@@ -323,6 +394,8 @@ def _rcmes_normalize_datetimes(datetimes, timestep):
 
             normalDatetimes.append(inputDatetime)
 
+    else:
+        normalDatetimes = list(datetimes)
 
     return normalDatetimes
 
@@ -484,123 +557,21 @@ def _rcmes_calc_average_on_new_time_unit_K(data, dates, unit):
         print 'Error: unknown unit type selected for time averaging: EXIT'
         return -1,-1,-1,-1
 
-    # Calculate arrays of: annual timeseries: year (2007,2007),
-    #                      monthly time series: year-month (200701,200702),
-    #                      daily timeseries:  year-month-day (20070101,20070102) 
-    #  depending on user-selected averaging period.
-
-    # Year list
-    if unit=='annual':
-        timeunits = np.array([int(d.strftime("%Y")) for d in dates])
-        unique_times = np.unique(timeunits)
-         
-    # YearMonth format list
-    if unit=='monthly':
-        timeunits = np.array([int(d.strftime("%Y%m")) for d in dates])
-        unique_times = np.unique(timeunits)
-
-    # YearMonthDay format list
-    if unit=='daily':
-        timeunits = np.array([int(d.strftime("%Y%m%d")) for d in dates])
-        unique_times = np.unique(timeunits)
-
-
-    # TODO: add pentad setting using Julian days?
-
-    # Full list: a special case
-    if unit == 'full':
-        #  Calculating means data over the entire time range: i.e., annual-mean climatology
-        timeunits = []
-        for i in np.arange(len(dates)):
-            timeunits.append(999)  # i.e. we just want the same value for all times.
-        timeunits = np.array(timeunits, dtype=int)
-        unique_times = np.unique(timeunits)
-
-    # empty list to store new times
-    newTimesList = []
+    # Label each date with the year, month or day it falls in (or with the
+    # whole time range) and get the representative datetime of each label.
+    newTimesList, timeunits = utils.group_times(dates, unit)
 
     # Decide whether or not you need to do any time averaging.
     #   i.e. if data are already on required time unit then just pass data through and 
     #        calculate and return representative datetimes.
-    processing_required = True
-    if len(timeunits)==(len(unique_times)):
-        processing_required = False
-
-    # 1D data arrays, i.e. time series
-    if data.ndim==1:
-        # Create array to store the resulting data
-        meanstore = np.zeros(len(unique_times))
-  
-        # Calculate the means across each unique time unit
-        i=0
-        for myunit in unique_times:
-            if processing_required:
-                datam=ma.masked_array(data,timeunits!=myunit)
-                meanstore[i] = ma.average(datam)
-            
-            # construct new times list
-            yyyy, mm, dd = _create_new_year_month_day(myunit, dates)
-            newTimesList.append(datetime.datetime(yyyy,mm,dd,0,0,0,0))
-            i = i+1
-
-    # 3D data arrays
-    if data.ndim==3:
-        # Create array to store the resulting data
-        meanstore = np.zeros([len(unique_times),data.shape[1],data.shape[2]])
-  
-        # Calculate the means across each unique time unit
-        i=0
-        datamask_store = []
-        for myunit in unique_times:
-            if processing_required:
-                mask = np.zeros_like(data)
-                mask[timeunits!=myunit,:,:] = 1.0
-                # Calculate missing data mask within each time unit...
-                datamask_at_this_timeunit = np.zeros_like(data)
-                datamask_at_this_timeunit[:]= _rcmes_create_mask_using_threshold(data[timeunits==myunit,:,:],threshold=0.75)
-                # Store results for masking later
-                datamask_store.append(datamask_at_this_timeunit[0])
-                # Calculate means for each pixel in this time unit, ignoring missing data (using masked array).
-                datam = ma.masked_array(data,np.logical_or(mask,datamask_at_this_timeunit))
-                meanstore[i,:,:] = ma.average(datam,axis=0)
-            # construct new times list
-            yyyy, mm, dd = _create_new_year_month_day(myunit, dates)
-            newTimesList.append(datetime.datetime(yyyy,mm,dd))
-            i += 1
-
-        if not processing_required:
-            meanstorem = data
-
-        if processing_required:
-            # Create masked array (using missing data mask defined above)
-            datamask_store = np.array(datamask_store)
-            meanstorem = ma.masked_array(meanstore, datamask_store)
+    if len(timeunits) == len(newTimesList):
+        return data, newTimesList
 
-    return meanstorem, newTimesList
+    # Gridded data are masked where too much of a time unit is missing data.
+    threshold = 0.75 if data.ndim == 3 else None
+    meanstorem = utils.calc_time_unit_means(data, timeunits, len(newTimesList), threshold)
 
-def _create_new_year_month_day(time_unit, dates):
-    smyunit = str(time_unit)
-    if len(smyunit)==4:  # YYYY
-        yyyy = int(smyunit[0:4])
-        mm = 1
-        dd = 1
-    elif len(smyunit)==6:  # YYYYMM
-        yyyy = int(smyunit[0:4])
-        mm = int(smyunit[4:6])
-        dd = 1
-    elif len(smyunit)==8:  # YYYYMMDD
-        yyyy = int(smyunit[0:4])
-        mm = int(smyunit[4:6])
-        dd = int(smyunit[6:8])
-    elif len(smyunit)==3:  # Full time range
-        # Need to set an appropriate time representing the mid-point of the entire time span
-        dt = dates[-1]-dates[0]
-        halfway = dates[0]+(dt/2)
-        yyyy = int(halfway.year)
-        mm = int(halfway.month)
-        dd = int(halfway.day)
-    
-    return (yyyy, mm, dd)
+    return meanstorem, newTimesList
 
 def _congrid(a, newdims, method='linear', centre=False, minusone=False):
     '''
@@ -826,3 +797,83 @@ def _get_subregion_slice_indices(subregion, target_dataset):
         "time_end"   : timeEnd
     }
 
+def _get_grid_lats_lons(lats, lons):
+    '''Get 2D latitude and longitude arrays for a lat/lon grid.
+
+    :param lats: 1D or 2D array of grid latitudes.
+    :type lats: Numpy Array
+    :param lons: 1D or 2D array of grid longitudes.
+    :type lons: Numpy Array
+
+    :returns: The 2D latitudes and longitudes of every grid point.
+    '''
+    lats = np.asarray(lats)
+    lons = np.asarray(lons)
+    if lats.ndim == 1 and lons.ndim == 1:
+        lons, lats = np.meshgrid(lons, lats)
+
+    return lats, lons
+
+def _get_subregion_grid_points(subregion, lats, lons):
+    '''Find the grid points inside a subregion.
+
+    :param subregion: A Bounds, a boolean mask in which True marks the grid
+        points outside the subregion, or a sequence of (lat, lon) polygon
+        vertices.
+    :param lats: 2D array of grid latitudes.
+    :type lats: Numpy Array
+    :param lons: 2D array of grid longitudes.
+    :type lons: Numpy Array
+
+    :returns: A boolean array that is True at grid points in the subregion.
+
+    :raises ValueError: If the subregion isn't given in a supported form.
+    '''
+    if isinstance(subregion, ds.Bounds):
+        return ((lats >= subregion.lat_min) & (lats <= subregion.lat_max) &
+                (lons >= subregion.lon_min) & (lons <= subregion.lon_max))
+
+    subregion = np.asarray(subregion)
+    if subregion.dtype == bool:
+        if subregion.shape != lats.shape:
+            error = ("Subregion mask shape %s doesn't match the grid shape %s" %
+                     (subregion.shape, lats.shape))
+            logger.error(error)
+            raise ValueError(error)
+        return ~subregion
+
+    if subregion.ndim == 2 and subregion.shape[1] == 2 and len(subregion) > 2:
+        points = np.column_stack((lats.ravel(), lons.ravel()))
+        return Path(subregion).contains_points(points).reshape(lats.shape)
+
+    error = "Subregions must be Bounds, boolean masks or polygon vertices"
+    logger.error(error)
+    raise ValueError(error)
+
+def _region_means(values, weights):
+    '''Calculate area weighted means of values with a region weight matrix.
+
+    :param values: Values with shape (times, lats, lons).
+    :type values: Numpy Array or Numpy Masked Array
+    :param weights: Weights from :func:`region_weights` for the values' grid.
+    :type weights: scipy.sparse.csr_matrix
+
+    :returns: The mean of each subregion at each time step.
+    :rtype: Numpy Masked Array of shape (number of subregions, times)
+    '''
+    values = ma.asarray(values)
+    num_times = values.shape[0]
+    values = values.reshape(num_times, -1)
+    missing = ma.getmaskarray(values)
+
+    if missing.any():
+        sums = weights.dot(np.where(missing, 0, ma.getdata(values)).T)
+        totals = weights.dot((~missing).T.astype(np.float64))
+    else:
+        sums = weights.dot(ma.getdata(values).T)
+        totals = weights.dot(np.ones(weights.shape[1]))[:, np.newaxis]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = sums / totals
+
+    return ma.masked_where(np.broadcast_to(totals == 0, means.shape), means)
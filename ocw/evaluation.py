@@ -24,6 +24,7 @@ import logging
 from metrics import Metric, UnaryMetric, BinaryMetric
 from dataset import Dataset, Bounds
 import ocw.dataset_processor as DSP
+import ocw.instrumentation as instrumentation
 
 logger = logging.getLogger(__name__)
 
@@ -203,6 +204,7 @@ class Evaluation(object):
             self.add_metric(metric)
 
 
+    @instrumentation.instrument('ocw.evaluation.Evaluation.run')
     def run(self):
         '''Run the evaluation.
 
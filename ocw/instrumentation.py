@@ -0,0 +1,360 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+'''
+Lightweight timing and memory instrumentation for the OCW pipeline.
+
+Spans measure wall time, CPU time, the change in peak resident memory and
+the size of the arrays that flow through an operation. Finished spans are
+handed to every registered sink. When no sink is registered, spans are not
+measured at all so instrumented code runs at (nearly) full speed.
+
+Example::
+
+    import ocw.instrumentation as instrumentation
+
+    summary = instrumentation.SummarySink()
+    instrumentation.add_sink(summary)
+
+    with instrumentation.span('my evaluation'):
+        evaluation.run()
+
+    print(summary.report())
+
+Classes:
+    Span - A single measured operation.
+    LogSink - Sink that logs each finished span.
+    JSONLinesSink - Sink that writes each finished span as a line of JSON.
+    SummarySink - Sink that aggregates finished spans in memory.
+'''
+
+import os
+import json
+import time
+import logging
+import functools
+import threading
+
+try:
+    import resource
+except ImportError:
+    # Peak memory tracking isn't available on this platform.
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_sinks = []
+_local = threading.local()
+
+
+def add_sink(sink):
+    ''' Register a sink to receive finished spans.
+
+    Instrumentation is enabled as long as at least one sink is registered.
+
+    :param sink: An object with an ``emit(record)`` method.
+    :type sink: LogSink, JSONLinesSink, SummarySink or similar
+    '''
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+
+def remove_sink(sink):
+    ''' Unregister a sink.
+
+    :param sink: A previously registered sink.
+
+    :raises ValueError: If the sink isn't registered.
+    '''
+    _sinks.remove(sink)
+
+
+def clear_sinks():
+    ''' Unregister all sinks, which disables instrumentation. '''
+    del _sinks[:]
+
+
+def is_enabled():
+    ''' Check whether any sink is registered.
+
+    :returns: True if spans are currently being measured.
+    :rtype: boolean
+    '''
+    return len(_sinks) > 0
+
+
+def span(name, **info):
+    ''' Measure a block of code.
+
+    :param name: The name of the measured operation.
+    :type name: string
+    :param info: Optional extra values to store in the span's record.
+
+    :returns: A context manager. When instrumentation is disabled a shared
+        no-op context manager is returned.
+    '''
+    if not _sinks:
+        return _NULL_SPAN
+    return Span(name, **info)
+
+
+def instrument(name=None):
+    ''' Decorator that measures every call of a function.
+
+    The total size of the numpy arrays (or Dataset values) passed to and
+    returned by the function are stored in the ``input_bytes`` and
+    ``output_bytes`` fields of the record.
+
+    :param name: Optional span name. Defaults to the function's module
+        qualified name.
+    :type name: string
+    '''
+    def decorator(func):
+        span_name = name or '{}.{}'.format(func.__module__, func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _sinks:
+                return func(*args, **kwargs)
+
+            with Span(span_name) as current:
+                current.info['input_bytes'] = sum(
+                    _nbytes(arg) for arg in args + tuple(kwargs.values())
+                )
+                result = func(*args, **kwargs)
+                current.info['output_bytes'] = _nbytes(result)
+            return result
+
+        return wrapper
+    return decorator
+
+
+def _nbytes(obj):
+    ''' Get the size in bytes of an array or of a Dataset's values. '''
+    values = getattr(obj, 'values', obj)
+    nbytes = getattr(values, 'nbytes', 0)
+    return nbytes if isinstance(nbytes, (int, long)) else 0
+
+
+def _peak_rss():
+    ''' Get the peak resident set size of the process in kilobytes. '''
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _cpu_time():
+    ''' Get the user + system CPU time of the process in seconds. '''
+    user, system = os.times()[:2]
+    return user + system
+
+
+class Span(object):
+    '''A single measured operation.'''
+
+    def __init__(self, name, **info):
+        '''Default Span constructor
+
+        :param name: The name of the measured operation.
+        :type name: string
+        :param info: Optional extra values to store in the span's record.
+        '''
+        self.name = name
+        self.info = info
+
+    def add_array(self, label, array):
+        '''Record the size of an array processed in this span.
+
+        :param label: The record key under which to store the size.
+        :type label: string
+        :param array: The numpy array or Dataset to measure.
+        '''
+        self.info[label] = _nbytes(array)
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+
+        self._parent = stack[-1].name if stack else None
+        self._depth = len(stack)
+        stack.append(self)
+
+        self._rss = _peak_rss()
+        self._cpu = _cpu_time()
+        self._wall = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall_time = time.time() - self._wall
+        cpu_time = _cpu_time() - self._cpu
+        rss_delta = _peak_rss() - self._rss
+        _local.stack.pop()
+
+        record = dict(self.info)
+        record.update({
+            'name': self.name,
+            'parent': self._parent,
+            'depth': self._depth,
+            'start': self._wall,
+            'wall_time': wall_time,
+            'cpu_time': cpu_time,
+            'peak_rss_delta_kb': rss_delta,
+            'error': exc_type.__name__ if exc_type else None
+        })
+
+        for sink in list(_sinks):
+            try:
+                sink.emit(record)
+            except Exception:
+                logger.exception('Instrumentation sink %s failed', sink)
+
+        return False
+
+
+class _NullSpan(object):
+    '''Do nothing stand-in for Span used when instrumentation is disabled.'''
+
+    info = {}
+
+    def add_array(self, label, array):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+
+class LogSink(object):
+    '''Sink that logs each finished span.'''
+
+    def __init__(self, log=None, level=logging.INFO):
+        '''Default LogSink constructor
+
+        :param log: Optional logger to write to. Defaults to this module's
+            logger.
+        :type log: logging.Logger
+        :param level: Optional logging level.
+        :type level: int
+        '''
+        self.log = log or logger
+        self.level = level
+
+    def emit(self, record):
+        '''Log a finished span.
+
+        :param record: The span record.
+        :type record: dict
+        '''
+        self.log.log(
+            self.level,
+            '%s%s: wall %.3fs, cpu %.3fs, peak rss +%d KB',
+            '  ' * record['depth'],
+            record['name'],
+            record['wall_time'],
+            record['cpu_time'],
+            record['peak_rss_delta_kb']
+        )
+
+
+class JSONLinesSink(object):
+    '''Sink that writes each finished span as a line of JSON.'''
+
+    def __init__(self, path):
+        '''Default JSONLinesSink constructor
+
+        :param path: The file to append records to.
+        :type path: string
+        '''
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        '''Append a finished span to the output file.
+
+        :param record: The span record.
+        :type record: dict
+        '''
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            with open(self.path, 'a') as output:
+                output.write(line)
+
+
+class SummarySink(object):
+    '''Sink that aggregates finished spans by name in memory.'''
+
+    def __init__(self):
+        '''Default SummarySink constructor'''
+        self._lock = threading.Lock()
+        self.totals = {}
+
+    def emit(self, record):
+        '''Add a finished span to the summary.
+
+        :param record: The span record.
+        :type record: dict
+        '''
+        with self._lock:
+            total = self.totals.setdefault(record['name'], {
+                'count': 0,
+                'wall_time': 0.,
+                'max_wall_time': 0.,
+                'cpu_time': 0.,
+                'peak_rss_delta_kb': 0,
+                'output_bytes': 0
+            })
+            total['count'] += 1
+            total['wall_time'] += record['wall_time']
+            total['max_wall_time'] = max(total['max_wall_time'],
+                                         record['wall_time'])
+            total['cpu_time'] += record['cpu_time']
+            total['peak_rss_delta_kb'] += record['peak_rss_delta_kb']
+            total['output_bytes'] += record.get('output_bytes', 0)
+
+    def reset(self):
+        '''Discard all aggregated spans.'''
+        with self._lock:
+            self.totals = {}
+
+    def report(self):
+        '''Format the summary as a table sorted by total wall time.
+
+        :returns: The formatted summary.
+        :rtype: string
+        '''
+        header = '{:<50} {:>7} {:>10} {:>10} {:>10} {:>12}'.format(
+            'name', 'calls', 'wall (s)', 'cpu (s)', 'rss (KB)', 'output (B)'
+        )
+        lines = [header]
+        ordered = sorted(self.totals.items(),
+                         key=lambda item: item[1]['wall_time'],
+                         reverse=True)
+        for name, total in ordered:
+            lines.append('{:<50} {:>7} {:>10.3f} {:>10.3f} {:>10} {:>12}'.format(
+                name,
+                total['count'],
+                total['wall_time'],
+                total['cpu_time'],
+                total['peak_rss_delta_kb'],
+                total['output_bytes']
+            ))
+        return '\n'.join(lines)
@@ -18,11 +18,14 @@
 '''
 Classes:
     Metric - Abstract Base Class from which all metrics must inherit.
+    HistogramAccumulator - Mergeable histogram of the values at each grid point.
 '''
 
 from abc import ABCMeta, abstractmethod
 import ocw.utils as utils
+import ocw.dataset_processor as dataset_processor
 import numpy
+import numpy.ma as ma
 from scipy import stats
 
 class Metric(object):
@@ -149,6 +152,41 @@ class PatternCorrelation(BinaryMetric):
         return stats.pearsonr(ref_dataset.values.flatten(), target_dataset.values.flatten())[0]
 
 
+class TemporalCorrelation(BinaryMetric):
+    '''Calculate the temporal correlation coefficients and associated
+       confidence levels between two datasets.'''
+
+    def __init__(self, threshold=0.75):
+        '''Default TemporalCorrelation constructor
+
+        :param threshold: (optional) Proportion of missing time steps above
+            which a grid point is masked.
+        :type threshold: Float
+        '''
+        self.threshold = threshold
+
+    def run(self, ref_dataset, target_dataset):
+        '''Calculate the temporal correlation coefficients and associated
+           confidence levels between two datasets.
+
+        .. note::
+           Overrides BinaryMetric.run()
+
+        :param ref_dataset: The reference dataset to use in this metric run.
+        :type ref_dataset: ocw.dataset.Dataset object
+        :param target_dataset: The target dataset to evaluate against the
+            reference dataset in this metric run.
+        :type target_dataset: ocw.dataset.Dataset object
+
+        :returns: A 2D array of temporal correlation coefficients and a 2D
+            array of confidence levels associated with the coefficients
+        :rtype: A tuple of two Numpy Masked Arrays
+        '''
+        coefficients, p_values = utils.calc_temporal_correlation(
+            ref_dataset.values, target_dataset.values, self.threshold)
+        return coefficients, 1 - p_values
+
+
 class MeanBias(BinaryMetric):
     '''Calculate the bias averaged over time.'''
 
@@ -173,3 +211,284 @@ class MeanBias(BinaryMetric):
         mean_bias = diff.mean(axis=0)
 
         return mean_bias
+
+
+class BootstrapConfidenceInterval(BinaryMetric):
+    '''Calculate block bootstrap confidence intervals of the mean bias or
+       RMSE between two datasets.'''
+
+    def __init__(self, statistic='bias', num_replicates=1000, block_length=1,
+                 confidence=0.95, seed=None, batch_size=100, processes=1,
+                 grid_block_size=10000):
+        '''Default BootstrapConfidenceInterval constructor
+
+        See :func:`ocw.utils.calc_bootstrap_confidence_interval` for a
+        description of the parameters.
+        '''
+        self.statistic = statistic
+        self.num_replicates = num_replicates
+        self.block_length = block_length
+        self.confidence = confidence
+        self.seed = seed
+        self.batch_size = batch_size
+        self.processes = processes
+        self.grid_block_size = grid_block_size
+
+    def run(self, ref_dataset, target_dataset):
+        '''Calculate the confidence interval at each grid point.
+
+        .. note::
+           Overrides BinaryMetric.run()
+
+        :param ref_dataset: The reference dataset to use in this metric run.
+        :type ref_dataset: ocw.dataset.Dataset object
+        :param target_dataset: The target dataset to evaluate against the
+            reference dataset in this metric run.
+        :type target_dataset: ocw.dataset.Dataset object
+
+        :returns: The lower and upper bounds of the confidence interval of
+            the mean bias (as in MeanBias) or the RMSE at each grid point
+        :rtype: A tuple of two Numpy Masked Arrays
+        '''
+        return utils.calc_bootstrap_confidence_interval(
+            ref_dataset.values, target_dataset.values,
+            statistic=self.statistic,
+            num_replicates=self.num_replicates,
+            block_length=self.block_length,
+            confidence=self.confidence,
+            seed=self.seed,
+            batch_size=self.batch_size,
+            processes=self.processes,
+            grid_block_size=self.grid_block_size)
+
+
+class PdfSkillScore(BinaryMetric):
+    '''Calculate the Perkins PDF skill score between two datasets.
+
+    The skill score is the overlap of the reference and target
+    distributions, sum(min(Z_ref, Z_target)) over the histogram bins, where
+    Z is the relative frequency of values in each bin (Perkins et al. 2007).
+    It is 1 for identical distributions and 0 for distributions that don't
+    overlap.
+
+    The histogram of the last reference dataset is cached, so running the
+    metric for many targets against the same reference only histograms the
+    reference once.
+    '''
+
+    def __init__(self, bins, subregions=None, chunk_size=100):
+        '''Default PdfSkillScore constructor
+
+        :param bins: The edges of the histogram bins.
+        :type bins: Numpy Array
+        :param subregions: (optional) Subregions to score instead of single
+            grid points. See :func:`ocw.dataset_processor.region_weights`
+            for the supported subregion types. The grid points of a
+            subregion are weighted by their area.
+        :type subregions: List
+        :param chunk_size: (optional) The number of time steps histogrammed
+            at once.
+        :type chunk_size: int
+        '''
+        self.bins = numpy.asarray(bins, dtype=numpy.float64)
+        self.subregions = subregions
+        self.chunk_size = chunk_size
+        self._ref_dataset = None
+        self._ref_histogram = None
+        self._weights_lats = None
+        self._weights_lons = None
+        self._weights = None
+
+    def run(self, ref_dataset, target_dataset):
+        '''Calculate the Perkins PDF skill score between two datasets.
+
+        .. note::
+           Overrides BinaryMetric.run()
+
+        :param ref_dataset: The reference dataset to use in this metric run.
+        :type ref_dataset: ocw.dataset.Dataset object
+        :param target_dataset: The target dataset to evaluate against the
+            reference dataset in this metric run.
+        :type target_dataset: ocw.dataset.Dataset object
+
+        :returns: The skill score at each grid point, or of each subregion
+            if subregions were given. Scores are masked where either
+            dataset has no values in the bins.
+        :rtype: Numpy Masked Array of shape (lats, lons) or (subregions,)
+        '''
+        if ref_dataset is not self._ref_dataset:
+            self._ref_histogram = self.histogram(ref_dataset.values)
+            self._ref_dataset = ref_dataset
+
+        return self.score(self._ref_histogram,
+                          self.histogram(target_dataset.values),
+                          ref_dataset.lats, ref_dataset.lons)
+
+    def histogram(self, values):
+        '''Histogram an array of values in chunks of time steps.
+
+        :param values: Values with shape (times, lats, lons).
+        :type values: Numpy Array or Numpy Masked Array
+
+        :returns: The histogram of the values.
+        :rtype: HistogramAccumulator
+        '''
+        histogram = HistogramAccumulator(self.bins)
+        for start in range(0, values.shape[0], self.chunk_size):
+            histogram.update(values[start:start + self.chunk_size])
+        return histogram
+
+    def score(self, ref_histogram, target_histogram, lats=None, lons=None):
+        '''Calculate the skill score from two histograms.
+
+        This allows scoring records that were histogrammed chunk by chunk
+        with :class:`HistogramAccumulator` instead of being loaded whole.
+
+        :param ref_histogram: The histogram of the reference values.
+        :type ref_histogram: HistogramAccumulator
+        :param target_histogram: The histogram of the target values.
+        :type target_histogram: HistogramAccumulator
+        :param lats: (optional) The latitudes of the histogram grid. Needed
+            if subregions were given.
+        :type lats: Numpy Array
+        :param lons: (optional) The longitudes of the histogram grid. Needed
+            if subregions were given.
+        :type lons: Numpy Array
+
+        :returns: The skill score at each grid point, or of each subregion
+            if subregions were given.
+        :rtype: Numpy Masked Array
+
+        :raises ValueError: If subregions were given without lats and lons.
+        '''
+        weights = self.region_weights(lats, lons)
+        ref_frequencies = ref_histogram.frequencies(weights)
+        target_frequencies = target_histogram.frequencies(weights)
+        return ma.minimum(ref_frequencies, target_frequencies).sum(axis=0)
+
+    def region_weights(self, lats, lons):
+        '''Get the weights of the grid points in each subregion.
+
+        The weights of the last grid are cached, so scoring many histograms
+        on the same grid only builds them once.
+
+        :param lats: The latitudes of the grid.
+        :type lats: Numpy Array
+        :param lons: The longitudes of the grid.
+        :type lons: Numpy Array
+
+        :returns: The weights from
+            :func:`ocw.dataset_processor.region_weights`, or None if no
+            subregions were given.
+        :rtype: Numpy Array or None
+
+        :raises ValueError: If subregions were given without lats and lons.
+        '''
+        if self.subregions is None:
+            return None
+        if lats is None or lons is None:
+            raise ValueError('The lats and lons of the grid are needed to '
+                             'score subregions')
+        if lats is not self._weights_lats or lons is not self._weights_lons:
+            self._weights = dataset_processor.region_weights(
+                self.subregions, lats, lons)
+            self._weights_lats = lats
+            self._weights_lons = lons
+        return self._weights
+
+
+class HistogramAccumulator(object):
+    '''Histogram of the values at each grid point built chunk by chunk.
+
+    Accumulators built from separate chunks of a record, e.g. by separate
+    processes, can be combined with merge().
+    '''
+
+    def __init__(self, bins):
+        '''Default HistogramAccumulator constructor
+
+        :param bins: The edges of the histogram bins. As with
+            numpy.histogram the last bin includes its right edge and values
+            outside the edges aren't counted.
+        :type bins: Numpy Array
+        '''
+        self.bins = numpy.asarray(bins, dtype=numpy.float64)
+        self.counts = None
+
+    def update(self, values):
+        '''Add a chunk of values to the histogram.
+
+        :param values: Values with shape (times, lats, lons). Masked values
+            aren't counted.
+        :type values: Numpy Array or Numpy Masked Array
+
+        :raises ValueError: If the grid doesn't match previous chunks.
+        '''
+        values = ma.asarray(values)
+        num_bins = len(self.bins) - 1
+        grid_shape = values.shape[1:]
+        if self.counts is None:
+            self.counts = numpy.zeros((num_bins,) + grid_shape, dtype=numpy.int64)
+        elif self.counts.shape[1:] != grid_shape:
+            raise ValueError('Values grid shape %s does not match histogram '
+                             'grid shape %s' % (grid_shape, self.counts.shape[1:]))
+
+        data = ma.getdata(values).reshape(values.shape[0], -1)
+        bin_index = numpy.searchsorted(self.bins, data, side='right') - 1
+        # The last bin is closed on the right.
+        bin_index[data == self.bins[-1]] = num_bins - 1
+        counted = ((bin_index >= 0) & (bin_index < num_bins) &
+                   ~ma.getmaskarray(values).reshape(data.shape))
+
+        num_cells = data.shape[1]
+        cell_index = numpy.broadcast_to(numpy.arange(num_cells), data.shape)
+        counts = numpy.bincount(bin_index[counted] * num_cells + cell_index[counted],
+                                minlength=num_bins * num_cells)
+        self.counts += counts.reshape(self.counts.shape)
+
+    def merge(self, other):
+        '''Add the counts of another histogram to this one.
+
+        :param other: A histogram with the same bins and grid.
+        :type other: HistogramAccumulator
+
+        :returns: This histogram.
+        :rtype: HistogramAccumulator
+
+        :raises ValueError: If the bins or grids of the histograms differ.
+        '''
+        if not numpy.array_equal(self.bins, other.bins):
+            raise ValueError('Only histograms with the same bins can be merged.')
+        if other.counts is None:
+            return self
+        if self.counts is None:
+            self.counts = other.counts.copy()
+        elif self.counts.shape != other.counts.shape:
+            raise ValueError('Only histograms with the same grid can be merged.')
+        else:
+            self.counts += other.counts
+        return self
+
+    def frequencies(self, weights=None):
+        '''Get the relative frequency of each bin.
+
+        :param weights: (optional) Subregion weights from
+            :func:`ocw.dataset_processor.region_weights`. When given, the
+            frequencies of each subregion are returned instead of those of
+            each grid point.
+        :type weights: scipy.sparse.csr_matrix
+
+        :returns: The relative frequencies with shape (bins, lats, lons) or
+            (bins, subregions). They are masked where no values were
+            counted.
+        :rtype: Numpy Masked Array
+        '''
+        counts = self.counts.astype(numpy.float64)
+        if weights is not None:
+            counts = weights.dot(counts.reshape(len(counts), -1).T).T
+
+        totals = counts.sum(axis=0)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            frequencies = counts / totals
+        return ma.masked_where(numpy.broadcast_to(totals == 0, counts.shape),
+                               frequencies)
@@ -15,7 +15,8 @@
 # specific language governing permissions and limitations
 # under the License.
 
-from tempfile import TemporaryFile
+import os
+from tempfile import TemporaryFile, mkstemp
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 from mpl_toolkits.basemap import Basemap
@@ -24,6 +25,8 @@ import scipy.stats.mstats as mstats
 import numpy as np
 import numpy.ma as ma
 
+import ocw.instrumentation as instrumentation
+
 # Set the default colormap to coolwarm
 mpl.rc('image', cmap='coolwarm')
 
@@ -149,6 +152,7 @@ def _fig_size(gridshape, aspect=None):
 
     return width, height
 
+@instrumentation.instrument()
 def draw_taylor_diagram(results, names, refname, fname, fmt='png',
                         gridshape=(1,1), ptitle='', subtitles=None,
                         pos='upper right', frameon=True, radmax=1.5):
@@ -223,6 +227,7 @@ def draw_taylor_diagram(results, names, refname, fname, fmt='png',
     fig.savefig('%s.%s' %(fname, fmt), bbox_inches='tight', dpi=fig.dpi)
     fig.clf()
 
+@instrumentation.instrument()
 def draw_subregions(subregions, lats, lons, fname, fmt='png', ptitle='',
                     parallels=None, meridians=None, subregion_masks=None):
     ''' Draw subregion domain(s) on a map.
@@ -327,6 +332,7 @@ def draw_subregions(subregions, lats, lons, fname, fmt='png', ptitle='',
     fig.savefig('%s.%s' %(fname, fmt), bbox_inches='tight', dpi=fig.dpi)
     fig.clf()
 
+@instrumentation.instrument()
 def draw_time_series(results, times, labels, fname, fmt='png', gridshape=(1, 1),
                      xlabel='', ylabel='', ptitle='', subtitles=None,
                      label_month=False, yscale='linear', aspect=None):
@@ -458,6 +464,7 @@ def draw_time_series(results, times, labels, fname, fmt='png', gridshape=(1, 1),
     fig.savefig('%s.%s' %(fname, fmt), bbox_inches='tight', dpi=fig.dpi)
     fig.clf()
 
+@instrumentation.instrument()
 def draw_contour_map(dataset, lats, lons, fname, fmt='png', gridshape=(1, 1),
                      clabel='', ptitle='', subtitles=None, cmap=None,
                      clevs=None, nlevs=10, parallels=None, meridians=None,
@@ -618,6 +625,7 @@ def draw_contour_map(dataset, lats, lons, fname, fmt='png', gridshape=(1, 1),
     fig.savefig('%s.%s' %(fname, fmt), bbox_inches='tight', dpi=fig.dpi)
     fig.clf()
 
+@instrumentation.instrument()
 def draw_portrait_diagram(results, rowlabels, collabels, fname, fmt='png',
                           gridshape=(1, 1), xlabel='', ylabel='', clabel='',
                           ptitle='', subtitles=None, cmap=None, clevs=None,
@@ -763,6 +771,204 @@ def draw_portrait_diagram(results, rowlabels, collabels, fname, fmt='png',
     fig.savefig('%s.%s' %(fname, fmt), bbox_inches='tight', dpi=fig.dpi)
     fig.clf()
 
+def _tile_pixel_centers(zoom, x, y, tile_size):
+    '''
+    Purpose::
+        Calculate the latitude and longitude of the pixel centers of a
+        spherical mercator (z/x/y) map tile.
+
+    Input::
+        zoom - an int giving the tile zoom level
+        x - an int giving the tile column
+        y - an int giving the tile row, counted from the north
+        tile_size - an int giving the width and height of the tile in pixels
+
+    Output::
+        lats - A 1D array of the latitudes of each pixel row (north to south)
+        lons - A 1D array of the longitudes of each pixel column
+    '''
+    ntiles = 2 ** zoom
+    if not (0 <= x < ntiles and 0 <= y < ntiles):
+        raise ValueError('Tile (%d, %d, %d) is outside of the map' %(zoom, x, y))
+
+    offsets = (np.arange(tile_size) + .5) / tile_size
+    lons = (x + offsets) / ntiles * 360. - 180.
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / ntiles))))
+    return lats, lons
+
+def _nearest_grid_index(grid, points):
+    '''
+    Purpose::
+        Find the index of the nearest grid cell for each point along one
+        axis of a regular or irregular, monotonically increasing grid.
+
+    Input::
+        grid - a 1D array of sorted grid cell centers
+        points - a 1D array of coordinates to locate on the grid
+
+    Output::
+        index - A 1D int array of grid indices for each point
+        inside - A 1D boolean array which is False for points that fall
+                 outside of the outermost grid cells
+    '''
+    if grid.size == 1:
+        return np.zeros(points.shape, dtype=int), np.ones(points.shape, dtype=bool)
+
+    edges = (grid[1:] + grid[:-1]) / 2.
+    lower = grid[0] - (grid[1] - grid[0]) / 2.
+    upper = grid[-1] + (grid[-1] - grid[-2]) / 2.
+    index = np.searchsorted(edges, points)
+    inside = (points >= lower) & (points <= upper)
+    return index, inside
+
+def draw_map_tile(dataset, lats, lons, zoom, x, y, fname, clevs, cmap=None,
+                  tile_size=256):
+    ''' Draw a single spherical mercator map tile of a gridded field.
+
+    The tile follows the z/x/y scheme used by web map clients such as
+    Leaflet, so it can be overlaid on a base map. Pixels are colored with the
+    nearest grid value. Pixels outside of the grid, or over masked values,
+    are left transparent.
+
+    :param dataset: 2D array of data to be drawn with shape (nLat, nLon).
+    :type dataset: Numpy Array
+    :param lats: 1D array of sorted latitude values.
+    :type lats: Numpy Array
+    :param lons: 1D array of sorted longitude values.
+    :type lons: Numpy Array
+    :param zoom: The tile zoom level.
+    :type zoom: int
+    :param x: The tile column.
+    :type x: int
+    :param y: The tile row, counted from the north.
+    :type y: int
+    :param fname: The filename of the PNG tile.
+    :type fname: string
+    :param clevs: Color levels values. Use the same levels for every tile of
+        a map so that all tiles share one color scale.
+    :type clevs: List of ints or floats
+    :param cmap: Optional string or matplotlib.colors.LinearSegmentedColormap
+        instance denoting the colormap. This must be able to be recognized by
+        `Matplotlib's get_cmap function <http://matplotlib.org/api/cm_api.html#matplotlib.cm.get_cmap>`_.
+    :type cmap: string or LinearSegmentedColormap object
+    :param tile_size: Optional width and height of the tile in pixels.
+    :type tile_size: int
+
+    :raises ValueError: If the tile is outside of the map.
+    '''
+    tile_lats, tile_lons = _tile_pixel_centers(zoom, x, y, tile_size)
+    lat_index, lat_inside = _nearest_grid_index(lats, tile_lats)
+    lon_index, lon_inside = _nearest_grid_index(lons, tile_lons)
+    lat_index = lat_index.clip(0, lats.size - 1)
+    lon_index = lon_index.clip(0, lons.size - 1)
+
+    data = ma.asarray(dataset)[np.ix_(lat_index, lon_index)]
+    visible = np.outer(lat_inside, lon_inside) & ~ma.getmaskarray(data)
+
+    cmap = plt.get_cmap(cmap)
+    norm = mpl.colors.BoundaryNorm(clevs, cmap.N)
+    rgba = cmap(norm(data.filled(clevs[0])))
+    rgba[..., 3] = np.where(visible, rgba[..., 3], 0)
+
+    mpl.image.imsave(fname, rgba, format='png')
+
+class MapTileRenderer(object):
+    ''' Lazily render and cache a spherical mercator tile pyramid.
+
+    Tiles are drawn with :func:`draw_map_tile` the first time they are
+    requested and then served from ``cache_dir`` on subsequent requests.
+    The color levels are calculated once over the entire field so that all
+    tiles, at every zoom level, share the same color scale.
+    '''
+
+    def __init__(self, dataset, lats, lons, cache_dir, cmap=None, clevs=None,
+                 nlevs=10, tile_size=256):
+        '''Default MapTileRenderer constructor
+
+        :param dataset: 2D array with shape (nLat, nLon) or 3D array with
+            shape (nT, nLat, nLon) of data to be drawn.
+        :type dataset: Numpy Array
+        :param lats: 1D array of sorted latitude values.
+        :type lats: Numpy Array
+        :param lons: 1D array of sorted longitude values.
+        :type lons: Numpy Array
+        :param cache_dir: The directory in which rendered tiles are stored.
+        :type cache_dir: string
+        :param cmap: Optional string or matplotlib.colors.LinearSegmentedColormap
+            instance denoting the colormap.
+        :type cmap: string or LinearSegmentedColormap object
+        :param clevs: Optional color levels values.
+        :type clevs: List of ints or floats
+        :param nlevs: Optional target number of color levels if clevs is None.
+        :type nlevs: int
+        :param tile_size: Optional width and height of the tiles in pixels.
+        :type tile_size: int
+
+        :raises ValueError: If lats or lons are not 1D arrays.
+        '''
+        if lats.ndim != 1 or lons.ndim != 1:
+            raise ValueError('Map tiles can only be drawn from 1D lats and lons')
+
+        if dataset.ndim == 2:
+            dataset = dataset.reshape(1, *dataset.shape)
+
+        if clevs is None:
+            clevs = _nice_intervals(dataset, nlevs)
+
+        self.dataset = dataset
+        self.lats = lats
+        self.lons = lons
+        self.cache_dir = cache_dir
+        self.cmap = cmap
+        self.clevs = clevs
+        self.tile_size = tile_size
+
+    def tile_path(self, zoom, x, y, index=0):
+        '''Get the path of a tile, rendering it if it isn't cached yet.
+
+        :param zoom: The tile zoom level.
+        :type zoom: int
+        :param x: The tile column.
+        :type x: int
+        :param y: The tile row, counted from the north.
+        :type y: int
+        :param index: Optional index of the field to draw along the first
+            axis of a 3D dataset.
+        :type index: int
+
+        :returns: The path to the PNG tile.
+        :rtype: string
+
+        :raises ValueError: If the tile is outside of the map.
+        '''
+        tile_dir = os.path.join(self.cache_dir, str(index), str(zoom), str(x))
+        path = os.path.join(tile_dir, '%d.png' % y)
+        if os.path.exists(path):
+            return path
+
+        if not os.path.isdir(tile_dir):
+            try:
+                os.makedirs(tile_dir)
+            except OSError:
+                # Another request may have created the directory meanwhile
+                if not os.path.isdir(tile_dir):
+                    raise
+
+        # Draw into a temporary file first so concurrent requests never
+        # serve a partially written tile.
+        fd, tmp_path = mkstemp(suffix='.png', dir=tile_dir)
+        os.close(fd)
+        try:
+            draw_map_tile(self.dataset[index], self.lats, self.lons, zoom, x, y,
+                          tmp_path, self.clevs, cmap=self.cmap,
+                          tile_size=self.tile_size)
+            os.rename(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return path
+
 class TaylorDiagram(object):
     """ Taylor diagram helper class
 
@@ -171,6 +171,12 @@ class TestNormalizeDatasetDatetimes(unittest.TestCase):
         # Check that all the days have been shifted to the first of the month
         self.assertTrue(all(x.day == 1 for x in new_ds.times))
 
+    def test_hourly(self):
+        new_ds = dp.normalize_dataset_datetimes(self.daily_dataset, 'hourly')
+
+        # Check that the times are left as they are
+        np.testing.assert_array_equal(new_ds.times, self.daily_dataset.times)
+
 class TestSubset(unittest.TestCase):
     def setUp(self):
         self.target_dataset = ten_year_monthly_dataset()
@@ -335,6 +341,68 @@ class TestFailingSubset(unittest.TestCase):
         with self.assertRaises(ValueError):
             dp.subset(self.subregion, self.target_dataset)
 
+class TestRegionMeans(unittest.TestCase):
+    def setUp(self):
+        lats = np.array(range(-10, 11, 2))
+        lons = np.array(range(0, 21, 2))
+        times = np.array([datetime.datetime(2000, month, 1)
+                          for month in range(1, 4)])
+        values = np.arange(3 * len(lats) * len(lons), dtype=float)
+        values = values.reshape(len(times), len(lats), len(lons))
+        self.target_dataset = ds.Dataset(lats, lons, times, values,
+                                         variable="test variable name")
+        self.lons, self.lats = np.meshgrid(lons, lats)
+        self.bounds = ds.Bounds(-4, 4, 6, 12,
+                                datetime.datetime(2000, 1, 1),
+                                datetime.datetime(2000, 3, 1))
+
+    def area_mean(self, values, inside):
+        weights = np.cos(np.radians(self.lats)) * inside
+        weights = np.resize(weights, values.shape)
+        return ma.average(values.reshape(len(values), -1),
+                          weights=weights.reshape(len(values), -1), axis=1)
+
+    def test_bounds_and_mask(self):
+        inside = ((self.lats >= -4) & (self.lats <= 4) &
+                  (self.lons >= 6) & (self.lons <= 12))
+        means = dp.region_means(self.target_dataset, [self.bounds, ~inside])
+        expected = self.area_mean(self.target_dataset.values, inside)
+
+        self.assertEqual(means.shape, (2, 3))
+        np.testing.assert_array_almost_equal(means[0], expected)
+        np.testing.assert_array_almost_equal(means[1], expected)
+
+    def test_polygon(self):
+        triangle = [(-11, -1), (12, -1), (-11, 22)]
+        means = dp.region_means(self.target_dataset, [triangle])
+        inside = self.lats + self.lons <= 10
+        np.testing.assert_array_almost_equal(
+            means[0], self.area_mean(self.target_dataset.values, inside))
+
+    def test_missing_values(self):
+        values = ma.array(self.target_dataset.values)
+        values[0, 5, 5] = ma.masked
+        values[1] = ma.masked
+        self.target_dataset.values = values
+        weights = dp.region_weights([self.bounds],
+                                    self.target_dataset.lats,
+                                    self.target_dataset.lons)
+        means = dp.region_means(self.target_dataset, weights)
+
+        inside = ((self.lats >= -4) & (self.lats <= 4) &
+                  (self.lons >= 6) & (self.lons <= 12))
+        self.assertAlmostEqual(means[0, 0],
+                               self.area_mean(values, inside)[0])
+        self.assertTrue(means.mask[0, 1])
+        self.assertFalse(means.mask[0, 2])
+
+    def test_invalid_subregion(self):
+        self.assertRaises(ValueError, dp.region_weights, [np.zeros((2, 2), dtype=bool)],
+                          self.target_dataset.lats, self.target_dataset.lons)
+        self.assertRaises(ValueError, dp.region_weights, ['Africa'],
+                          self.target_dataset.lats, self.target_dataset.lons)
+
+
 class TestNetCDFWrite(unittest.TestCase):
     def setUp(self):
         self.ds = ten_year_monthly_dataset()
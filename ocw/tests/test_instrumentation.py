@@ -0,0 +1,134 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+
+'''Unit tests for the instrumentation.py module.'''
+
+import os
+import json
+import tempfile
+import unittest
+
+import numpy as np
+
+import ocw.instrumentation as instrumentation
+
+
+class RecordingSink(object):
+    def __init__(self):
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@instrumentation.instrument()
+def _double(values):
+    return values * 2
+
+
+class TestSpan(unittest.TestCase):
+    def setUp(self):
+        self.sink = RecordingSink()
+        instrumentation.add_sink(self.sink)
+
+    def tearDown(self):
+        instrumentation.clear_sinks()
+
+    def test_span_record(self):
+        with instrumentation.span('outer', run=1):
+            pass
+
+        record = self.sink.records[0]
+        self.assertEqual(record['name'], 'outer')
+        self.assertEqual(record['run'], 1)
+        self.assertEqual(record['depth'], 0)
+        self.assertIsNone(record['error'])
+        self.assertTrue(record['wall_time'] >= 0)
+
+    def test_nested_spans(self):
+        with instrumentation.span('outer'):
+            with instrumentation.span('inner'):
+                pass
+
+        inner, outer = self.sink.records
+        self.assertEqual(inner['parent'], 'outer')
+        self.assertEqual(inner['depth'], 1)
+        self.assertIsNone(outer['parent'])
+
+    def test_error_is_recorded(self):
+        def fail():
+            with instrumentation.span('failing'):
+                raise ValueError()
+
+        self.assertRaises(ValueError, fail)
+        self.assertEqual(self.sink.records[0]['error'], 'ValueError')
+
+    def test_decorator_array_sizes(self):
+        values = np.zeros(10)
+        np.testing.assert_array_equal(_double(values), values)
+
+        record = self.sink.records[0]
+        self.assertEqual(record['name'], __name__ + '._double')
+        self.assertEqual(record['input_bytes'], values.nbytes)
+        self.assertEqual(record['output_bytes'], values.nbytes)
+
+
+class TestDisabled(unittest.TestCase):
+    def test_null_span(self):
+        instrumentation.clear_sinks()
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertIs(instrumentation.span('a'), instrumentation.span('b'))
+
+    def test_decorator_passthrough(self):
+        instrumentation.clear_sinks()
+        self.assertEqual(_double(2), 4)
+
+
+class TestSinks(unittest.TestCase):
+    def tearDown(self):
+        instrumentation.clear_sinks()
+
+    def test_summary_sink(self):
+        summary = instrumentation.SummarySink()
+        instrumentation.add_sink(summary)
+        for _ in range(3):
+            _double(np.zeros(4))
+
+        total = summary.totals[__name__ + '._double']
+        self.assertEqual(total['count'], 3)
+        self.assertEqual(total['output_bytes'], 3 * np.zeros(4).nbytes)
+        self.assertIn(__name__ + '._double', summary.report())
+
+    def test_json_lines_sink(self):
+        handle, path = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            instrumentation.add_sink(instrumentation.JSONLinesSink(path))
+            with instrumentation.span('first'):
+                pass
+            with instrumentation.span('second'):
+                pass
+
+            with open(path) as output:
+                names = [json.loads(line)['name'] for line in output]
+            self.assertEqual(names, ['first', 'second'])
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
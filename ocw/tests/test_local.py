@@ -25,6 +25,7 @@ import datetime
 import inspect
 import test_local # Import test_local so we can use inspect to get the path 
 import ocw.data_source.local as local
+import ocw.dataset as ds
 
 
 class test_load_file(unittest.TestCase):
@@ -64,6 +65,66 @@ class test_load_file(unittest.TestCase):
         new_values = self.values[0,:,:,:]
         self.assertTrue(numpy.allclose(local.load_file(self.file_path, "value").values, new_values))
 
+class test_load_multiple_files(unittest.TestCase):
+
+    def setUp(self):
+        self.file_paths = [create_monthly_netcdf_object(year) for year in (2002, 2001)]
+
+    def tearDown(self):
+        for file_path in self.file_paths:
+            os.remove(file_path)
+
+    def test_function_load_multiple_files_times(self):
+        '''To test load_multiple_files orders the files by time'''
+        dataset = local.load_multiple_files(self.file_paths, "value")
+        new_times = [datetime.datetime(year, month, 1)
+                     for year in (2001, 2002) for month in range(1, 13)]
+        self.assertEqual(list(dataset.times), new_times)
+
+    def test_function_load_multiple_files_values(self):
+        '''To test load_multiple_files for values'''
+        dataset = local.load_multiple_files('/tmp/temporaryMonthlyNetcdf*.nc', "value")
+        new_values = numpy.concatenate([
+            local.load_file(file_path, "value").values
+            for file_path in self.file_paths[::-1]
+        ])
+        self.assertTrue(numpy.allclose(dataset.values, new_values))
+
+    def test_function_load_multiple_files_subregion(self):
+        '''To test load_multiple_files only loads the subregion'''
+        subregion = ds.Bounds(1, 3, -159, -157,
+                              datetime.datetime(2001, 11, 1),
+                              datetime.datetime(2002, 2, 1))
+        dataset = local.load_multiple_files(self.file_paths, "value", subregion)
+        self.assertItemsEqual(dataset.lats, [1, 2, 3])
+        self.assertItemsEqual(dataset.lons, [-159, -158, -157])
+        self.assertEqual(dataset.times[0], datetime.datetime(2001, 11, 1))
+        self.assertEqual(dataset.times[-1], datetime.datetime(2002, 2, 1))
+
+        full_dataset = local.load_multiple_files(self.file_paths, "value")
+        self.assertTrue(numpy.allclose(dataset.values,
+                                       full_dataset.values[10:14, 1:4, 1:4]))
+
+    def test_function_load_multiple_files_grid_mismatch(self):
+        '''To test load_multiple_files rejects files on different grids'''
+        self.file_paths.append(create_monthly_netcdf_object(2003, lat_offset=10))
+        with self.assertRaises(ValueError):
+            local.load_multiple_files(self.file_paths, "value")
+
+    def test_function_load_multiple_files_curvilinear_grid(self):
+        '''To test load_multiple_files rejects files with 2D lats and lons'''
+        file_path = create_curvilinear_netcdf_object()
+        try:
+            with self.assertRaisesRegexp(ValueError, "rectilinear grids"):
+                local.load_multiple_files([file_path], "value")
+        finally:
+            os.remove(file_path)
+
+    def test_function_load_multiple_files_no_files(self):
+        '''To test load_multiple_files when no files match'''
+        with self.assertRaises(ValueError):
+            local.load_multiple_files('/tmp/noSuchNetcdf*.nc', "value")
+
 class test_get_netcdf_variable_names(unittest.TestCase):
     file_path = "http://zipper.jpl.nasa.gov/dist/"
     test_model = "AFRICA_KNMI-RACMO2.2b_CTL_ERAINT_MM_50km_1989-2008_tasmax.nc"
@@ -181,5 +242,43 @@ def create_invalid_dimensions_netcdf_object():
         return file_path
 
 
+def create_monthly_netcdf_object(year, lat_offset=0):
+        #To create a temporary netCDF file with a year of monthly data
+        file_path = '/tmp/temporaryMonthlyNetcdf%d.nc' % year
+        netCDF_file = netCDF4.Dataset(file_path, 'w',  format='NETCDF4')
+        netCDF_file.createDimension('lat_dim', 5)
+        netCDF_file.createDimension('lon_dim', 5)
+        netCDF_file.createDimension('time_dim', 12)
+        latitudes = netCDF_file.createVariable('latitude', 'd', ('lat_dim',))
+        longitudes = netCDF_file.createVariable('longitude', 'd', ('lon_dim',))
+        times = netCDF_file.createVariable('time', 'd', ('time_dim',))
+        values = netCDF_file.createVariable('value', 'd', ('time_dim', 'lat_dim', 'lon_dim'))
+        latitudes[:] = numpy.arange(0, 5) + lat_offset
+        longitudes[:] = numpy.arange(200, 205)
+        times[:] = numpy.arange(12)
+        values[:] = numpy.arange(300).reshape(12, 5, 5) + year
+        netCDF_file.variables['time'].units = 'months since %d-01-01 00:00:00' % year
+        netCDF_file.close()
+        return file_path
+
+def create_curvilinear_netcdf_object():
+        #To create a temporary netCDF file with 2D latitudes and longitudes
+        file_path = '/tmp/temporaryCurvilinearNetcdf.nc'
+        netCDF_file = netCDF4.Dataset(file_path, 'w',  format='NETCDF4')
+        netCDF_file.createDimension('y', 5)
+        netCDF_file.createDimension('x', 5)
+        netCDF_file.createDimension('time_dim', 12)
+        latitudes = netCDF_file.createVariable('latitude', 'd', ('y', 'x'))
+        longitudes = netCDF_file.createVariable('longitude', 'd', ('y', 'x'))
+        times = netCDF_file.createVariable('time', 'd', ('time_dim',))
+        values = netCDF_file.createVariable('value', 'd', ('time_dim', 'y', 'x'))
+        longitudes[:], latitudes[:] = numpy.meshgrid(numpy.arange(200, 205),
+                                                     numpy.arange(0, 5))
+        times[:] = numpy.arange(12)
+        values[:] = numpy.arange(300).reshape(12, 5, 5)
+        netCDF_file.variables['time'].units = 'months since 2001-01-01 00:00:00'
+        netCDF_file.close()
+        return file_path
+
 if __name__ == '__main__':
     unittest.main()
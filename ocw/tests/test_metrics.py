@@ -24,7 +24,9 @@ from ocw.dataset import Dataset
 import ocw.metrics as metrics
 
 import numpy as np
+import numpy.ma as ma
 import numpy.testing as npt
+from scipy import stats
 
 class TestBias(unittest.TestCase):
     '''Test the metrics.Bias metric.'''
@@ -132,6 +134,218 @@ class TestPatternCorrelation(unittest.TestCase):
         self.assertEqual(pattern, 1.0)
 
 
+class TestTemporalCorrelation(unittest.TestCase):
+    '''Test the metrics.TemporalCorrelation metric.'''
+    def setUp(self):
+        self.temporal_correlation = metrics.TemporalCorrelation()
+        self.ref_dataset = Dataset(
+            np.array([1., 2., 3.]),
+            np.array([1., 2., 3., 4.]),
+            np.array([dt.datetime(2000, x, 1) for x in range(1, 13)]),
+            np.random.RandomState(1).randn(12, 3, 4),
+            'ds1'
+        )
+        self.tar_dataset = Dataset(
+            np.array([1., 2., 3.]),
+            np.array([1., 2., 3., 4.]),
+            np.array([dt.datetime(2000, x, 1) for x in range(1, 13)]),
+            np.random.RandomState(2).randn(12, 3, 4),
+            'ds2'
+        )
+
+    def test_identical_inputs(self):
+        coefficients, levels = self.temporal_correlation.run(self.ref_dataset,
+                                                             self.ref_dataset)
+        npt.assert_array_almost_equal(coefficients, np.ones((3, 4)))
+        npt.assert_array_almost_equal(levels, np.ones((3, 4)))
+
+    def test_matches_pearsonr(self):
+        coefficients, levels = self.temporal_correlation.run(self.ref_dataset,
+                                                             self.tar_dataset)
+        for iy in range(3):
+            for ix in range(4):
+                r, p = stats.pearsonr(self.ref_dataset.values[:, iy, ix],
+                                      self.tar_dataset.values[:, iy, ix])
+                self.assertAlmostEqual(coefficients[iy, ix], r)
+                self.assertAlmostEqual(levels[iy, ix], 1 - p)
+
+    def test_masked_values(self):
+        values = ma.array(self.tar_dataset.values)
+        # Mostly missing, constant and partially missing grid points
+        values[:10, 0, 0] = ma.masked
+        values[:, 1, 1] = 5.
+        values[:3, 2, 2] = ma.masked
+        self.tar_dataset.values = values
+
+        coefficients, levels = self.temporal_correlation.run(self.ref_dataset,
+                                                             self.tar_dataset)
+        self.assertTrue(coefficients.mask[0, 0])
+        self.assertTrue(levels.mask[1, 1])
+        self.assertEqual(coefficients.mask.sum(), 2)
+
+        r, p = stats.pearsonr(self.ref_dataset.values[3:, 2, 2],
+                              self.tar_dataset.values[3:, 2, 2])
+        self.assertAlmostEqual(coefficients[2, 2], r)
+        self.assertAlmostEqual(levels[2, 2], 1 - p)
+
+
+class TestBootstrapConfidenceInterval(unittest.TestCase):
+    '''Test the metrics.BootstrapConfidenceInterval metric.'''
+    def setUp(self):
+        times = np.array([dt.datetime(2000, x, 1) for x in range(1, 13)])
+        self.ref_dataset = Dataset(
+            np.array([1., 2., 3.]),
+            np.array([1., 2., 3., 4.]),
+            times,
+            np.random.RandomState(4).randn(12, 3, 4) + 5,
+            'ds1'
+        )
+        self.tar_dataset = Dataset(
+            np.array([1., 2., 3.]),
+            np.array([1., 2., 3., 4.]),
+            times,
+            np.random.RandomState(5).randn(12, 3, 4),
+            'ds2'
+        )
+
+    def test_function_run(self):
+        confidence_interval = metrics.BootstrapConfidenceInterval(
+            num_replicates=200, block_length=3, seed=1)
+        lower, upper = confidence_interval.run(self.ref_dataset, self.tar_dataset)
+        mean_bias = metrics.MeanBias().run(self.ref_dataset, self.tar_dataset)
+
+        self.assertEqual(lower.shape, (3, 4))
+        self.assertTrue((lower <= mean_bias).all())
+        self.assertTrue((mean_bias <= upper).all())
+
+    def test_processes(self):
+        serial = metrics.BootstrapConfidenceInterval(
+            statistic='rmse', num_replicates=50, seed=1, batch_size=20)
+        parallel = metrics.BootstrapConfidenceInterval(
+            statistic='rmse', num_replicates=50, seed=1, batch_size=20,
+            processes=2)
+        for serial_bound, parallel_bound in zip(
+                serial.run(self.ref_dataset, self.tar_dataset),
+                parallel.run(self.ref_dataset, self.tar_dataset)):
+            npt.assert_array_almost_equal(serial_bound, parallel_bound)
+
+
+class TestPdfSkillScore(unittest.TestCase):
+    '''Test the metrics.PdfSkillScore metric.'''
+    def setUp(self):
+        self.bins = np.linspace(0, 10, 11)
+        random = np.random.RandomState(3)
+        times = np.array([dt.datetime(2000, 1, x) for x in range(1, 31)])
+        self.ref_dataset = Dataset(
+            np.array([1., 2., 3.]),
+            np.array([1., 2., 3., 4.]),
+            times,
+            ma.array(random.uniform(0, 10, (30, 3, 4))),
+            'ds1'
+        )
+        self.tar_dataset = Dataset(
+            np.array([1., 2., 3.]),
+            np.array([1., 2., 3., 4.]),
+            times,
+            random.uniform(2, 12, (30, 3, 4)),
+            'ds2'
+        )
+
+    def expected_score(self, ref_values, tar_values):
+        ref_counts = np.histogram(ref_values, self.bins)[0]
+        tar_counts = np.histogram(tar_values, self.bins)[0]
+        return np.minimum(ref_counts / float(ref_counts.sum()),
+                          tar_counts / float(tar_counts.sum())).sum()
+
+    def test_identical_inputs(self):
+        scores = metrics.PdfSkillScore(self.bins).run(self.ref_dataset,
+                                                      self.ref_dataset)
+        npt.assert_array_almost_equal(scores, np.ones((3, 4)))
+
+    def test_function_run(self):
+        self.ref_dataset.values[:10, 0, 0] = ma.masked
+        self.ref_dataset.values[:, 2, 3] = ma.masked
+        scores = metrics.PdfSkillScore(self.bins, chunk_size=7).run(
+            self.ref_dataset, self.tar_dataset)
+
+        self.assertTrue(scores.mask[2, 3])
+        self.assertAlmostEqual(
+            scores[0, 0],
+            self.expected_score(self.ref_dataset.values[10:, 0, 0],
+                                self.tar_dataset.values[:, 0, 0]))
+        self.assertAlmostEqual(
+            scores[1, 2],
+            self.expected_score(self.ref_dataset.values[:, 1, 2],
+                                self.tar_dataset.values[:, 1, 2]))
+
+    def test_subregions(self):
+        pdf_skill_score = metrics.PdfSkillScore(self.bins, subregions=[
+            np.array([[False] * 4] + [[True] * 4] * 2)
+        ])
+        scores = pdf_skill_score.run(self.ref_dataset, self.tar_dataset)
+        self.assertEqual(scores.shape, (1,))
+        self.assertAlmostEqual(
+            scores[0],
+            self.expected_score(self.ref_dataset.values[:, 0],
+                                self.tar_dataset.values[:, 0]))
+
+    def test_score_subregions(self):
+        pdf_skill_score = metrics.PdfSkillScore(self.bins, subregions=[
+            np.array([[False] * 4] + [[True] * 4] * 2)
+        ])
+        scores = pdf_skill_score.score(
+            pdf_skill_score.histogram(self.ref_dataset.values),
+            pdf_skill_score.histogram(self.tar_dataset.values),
+            self.ref_dataset.lats, self.ref_dataset.lons)
+        self.assertEqual(scores.shape, (1,))
+        self.assertAlmostEqual(
+            scores[0],
+            self.expected_score(self.ref_dataset.values[:, 0],
+                                self.tar_dataset.values[:, 0]))
+
+    def test_score_subregions_without_grid(self):
+        pdf_skill_score = metrics.PdfSkillScore(self.bins, subregions=[
+            np.array([[False] * 4] + [[True] * 4] * 2)
+        ])
+        histogram = pdf_skill_score.histogram(self.ref_dataset.values)
+        self.assertRaises(ValueError, pdf_skill_score.score,
+                          histogram, histogram)
+
+    def test_reference_histogram_cached(self):
+        pdf_skill_score = metrics.PdfSkillScore(self.bins)
+        pdf_skill_score.run(self.ref_dataset, self.tar_dataset)
+        ref_histogram = pdf_skill_score._ref_histogram
+        pdf_skill_score.run(self.ref_dataset, self.ref_dataset)
+        self.assertIs(pdf_skill_score._ref_histogram, ref_histogram)
+
+
+class TestHistogramAccumulator(unittest.TestCase):
+    '''Test the metrics.HistogramAccumulator class.'''
+    def setUp(self):
+        self.bins = np.array([0., 1., 2., 3.])
+        self.values = np.array([0., 0.5, 1., 2.5, 3., 3.5, -1.]).reshape(7, 1, 1)
+
+    def test_update(self):
+        histogram = metrics.HistogramAccumulator(self.bins)
+        histogram.update(self.values)
+        npt.assert_array_equal(histogram.counts.ravel(), [2, 1, 2])
+
+    def test_merge(self):
+        histogram = metrics.HistogramAccumulator(self.bins)
+        histogram.update(self.values[:3])
+        other = metrics.HistogramAccumulator(self.bins)
+        other.update(self.values[3:])
+        histogram.merge(other)
+        npt.assert_array_equal(histogram.counts.ravel(), [2, 1, 2])
+        npt.assert_array_almost_equal(histogram.frequencies().ravel(),
+                                      [0.4, 0.2, 0.4])
+
+    def test_merge_different_bins(self):
+        histogram = metrics.HistogramAccumulator(self.bins)
+        other = metrics.HistogramAccumulator(self.bins * 2)
+        self.assertRaises(ValueError, histogram.merge, other)
+
+
 class TestMeanBias(unittest.TestCase):
     '''Test the metrics.MeanBias metric.'''
     def setUp(self):
@@ -17,10 +17,74 @@
 
 '''Unit tests for the plotter.py module'''
 
+import os
+import shutil
+import tempfile
 import unittest
 
+import numpy as np
+import numpy.ma as ma
+
+import ocw.plotter as plotter
+
 class TestPlotter(unittest.TestCase):
     pass
 
+class TestTilePixelCenters(unittest.TestCase):
+    def test_zoom_zero_covers_world(self):
+        lats, lons = plotter._tile_pixel_centers(0, 0, 0, 4)
+        np.testing.assert_array_almost_equal(lons, [-135, -45, 45, 135])
+        self.assertTrue(lats[0] > 0 > lats[-1])
+        self.assertAlmostEqual(lats[0], -lats[-1])
+
+    def test_invalid_tile(self):
+        self.assertRaises(ValueError, plotter._tile_pixel_centers, 1, 2, 0, 4)
+
+class TestNearestGridIndex(unittest.TestCase):
+    def test_nearest_index(self):
+        grid = np.array([0., 1., 2., 3.])
+        points = np.array([-.4, .6, 2.4, 3.6])
+        index, inside = plotter._nearest_grid_index(grid, points)
+        np.testing.assert_array_equal(index[inside], [0, 1, 2])
+        np.testing.assert_array_equal(inside, [True, True, True, False])
+
+class TestMapTileRenderer(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.lats = np.arange(-45, 46, 1.)
+        self.lons = np.arange(-90, 91, 1.)
+        values = np.arange(self.lats.size * self.lons.size, dtype=float)
+        values = ma.masked_less(values.reshape(self.lats.size, self.lons.size), 10)
+        self.renderer = plotter.MapTileRenderer(values, self.lats, self.lons,
+                                                self.cache_dir, tile_size=16)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_tile_is_cached(self):
+        path = self.renderer.tile_path(1, 0, 0)
+        self.assertTrue(os.path.exists(path))
+        os.utime(path, (0, 0))
+        self.assertEqual(self.renderer.tile_path(1, 0, 0), path)
+        self.assertEqual(os.path.getmtime(path), 0)
+
+    def test_shared_color_levels(self):
+        clevs = self.renderer.clevs
+        self.renderer.tile_path(2, 1, 1)
+        self.renderer.tile_path(3, 3, 3)
+        self.assertIs(self.renderer.clevs, clevs)
+
+    def test_outside_of_grid_is_transparent(self):
+        path = self.renderer.tile_path(2, 3, 0)
+        image = plotter.plt.imread(path)
+        self.assertEqual(image.shape, (16, 16, 4))
+        self.assertTrue((image[..., 3] == 0).all())
+
+    def test_invalid_dimensions(self):
+        lats = np.meshgrid(self.lats, self.lons)[1]
+        self.assertRaises(ValueError, plotter.MapTileRenderer,
+                          self.renderer.dataset, lats, self.lons,
+                          self.cache_dir)
+
 if __name__  == '__main__':
     unittest.main()
\ No newline at end of file
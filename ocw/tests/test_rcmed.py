@@ -68,7 +68,8 @@ class test_rcmed(unittest.TestCase, CustomAssertions):
         self.param_metadata_output = pickle.load(meta_file)
 
 
-    def return_text(self, url):
+    def return_text(self, url, timeout=None):
+        self.timeout = timeout
         if url == self.url + "datasetId={0}&parameterId={1}&latMin={2}&latMax={3}&lonMin={4}&lonMax={5}&timeStart=20020801T0000Z&timeEnd=20021031T0000Z"\
                 .format(self.dataset_id, self.parameter_id, self.min_lat, self.max_lat, self.min_lon, self.max_lon, self.start_time_for_url, self.end_time_for_url):
             return open(os.path.join(self.file_path, "parameter_dataset_text.txt"))
@@ -103,5 +104,24 @@ class test_rcmed(unittest.TestCase, CustomAssertions):
         self.assert1DArraysEqual(rcmed.parameter_dataset(self.dataset_id, self.parameter_id, self.min_lat, self.max_lat, self.min_lon, self.max_lon, self.start_time, self.end_time).values.flatten(), self.values.flatten())
 
 
+    def test_function_parameter_dataset_progress(self):
+        rcmed.urllib2.urlopen = self.return_text
+        progress = []
+        dataset = rcmed.parameter_dataset(self.dataset_id, self.parameter_id, self.min_lat, self.max_lat, self.min_lon, self.max_lon, self.start_time, self.end_time,
+                                          progress_callback=lambda read, total: progress.append(read))
+        self.assert1DArraysEqual(dataset.values.flatten(), self.values.flatten())
+        file_size = os.path.getsize(os.path.join(self.file_path, "parameter_dataset_text.txt"))
+        self.assertEqual(progress[0], 0)
+        self.assertEqual(progress[-1], file_size)
+        self.assertEqual(progress, sorted(progress))
+
+
+    def test_function_parameter_dataset_timeout(self):
+        rcmed.urllib2.urlopen = self.return_text
+        rcmed.parameter_dataset(self.dataset_id, self.parameter_id, self.min_lat, self.max_lat, self.min_lon, self.max_lon, self.start_time, self.end_time,
+                                timeout=5)
+        self.assertEqual(self.timeout, 5)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -86,6 +86,110 @@ class TestBaseTimeStringParse(unittest.TestCase):
             'this string is not valid'
         )
 
+class TestDecodeTimeOffsets(unittest.TestCase):
+    def setUp(self):
+        self.base = datetime.datetime(1988, 1, 31, 6, 30)
+
+    def test_fixed_length_units(self):
+        offsets = np.array([0, 1.5, 36])
+        times = utils.decode_time_offsets(offsets, 'hours', self.base)
+        expected = [self.base + datetime.timedelta(hours=x) for x in offsets]
+
+        self.assertEquals(times, expected)
+
+    def test_months_clip_day_of_month(self):
+        offsets = np.arange(-13, 14)
+        times = utils.decode_time_offsets(offsets, 'months', self.base)
+        expected = [self.base + relativedelta(months=x) for x in offsets]
+
+        self.assertEquals(times, expected)
+
+    def test_years(self):
+        times = utils.decode_time_offsets(np.array([0, 2]), 'years', self.base)
+
+        self.assertEquals(times[1], datetime.datetime(1990, 1, 31, 6, 30))
+
+    def test_invalid_units(self):
+        self.assertRaises(
+            ValueError,
+            utils.decode_time_offsets,
+            np.arange(3),
+            'fortnights',
+            self.base
+        )
+
+class TestGroupTimes(unittest.TestCase):
+    def setUp(self):
+        self.times = [datetime.datetime(1999, 12, 31, 18) + datetime.timedelta(hours=6 * x)
+                      for x in range(8)]
+
+    def test_daily_groups(self):
+        new_times, indices = utils.group_times(self.times, 'daily')
+
+        self.assertEquals(new_times, [datetime.datetime(1999, 12, 31),
+                                      datetime.datetime(2000, 1, 1),
+                                      datetime.datetime(2000, 1, 2)])
+        np.testing.assert_array_equal(indices, [0, 1, 1, 1, 1, 2, 2, 2])
+
+    def test_annual_groups(self):
+        new_times, indices = utils.group_times(self.times[::-1], 'annual')
+
+        self.assertEquals(new_times, [datetime.datetime(1999, 1, 1),
+                                      datetime.datetime(2000, 1, 1)])
+        np.testing.assert_array_equal(indices, [1, 1, 1, 1, 1, 1, 1, 0])
+
+    def test_full_group(self):
+        new_times, indices = utils.group_times(self.times, 'full')
+
+        self.assertEquals(new_times, [datetime.datetime(2000, 1, 1)])
+        np.testing.assert_array_equal(indices, np.zeros(8))
+
+    def test_invalid_unit(self):
+        self.assertRaises(ValueError, utils.group_times, self.times, 'pentad')
+
+class TestCalcTimeUnitMeans(unittest.TestCase):
+    def setUp(self):
+        self.values = np.ma.arange(16.).reshape(8, 2)
+        self.indices = np.array([0, 0, 0, 0, 1, 1, 1, 1])
+
+    def test_means(self):
+        means = utils.calc_time_unit_means(self.values, self.indices)
+
+        np.testing.assert_array_equal(means, [[3, 4], [11, 12]])
+
+    def test_unordered_groups(self):
+        means = utils.calc_time_unit_means(self.values[::-1], self.indices)
+
+        np.testing.assert_array_equal(means, [[11, 12], [3, 4]])
+
+    def test_missing_values_ignored(self):
+        self.values[:3, 0] = np.ma.masked
+        means = utils.calc_time_unit_means(self.values, self.indices)
+
+        self.assertEquals(means[0, 0], 6)
+        self.assertFalse(means.mask.any())
+
+    def test_threshold_masks_means(self):
+        self.values[:4, 0] = np.ma.masked
+        self.values[4:7, 1] = np.ma.masked
+        means = utils.calc_time_unit_means(self.values, self.indices,
+                                           threshold=0.5)
+
+        np.testing.assert_array_equal(means.mask, [[True, False], [False, True]])
+
+class TestTimeSelectionIndices(unittest.TestCase):
+    def test_selection(self):
+        times = [datetime.datetime(2000, 1, x) for x in range(1, 31)]
+        selected = times[10:15] + [datetime.datetime(2001, 1, 1)] + times[:2]
+        indices = utils.time_selection_indices(times, selected)
+
+        np.testing.assert_array_equal(indices, [0, 1, 10, 11, 12, 13, 14])
+
+    def test_empty_selection(self):
+        times = [datetime.datetime(2000, 1, x) for x in range(1, 31)]
+
+        self.assertEquals(len(utils.time_selection_indices(times, [])), 0)
+
 class TestNormalizeLatLonValues(unittest.TestCase):
     def setUp(self):
         times = np.array([datetime.datetime(2000, x, 1) for x in range(1, 13)])
@@ -196,5 +300,84 @@ class TestCalcClimatologyYear(unittest.TestCase):
         np.testing.assert_array_equal(
             utils.calc_climatology_year(self.test_dataset)[1], total_mean)
 
+class TestBlockBootstrapIndices(unittest.TestCase):
+    ''' Testing function 'block_bootstrap_indices' from ocw.utils.py '''
+
+    def test_blocks_are_consecutive(self):
+        indices = utils.block_bootstrap_indices(10, 5, block_length=3, seed=1)
+        self.assertEqual(indices.shape, (5, 10))
+        self.assertTrue((indices >= 0).all() and (indices < 10).all())
+        for block_start in (0, 3, 6):
+            np.testing.assert_array_equal(
+                np.diff(indices[:, block_start:block_start + 3]), 1)
+
+    def test_seed(self):
+        np.testing.assert_array_equal(
+            utils.block_bootstrap_indices(10, 5, block_length=2, seed=7),
+            utils.block_bootstrap_indices(10, 5, block_length=2, seed=7))
+
+    def test_invalid_block_length(self):
+        self.assertRaises(ValueError, utils.block_bootstrap_indices, 10, 5, 11)
+
+class TestCalcBootstrapConfidenceInterval(unittest.TestCase):
+    ''' Testing function 'calc_bootstrap_confidence_interval' from ocw.utils.py '''
+
+    def setUp(self):
+        random = np.random.RandomState(5)
+        self.ref_values = random.normal(1, 1, (40, 2, 3))
+        self.target_values = random.normal(0, 1, (40, 2, 3))
+
+    def test_bias(self):
+        lower, upper = utils.calc_bootstrap_confidence_interval(
+            self.ref_values, self.target_values, num_replicates=200,
+            block_length=4, seed=2, batch_size=30)
+
+        indices = utils.block_bootstrap_indices(40, 200, 4, seed=2)
+        diff = self.ref_values - self.target_values
+        replicates = diff[indices].mean(axis=1)
+        np.testing.assert_array_almost_equal(
+            lower, np.percentile(replicates, 2.5, axis=0))
+        np.testing.assert_array_almost_equal(
+            upper, np.percentile(replicates, 97.5, axis=0))
+
+    def test_rmse_with_missing_values(self):
+        ref_values = np.ma.array(self.ref_values)
+        ref_values[:, 0, 0] = np.ma.masked
+        lower, upper = utils.calc_bootstrap_confidence_interval(
+            ref_values, self.target_values, statistic='rmse',
+            num_replicates=100, seed=3)
+
+        self.assertTrue(lower.mask[0, 0] and upper.mask[0, 0])
+        self.assertTrue((lower[0, 1:] <= upper[0, 1:]).all())
+        self.assertTrue((lower[0, 1:] > 0).all())
+
+    def test_grid_blocks(self):
+        lower, upper = utils.calc_bootstrap_confidence_interval(
+            self.ref_values, self.target_values, num_replicates=50, seed=4)
+        block_lower, block_upper = utils.calc_bootstrap_confidence_interval(
+            self.ref_values, self.target_values, num_replicates=50, seed=4,
+            grid_block_size=4)
+        np.testing.assert_array_almost_equal(block_lower, lower)
+        np.testing.assert_array_almost_equal(block_upper, upper)
+
+    def test_sparse_values(self):
+        ref_values = np.ma.array(self.ref_values)
+        ref_values[1:, 0, 1] = np.ma.masked
+        lower, upper = utils.calc_bootstrap_confidence_interval(
+            ref_values, self.target_values, num_replicates=200,
+            block_length=4, seed=2)
+
+        # Only the resamples that drew the first time step have a value.
+        indices = utils.block_bootstrap_indices(40, 200, 4, seed=2)
+        diff = ref_values[0, 0, 1] - self.target_values[0, 0, 1]
+        self.assertTrue((indices == 0).any(axis=1).any())
+        self.assertFalse(lower.mask[0, 1] or upper.mask[0, 1])
+        self.assertAlmostEqual(lower[0, 1], diff)
+        self.assertAlmostEqual(upper[0, 1], diff)
+
+    def test_invalid_statistic(self):
+        self.assertRaises(ValueError, utils.calc_bootstrap_confidence_interval,
+                          self.ref_values, self.target_values, 'mae')
+
 if __name__ == '__main__':
     unittest.main()
@@ -19,10 +19,12 @@
 
 import sys
 import datetime as dt
+import multiprocessing
 import numpy as np
+import numpy.ma as ma
 
+from scipy import stats
 from mpl_toolkits.basemap import shiftgrid
-from dateutil.relativedelta import relativedelta
 
 def decode_time_values(dataset, time_var_name):
     ''' Decode NetCDF time values into Python datetime objects.
@@ -44,19 +46,7 @@ def decode_time_values(dataset, time_var_name):
     time_units = parse_time_units(time_format)
     time_base = parse_time_base(time_format)
 
-    times = []
-    arg = {}
-    if time_units == 'months':
-        # datetime.timedelta doesn't support a 'months' option. To remedy
-        # this, a month == 30 days for our purposes.
-        for time_val in time_data:
-            times.append(time_base + relativedelta(months=int(time_val)))
-    else:
-        for time_val in time_data:
-            arg[time_units] = time_val
-            times.append(time_base + dt.timedelta(**arg))
-
-    return times
+    return decode_time_offsets(time_data[:], time_units, time_base)
 
 def parse_time_units(time_format):
     ''' Parse units value from time units string.
@@ -161,6 +151,191 @@ def parse_base_time_string(time_format):
 
     return time_format.split('since')[1].strip()
 
+# Length in microseconds of the fixed length time units.
+_TIME_UNIT_MICROSECONDS = {
+    'seconds': 10 ** 6,
+    'minutes': 60 * 10 ** 6,
+    'hours': 3600 * 10 ** 6,
+    'days': 86400 * 10 ** 6
+}
+
+# Datetime64 precision that truncates a time to the start of its time unit.
+_TIME_UNIT_PRECISIONS = {
+    'annual': 'datetime64[Y]',
+    'monthly': 'datetime64[M]',
+    'daily': 'datetime64[D]'
+}
+
+def decode_time_offsets(offsets, time_units, time_base):
+    ''' Convert numeric time offsets into Python datetime objects.
+
+    Months and years are calendar months and years. Whole units are added
+    and the day of the month is clipped to the length of the new month, so
+    January 31st plus one month is the last day of February.
+
+    :param offsets: The time values to convert, counted in time_units since
+        time_base.
+    :type offsets: Numpy array
+    :param time_units: The units of the offsets. One of seconds, minutes,
+        hours, days, months or years.
+    :type time_units: String
+    :param time_base: The time that the offsets are counted from.
+    :type time_base: datetime.datetime
+
+    :returns: The list of converted datetime values.
+
+    :raises ValueError: If time_units isn't one of the supported units.
+    '''
+    offsets = np.asarray(offsets)
+    base = np.datetime64(time_base, 'us')
+
+    if time_units in ('months', 'years'):
+        months = offsets.astype(np.int64)
+        if time_units == 'years':
+            months = months * 12
+
+        month_starts = base.astype('datetime64[M]') + months
+        first_days = month_starts.astype('datetime64[D]')
+        month_lengths = ((month_starts + 1).astype('datetime64[D]') -
+                         first_days).astype(np.int64)
+        days = np.minimum(time_base.day, month_lengths) - 1
+        time_of_day = base - base.astype('datetime64[D]')
+        times = first_days + days + time_of_day
+    elif time_units in _TIME_UNIT_MICROSECONDS:
+        steps = np.round(offsets * _TIME_UNIT_MICROSECONDS[time_units])
+        times = base + steps.astype('timedelta64[us]')
+    else:
+        cur_frame = sys._getframe().f_code
+        err = "{}.{}: Unsupported time units {}".format(
+            cur_frame.co_filename,
+            cur_frame.co_name,
+            time_units
+        )
+        raise ValueError(err)
+
+    return times.astype('datetime64[us]').tolist()
+
+def convert_to_datetime64(times):
+    ''' Convert a list of datetime objects to a datetime64 array.
+
+    :param times: The times to convert.
+    :type times: List or Numpy array of datetime.datetime objects
+
+    :returns: The times with microsecond precision.
+    :rtype: Numpy array of datetime64
+    '''
+    return np.asarray(times, dtype='datetime64[us]')
+
+def group_times(times, unit):
+    ''' Group times by the year, month or day that they fall in.
+
+    :param times: The times to group.
+    :type times: List or Numpy array of datetime.datetime objects
+    :param unit: The time unit to group on. One of full, annual, monthly or
+        daily. With full, all times form a single group.
+    :type unit: String
+
+    :returns: The datetime representing each group and the index of the
+        group that each time falls in. Groups are represented by the start
+        of their year, month or day, in ascending order. The full group is
+        represented by the start of the day half way through the time range.
+    :rtype: (List of datetime.datetime objects, Numpy array of ints)
+
+    :raises ValueError: If unit isn't one of the supported units.
+    '''
+    times = convert_to_datetime64(times)
+
+    if unit == 'full':
+        halfway = times[0] + (times[-1] - times[0]) // 2
+        halfway = halfway.astype('datetime64[D]').astype('datetime64[us]')
+        new_times = [halfway.tolist()]
+        group_indices = np.zeros(len(times), dtype=np.int64)
+    elif unit in _TIME_UNIT_PRECISIONS:
+        keys = times.astype(_TIME_UNIT_PRECISIONS[unit])
+        unique_keys, group_indices = np.unique(keys, return_inverse=True)
+        new_times = unique_keys.astype('datetime64[us]').tolist()
+    else:
+        cur_frame = sys._getframe().f_code
+        err = "{}.{}: Unsupported time unit {}".format(
+            cur_frame.co_filename,
+            cur_frame.co_name,
+            unit
+        )
+        raise ValueError(err)
+
+    return new_times, group_indices
+
+def calc_time_unit_means(values, group_indices, num_groups=None, threshold=None):
+    ''' Average values over groups of time steps.
+
+    Missing values are ignored. A mean is masked when all of the values
+    in its group are missing or, if threshold is given, when the proportion
+    of missing values in its group is above threshold.
+
+    :param values: The values to average. Time must be the first axis.
+    :type values: Numpy (masked) array
+    :param group_indices: The group of each time step, as returned by
+        group_times. Every group from 0 to num_groups - 1 must contain at
+        least one time step.
+    :type group_indices: Numpy array of ints
+    :param num_groups: (optional) The number of groups. Defaults to the
+        largest group index plus one.
+    :type num_groups: Integer
+    :param threshold: (optional) Proportion of missing values above which
+        a mean is masked.
+    :type threshold: Float
+
+    :returns: The mean of each group along the first axis.
+    :rtype: Numpy masked array
+    '''
+    group_indices = np.asarray(group_indices)
+    if num_groups is None:
+        num_groups = group_indices.max() + 1
+
+    # Sort the time steps by group (a no-op for ordered times) so that
+    # each group can be reduced as one contiguous block.
+    order = np.argsort(group_indices, kind='mergesort')
+    if np.any(order != np.arange(len(order))):
+        values = values[order]
+        group_indices = group_indices[order]
+    starts = np.searchsorted(group_indices, np.arange(num_groups))
+
+    valid = ~ma.getmaskarray(values)
+    filled = np.where(valid, ma.getdata(values), 0)
+    sums = np.add.reduceat(filled, starts, axis=0, dtype=np.float64)
+    counts = np.add.reduceat(valid, starts, axis=0, dtype=np.int64)
+    sizes = np.diff(np.append(starts, len(group_indices)))
+    sizes = sizes.reshape((-1,) + (1,) * (values.ndim - 1))
+
+    missing = counts == 0
+    if threshold is not None:
+        missing |= (sizes - counts) > sizes * threshold
+
+    means = sums / np.maximum(counts, 1)
+    means[missing] = 0.
+    return ma.masked_array(means, missing)
+
+def time_selection_indices(times, selected_times):
+    ''' Find the positions of a selection of times in a list of times.
+
+    :param times: The times to search.
+    :type times: List or Numpy array of datetime.datetime objects
+    :param selected_times: The times to find.
+    :type selected_times: List or Numpy array of datetime.datetime objects
+
+    :returns: The ascending indices into times of every time that is also
+        in selected_times.
+    :rtype: Numpy array of ints
+    '''
+    times = convert_to_datetime64(times)
+    selected_times = np.unique(convert_to_datetime64(selected_times))
+    if len(selected_times) == 0:
+        return np.array([], dtype=np.int64)
+
+    positions = np.searchsorted(selected_times, times)
+    positions = np.minimum(positions, len(selected_times) - 1)
+    return np.flatnonzero(selected_times[positions] == times)
+
 def normalize_lat_lon_values(lats, lons, values):
     ''' Normalize lat/lon values
 
@@ -311,3 +486,233 @@ def calc_climatology_season(month_start, month_end, dataset):
     t_series = reshape_data[:, month_index].mean(axis=1)
     means = t_series.mean(axis=0)
     return t_series, means
+
+def calc_temporal_correlation(ref_values, target_values, threshold=0.75):
+    ''' Calculate the temporal correlation at each grid point.
+
+    The Pearson correlation coefficient and its two-tailed p-value are
+    calculated at every grid point at once from the moments of the time
+    steps where neither series is masked. The p-value comes from the
+    Student's t distribution with n - 2 degrees of freedom, the same as
+    :func:`scipy.stats.pearsonr`.
+
+    A grid point is masked in the result if either series is missing more
+    than ``threshold`` of its time steps, if either series is constant, or
+    if the correlation can't be calculated from the shared time steps.
+
+    :param ref_values: Reference values with shape (times, lats, lons).
+    :type ref_values: Numpy Array or Numpy Masked Array
+    :param target_values: Target values with the same shape as ref_values.
+    :type target_values: Numpy Array or Numpy Masked Array
+    :param threshold: (optional) Proportion of missing time steps above
+        which a grid point is masked.
+    :type threshold: Float
+
+    :returns: The correlation coefficients and p-values for each grid point
+    :rtype: A tuple of two Numpy Masked Arrays of shape (lats, lons)
+
+    :raise ValueError: If the two arrays don't have the same shape.
+    '''
+    ref_values = ma.asarray(ref_values)
+    target_values = ma.asarray(target_values)
+    if ref_values.shape != target_values.shape:
+        raise ValueError('The reference and target values must have the same shape.')
+
+    ref_mask = ma.getmaskarray(ref_values)
+    target_mask = ma.getmaskarray(target_values)
+    num_times = ref_values.shape[0]
+
+    # Skip grid points that are missing too much data or that don't vary.
+    skip = ((ref_mask.sum(axis=0) > num_times * threshold) |
+            (target_mask.sum(axis=0) > num_times * threshold))
+    for values in (ref_values, target_values):
+        skip |= (values.max(axis=0) - values.min(axis=0)).filled(0) == 0
+
+    # Use only the time steps where both series have data.
+    valid = ~(ref_mask | target_mask)
+    num_valid = valid.sum(axis=0)
+    x = np.where(valid, ma.getdata(ref_values), 0).astype(np.float64)
+    y = np.where(valid, ma.getdata(target_values), 0).astype(np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_anom = np.where(valid, x - x.sum(axis=0) / num_valid, 0)
+        y_anom = np.where(valid, y - y.sum(axis=0) / num_valid, 0)
+        r = ((x_anom * y_anom).sum(axis=0) /
+             np.sqrt((x_anom ** 2).sum(axis=0) * (y_anom ** 2).sum(axis=0)))
+        r = np.clip(r, -1.0, 1.0)
+
+        dof = num_valid - 2
+        t = np.abs(r) * np.sqrt(dof / ((1.0 - r) * (1.0 + r)))
+        p_value = np.where(np.abs(r) == 1.0, 0.0, 2 * stats.t.sf(t, dof))
+
+    skip |= (num_valid < 2) | ~np.isfinite(r) | ~np.isfinite(p_value)
+    return ma.array(r, mask=skip), ma.array(p_value, mask=skip)
+
+def block_bootstrap_indices(num_times, num_replicates, block_length=1, seed=None):
+    ''' Draw moving block bootstrap resamples of a time axis.
+
+    Each resample is built from randomly placed blocks of ``block_length``
+    consecutive time steps, which keeps the autocorrelation of the series
+    within a block. A block length of 1 is the ordinary bootstrap.
+
+    :param num_times: The length of the time axis.
+    :type num_times: Integer
+    :param num_replicates: The number of resamples to draw.
+    :type num_replicates: Integer
+    :param block_length: (optional) The number of time steps in a block.
+    :type block_length: Integer
+    :param seed: (optional) Seed for the random number generator.
+    :type seed: Integer
+
+    :returns: The time indices of each resample.
+    :rtype: Numpy Array of shape (num_replicates, num_times)
+
+    :raise ValueError: If the block length isn't between 1 and num_times.
+    '''
+    if not 1 <= block_length <= num_times:
+        raise ValueError('The block length must be between 1 and the number of times.')
+
+    random = np.random.RandomState(seed)
+    num_blocks = -(-num_times // block_length)
+    starts = random.randint(0, num_times - block_length + 1,
+                            (num_replicates, num_blocks))
+    indices = starts[:, :, np.newaxis] + np.arange(block_length)
+    return indices.reshape(num_replicates, -1)[:, :num_times]
+
+def calc_bootstrap_confidence_interval(ref_values, target_values,
+                                       statistic='bias', num_replicates=1000,
+                                       block_length=1, confidence=0.95,
+                                       seed=None, batch_size=100,
+                                       processes=1, grid_block_size=10000):
+    ''' Calculate block bootstrap confidence intervals at each grid point.
+
+    The resampled time indices are drawn once and shared by all grid
+    points. The grid is processed in blocks of ``grid_block_size`` grid
+    points. All the replicates of a block are evaluated at once as a
+    weighted sum over time steps, in batches of ``batch_size`` replicates,
+    and reduced to percentiles before the next block. Besides the values
+    themselves, at most num_replicates * grid_block_size floats of
+    replicates are held at once.
+
+    :param ref_values: Reference values with shape (times, lats, lons).
+    :type ref_values: Numpy Array or Numpy Masked Array
+    :param target_values: Target values with the same shape as ref_values.
+    :type target_values: Numpy Array or Numpy Masked Array
+    :param statistic: (optional) 'bias' for the mean of ref_values -
+        target_values over time or 'rmse' for its root mean square.
+    :type statistic: String
+    :param num_replicates: (optional) The number of bootstrap replicates.
+    :type num_replicates: Integer
+    :param block_length: (optional) The number of consecutive time steps
+        resampled together.
+    :type block_length: Integer
+    :param confidence: (optional) The confidence level of the interval.
+    :type confidence: Float
+    :param seed: (optional) Seed for the random number generator. Results
+        don't depend on the number of processes.
+    :type seed: Integer
+    :param batch_size: (optional) The number of replicates evaluated at once.
+    :type batch_size: Integer
+    :param processes: (optional) The number of processes that evaluate
+        batches of replicates. None uses one per CPU.
+    :type processes: Integer
+    :param grid_block_size: (optional) The number of grid points whose
+        replicates are held at once.
+    :type grid_block_size: Integer
+
+    :returns: The lower and upper bounds of the confidence interval, from
+        the resamples that have values. They are masked where either
+        dataset has no values, or where no resample has values.
+    :rtype: A tuple of two Numpy Masked Arrays of shape (lats, lons)
+
+    :raise ValueError: If the statistic isn't supported or the two arrays
+        don't have the same shape.
+    '''
+    if statistic not in ('bias', 'rmse'):
+        raise ValueError("The statistic must be 'bias' or 'rmse'.")
+
+    ref_values = ma.asarray(ref_values)
+    target_values = ma.asarray(target_values)
+    if ref_values.shape != target_values.shape:
+        raise ValueError('The reference and target values must have the same shape.')
+
+    num_times = ref_values.shape[0]
+    grid_shape = ref_values.shape[1:]
+    diff = (ref_values - target_values).reshape(num_times, -1)
+    valid = ~ma.getmaskarray(diff)
+    diff = np.where(valid, ma.getdata(diff), 0).astype(np.float64)
+    missing = ~valid.any(axis=0)
+    valid = valid.astype(np.float64)
+    if statistic == 'rmse':
+        diff **= 2
+
+    indices = block_bootstrap_indices(num_times, num_replicates,
+                                      block_length, seed)
+    num_points = diff.shape[1]
+    tail = 50. * (1 - confidence)
+    lower = np.zeros(num_points)
+    upper = np.zeros(num_points)
+
+    if processes == 1:
+        _init_bootstrap_worker(diff, valid)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, _init_bootstrap_worker,
+                                    (diff, valid))
+    try:
+        for first_point in range(0, num_points, grid_block_size):
+            points = slice(first_point, first_point + grid_block_size)
+            batches = [(indices[start:start + batch_size], points)
+                       for start in range(0, num_replicates, batch_size)]
+            if pool is None:
+                replicates = map(_evaluate_bootstrap_batch, batches)
+            else:
+                replicates = pool.map(_evaluate_bootstrap_batch, batches)
+
+            replicates = np.concatenate(replicates)
+            if statistic == 'rmse':
+                replicates = np.sqrt(replicates)
+            # Resamples without valid values are NaN and left out.
+            replicates[:, missing[points]] = 0
+            lower[points], upper[points] = np.nanpercentile(
+                replicates, [tail, 100 - tail], axis=0)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        _init_bootstrap_worker(None, None)
+
+    # Values so sparse that no resample drew one have no interval either.
+    missing |= np.isnan(lower)
+    return (ma.array(lower.reshape(grid_shape), mask=missing.reshape(grid_shape)),
+            ma.array(upper.reshape(grid_shape), mask=missing.reshape(grid_shape)))
+
+_bootstrap_data = {}
+
+def _init_bootstrap_worker(values, valid):
+    ''' Store the values that bootstrap batches are evaluated on. '''
+    _bootstrap_data['values'] = values
+    _bootstrap_data['valid'] = valid
+
+def _evaluate_bootstrap_batch(batch):
+    ''' Calculate the resampled time mean of a block of grid points.
+
+    :param batch: The time indices of a batch of resamples, with shape
+        (replicates, times), and the slice of the grid points to evaluate.
+    :type batch: Tuple
+
+    :returns: The mean of each resample at each grid point, NaN where a
+        resample has no valid values.
+    :rtype: Numpy Array of shape (replicates, grid points)
+    '''
+    indices, points = batch
+    num_replicates, num_times = indices.shape
+    # How often each time step is drawn in each resample
+    offsets = np.arange(num_replicates)[:, np.newaxis] * num_times
+    counts = np.bincount((indices + offsets).ravel(),
+                         minlength=num_replicates * num_times)
+    counts = counts.reshape(num_replicates, num_times).astype(np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (counts.dot(_bootstrap_data['values'][:, points]) /
+                counts.dot(_bootstrap_data['valid'][:, points]))
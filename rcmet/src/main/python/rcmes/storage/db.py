@@ -17,12 +17,14 @@
 """Collection of functions used to interface with the database and to create netCDF file
 """
 import os
+import tempfile
 import urllib2
 import re
 import numpy as np
 import numpy.ma as ma
 import json
 import netCDF4
+import scipy.io
 
 from classes import RCMED
 from toolkit import process
@@ -33,15 +35,9 @@ def reorderXYT(lons, lats, times, values):
     # Re-order values in values array such that when reshaped everywhere is where it should be
     #  (as DB doesn't necessarily return everything in order)
     order = np.lexsort((lons, lats, times))
-    counter = 0
-    sortedValues = np.zeros_like(values)
-    sortedLats = np.zeros_like(lats)
-    sortedLons = np.zeros_like(lons)
-    for i in order:
-        sortedValues[counter] = values[i]
-        sortedLats[counter] = lats[i]
-        sortedLons[counter] = lons[i]
-        counter += 1
+    sortedValues = np.asarray(values)[order]
+    sortedLats = np.asarray(lats)[order]
+    sortedLons = np.asarray(lons)[order]
     
     return sortedValues, sortedLats, sortedLons
 
@@ -245,6 +241,119 @@ def improve_data(latitudes, longitudes, levels, times, values, timestep):
     return latitudes, longitudes, uniqueLevels, timesUnique, mdata
     
     
+def grid_data(latitudes, longitudes, levels, values, timestamps, timestep):
+    """
+    Purpose::
+        Arrange the data points of one database query on their (time, lat, lon, level) grid
+    
+    Input::
+        latitudes, longitudes, levels, values, timestamps: lists of data points as returned by get_data
+        timestep: "daily" | "monthly" used to normalize the times
+    Output::
+        uniqueLatitudes, uniqueLongitudes, uniqueLevels: 1d-numpy arrays of grid values
+        timesUnique: list of python datetime objects
+        values: 4d-numpy array of data values with shape (time, lat, lon, level)
+    """
+    if len(values) == 0:
+        return np.zeros(0), np.zeros(0), np.zeros(0), [], np.zeros((0, 0, 0, 0))
+
+    uniqueLatitudes = np.unique(latitudes)
+    uniqueLongitudes = np.unique(longitudes)
+    uniqueLevels = np.unique(levels)
+    uniqueTimestamps = np.unique(timestamps)
+
+    values, _, _ = reorderXYT(longitudes, latitudes, timestamps, values)
+
+    timeFormat = "%Y-%m-%d %H:%M:%S"
+    timesUnique = [datetime.strptime(t, timeFormat) for t in uniqueTimestamps]
+    timesUnique = process.normalizeDatetimes(timesUnique, timestep)
+
+    values = values.reshape(len(timesUnique), len(uniqueLatitudes), len(uniqueLongitudes), len(uniqueLevels))
+
+    return uniqueLatitudes, uniqueLongitudes, uniqueLevels, timesUnique, values
+
+def create_gridded_netCDF(latitudes, longitudes, levels, times, values, database, unit, startTime, netCD_fileName):
+    """
+    Purpose::
+        Write gridded data to a cache file that read_gridded_netCDF can memory map
+    
+    Input::
+        latitudes, longitudes, levels: 1d-numpy arrays of grid values
+        times: list of python datetime objects
+        values: 4d-numpy array of data values with shape (time, lat, lon, level)
+        database, unit: name and units of the parameter
+        startTime: python datetime object used as the base of the time values
+        netCD_fileName: path of the cache file
+
+    NB. The file is written under a temporary name and renamed when complete, so an 
+        interrupted write never leaves a cache file behind. A month without data 
+        only has an empty time dimension, as netCDF3 allows one dimension of length 0.
+    """
+    fileHandle, tempFileName = tempfile.mkstemp(suffix='.nc', dir=os.path.dirname(netCD_fileName))
+    os.close(fileHandle)
+    try:
+        # NB. netCDF3 files store variables contiguously so they can be memory mapped
+        netcdf = netCDF4.Dataset(tempFileName, mode='w', format='NETCDF3_CLASSIC')
+        netcdf.globalAttName = "The gridded netCDF cache file for parameter: " + database
+        netcdf.createDimension('time', len(times))
+        time = netcdf.createVariable('time', 'd', ('time',))
+        time.units = 'hours since ' + str(startTime)
+
+        if len(times) > 0:
+            netcdf.createDimension('lat', len(latitudes))
+            netcdf.createDimension('lon', len(longitudes))
+            netcdf.createDimension('lev', len(levels))
+            netcdf.createVariable('lat', 'd', ('lat',))[:] = latitudes
+            netcdf.createVariable('lon', 'd', ('lon',))[:] = longitudes
+            netcdf.createVariable('lev', 'd', ('lev',))[:] = levels
+            value = netcdf.createVariable('value', 'd', ('time', 'lat', 'lon', 'lev'))
+
+            netcdf.variables['lat'].units = 'degrees_north'
+            netcdf.variables['lon'].units = 'degrees_east'
+            netcdf.variables['lev'].units = 'hPa'
+            value.units = str(unit)
+
+            time[:] = [(t - startTime).total_seconds() / 3600. for t in times]
+            value[:] = values
+        netcdf.close()
+        os.rename(tempFileName, netCD_fileName)
+    except:
+        if os.path.exists(tempFileName):
+            os.remove(tempFileName)
+        raise
+
+def read_gridded_netCDF(netCD_fileName, values=None):
+    """
+    Purpose::
+        Read a cache file written by create_gridded_netCDF
+    
+    Input::
+        netCD_fileName: path of the cache file
+        values: (optional) 4d-numpy array of shape (time, lat, lon, level) to copy the 
+                data values into, e.g. a slice of a larger output array
+    Output::
+        latitudes, longitudes, levels: 1d-numpy arrays of grid values
+        times: list of python datetime objects
+    """
+    # The file is memory mapped so only the data that is used is read from disk
+    netcdf = scipy.io.netcdf_file(netCD_fileName, mode='r', mmap=True)
+    # A month without data only has the time variable
+    if 'value' not in netcdf.variables:
+        netcdf.close()
+        return np.zeros(0), np.zeros(0), np.zeros(0), []
+    latitudes = netcdf.variables['lat'][:].copy()
+    longitudes = netcdf.variables['lon'][:].copy()
+    levels = netcdf.variables['lev'][:].copy()
+    hours = netcdf.variables['time'][:].copy()
+    baseTime = datetime.strptime(netcdf.variables['time'].units.split('since ')[1], "%Y-%m-%d %H:%M:%S")
+    if values is not None:
+        values[:] = netcdf.variables['value'].data
+    netcdf.close()
+
+    times = [baseTime + timedelta(hours=hour) for hour in hours]
+    return latitudes, longitudes, levels, times
+    
+    
 def extractData ( datasetID, paramID, latMin, latMax, lonMin, lonMax, userStartTime, userEndTime, cachedir, timestep ):
     
     """
@@ -291,7 +400,8 @@ def extractData ( datasetID, paramID, latMin, latMax, lonMin, lonMax, userStartT
     name.append(project)
     instrument = instrument
     name.append(instrument)
-    version = "v1"
+    # v2 cache files hold gridded (time, lat, lon, level) arrays instead of lists of data points
+    version = "v2"
     name.append(version)
     
     # Check to see whether the folder is already created for netCDF or not, then it will be created
@@ -310,7 +420,7 @@ def extractData ( datasetID, paramID, latMin, latMax, lonMin, lonMax, userStartT
     
     timeFormat = "%Y-%m-%d %H:%M:%S"
    
-    date_list, lats, longs, uniqueLevls, uniqueTimes, vals = [], [], [], [], [], []
+    date_list = []
 
     # To make a list (date_list) of all months available based on user time request
     while userStartTime <= userEndTime:
@@ -327,33 +437,59 @@ def extractData ( datasetID, paramID, latMin, latMax, lonMin, lonMax, userStartT
         userStartTime= endOfMonth + timedelta(days=1)
 
     
-    # To loop over all months and return data
+    # To make sure each month is in the cache, and read the grid and times of each month
+    cacheFiles, monthTimes = [], []
+    latitudes = longitudes = uniqueLevels = None
     for i, date in enumerate(date_list):
         netCDF_name = variable + '_' + project + '_' + processing_level + '_' + processing_version + '_' + str(latMin) + '_' + str(latMax) + '_' + str(lonMin) + '_' + str(lonMax) + '_' + str("%04d" % date[0].year) + str("%02d" % date[0].month) + '.nc'
-        
-        # To check if netCDF file  exists, then use it
-        if os.path.exists(path+"/"+ netCDF_name):
-            latitudes, longitudes, levels, times, values = read_netcdf(path + "/" + netCDF_name)  
-        
-        # If the netCDF file does not exist, then create one and read it.
-        else:            
-            # To just query for one year of data
+        cacheFile = os.path.join(path, netCDF_name)
+
+        # If the netCDF file does not exist, then create one from the gridded data of the month
+        if not os.path.exists(cacheFile):
+            # To just query for one month of data
             print "%s of %s Database Download(s) Complete" % (i, len(date_list))  
             url = RCMED.jplUrl(datasetID, paramID, latMin, latMax, lonMin, lonMax, date[0], date[1], cachedir, timestep)
             
             # To get data from DB
-            latitudes, longitudes, levels, values, timestamps = get_data(url)
-            create_netCDF(latitudes, longitudes, levels, values, timestamps, database, latMin, latMax, lonMin, lonMax, date[0], date[1], unit, path + "/" + netCDF_name)
+            lats, lons, levels, values, timestamps = get_data(url)
+            lats, lons, levels, times, values = grid_data(lats, lons, levels, values, timestamps, timestep)
+            create_gridded_netCDF(lats, lons, levels, times, values, database, unit, date[0], cacheFile)
 
-            # To read from netCDF files
-            latitudes, longitudes, levels, times, values = read_netcdf(path + "/" + netCDF_name)            
+        lats, lons, levels, times = read_gridded_netCDF(cacheFile)
+        if len(times) == 0:
+            continue
 
-        lats=np.append(lats,latitudes)
-        longs=np.append(longs,longitudes)
-        uniqueLevls=np.append(uniqueLevls,levels)
-        uniqueTimes=np.append(uniqueTimes,times)
-        vals=np.append(vals,values)
-        
-    latitudes, longitudes, uniqueLevels, timesUnique, mdata = improve_data(lats, longs, uniqueLevls, uniqueTimes, vals, timestep)
+        if latitudes is None:
+            latitudes, longitudes, uniqueLevels = lats, lons, levels
+        elif not (np.array_equal(lats, latitudes) and np.array_equal(lons, longitudes) and np.array_equal(levels, uniqueLevels)):
+            raise ValueError('The grid of cache file %s does not match the grid of the other months' % cacheFile)
+
+        cacheFiles.append(cacheFile)
+        monthTimes.append(times)
+
+    if latitudes is None:
+        latitudes, longitudes, uniqueLevels = np.zeros(0), np.zeros(0), np.zeros(0)
+
+    # Copy each month into its slice of the output array
+    timesUnique = [t for times in monthTimes for t in times]
+    values = np.empty((len(timesUnique), len(latitudes), len(longitudes), len(uniqueLevels)))
+    timesaccu = 0
+    for cacheFile, times in zip(cacheFiles, monthTimes):
+        read_gridded_netCDF(cacheFile, values[timesaccu:timesaccu + len(times)])
+        timesaccu += len(times)
+
+    longitudes, latitudes = np.meshgrid(longitudes, latitudes)
+
+    # Flatten dimension if only single level
+    if len(uniqueLevels) == 1:
+        values = values[:, :, :, 0]
+    else:
+        latitudes = np.tile(latitudes[np.newaxis, :, :, np.newaxis], (len(timesUnique), 1, 1, len(uniqueLevels)))
+        longitudes = np.tile(longitudes[np.newaxis, :, :, np.newaxis], (len(timesUnique), 1, 1, len(uniqueLevels)))
+
+    # Created masked array to deal with missing values
+    #  -these make functions like values.mean(), values.max() etc ignore missing values
+    mdi = -9999  # TODO: extract this value from the DB retrieval metadata
+    mdata = ma.masked_array(values, mask=(values == mdi))
         
     return latitudes, longitudes, uniqueLevels, timesUnique, mdata
@@ -23,6 +23,8 @@ documentation for a complete list of supported formats.
 """
 
 from os import path
+from multiprocessing.pool import ThreadPool
+import functools
 import netCDF4
 import numpy as np
 import numpy.ma as ma
@@ -99,13 +101,20 @@ def getVariableRange(filename, variableName):
     return (varArray.min(), varArray.max())
 
 
-def read_data_from_file_list(filelist, myvar, timeVarName, latVarName, lonVarName):
+def read_data_from_file_list(filelist, myvar, timeVarName, latVarName, lonVarName,
+                             latRange=None, lonRange=None, timeRange=None, numThreads=1):
     '''
     Read in data from a list of model files into a single data structure
    
     Input:
        filelist - list of filenames (including path)
        myvar    - string containing name of variable to load in (as it appears in file)
+       timeVarName, latVarName, lonVarName - names of the time, latitude and longitude variables
+       latRange - (optional) (min, max) tuple of latitudes to read
+       lonRange - (optional) (min, max) tuple of longitudes to read, in the range [-180, 180]
+       timeRange - (optional) (start, end) tuple of datetimes to read
+       numThreads - (optional) number of threads used to scan the file headers, one by default.
+                    netCDF4 holds the GIL while it reads, so more threads only help on slow filesystems
     Output:
        lat, lon - 2D array of latitude and longitude values
        timestore    - list of times
@@ -113,95 +122,142 @@ def read_data_from_file_list(filelist, myvar, timeVarName, latVarName, lonVarNam
    
      NB. originally written specific for WRF netCDF output files
          modified to make more general (Feb 2011)
+
+         The headers of all files are scanned first to size the output exactly
+         and decode the times of every file. Only the hyperslab of each file
+         inside the lat/lon/time ranges is then read into the output.
    
       Peter Lean July 2010 
     '''
 
-    filelist.sort()
-    filename = filelist[0]
     # Crash nicely if 'filelist' is zero length
     """TODO:  Throw Error instead via try Except"""
     if len(filelist) == 0:
         print 'Error: no files have been passed to read_data_from_file_list()'
         sys.exit()
+    filelist.sort()
 
-    # Open the first file in the list to:
-    #    i) read in lats, lons
-    #    ii) find out how many timesteps in the file 
-    #        (assume same ntimes in each file in list)
-    #     -allows you to create an empty array to store variable data for all times
-    tmp = netCDF4.Dataset(filename, mode='r')
+    # Open the first file in the list to read in lats, lons
+    #  NB. no need to reload in the latitudes and longitudes -assume invariant
+    tmp = netCDF4.Dataset(filelist[0], mode='r')
     latsraw = tmp.variables[latVarName][:]
     lonsraw = tmp.variables[lonVarName][:]
+    tmp.close()
     if(latsraw.ndim == 1):
         lon, lat = np.meshgrid(lonsraw, latsraw)
     if(latsraw.ndim == 2):
         lon = lonsraw
         lat = latsraw
 
-    timesraw = tmp.variables[timeVarName]
-    ntimes = len(timesraw)
-    
     print 'Lats and lons read in for first file in filelist'
 
+    # Find the rows and columns of the lat/lon ranges
+    inRange = np.ones(lat.shape, dtype=bool)
+    if latRange is not None:
+        inRange &= (lat >= latRange[0]) & (lat <= latRange[1])
+    if lonRange is not None:
+        lonNormalized = np.where(lon > 180, lon - 360, lon)
+        inRange &= (lonNormalized >= lonRange[0]) & (lonNormalized <= lonRange[1])
+    rows = np.nonzero(inRange.any(axis=1))[0]
+    cols = np.nonzero(inRange.any(axis=0))[0]
+    if len(rows) == 0 or len(cols) == 0:
+        raise ValueError('No grid points inside the requested lat/lon ranges')
+    latSlice = slice(rows[0], rows[-1] + 1)
+    lonSlice = slice(cols[0], cols[-1] + 1)
+    lat = lat[latSlice, lonSlice]
+    lon = lon[latSlice, lonSlice]
+
+    # Scan the headers of all files to find the times to read from each one
+    readHeader = functools.partial(_read_file_header, myvar=myvar, 
+                                   timeVarName=timeVarName, timeRange=timeRange)
+    if numThreads == 1:
+        headers = map(readHeader, filelist)
+    else:
+        pool = ThreadPool(numThreads)
+        try:
+            headers = pool.map(readHeader, filelist)
+        finally:
+            pool.close()
+            pool.join()
+
     # Create a single empty masked array to store model data from all files
-    t2store = ma.zeros((ntimes * len(filelist), len(lat[:, 0]), len(lon[0, :])))
-    timestore = ma.zeros((ntimes * len(filelist))) 
-    
+    ntimes = sum(len(timeIndices) for _, timeIndices, _ in headers)
+    t2store = ma.zeros((ntimes, lat.shape[0], lat.shape[1]))
+    timestore = []
+
     # Now load in the data for real
-    #  NB. no need to reload in the latitudes and longitudes -assume invariant
-    i = 0
-    timesaccu = 0 # a counter for number of times stored so far in t2store 
     #  NB. this method allows for missing times in data files 
     #      as no assumption made that same number of times in each file...
-
-
+    timesaccu = 0 # a counter for number of times stored so far in t2store 
     for i, ifile in enumerate(filelist):
+        times, timeIndices, shape = headers[i]
+        if len(timeIndices) == 0:
+            continue
+
+        # Read the slab covering the selected times and lat/lon ranges. Dimensions 
+        #  which needn't exist, i.e. level, are indexed away so the slab has dimensions
+        #  (time, lat, lon)
+        slab = [slice(timeIndices[0], timeIndices[-1] + 1)]
+        gridSlices = [latSlice, lonSlice]
+        for length in shape[1:]:
+            slab.append(0 if length == 1 and len(shape) > 3 else gridSlices.pop(0))
 
-        #print 'Loading data from file: ',filelist[i]
         f = netCDF4.Dataset(ifile, mode='r')
-        t2raw = ma.array(f.variables[myvar][:])
-        timesraw = f.variables[timeVarName]
-        time = timesraw[:]
-        ntimes = len(time)
-        print 'file= ', i, 'ntimes= ', ntimes, filelist[i]
-        print 't2raw shape: ', t2raw.shape
-        
-        # Flatten dimensions which needn't exist, i.e. level 
-        #   e.g. if for single level then often data have 4 dimensions, when 3 dimensions will do.
-        #  Code requires data to have dimensions, (time,lat,lon)
-        #    i.e. remove level dimensions
-        # Remove 1d axis from the t2raw array
-        # Example: t2raw.shape == (365, 180, 360 1) <maps to (time, lat, lon, height)>
-        # After the squeeze you will be left with (365, 180, 360) instead
-        t2tmp = t2raw.squeeze()
-        # Nb. if this happens to be data for a single time only, then we just flattened it by accident
-        #     lets put it back... 
-        if t2tmp.ndim == 2:
-            t2tmp = np.expand_dims(t2tmp, 0)
+        t2raw = f.variables[myvar][tuple(slab)]
+        f.close()
+        ntimes = len(timeIndices)
+        print 'file= ', i, 'ntimes= ', ntimes, ifile
 
-        t2store[timesaccu + np.arange(ntimes), :, :] = t2tmp[:, :, :]
-        timestore[timesaccu + np.arange(ntimes)] = time
+        t2store[timesaccu:timesaccu + ntimes] = t2raw[timeIndices - timeIndices[0]]
+        timestore.extend(times)
         timesaccu += ntimes
-        f.close()
         
     print 'Data read in successfully with dimensions: ', t2store.shape
     
-    # TODO: search for duplicated entries (same time) and remove duplicates.
-    # Check to see if number of unique times == number of times, if so then no problem
-
-    if(len(np.unique(timestore)) != len(np.where(timestore != 0)[0].view())):
+    if len(set(timestore)) != len(timestore):
         print 'WARNING: Possible duplicated times'
 
-    # Decode model times into python datetime objects. Note: timestore becomes a list (no more an array) here
-    timestore, _ = process.getModelTimes(filename, timeVarName)
-    
     # Make sure latlon grid is monotonically increasing and that the domains
     # are correct
     lat, lon, t2store = checkLatLon(lat, lon, t2store)
     data_dict = {'lats': lat, 'lons': lon, 'times': timestore, 'data': t2store}
     return data_dict
 
+def _read_file_header(ifile, myvar, timeVarName, timeRange=None):
+    '''
+    Find the times of a model file that read_data_from_file_list will read
+
+    Input:
+       ifile - filename (including path)
+       myvar - name of the variable to read
+       timeVarName - name of the time variable
+       timeRange - (optional) (start, end) tuple of datetimes to read
+    Output:
+       times - list of python datetime objects to read from the file
+       timeIndices - numpy array of the indices of the time steps to read from the file
+       shape - shape of the variable in the file
+
+    Raises a ValueError if the variable has more than one level
+    '''
+    f = netCDF4.Dataset(ifile, mode='r')
+    shape = f.variables[myvar].shape
+    f.close()
+
+    # Besides lat and lon, only dimensions of length one (i.e. a single level) can be indexed away
+    if sum(length > 1 for length in shape[1:]) > 2:
+        raise ValueError('Variable %s in %s has shape %s: only variables with a single level can be read' 
+                         % (myvar, ifile, shape))
+
+    # Decode model times into python datetime objects
+    times, _ = process.getModelTimes(ifile, timeVarName)
+    timeIndices = np.arange(shape[0])
+    if timeRange is not None:
+        timeIndices = np.array([index for index, time in enumerate(times) 
+                                if timeRange[0] <= time <= timeRange[1]], dtype=int)
+        times = [times[index] for index in timeIndices]
+
+    return times, timeIndices, shape
+
 def select_var_from_file(myfile, fmt='not set'):
     '''
      Routine to act as user interface to allow users to select variable of interest from a file.
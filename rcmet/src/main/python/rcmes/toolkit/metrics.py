@@ -442,26 +442,10 @@ def calcTemporalCorrelationSubRegion(evaluationData, referenceData):
     REF: 277-281 in Stat methods in atmos sci by Wilks, 1995, Academic Press, 467pp.
     sigLev: the correlation between model and observation is significant at sigLev * 100 %
     '''
-    evaluationDataMask = process.create_mask_using_threshold(evaluationData, threshold = 0.75)
-    referenceDataMask = process.create_mask_using_threshold(referenceData, threshold = 0.75)
-    
-    ngrdY = evaluationData.shape[1] 
-    ngrdX = evaluationData.shape[2] 
-    temporalCorrelation = ma.zeros([ngrdY,ngrdX])-100.
-    sigLev = ma.zeros([ngrdY,ngrdX])-100.
-    for iy in np.arange(ngrdY):
-        for ix in np.arange(ngrdX):
-            if not evaluationDataMask[iy,ix] and not referenceDataMask[iy,ix]:
-                t1=evaluationData[:,iy,ix]
-                t2=referenceData[:,iy,ix]
-                if t1.min()!=t1.max() and t2.min()!=t2.max():
-                    temporalCorrelation[iy,ix], sigLev[iy,ix]=stats.pearsonr(t1[(t1.mask==False) & (t2.mask==False)],
-                                                  t2[(t1.mask==False) & (t2.mask==False)])
-                    sigLev[iy,ix]=1-sigLev[iy,ix]  # p-value => confidence level
-                    
-    temporalCorrelation=ma.masked_equal(temporalCorrelation.data, -100.)        
-    sigLev=ma.masked_equal(sigLev.data, -100.)    
-    
+    from ocw import utils
+    temporalCorrelation, pValue = utils.calc_temporal_correlation(evaluationData, referenceData, threshold = 0.75)
+    sigLev = 1 - pValue  # p-value => confidence level
+
     return temporalCorrelation, sigLev
 
 def calcPatternCorrelation(evaluationData, referenceData):
@@ -588,7 +572,6 @@ def calcPdf(evaluationData, referenceData, settings=None):
         PDF for the year
 
     '''
-    similarityScore = 0.0
     print 'min modelData', evaluationData[:, :, :].min()
     print 'max modelData', evaluationData[:, :, :].max()
     print 'min obsData', referenceData[:, :, :].min()
@@ -609,14 +592,7 @@ def calcPdf(evaluationData, referenceData, settings=None):
     print 'referenceData distribution and edges', pdfObs, edges    
     
     #find minimum at each bin between lists 
-    i = 0
-    for model_value in pdfMod :
-        print 'model_value is', model_value, 'pdfObs[', i, '] is', pdfObs[i]
-        if model_value < pdfObs[i]:
-            similarityScore += model_value
-        else:
-            similarityScore += pdfObs[i] 
-        i += 1 
+    similarityScore = np.minimum(pdfMod, pdfObs).sum()
     print 'similarity_score is', similarityScore
     return similarityScore
 
@@ -713,26 +689,22 @@ def metrics_plots(varName, numOBS, numMDL, nT, ngrdY, ngrdX, Times, lons,
     if numSubRgn > 0:
         print 'Enter area-averaging: mdlData.shape, obsData.shape ', mdlData.shape, obsData.shape
         print 'Use Latitude/Longitude Mask for Area Averaging'
+        from ocw import dataset_processor
+        masks = []
         for n in np.arange(numSubRgn):
             # Define mask using regular lat/lon box specified by users ('mask=True' defines the area to be excluded)
             maskLonMin = subRgnLon0[n] 
             maskLonMax = subRgnLon1[n]
             maskLatMin = subRgnLat0[n]
             maskLatMax = subRgnLat1[n]
-            mask = np.logical_or(np.logical_or(lats <= maskLatMin, lats >= maskLatMax), 
-                                np.logical_or(lons <= maskLonMin, lons >= maskLonMax))
-            # Calculate area-weighted averages within this region and store in a new list
-            for k in np.arange(numOBS):           # area-average obs data
-                Store = []
-                for t in np.arange(nT):
-                    Store.append(process.calc_area_mean(obsData[k, t, :, :], lats, lons, mymask = mask))
-                obsRgn[k, n, :] = ma.array(Store[:])
-            for k in np.arange(numMDL):           # area-average mdl data
-                Store = []
-                for t in np.arange(nT):
-                    Store.append(process.calc_area_mean(mdlData[k, t, :, :], lats, lons, mymask = mask))
-                mdlRgn[k, n, :] = ma.array(Store[:])
-            Store = []                               # release the memory allocated by temporary vars
+            masks.append(np.logical_or(np.logical_or(lats <= maskLatMin, lats >= maskLatMax), 
+                                np.logical_or(lons <= maskLonMin, lons >= maskLonMax)))
+        # Calculate area-weighted averages within all regions at once with one weight matrix
+        weights = dataset_processor.region_weights(masks, lats, lons)
+        for k in np.arange(numOBS):           # area-average obs data
+            obsRgn[k, :, :] = dataset_processor._region_means(obsData[k], weights)
+        for k in np.arange(numMDL):           # area-average mdl data
+            mdlRgn[k, :, :] = dataset_processor._region_means(mdlData[k], weights)
 
     #-------------------------------------------------------------------------
     # (mp.002) FoutOption: The option to create a binary or netCDF file of processed 
@@ -197,174 +197,16 @@ def calc_average_on_new_time_unit(data, dateList, unit='monthly'):
     '''
 
     # First catch unknown values of time unit passed in by user
-    acceptable = (unit == 'full') | (unit == 'annual') | (unit == 'monthly') | (unit == 'daily') | (unit == 'pentad')
+    acceptable = (unit == 'full') | (unit == 'annual') | (unit == 'monthly') | (unit == 'daily')
 
     if not acceptable:
         print 'Error: unknown unit type selected for time averaging'
         print '       Please check your code.'
         return
 
-    # Calculate arrays of years (2007,2007),
-    #                     yearsmonths (200701,200702),
-    #                     or yearmonthdays (20070101,20070102)
-    #  -depending on user selected averaging period.
-
-    # Year list
-    if unit == 'annual':
-        print 'Calculating annual mean data'
-        timeunits = []
-
-        for i in np.arange(len(dateList)):
-            timeunits.append(str(dateList[i].year))
-
-        timeunits = np.array(timeunits, dtype=int)
-
-    # YearMonth format list
-    if unit == 'monthly':
-        print 'Calculating monthly mean data'
-        timeunits = []
-
-        for i in np.arange(len(dateList)):
-            timeunits.append(str(dateList[i].year) + str("%02d" % dateList[i].month))
-
-        timeunits = np.array(timeunits, dtype=int)
-
-    # YearMonthDay format list
-    if unit == 'daily':
-        print 'Calculating daily mean data'
-        timeunits = []
-
-        for i in np.arange(len(dateList)):
-            timeunits.append(str(dateList[i].year) + str("%02d" % dateList[i].month) + \
-                             str("%02d" % dateList[i].day))
-
-        timeunits = np.array(timeunits, dtype=int)
-
-
-    # TODO: add pentad setting using Julian days?
-
-
-    # Full list: a special case
-    if unit == 'full':
-        print 'Calculating means data over full time range'
-        timeunits = []
-
-        for i in np.arange(len(dateList)):
-            timeunits.append(999)  # i.e. we just want the same value for all times.
-
-        timeunits = np.array(timeunits, dtype=int)
-
-
-
-    # empty list to store new times
-    newTimesList = []
-
-    # Decide whether or not you need to do any time averaging.
-    #   i.e. if data are already on required time unit then just pass data through and
-    #        calculate and return representative datetimes.
-    processing_required = True
-    if len(timeunits) == (len(np.unique(timeunits))):
-        processing_required = False
-
-    # 1D data arrays, i.e. time series
-    if data.ndim == 1:
-        # Create array to store the resulting data
-        meanstore = np.zeros(len(np.unique(timeunits)))
-
-        # Calculate the means across each unique time unit
-        i = 0
-        for myunit in np.unique(timeunits):
-            if processing_required:
-                datam = ma.masked_array(data, timeunits != myunit)
-                meanstore[i] = ma.average(datam)
-
-            # construct new times list
-            smyunit = str(myunit)
-            if len(smyunit) == 4:  # YYYY
-                yyyy = int(myunit[0:4])
-                mm = 1
-                dd = 1
-            if len(smyunit) == 6:  # YYYYMM
-                yyyy = int(smyunit[0:4])
-                mm = int(smyunit[4:6])
-                dd = 1
-            if len(smyunit) == 8:  # YYYYMMDD
-                yyyy = int(smyunit[0:4])
-                mm = int(smyunit[4:6])
-                dd = int(smyunit[6:8])
-            if len(smyunit) == 3:  # Full time range
-                # Need to set an appropriate time representing the mid-point of the entire time span
-                dt = dateList[-1] - dateList[0]
-                halfway = dateList[0] + (dt / 2)
-                yyyy = int(halfway.year)
-                mm = int(halfway.month)
-                dd = int(halfway.day)
-
-            newTimesList.append(datetime.datetime(yyyy, mm, dd, 0, 0, 0, 0))
-            i = i + 1
-
-    # 3D data arrays
-    if data.ndim == 3:
-
-        #datamask = create_mask_using_threshold(data,threshold=0.75)
-
-        # Create array to store the resulting data
-        meanstore = np.zeros([len(np.unique(timeunits)), data.shape[1], data.shape[2]])
-
-        # Calculate the means across each unique time unit
-        i = 0
-        datamask_store = []
-        for myunit in np.unique(timeunits):
-            if processing_required:
-
-                mask = np.zeros_like(data)
-                mask[timeunits != myunit, :, :] = 1.0
-
-                # Calculate missing data mask within each time unit...
-                datamask_at_this_timeunit = np.zeros_like(data)
-                datamask_at_this_timeunit[:] = create_mask_using_threshold(data[timeunits == myunit, :, :], threshold=0.75)
-                # Store results for masking later
-                datamask_store.append(datamask_at_this_timeunit[0])
-
-                # Calculate means for each pixel in this time unit, ignoring missing data (using masked array).
-                datam = ma.masked_array(data, np.logical_or(mask, datamask_at_this_timeunit))
-                meanstore[i, :, :] = ma.average(datam, axis=0)
-
-            # construct new times list
-            smyunit = str(myunit)
-            if len(smyunit) == 4:  # YYYY
-                yyyy = int(smyunit[0:4])
-                mm = 1
-                dd = 1
-            if len(smyunit) == 6:  # YYYYMM
-                yyyy = int(smyunit[0:4])
-                mm = int(smyunit[4:6])
-                dd = 1
-            if len(smyunit) == 8:  # YYYYMMDD
-                yyyy = int(smyunit[0:4])
-                mm = int(smyunit[4:6])
-                dd = int(smyunit[6:8])
-            if len(smyunit) == 3:  # Full time range
-                # Need to set an appropriate time representing the mid-point of the entire time span
-                dt = dateList[-1] - dateList[0]
-                halfway = dateList[0] + (dt / 2)
-                yyyy = int(halfway.year)
-                mm = int(halfway.month)
-                dd = int(halfway.day)
-
-            newTimesList.append(datetime.datetime(yyyy, mm, dd, 0, 0, 0, 0))
-
-            i += 1
-
-        if not processing_required:
-            meanstorem = data
-
-        if processing_required:
-            # Create masked array (using missing data mask defined above)
-            datamask_store = np.array(datamask_store)
-            meanstorem = ma.masked_array(meanstore, datamask_store)
-
-    return meanstorem, newTimesList
+    print 'Calculating %s mean data' % unit
+    from ocw import dataset_processor
+    return dataset_processor._rcmes_calc_average_on_new_time_unit_K(data, dateList, unit)
 
 def calc_running_accum_from_period_accum(data):
     '''
@@ -382,23 +224,51 @@ def calc_running_accum_from_period_accum(data):
 
     '''
 
+    return np.cumsum(data, axis=0, dtype=data.dtype)
 
-    running_acc = np.zeros_like(data)
+def calc_period_accum_from_running_accum(running_acc, previous=None, bucket_size=None, reset_tolerance=0.01):
+    '''
+     Routine to calculate individual period accumulations from running total accumulations,
+     i.e. the inverse of calc_running_accum_from_period_accum.
+     ::
 
-    if(len(data.shape) == 1):
-        running_acc[0] = data[0]
+         e.g.  0,0,1,1,1,3,5,6,6,6
+            -> 0,0,1,0,0,2,2,1,0,0
 
-    if(len(data.shape) > 1):
-        running_acc[0, :] = data[0, :]
+     A running total that drops by more than reset_tolerance has been reset, e.g. by a model
+     restart or a WRF precipitation bucket (bucket_mm) emptying. Smaller drops are rounding
+     errors in the model and give zero accumulations.
 
-    for i in np.arange(data.shape[0] - 1):
-        if(len(data.shape) == 1):
-            running_acc[i + 1] = running_acc[i] + data[i + 1]
+     Input::
+          running_acc: numpy array with time in the first axis
+          previous: (optional) running accumulation at the time before the first one,
+                    e.g. the last time of the previous file. Defaults to zero.
+          bucket_size: (optional) amount removed from the running total at each reset.
+                       Without it, a reset is assumed to restart the running total from zero.
+          reset_tolerance: (optional) largest drop in the running total that is not a reset
 
-        if(len(data.shape) > 1):
-            running_acc[i + 1, :] = running_acc[i, :] + data[i + 1, :]
+     Output::
+          period_acc: period accumulations
 
-    return running_acc
+    '''
+
+    period_acc = np.empty_like(running_acc)
+    if previous is None:
+        period_acc[0] = running_acc[0]
+    else:
+        period_acc[0] = running_acc[0] - previous
+    np.subtract(running_acc[1:], running_acc[:-1], out=period_acc[1:])
+
+    resets = ma.filled(period_acc < -reset_tolerance, False)
+    if resets.any():
+        if bucket_size is None:
+            period_acc[resets] = running_acc[resets]
+        else:
+            period_acc[resets] += bucket_size
+
+    np.maximum(period_acc, 0, out=period_acc)
+
+    return period_acc
 
 def ignore_boundaries(data, rim=10):
     '''
@@ -477,37 +347,11 @@ def getModelTimes(modelFile, timeVarName):
     base_time_string = string.lstrip(timeFormat[sinceLoc:])
     # decode base time
     base_time = decodeTimeFromString(base_time_string)
-    times = []
-
-    for xtime in xtimes[:]:
-
-        # Cast time as an int
-        #TODO: KDW this may cause problems for data that is hourly with more than one timestep in it
-        xtime = int(xtime)
-
-        if units == 'minutes':
-            dt = datetime.timedelta(minutes=xtime)
-            new_time = base_time + dt
-        elif units == 'hours':
-            dt = datetime.timedelta(hours=xtime)
-            new_time = base_time + dt
-        elif units == 'days':
-            dt = datetime.timedelta(days=xtime)
-            new_time = base_time + dt
-        elif units == 'months':
-            # NB. adding months in python is complicated as month length varies and hence ambiguous.
-            # Perform date arithmatic manually
-            #  Assumption: the base_date will usually be the first of the month
-            #              NB. this method will fail if the base time is on the 29th or higher day of month
-            #                      -as can't have, e.g. Feb 31st.
-            new_month = int(base_time.month + xtime % 12)
-            new_year = int(math.floor(base_time.year + xtime / 12.))
-            new_time = datetime.datetime(new_year, new_month, base_time.day, base_time.hour, base_time.second, 0)
-        elif units == 'years':
-            dt = datetime.timedelta(years=xtime)
-            new_time = base_time + dt
-
-        times.append(new_time)
+
+    # Cast times as ints
+    #TODO: KDW this may cause problems for data that is hourly with more than one timestep in it
+    from ocw import utils
+    times = utils.decode_time_offsets(np.asarray(xtimes[:]).astype(int), units, base_time)
 
     try:
         if len(xtimes) == 1:
@@ -770,14 +614,10 @@ def extract_sub_time_selection(allTimes, subTimes, data):
     # Create new array to store the subselection
     subdata = np.zeros([len(subTimes), data.shape[1], data.shape[2]])
 
-    # Loop over all Times and when it is a member of the required subselection, copy the data across
-    i = 0     # counter for allTimes
-    subi = 0  # counter for subTimes
-    for t in allTimes:
-        if(np.in1d(allTimes, subTimes)):
-            subdata[subi, :, :] = data[i, :, :]
-            subi += 1
-        i += 1
+    # Copy across the data at every time that is a member of the required subselection
+    from ocw import utils
+    indices = utils.time_selection_indices(allTimes, subTimes)
+    subdata[:len(indices), :, :] = data[indices, :, :]
 
     return subdata
 
@@ -841,30 +681,9 @@ def decode_model_timesK(ifile,timeVarName,file_type):
     # cut out base time (the bit following 'since')
     base_time_string = string.lstrip(timeFormat[sinceLoc:])
     # decode base time
-    # 9/25/2012: datetime.timedelta has problem with the argument because xtimes is NioVariable.
-    # Soln (J. Kim): use a temp variable ttmp in the for loop, then convert it into an integer xtime.
     base_time = decodeTimeFromString(base_time_string)
-    times=[]
-    for ttmp in xtimes[:]:
-        xtime = int(ttmp)
-        if(units=='minutes'):
-            dt = datetime.timedelta(minutes=xtime); new_time = base_time + dt
-        if(units=='hours'):
-            dt = datetime.timedelta(hours=xtime); new_time = base_time + dt
-        if(units=='days'):
-            dt = datetime.timedelta(days=xtime); new_time = base_time + dt
-        if(units=='months'):   # NB. adding months in python is complicated as month length varies and hence ambigous.
-            # Perform date arithmatic manually
-            #  Assumption: the base_date will usually be the first of the month
-            #              NB. this method will fail if the base time is on the 29th or higher day of month
-            #                      -as can't have, e.g. Feb 31st.
-            new_month = int(base_time.month + xtime % 12)
-            new_year = int(math.floor(base_time.year + xtime / 12.))
-            #print type(new_year),type(new_month),type(base_time.day),type(base_time.hour),type(base_time.second)
-            new_time = datetime.datetime(new_year,new_month,base_time.day,base_time.hour,base_time.second,0)
-        if(units=='years'):
-            dt = datetime.timedelta(years=xtime); new_time = base_time + dt
-        times.append(new_time)
+    from ocw import utils
+    times = utils.decode_time_offsets(np.asarray(xtimes[:]).astype(int), units, base_time)
     return times
 
 
@@ -51,10 +51,22 @@ One can change the default endian-ness and header precision::
     
 for a file with little-endian data whose record headers are long
 integers.
+
+Records can also be read in any order through a memory map of the
+file.  The record markers are scanned once to index the records::
+
+    >>> f = FortranFile('filename')
+    >>> x = f.mapRecord(3, 'f', shape=(161, 321))
+    >>> y = f.readRecordBatch(range(10, 40), 'f', shape=(161, 321))
+
+For native byte order, mapRecord returns a view of the file without
+copying the data, and readRecordBatch reads many records of the same
+size into a single array.
 """
 
 __docformat__ = "restructuredtext en"
 
+import os
 import struct
 import numpy
 
@@ -117,6 +129,25 @@ class FortranFile(file):
         file.__init__(self, fname, *args, **kwargs)
         self.ENDIAN = endian
         self.HEADER_PREC = header_prec
+        self._reset_index()
+
+    def _reset_index(self):
+        """Forget the record index and the memory map of the file."""
+        self._offsets = None
+        self._lengths = None
+        self._map = None
+
+    def close(self):
+        """Close the file and release its memory map."""
+        self._reset_index()
+        file.close(self)
+
+    def _dtype(self, prec):
+        """Get the numpy dtype of a struct precision code in the file's endian-ness."""
+        kind = 'f' if prec in self._real_precisions else 'i'
+        size = struct.calcsize(self.ENDIAN + prec)
+        byteorder = self.ENDIAN if self.ENDIAN in '<>' else '='
+        return numpy.dtype(byteorder + kind + str(size))
 
     def _read_exactly(self, num_bytes):
         """Read in exactly num_bytes, raising an error if it can't be done."""
@@ -139,6 +170,7 @@ class FortranFile(file):
 
     def _write_check(self, number_of_bytes):
         """Write the header for the given number of bytes"""
+        self._reset_index()
         self.write(struct.pack(self.ENDIAN+self.HEADER_PREC,
                                number_of_bytes))
 
@@ -201,9 +233,8 @@ class FortranFile(file):
             raise ValueError('Not an appropriate precision')
             
         data_str = self.readRecord()
-        num = len(data_str)/struct.calcsize(prec)
-        numbers =struct.unpack(self.ENDIAN+str(num)+prec,data_str) 
-        return numpy.array(numbers, dtype=_numpy_precisions[prec])
+        numbers = numpy.frombuffer(data_str, dtype=self._dtype(prec))
+        return numbers.astype(_numpy_precisions[prec])
 
     def writeReals(self, reals, prec='f'):
         """
@@ -247,8 +278,8 @@ class FortranFile(file):
             raise ValueError('Not an appropriate precision')
             
         data_str = self.readRecord()
-        num = len(data_str)/struct.calcsize(prec)
-        return numpy.array(struct.unpack(self.ENDIAN+str(num)+prec,data_str))
+        numbers = numpy.frombuffer(data_str, dtype=self._dtype(prec))
+        return numbers.astype(numpy.int_)
 
     def writeInts(self, ints, prec='i'):
         """
@@ -272,3 +303,139 @@ class FortranFile(file):
         for item in ints:
             self.write(struct.pack(_fmt,item))
         self._write_check(length_bytes)
+
+    def indexRecords(self):
+        """
+        Find the position and length of every record in the file.
+
+        The record markers are scanned in a single pass over a memory
+        map of the file.  The index is kept until the file is written to.
+
+        Returns
+
+            offsets : array
+                Byte offset of the data of each record
+            lengths : array
+                Length in bytes of the data of each record
+
+        """
+        if self._offsets is not None:
+            return self._offsets, self._lengths
+
+        if not self.closed:
+            self.flush()
+        header = self._dtype(self.HEADER_PREC)
+        file_size = os.path.getsize(self.name)
+        if file_size > 0:
+            self._map = numpy.memmap(self.name, dtype=numpy.uint8, mode='r')
+
+        offsets = []
+        lengths = []
+        position = 0
+        while position < file_size:
+            if position + 2 * header.itemsize > file_size:
+                raise IOError('Truncated record marker at byte %d' % position)
+            start = position + header.itemsize
+            l = int(self._map[position:start].view(header)[0])
+            end = start + l
+            if l < 0 or end + header.itemsize > file_size or \
+               int(self._map[end:end + header.itemsize].view(header)[0]) != l:
+                raise IOError('Error reading record from data file')
+            offsets.append(start)
+            lengths.append(l)
+            position = end + header.itemsize
+
+        self._offsets = numpy.array(offsets, dtype=numpy.int64)
+        self._lengths = numpy.array(lengths, dtype=numpy.int64)
+        return self._offsets, self._lengths
+
+    def _record_shape(self, length, dtype, shape):
+        """Check that a record of length bytes holds an array of the given shape."""
+        if length % dtype.itemsize:
+            raise ValueError('Record length is not a multiple of the precision')
+        num = length // dtype.itemsize
+        if shape is None:
+            return (num,)
+        shape = tuple(numpy.atleast_1d(shape))
+        if numpy.prod(shape) != num:
+            raise ValueError('Cannot read a record of %d values with shape %s'
+                             % (num, shape))
+        return shape
+
+    def mapRecord(self, record, prec='f', shape=None):
+        """
+        Read a record as an array without reading the records before it.
+
+        Parameters
+
+            record : int
+                Number of the record, counting from 0
+            prec : character, optional
+                Precision of the data using character codes from
+                Python's struct module
+            shape : tuple, optional
+                Shape of the returned array (in C order)
+
+        Returns a read only view of the memory mapped file for native
+        byte order, and a copy in native byte order otherwise.
+
+        """
+        offsets, lengths = self.indexRecords()
+        dtype = self._dtype(prec)
+        shape = self._record_shape(lengths[record], dtype, shape)
+        data = numpy.ndarray(shape, dtype=dtype, buffer=self._map,
+                             offset=offsets[record])
+        if not dtype.isnative:
+            data = data.astype(dtype.newbyteorder('='))
+        return data
+
+    def readRecordBatch(self, records, prec='f', shape=None, out=None):
+        """
+        Read many records of the same length into a single array.
+
+        Parameters
+
+            records : sequence of ints
+                Numbers of the records to read, counting from 0
+            prec : character, optional
+                Precision of the data using character codes from
+                Python's struct module
+            shape : tuple, optional
+                Shape of each record (in C order)
+            out : array, optional
+                Array to read the records into, of shape
+                (len(records),) + shape
+
+        Returns an array of shape (len(records),) + shape in native byte
+        order.
+
+        """
+        offsets, lengths = self.indexRecords()
+        records = numpy.asarray(records, dtype=numpy.int64)
+        dtype = self._dtype(prec)
+        if len(records) == 0:
+            raise ValueError('No records to read')
+        if numpy.any(lengths[records] != lengths[records[0]]):
+            raise ValueError('Records to read in a batch must have the same length')
+        shape = self._record_shape(lengths[records[0]], dtype, shape)
+
+        if out is None:
+            out = numpy.empty((len(records),) + shape,
+                              dtype=dtype.newbyteorder('='))
+        elif out.shape != (len(records),) + shape:
+            raise ValueError('out must have shape %s' % ((len(records),) + shape,))
+
+        steps = numpy.diff(offsets[records])
+        if len(steps) > 0 and numpy.all(steps == steps[0]) and steps[0] > 0:
+            # Evenly spaced records (e.g. consecutive records of the same
+            # length) are copied as one strided view of the file
+            strides = (int(steps[0]),) + numpy.empty(shape, dtype=dtype).strides
+            out[...] = numpy.ndarray((len(records),) + shape, dtype=dtype,
+                                     buffer=self._map,
+                                     offset=offsets[records[0]],
+                                     strides=strides)
+        else:
+            for i, record in enumerate(records):
+                out[i] = numpy.ndarray(shape, dtype=dtype, buffer=self._map,
+                                       offset=offsets[record])
+        return out
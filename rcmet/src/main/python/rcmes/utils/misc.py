@@ -33,6 +33,7 @@ import netCDF4
 import classes
 
 from fortranfile import FortranFile
+from toolkit import process
 
 def reshapeMonthlyData(dataset1):
     """
@@ -275,7 +276,7 @@ def calc_base_time_wrf(filename):
     
     return base_time
 
-def calc_period_precip_from_running_tot(running_precip):
+def calc_period_precip_from_running_tot(running_precip, bucketSize=None):
     '''
      WRF precipitation accumulations are stored as running totals from the start of the model run
      To find out values during each output time period, you must subtract the previous total
@@ -286,6 +287,7 @@ def calc_period_precip_from_running_tot(running_precip):
       Input: 
          running_precip   - numpy array containing precipitation data at more than one time level
                              NB. assumes time dimension is the first one precip[time, lat, lon, level] 
+         bucketSize       - (optional) WRF bucket_mm size, see process.calc_period_accum_from_running_accum
     
       Output:
          acc_precip       - numpy array of same dimensions as input, 
@@ -297,18 +299,49 @@ def calc_period_precip_from_running_tot(running_precip):
     '''
     
     print 'Calculating period precip accumulations from running total'
-    shifted_running_precip = np.roll(running_precip, -1, axis=0)
-    nt = running_precip.shape[0]
-    # avoid wrapping from the end time to the start time by forcing the accumulation at final time=0
-    shifted_running_precip[nt - 1, :, :] = running_precip[nt - 1, :, :]
-    acc_precip = shifted_running_precip - running_precip 
-
-    # NB. sometimes rounding errors in the model lead to very small negative period accumulations
-    #     These are removed and set to zero here.
-    acc_precip = np.maximum(acc_precip, 0)
+    acc_precip = np.zeros_like(running_precip)
+    acc_precip[:-1] = process.calc_period_accum_from_running_accum(running_precip[1:],
+                                                                   previous=running_precip[0],
+                                                                   bucket_size=bucketSize)
 
     return acc_precip
 
+def iter_period_precip_from_filelist(myfilelist, precipVarNames=('RAINC', 'RAINNC'), bucketSize=None):
+    '''
+     Generator that converts the WRF running total precipitation in a list of files
+     into period accumulations, one time at a time.
+
+     The running totals are read one time at a time and only the previous time is kept,
+     so memory use doesn't grow with the number of files. Resets of each running total
+     (model restarts or bucket_mm buckets emptying) are handled separately for each
+     precipitation component.
+
+      Input:
+         myfilelist     - a list of filenames (including full path) in time order
+         precipVarNames - (optional) names of the running total precipitation components to add up
+         bucketSize     - (optional) WRF bucket_mm size, see process.calc_period_accum_from_running_accum
+
+      Output:
+         yields a numpy array of the total precip accumulated over each output time period
+    '''
+    previous = dict.fromkeys(precipVarNames)
+
+    for ifile in myfilelist:
+        f = netCDF4.Dataset(ifile, mode='r')
+        ntimes = f.variables[precipVarNames[0]].shape[0]
+
+        for t in xrange(ntimes):
+            precip = 0
+            for varName in precipVarNames:
+                running = f.variables[varName][t:t + 1]
+                precip = precip + process.calc_period_accum_from_running_accum(running,
+                                                                               previous=previous[varName],
+                                                                               bucket_size=bucketSize)[0]
+                previous[varName] = running[0]
+            yield precip
+
+        f.close()
+
 def decode_eraint_surf_times(xtimes):
     '''
       Routine to convert from ERA-Interim time ('hours since 1900...') 
@@ -333,7 +366,7 @@ def decode_eraint_surf_times(xtimes):
     
     return times
 
-def read_total_precip_from_filelist(myfilelist):
+def read_total_precip_from_filelist(myfilelist, timeVarName='XTIME', latVarName='XLAT', lonVarName='XLONG'):
     '''
      WRF outputs precipitation data under several variables:
      
@@ -351,6 +384,7 @@ def read_total_precip_from_filelist(myfilelist):
          
      Input:
          myfilelist - a list of filename (including full path)
+         timeVarName, latVarName, lonVarName - (optional) names of the time, latitude and longitude variables
            
      Output:
          precip - a numpy array of total precip values
@@ -365,11 +399,30 @@ def read_total_precip_from_filelist(myfilelist):
     myfilelist.sort()
 
     print 'Calculating total precipitation from individual rain/snow, convective/ls components'
-    lat, lon, times, rainnc = read_data_from_file_list(myfilelist, 'RAINC')
-    lat, lon, times, rainc = read_data_from_file_list(myfilelist, 'RAINNC')
-    precip = rainnc + rainc
+    f = netCDF4.Dataset(myfilelist[0], mode='r')
+    # WRF stores the (time invariant) grid at every time
+    lat = f.variables[latVarName][0]
+    lon = f.variables[lonVarName][0]
+    f.close()
+
+    times = []
+    for ifile in myfilelist:
+        fileTimes, _ = process.getModelTimes(ifile, timeVarName)
+        times.extend(fileTimes)
+
+    # Add up the components one file at a time straight into the output
+    precip = np.zeros((len(times),) + lat.shape)
+    start = 0
+    for ifile in myfilelist:
+        f = netCDF4.Dataset(ifile, mode='r')
+        for varName in ('RAINC', 'RAINNC'):
+            rain = f.variables[varName][:]
+            precip[start:start + rain.shape[0]] += rain
+        start += rain.shape[0]
+        f.close()
+
     # reset negative values to zero
-    precip[precip < 0] = 0.0
+    np.maximum(precip, 0.0, out=precip)
 
     return lat, lon, times, precip
 
@@ -663,11 +716,9 @@ def read_urd_files(filelist, latMin, latMax, lonMin, lonMax):
         # Find out how many days there are in that month
         nt = calendar.monthrange(year, month)[1]
         
-        data = np.zeros((nt, nsublat, nsublon))
-        for t in np.arange(nt):
-            precip = f.readReals()
-            precip.shape = [nlat, nlon]
-            data[t, :, :] = precip[wh_true].reshape(nsublat, nsublon) 
+        # Read all the days of the month at once
+        precip = f.readRecordBatch(range(nt), 'f', shape=(nlat, nlon))
+        data = precip[:, wh_true].reshape(nt, nsublat, nsublon)
         
         datastore.append(data)
 
@@ -0,0 +1,136 @@
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import StringIO
+from datetime import datetime
+
+import numpy as np
+
+# storage, utils and classes import each other, which only resolves when
+# classes is imported first
+import classes
+import storage.db as db
+
+
+class TestGriddedCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.cacheFile = os.path.join(self.cachedir, 'month.nc')
+        self.startTime = datetime(2000, 1, 1)
+        # The database returns the points of a month in any order
+        self.points = [(lat, lon, day) for day in (2, 1) for lon in (5, 3, 4) for lat in (2, 1)]
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir)
+
+    def gridData(self, points):
+        lats = [lat for lat, _, _ in points]
+        lons = [lon for _, lon, _ in points]
+        timestamps = ['2000-01-%02d 00:00:00' % day for _, _, day in points]
+        values = [day * 100 + lat * 10 + lon for lat, lon, day in points]
+        return db.grid_data(lats, lons, [0] * len(points), values, timestamps, 'daily')
+
+    def expectedValues(self):
+        return (np.array([1, 2])[:, None, None, None] * 100 +
+                np.array([1, 2])[:, None, None] * 10 + np.array([3, 4, 5])[:, None])
+
+    def testGridData(self):
+        lats, lons, levels, times, values = self.gridData(self.points)
+
+        np.testing.assert_array_equal(lats, [1, 2])
+        np.testing.assert_array_equal(lons, [3, 4, 5])
+        np.testing.assert_array_equal(levels, [0])
+        self.assertEqual(times, [datetime(2000, 1, 1), datetime(2000, 1, 2)])
+        np.testing.assert_array_equal(values, self.expectedValues())
+
+    def testCacheRoundTrip(self):
+        lats, lons, levels, times, values = self.gridData(self.points)
+        db.create_gridded_netCDF(lats, lons, levels, times, values, 'trmm', 'mm', self.startTime, self.cacheFile)
+
+        cachedValues = np.empty(values.shape)
+        cachedLats, cachedLons, cachedLevels, cachedTimes = db.read_gridded_netCDF(self.cacheFile, cachedValues)
+        np.testing.assert_array_equal(cachedLats, lats)
+        np.testing.assert_array_equal(cachedLons, lons)
+        np.testing.assert_array_equal(cachedLevels, levels)
+        self.assertEqual(cachedTimes, times)
+        np.testing.assert_array_equal(cachedValues, values)
+
+    def testEmptyMonth(self):
+        lats, lons, levels, times, values = self.gridData([])
+        db.create_gridded_netCDF(lats, lons, levels, times, values, 'trmm', 'mm', self.startTime, self.cacheFile)
+
+        cachedLats, cachedLons, cachedLevels, cachedTimes = db.read_gridded_netCDF(self.cacheFile)
+        self.assertEqual(len(cachedLats), 0)
+        self.assertEqual(len(cachedLons), 0)
+        self.assertEqual(len(cachedLevels), 0)
+        self.assertEqual(cachedTimes, [])
+
+    def testFailedWriteLeavesNoCacheFile(self):
+        lats, lons, levels, times, values = self.gridData(self.points)
+        with self.assertRaises(Exception):
+            db.create_gridded_netCDF(lats, lons, levels, times, values[:, :, :2], 'trmm', 'mm', self.startTime, self.cacheFile)
+        self.assertEqual(os.listdir(self.cachedir), [])
+
+
+class TestExtractData(unittest.TestCase):
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.urls = []
+        self.urlopen = db.urllib2.urlopen
+        db.urllib2.urlopen = self.returnText
+
+    def tearDown(self):
+        db.urllib2.urlopen = self.urlopen
+        shutil.rmtree(self.cachedir)
+
+    def returnText(self, url):
+        if url.endswith('&info=yes'):
+            return StringIO.StringIO(json.dumps({'database': 'trmm', 'timestep': 'daily', 'realm': 'atmos',
+                                                 'instrument': 'trmm', 'start_date': '', 'end_date': '',
+                                                 'units': 'mm'}))
+        self.urls.append(url)
+        # January has two days of data on a 2x3 grid, February has none
+        rows = ''
+        if 'timeStart=20000101' in url:
+            rows = ''.join('%d,%d,0,2000-01-%02d 00:00:00,%d\r\n' % (lat, lon, day, day * 100 + lat * 10 + lon)
+                           for day in (1, 2) for lat in (1, 2) for lon in (3, 4, 5))
+        return StringIO.StringIO('header\r\ndata: \r\n' + rows)
+
+    def extractData(self):
+        return db.extractData(1, 2, 1, 2, 3, 5, datetime(2000, 1, 1), datetime(2000, 2, 29), self.cachedir, 'daily')
+
+    def testEmptyMonthCached(self):
+        for run in range(2):
+            lats, lons, levels, times, values = self.extractData()
+
+            self.assertEqual(times, [datetime(2000, 1, 1), datetime(2000, 1, 2)])
+            np.testing.assert_array_equal(lats, [[1, 1, 1], [2, 2, 2]])
+            np.testing.assert_array_equal(lons, [[3, 4, 5], [3, 4, 5]])
+            np.testing.assert_array_equal(values[1], [[213, 214, 215], [223, 224, 225]])
+
+        # The second run reads both months from the cache
+        self.assertEqual(len(self.urls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
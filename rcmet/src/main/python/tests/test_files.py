@@ -17,12 +17,24 @@
 # under the License.
 #
 import os
+import shutil
+import tempfile
 import unittest
-import Nio as nio
+import datetime
+import netCDF4
+import numpy as np
+try:
+    import Nio as nio
+except ImportError:
+    nio = None
 
+# storage.files, utils.misc and classes import each other, which only
+# resolves when classes is imported first
+import classes
 import storage.files as files
 
 
+@unittest.skipIf(nio is None, 'PyNIO is not installed')
 class TestGetVariableByType(unittest.TestCase):
 
     def setUp(self):
@@ -83,5 +95,92 @@ class TestGetVariableByType(unittest.TestCase):
         f.close()
         return filename
 
+
+class TestReadDataFromFileList(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.lats = np.array([10., 11., 12.])
+        self.lons = np.array([20., 21., 22., 23.])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def expectedValues(self, days):
+        return (np.array(days)[:, np.newaxis, np.newaxis] * 100 +
+                np.arange(3)[:, np.newaxis] * 10 + np.arange(4))
+
+    def makeFile(self, name, days, layout='time,lat,lon', numLevels=1):
+        '''Write t2 on the grid with the value day*100 + row*10 + col, 
+        the same at every level'''
+        filename = os.path.join(self.directory, name)
+        f = netCDF4.Dataset(filename, 'w')
+        f.createDimension('time', len(days))
+        f.createDimension('level', numLevels)
+        f.createDimension('lat', len(self.lats))
+        f.createDimension('lon', len(self.lons))
+        times = f.createVariable('time', 'f8', ('time',))
+        times.units = 'days since 2000-01-01 00:00:00'
+        times[:] = days
+        f.createVariable('lat', 'f4', ('lat',))[:] = self.lats
+        f.createVariable('lon', 'f4', ('lon',))[:] = self.lons
+
+        values = self.expectedValues(days)
+        dimensions = tuple(layout.split(','))
+        if 'level' in dimensions:
+            values = np.expand_dims(values, dimensions.index('level'))
+            values = np.repeat(values, numLevels, axis=dimensions.index('level'))
+        f.createVariable('t2', 'f4', dimensions)[:] = values
+        f.close()
+        return filename
+
+    def readData(self, filelist, **kwargs):
+        return files.read_data_from_file_list(filelist, 't2', 'time', 'lat', 'lon', **kwargs)
+
+    def testMultipleFiles(self):
+        filelist = [self.makeFile('b.nc', [2, 3, 4]), self.makeFile('a.nc', [0, 1])]
+        data = self.readData(filelist)
+
+        self.assertEqual(data['data'].shape, (5, 3, 4))
+        self.assertEqual(data['times'], [datetime.datetime(2000, 1, 1 + day) for day in range(5)])
+        np.testing.assert_array_equal(data['data'], self.expectedValues(range(5)))
+        np.testing.assert_array_equal(data['lats'][:, 0], self.lats)
+        np.testing.assert_array_equal(data['lons'][0], self.lons)
+
+    def testTimeRange(self):
+        filelist = [self.makeFile('a.nc', [0, 1]), self.makeFile('b.nc', [2, 3, 4]),
+                    self.makeFile('c.nc', [5, 6])]
+        timeRange = (datetime.datetime(2000, 1, 2), datetime.datetime(2000, 1, 4))
+        data = self.readData(filelist, timeRange=timeRange)
+
+        self.assertEqual(data['times'], [datetime.datetime(2000, 1, 1 + day) for day in [1, 2, 3]])
+        np.testing.assert_array_equal(data['data'], self.expectedValues([1, 2, 3]))
+
+    def testLatLonRange(self):
+        filelist = [self.makeFile('a.nc', [0, 1])]
+        data = self.readData(filelist, latRange=(11, 12), lonRange=(21, 22))
+
+        np.testing.assert_array_equal(data['lats'], [[11, 11], [12, 12]])
+        np.testing.assert_array_equal(data['lons'], [[21, 22], [21, 22]])
+        np.testing.assert_array_equal(data['data'], self.expectedValues([0, 1])[:, 1:3, 1:3])
+
+    def testSingleLevel(self):
+        filelist = [self.makeFile('a.nc', [0, 1], 'time,level,lat,lon')]
+        data = self.readData(filelist)
+
+        np.testing.assert_array_equal(data['data'], self.expectedValues([0, 1]))
+
+    def testTrailingSingleLevel(self):
+        filelist = [self.makeFile('a.nc', [0, 1], 'time,lat,lon,level')]
+        data = self.readData(filelist)
+
+        np.testing.assert_array_equal(data['data'], self.expectedValues([0, 1]))
+
+    def testMultipleLevelsRaisesValueError(self):
+        filelist = [self.makeFile('a.nc', [0, 1], 'time,level,lat,lon', numLevels=2)]
+        with self.assertRaises(ValueError):
+            self.readData(filelist)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,142 @@
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from utils.fortranfile import FortranFile
+
+
+class TestFortranFileRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.tempDir = tempfile.mkdtemp()
+        self.fileName = os.path.join(self.tempDir, 'records.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempDir)
+
+    def writeRecords(self, records, endian='@', prec='f'):
+        fortranFile = FortranFile(self.fileName, endian, mode='wb')
+        for record in records:
+            fortranFile.writeReals(np.ravel(record), prec)
+        fortranFile.close()
+
+    def recordValues(self, numOfRecords, shape=(2, 3)):
+        return [10 * record + np.arange(np.prod(shape)).reshape(shape)
+                for record in range(numOfRecords)]
+
+    def testNativeRoundTrip(self):
+        records = self.recordValues(5)
+        self.writeRecords(records)
+
+        fortranFile = FortranFile(self.fileName)
+        offsets, lengths = fortranFile.indexRecords()
+        np.testing.assert_array_equal(lengths, [24] * 5)
+        np.testing.assert_array_equal(offsets, 4 + 32 * np.arange(5))
+        np.testing.assert_array_equal(fortranFile.mapRecord(3, 'f', shape=(2, 3)), records[3])
+        np.testing.assert_array_equal(fortranFile.readRecordBatch(range(5), 'f', shape=(2, 3)), records)
+        # the same values as reading the records in order
+        for record in records:
+            np.testing.assert_array_equal(fortranFile.readReals('f'), np.ravel(record))
+        fortranFile.close()
+
+    def testBigEndianRoundTrip(self):
+        records = self.recordValues(4)
+        self.writeRecords(records, endian='>', prec='d')
+
+        fortranFile = FortranFile(self.fileName, endian='>')
+        mapped = fortranFile.mapRecord(2, 'd', shape=(2, 3))
+        self.assertTrue(mapped.dtype.isnative)
+        np.testing.assert_array_equal(mapped, records[2])
+        batch = fortranFile.readRecordBatch([1, 2, 3], 'd', shape=(2, 3))
+        self.assertTrue(batch.dtype.isnative)
+        np.testing.assert_array_equal(batch, records[1:])
+        fortranFile.close()
+
+    def testStridedBatch(self):
+        records = self.recordValues(7)
+        self.writeRecords(records)
+
+        fortranFile = FortranFile(self.fileName)
+        batch = fortranFile.readRecordBatch([1, 3, 5], 'f', shape=(2, 3))
+        np.testing.assert_array_equal(batch, [records[1], records[3], records[5]])
+        # in reverse order, which is read one record at a time
+        batch = fortranFile.readRecordBatch([5, 3, 1], 'f', shape=(2, 3))
+        np.testing.assert_array_equal(batch, [records[5], records[3], records[1]])
+        fortranFile.close()
+
+    def testUnevenlySpacedBatch(self):
+        # a shorter record between records of the same length
+        records = self.recordValues(4)
+        records.insert(2, np.arange(2.))
+        self.writeRecords(records)
+
+        fortranFile = FortranFile(self.fileName)
+        out = np.zeros((4, 2, 3), dtype=np.float32)
+        batch = fortranFile.readRecordBatch([0, 1, 3, 4], 'f', shape=(2, 3), out=out)
+        self.assertIs(batch, out)
+        np.testing.assert_array_equal(batch, [records[0], records[1], records[3], records[4]])
+        batch = fortranFile.readRecordBatch([4, 0, 3], 'f', shape=(2, 3))
+        np.testing.assert_array_equal(batch, [records[4], records[0], records[3]])
+
+        with self.assertRaises(ValueError):
+            fortranFile.readRecordBatch([1, 2], 'f')
+        fortranFile.close()
+
+    def testTruncatedRecordMarker(self):
+        self.writeRecords(self.recordValues(2))
+        with open(self.fileName, 'ab') as dataFile:
+            dataFile.write('\x00\x00')
+
+        fortranFile = FortranFile(self.fileName)
+        with self.assertRaisesRegexp(IOError, 'Truncated record marker at byte 64'):
+            fortranFile.indexRecords()
+        fortranFile.close()
+
+    def testMissingEndMarker(self):
+        self.writeRecords(self.recordValues(2))
+        with open(self.fileName, 'r+b') as dataFile:
+            dataFile.truncate(os.path.getsize(self.fileName) - 4)
+
+        fortranFile = FortranFile(self.fileName)
+        with self.assertRaisesRegexp(IOError, 'Error reading record'):
+            fortranFile.indexRecords()
+        fortranFile.close()
+
+    def testCloseReleasesMap(self):
+        records = self.recordValues(3)
+        self.writeRecords(records)
+
+        fortranFile = FortranFile(self.fileName)
+        mapped = fortranFile.mapRecord(1, 'f', shape=(2, 3))
+        self.assertIsNotNone(fortranFile._map)
+        fortranFile.close()
+
+        self.assertIsNone(fortranFile._map)
+        self.assertIsNone(fortranFile._offsets)
+        # views of the map stay readable after the file is closed
+        np.testing.assert_array_equal(mapped, records[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
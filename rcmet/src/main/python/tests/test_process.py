@@ -19,6 +19,8 @@
 import unittest
 from datetime import datetime, timedelta
 
+import numpy as np
+
 import toolkit.process as process
 
 
@@ -37,8 +39,28 @@ class TestNormalizeDatetimes(unittest.TestCase):
         self.daily = 'daily'
         self.normalDaily = process.normalizeDatetimes(self.dailyNoonish, self.daily)
         self.assertEqual(self.dailyClean, self.normalDaily)
-        
-        
+
+
+class TestAccumulations(unittest.TestCase):
+
+    def testRunningAccum(self):
+        period = np.array([0, 0, 1, 0, 0, 2, 2, 1, 0, 0])
+        running = process.calc_running_accum_from_period_accum(period)
+        np.testing.assert_array_equal(running, [0, 0, 1, 1, 1, 3, 5, 6, 6, 6])
+
+    def testPeriodAccum(self):
+        running = np.array([0, 0, 1, 1, 1, 3, 5, 6, 6, 6])
+        period = process.calc_period_accum_from_running_accum(running, previous=0)
+        np.testing.assert_array_equal(period, [0, 0, 1, 0, 0, 2, 2, 1, 0, 0])
+
+    def testPeriodAccumResets(self):
+        running = np.array([1., 3., 0.5, 2., 2. - 1.e-6])
+        restarted = process.calc_period_accum_from_running_accum(running)
+        np.testing.assert_allclose(restarted, [1, 2, 0.5, 1.5, 0])
+        bucket = process.calc_period_accum_from_running_accum(running, bucket_size=4.)
+        np.testing.assert_allclose(bucket, [1, 2, 1.5, 1.5, 0])
+
+
 if __name__ == '__main__':
     unittest.main()
          
\ No newline at end of file